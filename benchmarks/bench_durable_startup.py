@@ -0,0 +1,104 @@
+"""
+持久化存储启动恢复基准测试
+
+先在数据目录中生成包含N条链接的快照和一段操作日志尾部，
+再在新进程中测量DurableURLStorage加载快照并重放日志所需的时间和内存。
+
+用法:
+    python benchmarks/bench_durable_startup.py --count 5000000 --tail 100000 --data-dir /tmp/bench-durable
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.durable_storage import DurableURLStorage  # noqa: E402
+from utils.url_record import URLRecord, now_micros  # noqa: E402
+
+
+BASE_URL = "http://localhost:8000"
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def _prepare(data_dir: str, count: int, tail: int) -> None:
+    """直接写入记录后生成快照，再通过正常写路径追加日志尾部"""
+    storage = DurableURLStorage(data_dir, fsync_delay=0.005, snapshot_ops=count + tail + 1)
+    now = now_micros()
+    for i in range(count):
+        storage._insert_record(URLRecord(
+            id=f"{i:08x}",
+            original_url=f"https://www.example.com/articles/{i}?utm_source=newsletter",
+            base_url=BASE_URL,
+            created_at=now,
+            expires_at=now + 30 * 86400 * 10**6 if i % 4 == 0 else None,
+            last_accessed=now if i % 2 == 0 else None,
+            click_count=i % 50,
+        ))
+    await storage.compact()
+    
+    # 日志尾部：并发写入以触发组提交
+    batch = 1000
+    for start in range(0, tail, batch):
+        await asyncio.gather(*(
+            storage.create_url({
+                "id": f"tail{i:08x}",
+                "original_url": f"https://www.example.com/tail/{i}",
+                "base_url": BASE_URL,
+            })
+            for i in range(start, min(start + batch, tail))
+        ))
+    await storage.close()
+
+
+def _measure(data_dir: str) -> dict:
+    before = _rss_bytes()
+    started = time.perf_counter()
+    storage = DurableURLStorage(data_dir)
+    elapsed = time.perf_counter() - started
+    result = dict(storage.recovery_stats)
+    result["startup_seconds"] = round(elapsed, 3)
+    result["rss_bytes"] = _rss_bytes() - before
+    result["snapshot_bytes"] = os.path.getsize(os.path.join(data_dir, "snapshot.dat"))
+    result["log_bytes"] = os.path.getsize(os.path.join(data_dir, "oplog.jsonl"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="持久化存储启动恢复基准测试")
+    parser.add_argument("--count", type=int, default=5_000_000, help="快照中的链接数")
+    parser.add_argument("--tail", type=int, default=100_000, help="快照之后日志中的写入数")
+    parser.add_argument("--data-dir", default="/tmp/bench-durable")
+    parser.add_argument("--measure-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure_only:
+        print(json.dumps(_measure(args.data_dir)))
+        return
+    
+    shutil.rmtree(args.data_dir, ignore_errors=True)
+    started = time.perf_counter()
+    asyncio.run(_prepare(args.data_dir, args.count, args.tail))
+    print(f"prepared {args.count:,} + {args.tail:,} links in {time.perf_counter() - started:.1f}s")
+    
+    # 在新进程中测量，避免准备阶段的内存影响结果
+    proc = subprocess.run(
+        [sys.executable, __file__, "--measure-only", "--data-dir", args.data_dir],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    print(proc.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+HTTP负载与延迟基准测试
+
+通过httpx驱动ASGI应用，可以在进程内直接调用（ASGITransport，不经过网络栈），
+也可以压测本地启动的uvicorn进程。分别运行创建为主、重定向为主和混合三类负载，
+按路由统计吞吐量与p50/p99/p999延迟，结果写为JSON，便于在不同提交之间对比。
+
+重定向目标按Zipf分布抽样，模拟少数热点链接占据大部分流量的真实场景。
+
+用法:
+    python benchmarks/bench_http.py --target asgi --requests 20000 --output results.json
+    python benchmarks/bench_http.py --target uvicorn --workers 4 --concurrency 64
+    python benchmarks/bench_http.py --target asgi --baseline before.json
+    python benchmarks/bench_http.py --target asgi --workloads redirect --fast-redirect --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+WORKLOADS = ("create", "redirect", "mixed")
+
+# 混合负载中各类请求的比例
+MIXED_WEIGHTS = {"redirect": 0.8, "create": 0.1, "info": 0.1}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _summarize(latencies: List[float], errors: int) -> dict:
+    values = sorted(latencies)
+    to_ms = 1000.0
+    return {
+        "count": len(values),
+        "errors": errors,
+        "mean_ms": round(sum(values) / len(values) * to_ms, 3) if values else 0.0,
+        "p50_ms": round(_percentile(values, 0.50) * to_ms, 3),
+        "p99_ms": round(_percentile(values, 0.99) * to_ms, 3),
+        "p999_ms": round(_percentile(values, 0.999) * to_ms, 3),
+        "max_ms": round(values[-1] * to_ms, 3) if values else 0.0,
+    }
+
+
+def _zipf_sampler(ids: List[str], skew: float, rng: random.Random):
+    """按Zipf分布（排名越靠前越热）抽样的函数"""
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, len(ids) + 1):
+        total += 1.0 / rank ** skew
+        cum_weights.append(total)
+    return lambda k: rng.choices(ids, cum_weights=cum_weights, k=k)
+
+
+def _plan(workload: str, count: int, ids: List[str], skew: float, rng: random.Random) -> List[Tuple[str, str, str]]:
+    """生成请求计划：(路由标签, 方法, 路径)"""
+    sample = _zipf_sampler(ids, skew, rng)
+    if workload == "create":
+        return [("POST /shorten", "POST", "/shorten")] * count
+    if workload == "redirect":
+        return [("GET /{short_id}", "GET", f"/{short_id}") for short_id in sample(count)]
+    
+    kinds = rng.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()), k=count)
+    targets = iter(sample(count))
+    plan = []
+    for kind in kinds:
+        if kind == "create":
+            plan.append(("POST /shorten", "POST", "/shorten"))
+        elif kind == "redirect":
+            plan.append(("GET /{short_id}", "GET", f"/{next(targets)}"))
+        else:
+            plan.append(("GET /api/urls/{short_id}", "GET", f"/api/urls/{next(targets)}"))
+    return plan
+
+
+async def _seed(client: httpx.AsyncClient, count: int) -> List[str]:
+    """通过批量接口预先创建重定向目标"""
+    ids = []
+    for start in range(0, count, 1000):
+        items = [
+            {"original_url": f"https://www.example.com/articles/{i}"}
+            for i in range(start, min(start + 1000, count))
+        ]
+        response = await client.post("/shorten/batch", json={"items": items})
+        response.raise_for_status()
+        ids.extend(item["data"]["id"] for item in response.json()["results"] if item["success"])
+    return ids
+
+
+async def _run_workload(
+    client: httpx.AsyncClient,
+    workload: str,
+    plan: List[Tuple[str, str, str]],
+    concurrency: int
+) -> dict:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    requests = iter(enumerate(plan))
+    
+    async def worker():
+        for i, (route, method, path) in requests:
+            body = {"original_url": f"https://www.example.com/{workload}/{i}"} if method == "POST" else None
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            elapsed = time.perf_counter() - started
+            if failed:
+                errors[route] += 1
+            else:
+                latencies[route].append(elapsed)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    
+    routes = {route: _summarize(latencies[route], errors[route]) for route in sorted(set(latencies) | set(errors))}
+    return {
+        "workload": workload,
+        "requests": len(plan),
+        "errors": sum(errors.values()),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(plan) / duration, 1),
+        "routes": routes,
+    }
+
+
+async def _run_all(client: httpx.AsyncClient, args) -> List[dict]:
+    rng = random.Random(args.seed)
+    ids = await _seed(client, args.links)
+    results = []
+    for workload in args.workloads:
+        if args.warmup:
+            await _run_workload(client, workload, _plan(workload, args.warmup, ids, args.skew, rng), args.concurrency)
+        plan = _plan(workload, args.requests, ids, args.skew, rng)
+        result = await _run_workload(client, workload, plan, args.concurrency)
+        print(
+            f"{workload:>8}: {result['throughput_rps']:>10.1f} req/s, errors={result['errors']}",
+            file=sys.stderr
+        )
+        results.append(result)
+    return results
+
+
+async def _bench_asgi(args) -> List[dict]:
+    """进程内调用ASGI应用，手动进入应用生命周期（启动和关闭）"""
+    from main import app
+    
+    asgi_app = app
+    if args.fast_redirect:
+        from middleware.redirect import FastRedirectMiddleware
+        from services.container import container
+        asgi_app = FastRedirectMiddleware(app, service_factory=lambda: container.service)
+    
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await _run_all(client, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn未能在超时时间内启动")
+        await asyncio.sleep(0.1)
+
+
+async def _bench_uvicorn(args) -> List[dict]:
+    """压测本地uvicorn进程；指定--url时使用已运行的服务"""
+    process = None
+    base_url = args.url
+    if base_url is None:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--host", "127.0.0.1",
+                "--port", str(port),
+                "--workers", str(args.workers),
+                "--log-level", "warning",
+                "--no-access-log",
+            ],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "REDIRECT_FAST_PATH": "true" if args.fast_redirect else "false"},
+        )
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            await _wait_ready(client)
+            return await _run_all(client, args)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(report: dict, baseline: dict) -> None:
+    """打印与基线结果的对比（吞吐量和各路由p50/p99变化百分比）"""
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+    
+    previous = {result["workload"]: result for result in baseline["results"]}
+    print(f"\n对比基线 {baseline['meta'].get('commit')} -> {report['meta'].get('commit')}")
+    for result in report["results"]:
+        old = previous.get(result["workload"])
+        if old is None:
+            continue
+        print(f"{result['workload']}: throughput {change(result['throughput_rps'], old['throughput_rps'])}")
+        for route, stats in result["routes"].items():
+            old_stats = old["routes"].get(route)
+            if old_stats:
+                print(
+                    f"  {route}: p50 {change(stats['p50_ms'], old_stats['p50_ms'])}, "
+                    f"p99 {change(stats['p99_ms'], old_stats['p99_ms'])}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP负载与延迟基准测试")
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi", help="进程内ASGI或本地uvicorn")
+    parser.add_argument("--url", help="uvicorn目标：压测已运行的服务而不是自动启动")
+    parser.add_argument("--workers", type=int, default=1, help="自动启动uvicorn时的worker数")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--requests", type=int, default=10000, help="每类负载的请求数")
+    parser.add_argument("--warmup", type=int, default=1000, help="每类负载正式计时前的预热请求数")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发请求数")
+    parser.add_argument("--links", type=int, default=10000, help="预先创建的重定向目标数")
+    parser.add_argument("--skew", type=float, default=1.1, help="重定向目标Zipf分布的偏斜系数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--fast-redirect", action="store_true", help="重定向走ASGI快速路径（FastRedirectMiddleware）")
+    parser.add_argument("--output", help="结果JSON文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="用于对比的历史结果JSON文件")
+    args = parser.parse_args()
+    
+    run = _bench_asgi if args.target == "asgi" else _bench_uvicorn
+    results = asyncio.run(run(args))
+    
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "target": args.target,
+            "workers": args.workers if args.target == "uvicorn" else None,
+            "fast_redirect": args.fast_redirect,
+            "storage_backend": os.getenv("STORAGE_BACKEND", "memory"),
+            "concurrency": args.concurrency,
+            "links": args.links,
+            "skew": args.skew,
+        },
+        "results": results,
+    }
+    
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            _compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
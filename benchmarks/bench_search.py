@@ -0,0 +1,110 @@
+"""
+短链接搜索基准测试
+
+在内存存储中生成N条链接，分别测量逐条扫描和启用搜索索引（SEARCH_INDEX_ENABLED）时
+前缀查询和子串查询的延迟，以及建立索引的耗时和索引内存（按对象大小估算）。
+
+用法:
+    python benchmarks/bench_search.py --count 1000000
+    python benchmarks/bench_search.py --count 200000 --repeat 20
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.storage import URLStorage  # noqa: E402
+from utils.url_record import URLRecord, now_micros  # noqa: E402
+
+
+BASE_URL = "http://localhost:8000"
+HOSTS = ["www.example.com", "docs.example.org", "shop.example.net", "blog.example.io"]
+QUERIES = [
+    ("prefix", "https://docs.example.org/guide/12"),
+    ("prefix", "alias12"),
+    ("substring", "/guide/4242"),
+    ("substring", "campaign=spring"),
+    ("substring", "ab"),
+]
+
+
+def _records(count: int):
+    now = now_micros()
+    for i in range(count):
+        host = HOSTS[i % len(HOSTS)]
+        campaign = "spring" if i % 1000 == 0 else "newsletter"
+        yield URLRecord(
+            id=f"{i:08x}",
+            original_url=f"https://{host}/guide/{i}?utm_campaign={campaign}",
+            base_url=BASE_URL,
+            created_at=now + i,
+            custom_alias=f"alias{i}" if i % 100 == 0 else None,
+        )
+
+
+def _fill(count: int, search_index: bool):
+    storage = URLStorage(search_index=search_index)
+    gc.disable()
+    started = time.perf_counter()
+    for record in _records(count):
+        storage._insert_record(record)
+    seconds = time.perf_counter() - started
+    gc.enable()
+    return storage, seconds
+
+
+def _index_bytes(index) -> int:
+    """索引容器及其中键、倒排表和排序条目的大小（文本与记录共享的字符串不计入）"""
+    size = 0
+    for block in index._sorted._blocks:
+        size += sys.getsizeof(block) + sum(map(sys.getsizeof, block))
+    size += sys.getsizeof(index._postings) + sum(map(sys.getsizeof, index._postings))
+    size += sum(map(sys.getsizeof, index._postings.values()))
+    size += sys.getsizeof(index._doc_ids) + sys.getsizeof(index._docs)
+    return size
+
+
+async def _query_ms(storage: URLStorage, mode: str, query: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await storage.search_urls(query, mode, 100)
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+async def run(args) -> dict:
+    scan, scan_seconds = _fill(args.count, search_index=False)
+    indexed, indexed_seconds = _fill(args.count, search_index=True)
+    queries = {}
+    for mode, query in QUERIES:
+        queries[f"{mode}:{query}"] = {
+            "scan_ms": await _query_ms(scan, mode, query, args.repeat),
+            "indexed_ms": await _query_ms(indexed, mode, query, args.repeat),
+        }
+    return {
+        "count": args.count,
+        "fill_seconds": round(scan_seconds, 2),
+        "fill_seconds_indexed": round(indexed_seconds, 2),
+        "index_us_per_link": round((indexed_seconds - scan_seconds) / args.count * 1e6, 2),
+        "index_mb": round(_index_bytes(indexed._search_index) / 2**20, 1),
+        "queries": queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="短链接搜索基准测试")
+    parser.add_argument("--count", type=int, default=200000, help="链接数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询的重复次数（取中位数）")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+列表和详情响应序列化基准测试
+
+对比两种把存储读取结果变成响应正文的方式：
+常规路径（response_model校验加JSONResponse序列化，与FastAPI路由处理返回值的过程相同）
+与JSON片段缓存（utils/fragment_cache.py，缓存命中时只拼接点击次数）。
+只测量序列化本身，不含存储读取和HTTP开销；每页点击次数随机变化，模拟看板轮询期间链接持续被访问。
+
+用法:
+    python benchmarks/bench_serialization.py --page-sizes 100 1000 --rounds 200
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from models.url_models import URLResponse  # noqa: E402
+from utils.fragment_cache import FragmentCache  # noqa: E402
+
+
+BASE_URL = "http://localhost:8000"
+
+
+def _make_urls(count: int, rng: random.Random) -> List[URLResponse]:
+    now = datetime.utcnow()
+    return [
+        URLResponse(
+            id=f"{i:08x}",
+            original_url=f"https://www.example.com/articles/{i}?utm_source=newsletter",
+            short_url=f"{BASE_URL}/{i:08x}",
+            click_count=rng.randrange(10000),
+            created_at=now - timedelta(seconds=i),
+            expires_at=now + timedelta(days=30) if i % 4 == 0 else None,
+        )
+        for i in range(count)
+    ]
+
+
+def _with_clicks(urls: List[URLResponse], rng: random.Random) -> List[URLResponse]:
+    """复制一页结果并改变部分点击次数（相当于下一次从存储读到的结果）"""
+    return [
+        url.model_copy(update={"click_count": url.click_count + 1}) if rng.random() < 0.3 else url
+        for url in urls
+    ]
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _measure(render: Callable[[object], bytes], pages: List[object]) -> dict:
+    latencies = []
+    total_bytes = 0
+    for page in pages:
+        started = time.perf_counter()
+        total_bytes += len(render(page))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 4),
+        "ops_per_s": round(len(pages) / sum(latencies), 1),
+        "bytes": total_bytes // len(pages),
+    }
+
+
+def _response_model_renderer(response_type) -> Callable[[object], bytes]:
+    """与路由声明response_model时相同：校验、转换为JSON兼容对象，再由JSONResponse编码"""
+    field = create_response_field(name="response", type_=response_type)
+    loop = asyncio.new_event_loop()
+    
+    def render(content) -> bytes:
+        value = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(value).body
+    
+    return render
+
+
+def run(page_size: int, rounds: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    base = _make_urls(page_size, rng)
+    pages = [_with_clicks(base, rng) for _ in range(rounds)]
+    infos = [_with_clicks(base[:1], rng)[0] for _ in range(rounds)]
+    
+    cache = FragmentCache(max_size=page_size)
+    cache.render_list(base)  # 预热：看板轮询时缓存中已有上一轮的片段
+    
+    result = {
+        "page_size": page_size,
+        "list": {
+            "response_model": _measure(_response_model_renderer(List[URLResponse]), pages),
+            "fragments": _measure(cache.render_list, pages),
+            "fragments_cold": _measure(lambda page: FragmentCache(max_size=page_size).render_list(page), pages[:20]),
+        },
+        "info": {
+            "response_model": _measure(_response_model_renderer(URLResponse), infos),
+            "fragments": _measure(cache.render, infos),
+        },
+    }
+    
+    # 两种方式输出应逐字节相同
+    assert cache.render_list(pages[0]) == _response_model_renderer(List[URLResponse])(pages[0])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表和详情响应序列化基准测试")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000], help="每页链接数")
+    parser.add_argument("--rounds", type=int, default=200, help="每种方式序列化的页数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+    
+    results = [run(page_size, args.rounds, args.seed) for page_size in args.page_sizes]
+    print(json.dumps(results, indent=2))
+    
+    print()
+    print(f"{'page':>6} {'endpoint':<6} {'response_model p50':>20} {'fragments p50':>15} {'speedup':>8}")
+    for result in results:
+        for endpoint in ("list", "info"):
+            before = result[endpoint]["response_model"]["p50_ms"]
+            after = result[endpoint]["fragments"]["p50_ms"]
+            print(
+                f"{result['page_size']:>6} {endpoint:<6} {before:>17.4f} ms {after:>12.4f} ms "
+                f"{before / after:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+列式快照导出导入基准测试
+
+在内存存储中直接生成N条链接，测量导出为列式快照和从快照导入新存储的耗时与文件大小；
+另外经服务层批量创建接口重放一小部分链接，按速率估算同样数量通过接口重放所需的时间。
+
+用法:
+    python benchmarks/bench_snapshot.py --count 10000000
+    python benchmarks/bench_snapshot.py --count 1000000 --path /tmp/links.snap --replay-sample 20000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.url_models import URLCreate  # noqa: E402
+from services.url_service import URLService  # noqa: E402
+from utils.storage import URLStorage  # noqa: E402
+from utils.url_record import URLRecord, now_micros  # noqa: E402
+from utils.columnar_snapshot import export_snapshot, import_snapshot  # noqa: E402
+
+
+BASE_URL = "http://localhost:8000"
+
+
+def _fill(count: int) -> URLStorage:
+    storage = URLStorage()
+    now = now_micros()
+    for i in range(count):
+        storage._insert_record(URLRecord(
+            id=f"{i:08x}",
+            original_url=f"https://www.example.com/articles/{i}?utm_source=newsletter",
+            base_url=BASE_URL,
+            created_at=now + i,
+            expires_at=now + 30 * 86400 * 10**6 if i % 4 == 0 else None,
+            last_accessed=now if i % 2 == 0 else None,
+            click_count=i % 50,
+            custom_alias=f"alias{i}" if i % 100 == 0 else None,
+        ))
+    return storage
+
+
+async def _replay_rate(sample: int) -> float:
+    """经服务层批量创建（与POST /shorten/batch相同的校验和写入）的每秒条数"""
+    service = URLService(storage=URLStorage())
+    items = [URLCreate(original_url=f"https://www.example.com/articles/{i}") for i in range(sample)]
+    started = time.perf_counter()
+    for start in range(0, sample, 1000):
+        await service.create_short_urls(items[start:start + 1000])
+    return sample / (time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    path = args.path or os.path.join(tempfile.gettempdir(), "bench-links.snap")
+    gc.disable()
+    storage = _fill(args.count)
+    gc.enable()
+    
+    started = time.perf_counter()
+    await export_snapshot(storage, path)
+    export_seconds = time.perf_counter() - started
+    del storage
+    gc.collect()
+    
+    restored = URLStorage()
+    started = time.perf_counter()
+    await import_snapshot(restored, path)
+    import_seconds = time.perf_counter() - started
+    assert len(restored._storage) == args.count
+    
+    replay_rate = await _replay_rate(args.replay_sample)
+    size = os.path.getsize(path)
+    if args.path is None:
+        os.remove(path)
+    return {
+        "count": args.count,
+        "file_bytes": size,
+        "bytes_per_link": round(size / args.count, 1),
+        "export_seconds": round(export_seconds, 3),
+        "import_seconds": round(import_seconds, 3),
+        "replay_links_per_second": round(replay_rate, 1),
+        "replay_estimated_seconds": round(args.count / replay_rate, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列式快照导出导入基准测试")
+    parser.add_argument("--count", type=int, default=1000000, help="链接数")
+    parser.add_argument("--path", help="快照文件路径，默认写入临时目录并在结束后删除")
+    parser.add_argument("--replay-sample", type=int, default=10000, help="用于估算接口重放速率的链接数")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
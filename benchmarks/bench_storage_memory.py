@@ -0,0 +1,139 @@
+"""
+存储记录内存占用基准测试
+
+对比旧的"每条链接一个dict"布局与紧凑URLRecord布局下每条链接的内存占用。
+每个(布局, 数量)组合在独立子进程中运行，以进程RSS增量计算字节/链接。
+--features启用按链接的统计功能（只影响record布局），此时每条链接被点击一次。
+
+用法:
+    python benchmarks/bench_storage_memory.py --counts 1000000 10000000
+    python benchmarks/bench_storage_memory.py --layouts record --counts 10000000
+    python benchmarks/bench_storage_memory.py --layouts record --counts 1000000 --features series visitors
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.storage import URLStorage  # noqa: E402
+from utils.hyperloglog import new_sketch, add_register, visitor_register  # noqa: E402
+from utils.url_utils import generate_short_id  # noqa: E402
+
+
+BASE_URL = "http://localhost:8000"
+
+
+def _rss_bytes() -> int:
+    """读取当前进程常驻内存（Linux /proc）"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _make_url_dict(i: int) -> dict:
+    """构造与服务层一致的链接数据：部分带过期时间、部分已被访问"""
+    short_id = generate_short_id()
+    now = datetime.utcnow()
+    return {
+        "id": short_id,
+        "original_url": f"https://www.example.com/articles/{i}?utm_source=newsletter",
+        "short_url": f"{BASE_URL}/{short_id}",
+        "click_count": i % 50,
+        "created_at": now.isoformat(),
+        "expires_at": (now + timedelta(days=30)).isoformat() if i % 4 == 0 else None,
+        "is_active": True,
+        "last_accessed": now.isoformat() if i % 2 == 0 else None,
+    }
+
+
+def _fill_dict_layout(count: int) -> dict:
+    """旧布局：直接保存服务层字典"""
+    storage = {}
+    for i in range(count):
+        data = _make_url_dict(i)
+        storage[data["id"]] = data
+    return storage
+
+
+def _fill_record_layout(count: int, features: list) -> URLStorage:
+    """新布局：URLStorage保存URLRecord"""
+    storage = URLStorage(click_series="series" in features)
+    loop = asyncio.new_event_loop()
+    
+    async def fill():
+        for i in range(count):
+            created = await storage.create_url(_make_url_dict(i))
+            if features:
+                await storage.resolve_and_count(created.id)
+            if "visitors" in features:
+                registers = new_sketch()
+                add_register(registers, *visitor_register(f"10.0.0.{i % 256}|bench"))
+                await storage.merge_visitor_sketches({created.id: registers})
+    
+    loop.run_until_complete(fill())
+    loop.close()
+    return storage
+
+
+def run_single(layout: str, count: int, features: list) -> dict:
+    gc.collect()
+    before = _rss_bytes()
+    if layout == "dict":
+        holder = _fill_dict_layout(count)
+    else:
+        holder = _fill_record_layout(count, features)
+    gc.collect()
+    after = _rss_bytes()
+    del holder
+    return {
+        "layout": layout,
+        "count": count,
+        "features": features,
+        "rss_bytes": after - before,
+        "bytes_per_link": round((after - before) / count, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存储记录内存占用基准测试")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--layouts", nargs="+", default=["dict", "record"], choices=["dict", "record"])
+    parser.add_argument("--features", nargs="*", default=[], choices=["series", "visitors"], help="启用的按链接统计功能")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.single:
+        print(json.dumps(run_single(args.layouts[0], args.counts[0], args.features)))
+        return
+    
+    results = []
+    for count in args.counts:
+        for layout in args.layouts:
+            proc = subprocess.run(
+                [
+                    sys.executable, __file__, "--single", "--layouts", layout, "--counts", str(count),
+                    "--features", *args.features,
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                results.append({"layout": layout, "count": count, "error": proc.stderr.strip().splitlines()[-1:]})
+            else:
+                results.append(json.loads(proc.stdout))
+            print(json.dumps(results[-1]), flush=True)
+    
+    print()
+    print(f"{'layout':<8} {'count':>12} {'bytes/link':>12}")
+    for row in results:
+        per_link = row.get("bytes_per_link", "error")
+        print(f"{row['layout']:<8} {row['count']:>12,} {per_link:>12}")
+
+
+if __name__ == "__main__":
+    main()
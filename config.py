@@ -0,0 +1,184 @@
+import os
+from typing import Literal
+from pydantic import BaseModel, ConfigDict, Field
+
+
+def _env(name: str, default: str):
+    """读取环境变量，未设置时使用默认值"""
+    return lambda: os.getenv(name, default)
+
+
+class Settings(BaseModel):
+    """应用配置，各项均可通过同名大写环境变量覆盖"""
+    model_config = ConfigDict(validate_default=True)
+    
+    storage_backend: Literal["memory", "durable", "redis", "shm"] = Field(
+        default_factory=_env("STORAGE_BACKEND", "memory"),
+        description="存储后端：memory（进程内存）、durable（本地持久化）、redis或shm（同主机多进程共享内存）"
+    )
+    data_dir: str = Field(
+        default_factory=_env("DATA_DIR", "./data"),
+        description="durable后端的数据目录（快照和操作日志）"
+    )
+    fsync_delay: float = Field(
+        default_factory=_env("FSYNC_DELAY", "0.002"),
+        ge=0,
+        description="durable后端批量fsync的等待窗口（秒），窗口内的写入合并为一次fsync"
+    )
+    snapshot_ops: int = Field(
+        default_factory=_env("SNAPSHOT_OPS", "1000000"),
+        gt=0,
+        description="durable后端操作日志累计多少条后生成新快照并截断日志"
+    )
+    redis_url: str = Field(
+        default_factory=_env("REDIS_URL", "redis://localhost:6379/0"),
+        description="Redis连接地址"
+    )
+    redis_prefix: str = Field(
+        default_factory=_env("REDIS_PREFIX", "shortener:"),
+        description="Redis键前缀"
+    )
+    redis_max_connections: int = Field(
+        default_factory=_env("REDIS_MAX_CONNECTIONS", "50"),
+        gt=0,
+        description="Redis连接池最大连接数"
+    )
+    shm_path: str = Field(
+        default_factory=_env("SHM_PATH", "/dev/shm/url-shortener.tbl"),
+        description="shm后端的共享内存表文件，同一主机的所有worker必须一致"
+    )
+    shm_capacity: int = Field(
+        default_factory=_env("SHM_CAPACITY", "1048576"),
+        gt=0,
+        description="shm后端哈希表槽位数（2的幂），最多可用75%；只在创建表文件时生效"
+    )
+    shm_heap_size: int = Field(
+        default_factory=_env("SHM_HEAP_SIZE", "268435456"),
+        gt=0,
+        description="shm后端字符串区大小（字节），保存原始URL；只在创建表文件时生效"
+    )
+    search_index_enabled: bool = Field(
+        default_factory=_env("SEARCH_INDEX_ENABLED", "false"),
+        description="memory和durable后端维护原始URL和别名的前缀及三元组搜索索引，redis后端维护前缀搜索有序集合；不启用时搜索扫描全部链接"
+    )
+    id_block_size: int = Field(
+        default_factory=_env("ID_BLOCK_SIZE", "1000"),
+        gt=0,
+        description="每次从存储后端预留的短ID计数值个数"
+    )
+    id_secret: str = Field(
+        default_factory=_env("ID_SECRET", ""),
+        description="短ID置换密钥；为空时使用随机生成并与ID计数值一起保存在存储中的密钥。设置时共享同一存储的实例必须一致"
+    )
+    click_series_enabled: bool = Field(
+        default_factory=_env("CLICK_SERIES_ENABLED", "false"),
+        description="按分钟、小时和天记录每条链接的点击时间序列（每条被点击的链接约800字节）；不启用时统计接口返回的序列全为0"
+    )
+    click_flush_interval: float = Field(
+        default_factory=_env("CLICK_FLUSH_INTERVAL", "0"),
+        ge=0,
+        description="点击计数写回间隔（秒），0表示每次重定向直接写存储"
+    )
+    visitor_flush_interval: float = Field(
+        default_factory=_env("VISITOR_FLUSH_INTERVAL", "0"),
+        ge=0,
+        description="独立访客统计合并到存储的间隔（秒），0表示不统计独立访客（每条有访客的链接约1KB）"
+    )
+    resolve_cache_size: int = Field(
+        default_factory=_env("RESOLVE_CACHE_SIZE", "0"),
+        ge=0,
+        description="热点链接解析缓存容量（条），0表示不启用"
+    )
+    resolve_cache_ttl: float = Field(
+        default_factory=_env("RESOLVE_CACHE_TTL", "30"),
+        gt=0,
+        description="解析缓存条目有效期（秒），多实例共享存储时其他实例的修改最多延迟这么久可见"
+    )
+    expiry_reap_interval: float = Field(
+        default_factory=_env("EXPIRY_REAP_INTERVAL", "60"),
+        ge=0,
+        description="过期链接清理间隔（秒），0表示不清理"
+    )
+    expiry_grace_period: float = Field(
+        default_factory=_env("EXPIRY_GRACE_PERIOD", "86400"),
+        ge=0,
+        description="链接过期多久后才被清理（秒），宽限期内访问仍返回410而不是404"
+    )
+    expiry_reap_batch_size: int = Field(
+        default_factory=_env("EXPIRY_REAP_BATCH_SIZE", "1000"),
+        gt=0,
+        description="每批清理的过期链接数，批次之间让出事件循环"
+    )
+    dedup_enabled: bool = Field(
+        default_factory=_env("DEDUP_ENABLED", "false"),
+        description="去重模式：创建未指定别名和过期时间的链接时，规范化URL相同则返回已有链接"
+    )
+    dedup_strip_params: str = Field(
+        default_factory=_env("DEDUP_STRIP_PARAMS", "utm_*,gclid,fbclid,msclkid,mc_cid,mc_eid"),
+        description="去重时忽略的跟踪查询参数，逗号分隔，以*结尾表示前缀匹配"
+    )
+    top_links_capacity: int = Field(
+        default_factory=_env("TOP_LINKS_CAPACITY", "0"),
+        ge=0,
+        description="热点链接统计每个时间段跟踪的链接数，0表示不启用/api/urls/top"
+    )
+    top_links_window: int = Field(
+        default_factory=_env("TOP_LINKS_WINDOW", "60"),
+        gt=0,
+        description="热点链接统计按分钟保留的窗口长度（分钟），即/api/urls/top的minutes参数上限"
+    )
+    fragment_cache_size: int = Field(
+        default_factory=_env("FRAGMENT_CACHE_SIZE", "0"),
+        ge=0,
+        description="列表和详情接口的JSON片段缓存容量（条），0表示不启用"
+    )
+    notfound_filter_enabled: bool = Field(
+        default_factory=_env("NOTFOUND_FILTER_ENABLED", "false"),
+        description="用进程内计数布隆过滤器直接拒绝不存在的短链接ID；只适用于本进程能看到全部写入的部署"
+    )
+    notfound_filter_capacity: int = Field(
+        default_factory=_env("NOTFOUND_FILTER_CAPACITY", "1000000"),
+        gt=0,
+        description="成员过滤器按多少个ID和别名设计容量，超出后误判率上升"
+    )
+    notfound_filter_error_rate: float = Field(
+        default_factory=_env("NOTFOUND_FILTER_ERROR_RATE", "0.01"),
+        gt=0,
+        lt=1,
+        description="成员过滤器在设计容量下的误判率"
+    )
+    redirect_fast_path: bool = Field(
+        default_factory=_env("REDIRECT_FAST_PATH", "false"),
+        description="重定向请求由最外层ASGI中间件直接处理，不经过路由、依赖注入和CORS中间件"
+    )
+    warm_start_path: str = Field(
+        default_factory=_env("WARM_START_PATH", ""),
+        description="热点链接快照文件：关闭时写入，启动时在接受请求前据此预热解析缓存；为空表示不启用"
+    )
+    warm_start_size: int = Field(
+        default_factory=_env("WARM_START_SIZE", "1000"),
+        gt=0,
+        description="热点链接快照最多保存的链接数"
+    )
+    shutdown_timeout: float = Field(
+        default_factory=_env("SHUTDOWN_TIMEOUT", "10"),
+        gt=0,
+        description="关闭时等待后台任务完成当前一轮并写回缓冲的最长时间（秒）"
+    )
+    admin_token: str = Field(
+        default_factory=_env("ADMIN_TOKEN", ""),
+        description="管理接口（快照导出导入）令牌，请求头X-Admin-Token须与之相同；为空表示不提供管理接口"
+    )
+    snapshot_upload_max_bytes: int = Field(
+        default_factory=_env("SNAPSHOT_UPLOAD_MAX_BYTES", "1073741824"),
+        gt=0,
+        description="导入快照请求体的最大字节数，超过时返回413"
+    )
+    metrics_enabled: bool = Field(
+        default_factory=_env("METRICS_ENABLED", "false"),
+        description="是否记录请求和存储操作指标并提供/metrics接口"
+    )
+
+
+# 全局配置实例
+settings = Settings()
@@ -1,3 +1,3 @@
-from .url_exceptions import URLNotFoundError, URLExpiredError, InvalidURLError, DuplicateAliasError, URLInactiveError
+from .url_exceptions import URLNotFoundError, URLExpiredError, InvalidURLError, DuplicateAliasError, URLInactiveError, InvalidCursorError, InvalidTimeRangeError, StorageFullError, InvalidSnapshotError, SnapshotNotSupportedError, AdminAuthError
 
-__all__ = ["URLNotFoundError", "URLExpiredError", "InvalidURLError", "DuplicateAliasError", "URLInactiveError"] 
\ No newline at end of file
+__all__ = ["URLNotFoundError", "URLExpiredError", "InvalidURLError", "DuplicateAliasError", "URLInactiveError", "InvalidCursorError", "InvalidTimeRangeError", "StorageFullError", "InvalidSnapshotError", "SnapshotNotSupportedError", "AdminAuthError"] 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import json
 from fastapi import HTTPException
 from typing import Optional
 
@@ -17,6 +18,19 @@ class URLNotFoundError(URLShortenerException):
         )
 
 
+# 404响应体按全局异常处理器的格式预先拆成前后两段，只需填入转义后的ID
+_NOT_FOUND_HEAD, _NOT_FOUND_TAIL = json.dumps(
+    {"error": URLNotFoundError("\x00").detail, "status_code": 404},
+    ensure_ascii=False,
+    separators=(",", ":"),
+).split(json.dumps("\x00")[1:-1])
+
+
+def not_found_body(url_id: str) -> bytes:
+    """与URLNotFoundError经全局异常处理器返回的响应体相同，不构造异常"""
+    return (_NOT_FOUND_HEAD + json.dumps(url_id, ensure_ascii=False)[1:-1] + _NOT_FOUND_TAIL).encode()
+
+
 class URLExpiredError(URLShortenerException):
     """URL已过期异常"""
     def __init__(self, url_id: str):
@@ -50,4 +64,67 @@ class URLInactiveError(URLShortenerException):
         super().__init__(
             status_code=410,
             detail=f"短链接 '{url_id}' 已停用"
-        ) 
\ No newline at end of file
+        ) 
+
+
+class InvalidCursorError(URLShortenerException):
+    """无效分页游标异常"""
+    def __init__(self, cursor: str):
+        super().__init__(
+            status_code=400,
+            detail=f"无效的分页游标: '{cursor}'"
+        )
+
+
+class InvalidTimeRangeError(URLShortenerException):
+    """无效时间范围异常"""
+    def __init__(self, start, end):
+        super().__init__(
+            status_code=400,
+            detail=f"无效的时间范围: 开始时间{start}晚于结束时间{end}"
+        )
+
+
+class StorageFullError(URLShortenerException):
+    """存储空间已满异常"""
+    def __init__(self, detail: str = "存储空间已满"):
+        super().__init__(
+            status_code=507,
+            detail=detail
+        )
+
+
+class InvalidSnapshotError(URLShortenerException):
+    """无效快照文件异常"""
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=400,
+            detail=f"无效的快照文件: {reason}"
+        )
+
+
+class SnapshotTooLargeError(URLShortenerException):
+    """快照文件过大异常"""
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=413,
+            detail=f"快照文件超过{limit}字节的上限"
+        )
+
+
+class SnapshotNotSupportedError(URLShortenerException):
+    """存储后端不支持快照导出导入异常"""
+    def __init__(self, backend: str):
+        super().__init__(
+            status_code=501,
+            detail=f"存储后端 '{backend}' 不支持快照导出导入"
+        )
+
+
+class AdminAuthError(URLShortenerException):
+    """管理令牌无效异常"""
+    def __init__(self):
+        super().__init__(
+            status_code=401,
+            detail="管理令牌无效"
+        )
\ No newline at end of file
@@ -1,10 +1,32 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
 from routers.url_router import router as url_router
+from routers.metrics_router import router as metrics_router
+from routers.admin_router import router as admin_router
+from middleware.metrics import MetricsMiddleware
+from middleware.redirect import FastRedirectMiddleware
 from exceptions.url_exceptions import URLShortenerException
+from services.container import container
+from config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：接受请求前加载成员过滤器、预热热点链接并启动后台任务；
+    关闭时写回点击计数和独立访客统计、保存热点链接快照并关闭存储
+    """
+    await container.start()
+    app.state.container = container
+    try:
+        yield
+    finally:
+        await container.stop()
 
 
 # 创建FastAPI应用实例
@@ -13,7 +35,8 @@ app = FastAPI(
     description="基于FastAPI的URL短链接生成微服务",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # 添加CORS中间件
@@ -25,7 +48,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 注册路由
+# 添加请求指标中间件
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# 重定向快速路径，最后添加因而位于最外层
+if settings.redirect_fast_path:
+    app.add_middleware(
+        FastRedirectMiddleware,
+        service_factory=lambda: container.service,
+        metrics_enabled=settings.metrics_enabled
+    )
+
+# 注册路由（/metrics须在短链接重定向的/{short_id}之前注册）
+if settings.metrics_enabled:
+    app.include_router(metrics_router, tags=["监控"])
+if settings.admin_token:
+    app.include_router(admin_router, tags=["管理"])
 app.include_router(url_router, tags=["URL短链接"])
 
 
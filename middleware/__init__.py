@@ -0,0 +1,4 @@
+from .metrics import MetricsMiddleware
+from .redirect import FastRedirectMiddleware
+
+__all__ = ["MetricsMiddleware", "FastRedirectMiddleware"]
@@ -0,0 +1,83 @@
+import time
+from typing import Dict, Optional, Tuple
+
+from utils.metrics import http_request_duration_seconds, http_requests_in_flight, http_requests_total
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    HTTP请求指标中间件（纯ASGI实现）
+    
+    按（方法, 路由模板）记录延迟直方图，按（方法, 路由模板, 状态码）计数，并统计正在处理的请求数。
+    路由标签使用模板（如/{short_id}）而不是实际路径，避免标签基数随短链接数量增长；
+    各路由的直方图在首次请求时一次性预先分配，此后每次请求只有两次计时和几次加法
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[Dict[object, str]] = None  # 端点函数 -> 路由模板
+        self._durations: Dict[Tuple[str, str], object] = {}
+        self._counters: Dict[Tuple[str, str, int], object] = {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            self._record(scope, status_code, elapsed)
+    
+    def _record(self, scope, status_code: int, elapsed: float) -> None:
+        method = scope["method"]
+        route = self._route_label(scope)
+        
+        duration = self._durations.get((method, route))
+        if duration is None:
+            duration = self._durations[(method, route)] = http_request_duration_seconds.labels(method, route)
+        duration.observe(elapsed)
+        
+        key = (method, route, status_code)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = http_requests_total.labels(method, route, str(status_code))
+        counter.inc()
+    
+    def _route_label(self, scope) -> str:
+        """路由器匹配后会把端点写入scope，据此查出路由模板"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None or endpoint not in self._route_paths:
+            self._build_route_paths(scope["app"])
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+    
+    def _build_route_paths(self, app) -> None:
+        """建立端点到路由模板的映射，并为每个路由预先分配延迟直方图"""
+        route_paths = {}
+        for route in app.routes:
+            endpoint = getattr(route, "endpoint", None)
+            if endpoint is None:
+                continue
+            route_paths[endpoint] = route.path
+            for method in getattr(route, "methods", None) or ():
+                key = (method, route.path)
+                if key not in self._durations:
+                    self._durations[key] = http_request_duration_seconds.labels(method, route.path)
+        self._route_paths = route_paths
@@ -0,0 +1,142 @@
+import json
+import time
+from typing import Dict, Optional, Set
+from urllib.parse import quote
+
+from exceptions.url_exceptions import URLShortenerException, not_found_body
+from utils.metrics import http_request_duration_seconds, http_requests_in_flight, http_requests_total
+
+
+REDIRECT_ROUTE = "/{short_id}"
+
+# 与RedirectResponse相同的Location转义规则
+_LOCATION_SAFE = ":/%#?=@[]!$&'()*+,;"
+
+_EMPTY_BODY = {"type": "http.response.body", "body": b""}
+
+
+class FastRedirectMiddleware:
+    """
+    重定向快速路径（纯ASGI实现，位于所有中间件最外层）
+    
+    单段路径的GET请求（/{short_id}）不经过路由匹配、依赖注入、CORS中间件和响应对象，
+    直接用进程内共享的URLService解析，发送预先格式化的302响应头；
+    成员过滤器判定不存在时直接发送预先格式化的404，其他错误时按全局异常处理器的格式返回JSON。应用自身的单段路径（/docs、/metrics等）、
+    带Origin头的跨域请求和其他请求原样交给应用处理。
+    启用指标时按/{short_id}路由记录请求，与经过路由时的标签一致
+    """
+    
+    def __init__(self, app, service_factory=None, metrics_enabled: bool = True):
+        self.app = app
+        self._service_factory = service_factory
+        self._service = None
+        self._reserved: Optional[Set[str]] = None  # 应用自身的单段路径
+        self._metrics_enabled = metrics_enabled
+        self._duration = http_request_duration_seconds.labels("GET", REDIRECT_ROUTE)
+        self._counters: Dict[int, object] = {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        
+        path = scope["path"]
+        if path.find("/", 1) != -1 or len(path) < 2:
+            await self.app(scope, receive, send)
+            return
+        if self._reserved is None:
+            self._reserved = self._reserved_paths(scope.get("app", self.app))
+        if path in self._reserved or self._has_origin(scope):
+            await self.app(scope, receive, send)
+            return
+        
+        if not self._metrics_enabled:
+            await self._redirect(scope, path[1:], send)
+            return
+        
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            status_code = await self._redirect(scope, path[1:], send)
+        finally:
+            http_requests_in_flight.dec()
+        self._duration.observe(time.perf_counter() - started)
+        counter = self._counters.get(status_code)
+        if counter is None:
+            counter = self._counters[status_code] = http_requests_total.labels("GET", REDIRECT_ROUTE, str(status_code))
+        counter.inc()
+    
+    async def _redirect(self, scope, short_id: str, send) -> int:
+        """解析并发送响应，返回状态码"""
+        service = self._service
+        if service is None:
+            service = self._service = self._create_service()
+        if service.known_missing(short_id):
+            return await self._send_json(send, 404, not_found_body(short_id))
+        try:
+            original_url = await service.get_original_url(short_id, self._visitor(scope))
+        except URLShortenerException as exc:
+            body = json.dumps(
+                {"error": exc.detail, "status_code": exc.status_code},
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ).encode()
+            return await self._send_json(send, exc.status_code, body)
+        
+        await send({
+            "type": "http.response.start",
+            "status": 302,
+            "headers": [
+                (b"content-length", b"0"),
+                (b"location", quote(original_url, safe=_LOCATION_SAFE).encode("latin-1")),
+            ],
+        })
+        await send(_EMPTY_BODY)
+        return 302
+    
+    @staticmethod
+    async def _send_json(send, status: int, body: bytes) -> int:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-length", str(len(body)).encode()),
+                (b"content-type", b"application/json"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+        return status
+    
+    def _create_service(self):
+        if self._service_factory is not None:
+            return self._service_factory()
+        from services.url_service import URLService
+        return URLService()
+    
+    @staticmethod
+    def _visitor(scope) -> str:
+        """与路由中的visitor_id相同：客户端IP和User-Agent"""
+        client = scope.get("client")
+        user_agent = ""
+        for name, value in scope["headers"]:
+            if name == b"user-agent":
+                user_agent = value.decode("latin-1")
+                break
+        return f"{client[0] if client else ''}\x00{user_agent}"
+    
+    @staticmethod
+    def _has_origin(scope) -> bool:
+        for name, _ in scope["headers"]:
+            if name == b"origin":
+                return True
+        return False
+    
+    @staticmethod
+    def _reserved_paths(app) -> Set[str]:
+        """应用中不含路径参数的单段路由（含根路径）"""
+        reserved = {"/"}
+        for route in app.routes:
+            path = getattr(route, "path", "")
+            if "{" not in path and path.count("/") == 1:
+                reserved.add(path)
+        return reserved
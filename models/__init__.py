@@ -1,3 +1,23 @@
-from .url_models import URLCreate, URLResponse, URLStats, URLUpdate
+from .url_models import (
+    URLCreate,
+    URLResponse,
+    URLStats,
+    ClickSeriesPoint,
+    TopURL,
+    URLUpdate,
+    URLBatchCreate,
+    URLBatchItemResult,
+    URLBatchResponse
+)
 
-__all__ = ["URLCreate", "URLResponse", "URLStats", "URLUpdate"] 
\ No newline at end of file
+__all__ = [
+    "URLCreate",
+    "URLResponse",
+    "URLStats",
+    "ClickSeriesPoint",
+    "TopURL",
+    "URLUpdate",
+    "URLBatchCreate",
+    "URLBatchItemResult",
+    "URLBatchResponse"
+] 
\ No newline at end of file
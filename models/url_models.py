@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, HttpUrl, Field
 
 
@@ -21,6 +21,12 @@ class URLResponse(BaseModel):
     is_active: bool = Field(True, description="是否激活")
 
 
+class ClickSeriesPoint(BaseModel):
+    """点击时间序列中的一个点"""
+    timestamp: datetime = Field(..., description="时间段起始时间（UTC）")
+    clicks: int = Field(..., description="该时间段内的点击次数")
+
+
 class URLStats(BaseModel):
     """短链接统计模型"""
     id: str = Field(..., description="短链接ID")
@@ -31,10 +37,67 @@ class URLStats(BaseModel):
     last_accessed: Optional[datetime] = Field(None, description="最后访问时间")
     expires_at: Optional[datetime] = Field(None, description="过期时间")
     is_active: bool = Field(..., description="是否激活")
+    unique_visitors: Optional[int] = Field(None, description="估计独立访客数（按客户端IP和User-Agent区分，误差约3%），未启用统计时为空")
+    granularity: Optional[Literal["minute", "hour", "day"]] = Field(None, description="点击时间序列粒度")
+    series: Optional[List[ClickSeriesPoint]] = Field(None, description="按粒度分段的点击次数，请求指定粒度时返回")
+
+
+class TopURL(BaseModel):
+    """热点短链接模型"""
+    id: str = Field(..., description="短链接ID")
+    original_url: str = Field(..., description="原始URL")
+    short_url: str = Field(..., description="短链接")
+    clicks: int = Field(..., description="统计时间段内的估计点击次数（上界）")
+    error: int = Field(..., description="估计误差上界，clicks - error为点击次数下界")
 
 
 class URLUpdate(BaseModel):
     """更新短链接的请求模型"""
     original_url: Optional[HttpUrl] = Field(None, description="原始URL")
     expires_at: Optional[datetime] = Field(None, description="过期时间")
-    is_active: Optional[bool] = Field(None, description="是否激活") 
\ No newline at end of file
+    is_active: Optional[bool] = Field(None, description="是否激活")
+
+
+class DomainStats(BaseModel):
+    """按域名汇总的统计模型"""
+    domain: str = Field(..., description="原始URL的主机名")
+    links: int = Field(..., description="链接数")
+    active_links: int = Field(..., description="激活的链接数")
+    clicks: int = Field(..., description="点击次数合计")
+
+
+class DomainUpdate(BaseModel):
+    """批量更新某域名下全部链接的请求模型"""
+    is_active: bool = Field(..., description="是否激活")
+
+
+class DomainBulkResult(BaseModel):
+    """按域名批量操作的结果"""
+    domain: str = Field(..., description="原始URL的主机名")
+    affected: int = Field(..., description="状态发生变化或被删除的链接数")
+
+
+# 批量创建接口单次允许的最大条数
+MAX_BATCH_SIZE = 10000
+
+
+class URLBatchCreate(BaseModel):
+    """批量创建短链接的请求模型"""
+    items: List[URLCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE, description="待创建的短链接列表")
+
+
+class URLBatchItemResult(BaseModel):
+    """批量创建中单项的结果"""
+    index: int = Field(..., description="在请求列表中的序号")
+    success: bool = Field(..., description="是否创建成功")
+    status_code: int = Field(..., description="与单个创建接口一致的状态码")
+    data: Optional[URLResponse] = Field(None, description="创建成功时的短链接")
+    error: Optional[str] = Field(None, description="失败原因")
+
+
+class URLBatchResponse(BaseModel):
+    """批量创建短链接的响应模型"""
+    total: int = Field(..., description="请求条数")
+    succeeded: int = Field(..., description="成功条数")
+    failed: int = Field(..., description="失败条数")
+    results: List[URLBatchItemResult] = Field(..., description="按请求顺序排列的逐项结果")
\ No newline at end of file
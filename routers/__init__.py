@@ -1,3 +1,5 @@
 from .url_router import router as url_router
+from .metrics_router import router as metrics_router
+from .admin_router import router as admin_router
 
-__all__ = ["url_router"] 
\ No newline at end of file
+__all__ = ["url_router", "metrics_router", "admin_router"] 
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import hmac
+import os
+import tempfile
+
+from fastapi import APIRouter, Depends, Header, Request
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+
+from services.url_service import URLService
+from routers.url_router import get_url_service
+from utils.columnar_snapshot import SNAPSHOT_MEDIA_TYPE
+from exceptions.url_exceptions import AdminAuthError, SnapshotTooLargeError
+from config import settings
+
+
+router = APIRouter(prefix="/api/admin")
+
+# 上传的请求体攒够这么多字节后在工作线程中写入临时文件
+_SPOOL_BYTES = 1 << 20
+
+
+def require_admin(x_admin_token: str = Header("", description="管理令牌（ADMIN_TOKEN）")) -> None:
+    """依赖注入：校验管理令牌"""
+    if not settings.admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise AdminAuthError()
+
+
+def _temp_path() -> str:
+    fd, path = tempfile.mkstemp(prefix="snapshot-", suffix=".snap")
+    os.close(fd)
+    return path
+
+
+async def _spool_upload(request: Request, path: str, limit: int) -> None:
+    """将请求体写入临时文件：文件写入在工作线程中进行，超过limit字节时抛出SnapshotTooLargeError"""
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        raise SnapshotTooLargeError(limit)
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        buffer = bytearray()
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                raise SnapshotTooLargeError(limit)
+            buffer += chunk
+            if len(buffer) >= _SPOOL_BYTES:
+                await asyncio.to_thread(f.write, buffer)
+                buffer = bytearray()
+        if buffer:
+            await asyncio.to_thread(f.write, buffer)
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+@router.get("/snapshot", summary="导出链接快照", response_class=FileResponse, dependencies=[Depends(require_admin)])
+async def export_snapshot(service: URLService = Depends(get_url_service)):
+    """
+    导出全部链接为列式二进制快照（点击时间序列和独立访客统计不包含在内）
+    
+    仅memory和durable后端支持，其他后端返回501
+    """
+    path = _temp_path()
+    try:
+        await service.export_snapshot(path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=SNAPSHOT_MEDIA_TYPE,
+        filename="links.snap",
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@router.post("/snapshot", summary="导入链接快照", dependencies=[Depends(require_admin)])
+async def import_snapshot(request: Request, service: URLService = Depends(get_url_service)):
+    """
+    导入列式二进制快照（请求体为快照文件），同ID的已有链接被替换
+    
+    请求体先在工作线程中写入临时文件再导入，超过SNAPSHOT_UPLOAD_MAX_BYTES时返回413
+    """
+    path = _temp_path()
+    try:
+        await _spool_upload(request, path, settings.snapshot_upload_max_bytes)
+        imported = await service.import_snapshot(path)
+    finally:
+        os.remove(path)
+    return {"imported": imported}
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import registry
+
+
+# Prometheus文本格式0.0.4，Starlette会补上charset=utf-8
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+router = APIRouter()
+
+
+@router.get("/metrics", summary="服务指标", response_class=PlainTextResponse)
+async def metrics():
+    """
+    以Prometheus文本格式输出请求延迟、状态码、存储操作和缓存等指标
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -1,17 +1,38 @@
-from typing import List
-from fastapi import APIRouter, Request, Depends
-from fastapi.responses import RedirectResponse
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Request, Response, Depends, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
 
-from models.url_models import URLCreate, URLResponse, URLStats, URLUpdate
+from models.url_models import (
+    URLCreate,
+    URLResponse,
+    URLStats,
+    TopURL,
+    URLUpdate,
+    URLBatchCreate,
+    URLBatchResponse,
+    DomainStats,
+    DomainUpdate,
+    DomainBulkResult
+)
 from services.url_service import URLService
+from services.container import container
+from exceptions.url_exceptions import not_found_body
+from config import settings
 
 
 router = APIRouter()
 
 
 def get_url_service() -> URLService:
-    """依赖注入：获取URL服务实例"""
-    return URLService()
+    """依赖注入：获取服务容器中共享的URL服务实例"""
+    return container.service
+
+
+def visitor_id(request: Request) -> str:
+    """独立访客标识：客户端IP和User-Agent"""
+    host = request.client.host if request.client is not None else ""
+    return f"{host}\x00{request.headers.get('user-agent', '')}"
 
 
 @router.post("/shorten", response_model=URLResponse, summary="创建短链接")
@@ -30,9 +51,26 @@ async def create_short_url(
     return await service.create_short_url(url_data, request)
 
 
+@router.post("/shorten/batch", response_model=URLBatchResponse, summary="批量创建短链接")
+async def create_short_urls(
+    batch: URLBatchCreate,
+    request: Request,
+    service: URLService = Depends(get_url_service)
+):
+    """
+    批量创建短链接
+    
+    - **items**: URLCreate列表，单次最多10000条
+    
+    每一项单独返回成功或失败（状态码与单个创建接口一致），部分失败不影响其他项
+    """
+    return await service.create_short_urls(batch.items, request)
+
+
 @router.get("/{short_id}", summary="重定向到原始URL")
 async def redirect_to_original(
     short_id: str,
+    request: Request,
     service: URLService = Depends(get_url_service)
 ):
     """
@@ -40,18 +78,61 @@ async def redirect_to_original(
     
     - **short_id**: 短链接ID或自定义别名
     """
-    original_url = await service.get_original_url(short_id)
+    # 成员过滤器判定不存在时直接返回预先格式化的404，不经过异常处理
+    if service.known_missing(short_id):
+        return Response(not_found_body(short_id), status_code=404, media_type="application/json")
+    original_url = await service.get_original_url(short_id, visitor_id(request))
     return RedirectResponse(url=original_url, status_code=302)
 
 
 @router.get("/api/urls", response_model=List[URLResponse], summary="获取所有短链接")
 async def get_all_urls(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标"),
+    stream: bool = Query(False, description="以NDJSON流式返回游标之后的全部短链接"),
+    service: URLService = Depends(get_url_service)
+):
+    """
+    获取短链接列表（按创建时间排序）
+    
+    - **limit**: 每页条数，最多1000
+    - **cursor**: 上一页响应头X-Next-Cursor中的游标，不传则从头开始
+    - **stream**: 为true时忽略limit，以application/x-ndjson逐行流式返回
+    
+    响应头X-Next-Cursor给出下一页游标，没有更多结果时不返回该响应头
+    """
+    if stream:
+        return StreamingResponse(service.iter_urls_ndjson(cursor), media_type="application/x-ndjson")
+    
+    if service.fragment_cache is None:
+        urls, next_cursor = await service.list_urls(limit, cursor)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return urls
+    
+    # 直接返回拼接好的JSON，跳过response_model的校验和序列化
+    content, next_cursor = await service.list_urls_json(limit, cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+    return Response(content, media_type="application/json", headers=headers)
+
+
+@router.get("/api/urls/top", response_model=List[TopURL], summary="获取热点短链接")
+async def get_top_urls(
+    k: int = Query(10, ge=1, le=100, description="返回条数"),
+    minutes: Optional[int] = Query(None, ge=1, le=settings.top_links_window, description="统计最近多少分钟，不传则统计全时段"),
     service: URLService = Depends(get_url_service)
 ):
     """
-    获取所有短链接列表
+    获取点击最多的短链接（须在/api/urls/{short_id}之前注册）
+    
+    - **k**: 返回条数，最多100
+    - **minutes**: 统计最近多少分钟，最多为TOP_LINKS_WINDOW；不传则统计本进程启动以来的全部重定向
+    
+    基于Space-Saving近似统计，clicks为估计值的上界，clicks - error为下界；
+    多worker部署时只反映处理本请求的worker
     """
-    return await service.get_all_urls()
+    return await service.get_top_urls(k, minutes)
 
 
 @router.get("/api/urls/{short_id}", response_model=URLResponse, summary="获取短链接信息")
@@ -64,20 +145,27 @@ async def get_url_info(
     
     - **short_id**: 短链接ID或自定义别名
     """
+    if service.fragment_cache is not None:
+        return Response(await service.get_url_info_json(short_id), media_type="application/json")
     return await service.get_url_info(short_id)
 
 
 @router.get("/api/urls/{short_id}/stats", response_model=URLStats, summary="获取短链接统计")
 async def get_url_stats(
     short_id: str,
+    granularity: Optional[Literal["minute", "hour", "day"]] = Query(None, description="点击时间序列粒度"),
+    start: Optional[datetime] = Query(None, description="序列开始时间，默认为该粒度保留的最早时间段"),
+    end: Optional[datetime] = Query(None, description="序列结束时间，默认为当前时间"),
     service: URLService = Depends(get_url_service)
 ):
     """
     获取短链接统计信息
     
     - **short_id**: 短链接ID或自定义别名
+    - **granularity**: 可选，minute（最近60分钟）、hour（最近48小时）或day（最近90天），指定时返回点击时间序列
+    - **start** / **end**: 可选的序列时间范围，超出保留范围的部分不返回
     """
-    return await service.get_url_stats(short_id)
+    return await service.get_url_stats(short_id, granularity, start, end)
 
 
 @router.put("/api/urls/{short_id}", response_model=URLResponse, summary="更新短链接")
@@ -109,9 +197,97 @@ async def delete_url(
     return {"message": "短链接删除成功" if success else "删除失败"}
 
 
+@router.get("/api/domains/{domain}/urls", response_model=List[URLResponse], summary="按域名获取短链接")
+async def get_domain_urls(
+    domain: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标"),
+    service: URLService = Depends(get_url_service)
+):
+    """
+    获取原始URL主机名为domain的短链接（按创建时间排序）
+    
+    - **domain**: 主机名，不区分大小写，端口忽略；子域名单独统计
+    - **limit** / **cursor**: 与/api/urls相同，下一页游标在响应头X-Next-Cursor中
+    """
+    urls, next_cursor = await service.list_domain_urls(domain, limit, cursor)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return urls
+
+
+@router.get("/api/domains/{domain}/stats", response_model=DomainStats, summary="获取域名统计")
+async def get_domain_stats(
+    domain: str,
+    service: URLService = Depends(get_url_service)
+):
+    """
+    汇总某域名下的链接数、激活的链接数和点击次数
+    
+    - **domain**: 主机名
+    """
+    return await service.get_domain_stats(domain)
+
+
+@router.put("/api/domains/{domain}", response_model=DomainBulkResult, summary="批量停用或启用域名下的短链接")
+async def update_domain(
+    domain: str,
+    update_data: DomainUpdate,
+    service: URLService = Depends(get_url_service)
+):
+    """
+    批量设置某域名下全部短链接的激活状态，例如停用滥用域名的全部链接
+    
+    - **domain**: 主机名
+    - **is_active**: 是否激活
+    
+    affected为状态实际发生变化的链接数
+    """
+    return await service.set_domain_active(domain, update_data.is_active)
+
+
+@router.delete("/api/domains/{domain}", response_model=DomainBulkResult, summary="删除域名下的全部短链接")
+async def delete_domain(
+    domain: str,
+    service: URLService = Depends(get_url_service)
+):
+    """
+    删除某域名下的全部短链接及其别名和统计
+    
+    - **domain**: 主机名
+    """
+    return await service.delete_domain(domain)
+
+
+@router.get("/api/search", response_model=List[URLResponse], summary="搜索短链接")
+async def search_urls(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=2048, description="搜索文本"),
+    mode: Literal["prefix", "substring"] = Query("substring", description="匹配方式"),
+    limit: int = Query(100, ge=1, le=1000, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标"),
+    service: URLService = Depends(get_url_service)
+):
+    """
+    按原始URL或自定义别名搜索短链接
+    
+    - **q**: 搜索文本，ASCII字母不区分大小写
+    - **mode**: prefix（以q开头，按匹配的文本排序）或substring（包含q，按创建时间排序）
+    - **limit** / **cursor**: 与/api/urls相同，下一页游标在响应头X-Next-Cursor中
+    """
+    urls, next_cursor = await service.search_urls(q, mode, limit, cursor)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return urls
+
+
 @router.get("/api/health", summary="健康检查")
-async def health_check():
+async def health_check(service: URLService = Depends(get_url_service)):
     """
-    服务健康检查
+    服务健康检查（启用解析缓存时附带服务所用缓存的命中统计）
     """
-    return {"status": "healthy", "service": "URL Shortener"} 
\ No newline at end of file
+    health = {"status": "healthy", "service": "URL Shortener"}
+    if service.resolve_cache is not None:
+        health["resolve_cache"] = service.resolve_cache.stats()
+    return health 
\ No newline at end of file
@@ -1,3 +1,4 @@
 from .url_service import URLService
+from .container import ServiceContainer
 
-__all__ = ["URLService"] 
\ No newline at end of file
+__all__ = ["URLService", "ServiceContainer"] 
\ No newline at end of file
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import List, Optional
+
+from services.url_service import URLService
+from utils.base_storage import BaseURLStorage
+from utils.storage import url_storage
+from utils.click_buffer import click_buffer
+from utils.visitor_buffer import visitor_buffer
+from utils.expiry_reaper import expiry_reaper
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+WARM_START_VERSION = 1
+
+
+class ServiceContainer:
+    """
+    应用服务容器
+    
+    在应用生命周期内持有按配置创建的存储后端、缓存、缓冲和后台任务，
+    只创建一个URLService供所有请求共享（未经生命周期启动时按需创建，例如测试客户端）。
+    
+    start()在接受请求前加载成员过滤器，按热点链接快照预热解析缓存，再启动后台任务；
+    stop()让后台任务完成当前一轮后停止，写回点击计数和独立访客统计，保存热点链接快照，最后关闭存储
+    """
+    
+    def __init__(
+        self,
+        storage: Optional[BaseURLStorage] = None,
+        warm_start_path: Optional[str] = None,
+        warm_start_size: Optional[int] = None,
+        shutdown_timeout: Optional[float] = None
+    ):
+        self.storage = storage if storage is not None else url_storage
+        self.warm_start_path = settings.warm_start_path if warm_start_path is None else warm_start_path
+        self.warm_start_size = warm_start_size or settings.warm_start_size
+        self.shutdown_timeout = shutdown_timeout or settings.shutdown_timeout
+        self._service: Optional[URLService] = None
+        self.started = False
+    
+    @property
+    def service(self) -> URLService:
+        if self._service is None:
+            self._service = URLService(storage=self.storage)
+        return self._service
+    
+    async def start(self) -> None:
+        """加载成员过滤器、预热解析缓存并启动后台任务"""
+        if settings.notfound_filter_enabled:
+            await self.storage.warm()
+        if self.warm_start_path:
+            loaded = await self.warm_start()
+            logger.info("按热点链接快照预热%d条链接", loaded)
+        if settings.click_flush_interval > 0:
+            click_buffer.start(self.storage, settings.click_flush_interval)
+        if settings.visitor_flush_interval > 0:
+            visitor_buffer.start(self.storage, settings.visitor_flush_interval)
+        if settings.expiry_reap_interval > 0:
+            expiry_reaper.start(self.storage, settings.expiry_reap_interval, on_reaped=self.service.discard_links)
+        self.started = True
+    
+    async def stop(self) -> None:
+        """停止后台任务、写回缓冲、保存热点链接快照并关闭存储"""
+        try:
+            await asyncio.wait_for(self._drain(), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("关闭超时（%s秒），部分缓冲未写回", self.shutdown_timeout)
+        if self.warm_start_path:
+            try:
+                self.save_hot_links()
+            except OSError:
+                logger.exception("热点链接快照保存失败")
+        await self.storage.close()
+        self.started = False
+    
+    async def _drain(self) -> None:
+        await expiry_reaper.stop()
+        await click_buffer.stop()
+        await visitor_buffer.stop()
+    
+    def hot_links(self) -> List[str]:
+        """当前热点链接：按热点统计的点击数排序，再补充解析缓存中最近使用的键"""
+        service = self.service
+        limit = self.warm_start_size
+        keys = []
+        if service.top_links is not None:
+            keys.extend(key for key, _, _ in service.top_links.top(limit))
+        if service.resolve_cache is not None:
+            keys.extend(service.resolve_cache.hot_keys(limit))
+        return list(dict.fromkeys(keys))[:limit]
+    
+    def save_hot_links(self) -> int:
+        """写入热点链接快照（先写临时文件再替换），返回保存的链接数"""
+        keys = self.hot_links()
+        tmp_path = self.warm_start_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": WARM_START_VERSION, "saved_at": int(time.time()), "keys": keys}, f)
+        os.replace(tmp_path, self.warm_start_path)
+        return len(keys)
+    
+    async def warm_start(self) -> int:
+        """
+        按热点链接快照读取链接并填充解析缓存，返回存在的链接数
+        
+        只读取不计点击；快照不存在或格式不符时跳过。未启用解析缓存时仍会读取一遍，
+        预热存储连接和页面缓存
+        """
+        try:
+            with open(self.warm_start_path) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError):
+            logger.warning("热点链接快照无法读取，跳过预热")
+            return 0
+        if snapshot.get("version") != WARM_START_VERSION:
+            return 0
+        
+        keys = snapshot["keys"][:self.warm_start_size]
+        resolve_cache = self.service.resolve_cache
+        loaded = 0
+        for start in range(0, len(keys), 100):
+            batch = keys[start:start + 100]
+            urls = await asyncio.gather(*(self.storage.get_url(key) for key in batch))
+            for key, url_data in zip(batch, urls):
+                if url_data is None:
+                    continue
+                loaded += 1
+                if resolve_cache is not None:
+                    resolve_cache.put(key, url_data)
+        return loaded
+
+
+# 全局服务容器实例，由应用生命周期启动和关闭
+container = ServiceContainer()
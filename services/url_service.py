@@ -1,98 +1,244 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import Request
 
-from models.url_models import URLCreate, URLResponse, URLStats, URLUpdate
-from utils.url_utils import generate_short_id, validate_url, is_url_expired, is_valid_alias, sanitize_url
+from models.url_models import (
+    URLCreate,
+    URLResponse,
+    URLStats,
+    ClickSeriesPoint,
+    TopURL,
+    URLUpdate,
+    DomainStats,
+    DomainBulkResult,
+    URLBatchItemResult,
+    URLBatchResponse
+)
+from utils.url_utils import (
+    validate_url,
+    is_valid_alias,
+    sanitize_url,
+    canonicalize_url,
+    canonical_key,
+    parse_param_patterns,
+    get_domain_from_url
+)
+from utils.base_storage import BaseURLStorage
 from utils.storage import url_storage
+from utils.filtered_storage import FilteredStorage
+from utils.click_buffer import click_buffer
+from utils.id_allocator import IDAllocator, id_allocator
+from utils.resolve_cache import ResolveCache, resolve_cache
+from utils.fragment_cache import FragmentCache, fragment_cache
+from utils.top_links import TopLinks, top_links
+from utils.visitor_buffer import VisitorBuffer, visitor_buffer
+from utils.hyperloglog import estimate, merge_sketch
+from utils.url_record import from_micros, to_micros, decode_cursor, now_micros
+from utils.click_series import GRANULARITIES, series_points
+from utils.columnar_snapshot import export_snapshot, import_snapshot
+from utils.metrics import url_dedup_hits_total
+from config import settings
 from exceptions.url_exceptions import (
+    URLShortenerException,
     URLNotFoundError, 
-    URLExpiredError, 
     InvalidURLError, 
-    DuplicateAliasError, 
-    URLInactiveError
+    DuplicateAliasError,
+    InvalidTimeRangeError
 )
 
 
 class URLService:
     """URL短链接服务层"""
     
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        storage: Optional[BaseURLStorage] = None,
+        id_allocator: Optional[IDAllocator] = None,
+        resolve_cache: Optional[ResolveCache] = None,
+        dedup_enabled: Optional[bool] = None,
+        top_links: Optional[TopLinks] = None,
+        visitor_buffer: Optional[VisitorBuffer] = None,
+        fragment_cache: Optional[FragmentCache] = None
+    ):
         self.base_url = base_url.rstrip('/')
-        self.storage = url_storage
+        # 默认使用按配置创建的全局存储后端
+        self.storage = storage if storage is not None else url_storage
+        # 存储外层为成员过滤器时，重定向可在解析前直接判定不存在
+        self._key_filter = self.storage if isinstance(self.storage, FilteredStorage) else None
+        if id_allocator is None:
+            id_allocator = self._default_id_allocator()
+        self.id_allocator = id_allocator
+        # 开启写回时点击先计入缓冲，由后台任务批量合并到存储
+        self.click_buffer = click_buffer if settings.click_flush_interval > 0 else None
+        # 开启解析缓存时热点链接重定向无需读取存储
+        if resolve_cache is None:
+            resolve_cache = self._default_resolve_cache()
+        self.resolve_cache = resolve_cache
+        # 重定向计入热点统计
+        if top_links is None:
+            top_links = self._default_top_links()
+        self.top_links = top_links
+        # 独立访客先计入进程内HyperLogLog，由后台任务合并到存储
+        if visitor_buffer is None:
+            visitor_buffer = self._default_visitor_buffer()
+        self.visitor_buffer = visitor_buffer
+        # 开启片段缓存时列表和详情响应直接拼接缓存的JSON
+        if fragment_cache is None:
+            fragment_cache = self._default_fragment_cache()
+        self.fragment_cache = fragment_cache
+        # 去重模式下相同目标的链接只保存一条
+        self.dedup_enabled = settings.dedup_enabled if dedup_enabled is None else dedup_enabled
+        self.dedup_strip_params = parse_param_patterns(settings.dedup_strip_params)
     
     async def create_short_url(self, url_data: URLCreate, request: Request = None) -> URLResponse:
         """创建短链接"""
-        # 验证原始URL
-        original_url = str(url_data.original_url)
-        if not validate_url(original_url):
-            raise InvalidURLError(original_url)
+        # 验证并清理原始URL和别名
+        original_url = self._validate_create(url_data)
         
-        # 清理URL
-        original_url = sanitize_url(original_url)
+        # 去重模式下规范化URL相同时返回已有链接
+        dedup = self._dedup_key(url_data, original_url)
+        if dedup is not None:
+            canonical_url, key = dedup
+            existing = (await self.storage.find_canonical([key])).get(key)
+            if self._is_reusable(existing, canonical_url):
+                url_dedup_hits_total.inc()
+                return existing
         
-        # 生成或验证自定义别名
-        if url_data.custom_alias:
-            if not is_valid_alias(url_data.custom_alias):
-                raise InvalidURLError(f"无效的别名格式: {url_data.custom_alias}")
-            
-            if await self.storage.alias_exists(url_data.custom_alias):
-                raise DuplicateAliasError(url_data.custom_alias)
-            
-            short_id = url_data.custom_alias
-        else:
-            # 生成唯一的短ID
-            while True:
-                short_id = generate_short_id()
-                if not await self.storage.get_url(short_id):
-                    break
+        # 使用自定义别名，或分配短ID（计数值分块预留，生成ID之间不会重复）
+        short_id = url_data.custom_alias or await self.id_allocator.next_id()
         
-        # 构建短链接URL
-        if request:
-            base_url = str(request.base_url).rstrip('/')
-        else:
-            base_url = self.base_url
+        url_dict = self._build_url_dict(
+            url_data, short_id, original_url, self._get_base_url(request), datetime.utcnow()
+        )
+        if dedup is not None:
+            url_dict["canonical_key"] = dedup[1]
         
-        short_url = f"{base_url}/{short_id}"
+        # 由存储原子地检查并写入：并发请求同一别名时只有一个成功；
+        # 生成ID可能恰好与形如8位base62的自定义别名相同，此时换用下一个ID
+        created = await self.storage.create_url_if_absent(url_dict)
+        while created is None and not url_data.custom_alias:
+            url_dict["id"] = await self.id_allocator.next_id()
+            created = await self.storage.create_url_if_absent(url_dict)
+        if created is None:
+            raise DuplicateAliasError(url_data.custom_alias)
+        return created
+    
+    async def create_short_urls(self, items: List[URLCreate], request: Request = None) -> URLBatchResponse:
+        """
+        批量创建短链接
         
-        # 创建URL数据
-        url_dict = {
-            "id": short_id,
-            "original_url": original_url,
-            "short_url": short_url,
-            "click_count": 0,
-            "created_at": datetime.utcnow().isoformat(),
-            "expires_at": url_data.expires_at.isoformat() if url_data.expires_at else None,
-            "is_active": True,
-            "last_accessed": None
-        }
+        一次遍历完成校验，生成ID批量分配，最后一次存储调用按条件提交全部记录，
+        自定义别名的冲突由存储在写入时原子检查；每一项单独报告成功或失败。
+        去重模式下已有链接和批内重复项只创建一次
+        """
+        results: List[Optional[URLBatchItemResult]] = [None] * len(items)
+        to_create = []  # (序号, 请求项, 清理后的URL)
+        seen_aliases = set()
         
-        if url_data.custom_alias:
-            url_dict["custom_alias"] = url_data.custom_alias
+        for index, url_data in enumerate(items):
+            try:
+                original_url = self._validate_create(url_data)
+                alias = url_data.custom_alias
+                if alias:
+                    if alias in seen_aliases:
+                        raise DuplicateAliasError(alias)
+                    seen_aliases.add(alias)
+            except URLShortenerException as exc:
+                results[index] = URLBatchItemResult(
+                    index=index, success=False, status_code=exc.status_code, error=exc.detail
+                )
+                continue
+            to_create.append((index, url_data, original_url))
         
-        return await self.storage.create_url(url_dict)
-    
-    async def get_original_url(self, short_id: str) -> str:
-        """根据短ID获取原始URL"""
-        url_data = await self.storage.get_url(short_id)
-        if not url_data:
-            raise URLNotFoundError(short_id)
+        duplicates = []  # (序号, 批内首次出现的序号)
+        dedup_keys = {}  # 序号 -> 规范化URL哈希键
+        if self.dedup_enabled:
+            to_create, duplicates, dedup_keys = await self._dedup_batch(to_create, results)
+        
+        # 批量分配生成ID
+        generated_ids = iter(await self.id_allocator.next_ids(
+            sum(1 for _, url_data, _ in to_create if not url_data.custom_alias)
+        ))
         
-        # 检查是否过期
-        if url_data.expires_at and is_url_expired(url_data.expires_at):
-            raise URLExpiredError(short_id)
+        base_url = self._get_base_url(request)
+        created_at = datetime.utcnow()
+        url_dicts = [
+            self._build_url_dict(
+                url_data,
+                url_data.custom_alias or next(generated_ids),
+                original_url,
+                base_url,
+                created_at
+            )
+            for _, url_data, original_url in to_create
+        ]
+        for (index, _, _), url_dict in zip(to_create, url_dicts):
+            if index in dedup_keys:
+                url_dict["canonical_key"] = dedup_keys[index]
         
-        # 检查是否激活
-        if not url_data.is_active:
-            raise URLInactiveError(short_id)
+        # 全部按条件提交；与已有别名冲突的生成ID换用新ID后只重试这些项
+        created = await self.storage.create_urls_if_absent(url_dicts) if url_dicts else []
+        retry = [
+            position for position, (url_dict, response) in enumerate(zip(url_dicts, created))
+            if response is None and "custom_alias" not in url_dict
+        ]
+        while retry:
+            for position, short_id in zip(retry, await self.id_allocator.next_ids(len(retry))):
+                url_dicts[position]["id"] = short_id
+            retried = await self.storage.create_urls_if_absent([url_dicts[position] for position in retry])
+            for position, response in zip(retry, retried):
+                created[position] = response
+            retry = [position for position, response in zip(retry, retried) if response is None]
+        for (index, _, _), url_dict, response in zip(to_create, url_dicts, created):
+            if response is None:
+                exc = DuplicateAliasError(url_dict["id"])
+                results[index] = URLBatchItemResult(
+                    index=index, success=False, status_code=exc.status_code, error=exc.detail
+                )
+            else:
+                results[index] = URLBatchItemResult(index=index, success=True, status_code=200, data=response)
+        for index, first in duplicates:
+            results[index] = URLBatchItemResult(
+                index=index, success=True, status_code=200, data=results[first].data
+            )
         
-        # 增加点击次数
-        await self.storage.increment_click_count(short_id)
+        succeeded = sum(1 for result in results if result.success)
+        return URLBatchResponse(
+            total=len(items),
+            succeeded=succeeded,
+            failed=len(items) - succeeded,
+            results=results
+        )
+    
+    def known_missing(self, short_id: str) -> bool:
+        """成员过滤器判定短ID（或别名）一定不存在；未启用过滤器时返回False"""
+        return self._key_filter is not None and not self._key_filter.might_exist(short_id)
+    
+    async def get_original_url(self, short_id: str, visitor: Optional[str] = None) -> str:
+        """根据短ID获取原始URL（单次查找完成校验和点击计数），visitor为访客标识，用于独立访客统计"""
+        if self.resolve_cache is not None:
+            return await self._resolve_cached(short_id, visitor)
         
-        return url_data.original_url
+        if self.click_buffer is None:
+            original_url = await self.storage.resolve_and_count(short_id)
+        else:
+            original_url = await self.storage.resolve_url(short_id)
+            self.click_buffer.record(short_id)
+        if self.top_links is not None:
+            self.top_links.record(short_id)
+        if self.visitor_buffer is not None and visitor is not None:
+            self.visitor_buffer.record(short_id, visitor)
+        return original_url
     
-    async def get_url_stats(self, short_id: str) -> URLStats:
-        """获取URL统计信息"""
+    async def get_url_stats(
+        self,
+        short_id: str,
+        granularity: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> URLStats:
+        """获取URL统计信息，指定粒度时附带该时间范围内的点击时间序列"""
         url_data = await self.storage.get_url(short_id)
         if not url_data:
             raise URLNotFoundError(short_id)
@@ -115,6 +261,25 @@ class URLService:
             if detailed_stats["last_accessed"]:
                 stats_data["last_accessed"] = datetime.fromisoformat(detailed_stats["last_accessed"])
         
+        # 合并尚未写回的点击增量
+        pending_count, pending_last = 0, None
+        if self.click_buffer is not None:
+            pending_count, pending_last = self.click_buffer.pending(url_data.id)
+            if pending_count:
+                stats_data["click_count"] += pending_count
+                last_accessed = from_micros(pending_last)
+                if stats_data["last_accessed"] is None or last_accessed > stats_data["last_accessed"]:
+                    stats_data["last_accessed"] = last_accessed
+        
+        if self.visitor_buffer is not None:
+            stats_data["unique_visitors"] = await self._unique_visitors(short_id, url_data.id)
+        
+        if granularity is not None:
+            stats_data["granularity"] = granularity
+            stats_data["series"] = await self._click_series(
+                url_data.id, granularity, start, end, pending_count, pending_last
+            )
+        
         return URLStats(**stats_data)
     
     async def update_url(self, short_id: str, update_data: URLUpdate) -> URLResponse:
@@ -139,7 +304,11 @@ class URLService:
         if not update_dict:
             return url_data
         
-        return await self.storage.update_url(short_id, update_dict)
+        # 写入前后各失效一次：写入期间并发的重定向可能用旧记录重新填充缓存
+        self._invalidate_link(short_id, url_data.id)
+        updated = await self.storage.update_url(short_id, update_dict)
+        self._invalidate_link(short_id, url_data.id)
+        return updated
     
     async def delete_url(self, short_id: str) -> bool:
         """删除短链接"""
@@ -147,16 +316,375 @@ class URLService:
         if not url_data:
             raise URLNotFoundError(short_id)
         
-        return await self.storage.delete_url(short_id)
+        if self.click_buffer is not None:
+            self.click_buffer.discard(url_data.id)
+        self._invalidate_link(short_id, url_data.id)
+        if self.top_links is not None:
+            self.top_links.discard(short_id, url_data.id)
+        if self.visitor_buffer is not None:
+            self.visitor_buffer.discard(short_id)
+            self.visitor_buffer.discard(url_data.id)
+        
+        deleted = await self.storage.delete_url(short_id)
+        self._invalidate_link(short_id, url_data.id)
+        return deleted
     
     async def get_all_urls(self) -> List[URLResponse]:
         """获取所有短链接"""
         return await self.storage.get_all_urls()
     
+    async def list_urls(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """分页获取短链接，返回本页结果和下一页游标"""
+        return await self.storage.list_urls(limit, cursor)
+    
+    async def list_urls_json(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """分页获取短链接，本页结果由片段缓存拼接为JSON数组（需启用片段缓存）"""
+        urls, next_cursor = await self.storage.list_urls(limit, cursor)
+        return self.fragment_cache.render_list(urls), next_cursor
+    
+    def iter_urls_ndjson(self, cursor: Optional[str] = None, batch_size: int = 500) -> AsyncIterator[str]:
+        """
+        从游标之后逐条序列化为NDJSON，每batch_size行产出一次
+        
+        游标在开始响应前校验，流式输出过程中不会再因游标无效而中断
+        """
+        if cursor is not None:
+            decode_cursor(cursor)
+        return self._ndjson_chunks(cursor, batch_size)
+    
+    async def get_top_urls(self, k: int = 10, minutes: Optional[int] = None) -> List[TopURL]:
+        """
+        获取点击最多的k个短链接，minutes为None时统计全时段，否则统计最近minutes分钟
+        
+        热点统计以重定向时的短ID或别名为键，这里读取候选链接并按实际ID合并，跳过已删除的链接
+        """
+        if self.top_links is None:
+            return []
+        
+        merged: Dict[str, TopURL] = {}
+        for key, clicks, error in self.top_links.top(2 * k, minutes):
+            url_data = await self.storage.get_url(key)
+            if url_data is None:
+                continue
+            item = merged.get(url_data.id)
+            if item is None:
+                merged[url_data.id] = TopURL(
+                    id=url_data.id,
+                    original_url=url_data.original_url,
+                    short_url=url_data.short_url,
+                    clicks=clicks,
+                    error=error
+                )
+            else:
+                item.clicks += clicks
+                item.error += error
+        return sorted(merged.values(), key=lambda item: item.clicks, reverse=True)[:k]
+    
     async def get_url_info(self, short_id: str) -> URLResponse:
         """获取短链接信息（不增加点击次数）"""
         url_data = await self.storage.get_url(short_id)
         if not url_data:
             raise URLNotFoundError(short_id)
         
-        return url_data 
\ No newline at end of file
+        return url_data
+    
+    async def get_url_info_json(self, short_id: str) -> bytes:
+        """获取短链接信息，由片段缓存序列化为JSON（需启用片段缓存）"""
+        return self.fragment_cache.render(await self.get_url_info(short_id))
+    
+    async def list_domain_urls(self, domain: str, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """分页获取原始URL主机名为domain的短链接，返回本页结果和下一页游标"""
+        return await self.storage.list_domain_urls(self._domain_key(domain), limit, cursor)
+    
+    async def get_domain_stats(self, domain: str) -> DomainStats:
+        """按域名汇总链接数和点击次数（写回缓冲中尚未合并的点击不计入）"""
+        domain = self._domain_key(domain)
+        return DomainStats(domain=domain, **await self.storage.get_domain_stats(domain))
+    
+    async def set_domain_active(self, domain: str, is_active: bool) -> DomainBulkResult:
+        """批量停用或启用某域名下的全部链接，状态变化的链接从缓存中移除"""
+        domain = self._domain_key(domain)
+        changed = await self.storage.set_domain_active(domain, is_active)
+        self._invalidate_links(changed)
+        return DomainBulkResult(domain=domain, affected=len(changed))
+    
+    async def delete_domain(self, domain: str) -> DomainBulkResult:
+        """删除某域名下的全部链接，并与delete_url一样丢弃它们的缓存和待合并统计"""
+        domain = self._domain_key(domain)
+        deleted = await self.storage.delete_domain_urls(domain)
+        self.discard_links(deleted)
+        return DomainBulkResult(domain=domain, affected=len(deleted))
+    
+    async def search_urls(self, query: str, mode: str = "substring", limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """按原始URL或别名搜索短链接，返回本页结果和下一页游标"""
+        return await self.storage.search_urls(query, mode, limit, cursor)
+    
+    async def export_snapshot(self, path: str) -> int:
+        """把全部链接导出为列式快照文件，返回记录数"""
+        return await export_snapshot(self.storage, path)
+    
+    async def import_snapshot(self, path: str) -> int:
+        """导入列式快照文件，返回记录数；被替换的链接可能已在缓存中，导入后清空解析缓存"""
+        imported = await import_snapshot(self.storage, path)
+        if self.resolve_cache is not None:
+            self.resolve_cache.clear()
+        if self.fragment_cache is not None:
+            self.fragment_cache.clear()
+        return imported
+    
+    def _default_id_allocator(self) -> IDAllocator:
+        """全局存储使用全局分配器；注入的存储使用独立分配器"""
+        if self.storage is url_storage:
+            return id_allocator
+        return IDAllocator(
+            self.storage.reserve_id_block,
+            block_size=settings.id_block_size,
+            secret=settings.id_secret,
+            load_secret=self.storage.load_id_secret
+        )
+    
+    def _default_resolve_cache(self) -> Optional[ResolveCache]:
+        """全局存储使用全局缓存；注入的存储使用独立缓存"""
+        if settings.resolve_cache_size == 0:
+            return None
+        if self.storage is url_storage:
+            return resolve_cache
+        return ResolveCache(settings.resolve_cache_size, settings.resolve_cache_ttl)
+    
+    def _default_visitor_buffer(self) -> Optional[VisitorBuffer]:
+        """全局存储使用全局缓冲；注入的存储使用独立缓冲"""
+        if settings.visitor_flush_interval == 0:
+            return None
+        if self.storage is url_storage:
+            return visitor_buffer
+        return VisitorBuffer()
+    
+    def _default_fragment_cache(self) -> Optional[FragmentCache]:
+        """全局存储使用全局片段缓存；注入的存储使用独立缓存"""
+        if settings.fragment_cache_size == 0:
+            return None
+        if self.storage is url_storage:
+            return fragment_cache
+        return FragmentCache(settings.fragment_cache_size)
+    
+    def _default_top_links(self) -> Optional[TopLinks]:
+        """全局存储使用全局热点统计；注入的存储使用独立统计"""
+        if settings.top_links_capacity == 0:
+            return None
+        if self.storage is url_storage:
+            return top_links
+        return TopLinks(settings.top_links_capacity, settings.top_links_window)
+    
+    def _invalidate_link(self, short_id: str, url_id: str) -> None:
+        """使解析缓存中以short_id和url_id为键的条目以及片段缓存中的该链接失效"""
+        if self.resolve_cache is not None:
+            self.resolve_cache.invalidate(short_id, url_id)
+        if self.fragment_cache is not None:
+            self.fragment_cache.invalidate(url_id)
+    
+    def discard_links(self, url_ids: List[str]) -> None:
+        """链接被批量删除或过期清理后，丢弃它们的缓存、待合并的点击和独立访客统计以及热点统计"""
+        if not url_ids:
+            return
+        self._invalidate_links(url_ids)
+        for url_id in url_ids:
+            if self.click_buffer is not None:
+                self.click_buffer.discard(url_id)
+            if self.visitor_buffer is not None:
+                self.visitor_buffer.discard(url_id)
+        if self.top_links is not None:
+            self.top_links.discard(*url_ids)
+    
+    def _invalidate_links(self, url_ids: List[str]) -> None:
+        """批量操作后使解析缓存（含以别名为键的条目）和片段缓存中的这些链接失效"""
+        if not url_ids:
+            return
+        if self.resolve_cache is not None:
+            self.resolve_cache.invalidate_links(set(url_ids))
+        if self.fragment_cache is not None:
+            self.fragment_cache.invalidate(*url_ids)
+    
+    @staticmethod
+    def _domain_key(domain: str) -> str:
+        """接受主机名（可带端口）或完整URL，统一为域名索引使用的小写主机名"""
+        domain = domain.strip()
+        if "://" not in domain:
+            domain = "http://" + domain
+        return get_domain_from_url(domain)
+    
+    async def _resolve_cached(self, short_id: str, visitor: Optional[str] = None) -> str:
+        """经解析缓存重定向：命中时只需计数，未命中时读取存储并填充缓存"""
+        link = self.resolve_cache.get(short_id)
+        if link is None:
+            url_data = await self.storage.get_url(short_id)
+            if url_data is None:
+                raise URLNotFoundError(short_id)
+            link = self.resolve_cache.put(short_id, url_data)
+        
+        original_url = link.resolve(short_id, now_micros())
+        if self.click_buffer is None:
+            await self.storage.increment_click_count(link.url_id)
+        else:
+            self.click_buffer.record(link.url_id)
+        if self.top_links is not None:
+            self.top_links.record(link.url_id)
+        if self.visitor_buffer is not None and visitor is not None:
+            self.visitor_buffer.record(link.url_id, visitor)
+        return original_url
+    
+    async def _unique_visitors(self, short_id: str, url_id: str) -> int:
+        """合并存储中的统计和本进程尚未合并的统计（缓冲按重定向时的ID或别名记录）后估计"""
+        registers = bytearray(await self.storage.get_visitor_sketch(url_id))
+        for key in {short_id, url_id}:
+            pending = self.visitor_buffer.pending(key)
+            if pending is not None:
+                merge_sketch(registers, pending)
+        return estimate(registers)
+    
+    async def _click_series(
+        self,
+        url_id: str,
+        granularity: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        pending_count: int = 0,
+        pending_last: Optional[int] = None
+    ) -> List[ClickSeriesPoint]:
+        """从存储的计数环取出时间范围内的序列，尚未写回的点击计入最后访问时间所在的时间段"""
+        width, size = GRANULARITIES[granularity]
+        now = now_micros() // 1_000_000
+        end_ts = now if end is None else to_micros(end) // 1_000_000
+        start_ts = end_ts - (size - 1) * width if start is None else to_micros(start) // 1_000_000
+        if start_ts > end_ts:
+            raise InvalidTimeRangeError(start, end)
+        
+        head, ring = await self.storage.get_click_series(url_id, granularity)
+        pending_bucket = None
+        if pending_count:
+            pending_bucket = pending_last // 1_000_000 // width * width
+        return [
+            ClickSeriesPoint(
+                timestamp=from_micros(timestamp * 1_000_000),
+                clicks=clicks + (pending_count if timestamp == pending_bucket else 0)
+            )
+            for timestamp, clicks in series_points(head, ring, granularity, start_ts, end_ts, now)
+        ]
+    
+    def _dedup_key(self, url_data: URLCreate, original_url: str) -> Optional[Tuple[str, str]]:
+        """
+        返回（规范化URL, 哈希键）；未开启去重或请求不可去重时返回None
+        
+        指定了自定义别名或过期时间的请求要求得到独立的链接，不参与去重
+        """
+        if not self.dedup_enabled or url_data.custom_alias or url_data.expires_at is not None:
+            return None
+        canonical_url = canonicalize_url(original_url, self.dedup_strip_params)
+        return canonical_url, canonical_key(canonical_url)
+    
+    def _is_reusable(self, url_data: Optional[URLResponse], canonical_url: str) -> bool:
+        """
+        去重索引找到的链接是否可以直接返回
+        
+        索引只在创建时写入，链接之后可能被停用、设置过期时间或修改目标，需要重新确认
+        """
+        return (
+            url_data is not None
+            and url_data.is_active
+            and url_data.expires_at is None
+            and canonicalize_url(url_data.original_url, self.dedup_strip_params) == canonical_url
+        )
+    
+    async def _dedup_batch(
+        self,
+        to_create: List[Tuple[int, URLCreate, str]],
+        results: List[Optional[URLBatchItemResult]]
+    ) -> Tuple[List[Tuple[int, URLCreate, str]], List[Tuple[int, int]], Dict[int, str]]:
+        """
+        批量创建的去重：一次查询全部哈希键，已有链接直接写入结果，批内重复项只保留首次出现的一项
+        
+        返回仍需创建的项、（重复项序号, 首次出现序号）和需创建项的哈希键
+        """
+        dedup = {}
+        for index, url_data, original_url in to_create:
+            item_key = self._dedup_key(url_data, original_url)
+            if item_key is not None:
+                dedup[index] = item_key
+        if not dedup:
+            return to_create, [], {}
+        
+        existing = await self.storage.find_canonical(list({key for _, key in dedup.values()}))
+        pending = []
+        duplicates = []
+        dedup_keys = {}
+        first_index = {}  # 哈希键 -> 批内首次出现的序号
+        for item in to_create:
+            index = item[0]
+            if index in dedup:
+                canonical_url, key = dedup[index]
+                found = existing.get(key)
+                if self._is_reusable(found, canonical_url):
+                    results[index] = URLBatchItemResult(index=index, success=True, status_code=200, data=found)
+                    url_dedup_hits_total.inc()
+                    continue
+                if key in first_index:
+                    duplicates.append((index, first_index[key]))
+                    url_dedup_hits_total.inc()
+                    continue
+                first_index[key] = index
+                dedup_keys[index] = key
+            pending.append(item)
+        return pending, duplicates, dedup_keys
+    
+    def _validate_create(self, url_data: URLCreate) -> str:
+        """校验原始URL和自定义别名格式，返回清理后的URL"""
+        # 验证原始URL
+        original_url = str(url_data.original_url)
+        if not validate_url(original_url):
+            raise InvalidURLError(original_url)
+        
+        if url_data.custom_alias and not is_valid_alias(url_data.custom_alias):
+            raise InvalidURLError(f"无效的别名格式: {url_data.custom_alias}")
+        
+        # 清理URL
+        return sanitize_url(original_url)
+    
+    def _get_base_url(self, request: Optional[Request]) -> str:
+        """构建短链接基础URL（完整short_url在序列化时拼接）"""
+        if request:
+            return str(request.base_url).rstrip('/')
+        return self.base_url
+    
+    @staticmethod
+    def _build_url_dict(
+        url_data: URLCreate,
+        short_id: str,
+        original_url: str,
+        base_url: str,
+        created_at: datetime
+    ) -> dict:
+        """构建交给存储层的URL数据"""
+        url_dict = {
+            "id": short_id,
+            "original_url": original_url,
+            "base_url": base_url,
+            "click_count": 0,
+            "created_at": created_at,
+            "expires_at": url_data.expires_at,
+            "is_active": True,
+            "last_accessed": None
+        }
+        
+        if url_data.custom_alias:
+            url_dict["custom_alias"] = url_data.custom_alias
+        
+        return url_dict
+    
+    async def _ndjson_chunks(self, cursor: Optional[str], batch_size: int) -> AsyncIterator[str]:
+        lines = []
+        async for url in self.storage.iter_urls(cursor, batch_size):
+            lines.append(url.model_dump_json())
+            if len(lines) >= batch_size:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
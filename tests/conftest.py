@@ -1,10 +1,24 @@
+import os
+import uuid
 import pytest
+import pytest_asyncio
 from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 
-from main import app
-from utils.storage import URLStorage
-from services.url_service import URLService
+# 全局应用实例在导入时读取配置，测试中启用默认关闭的可选功能以覆盖其接口
+os.environ.setdefault("CLICK_SERIES_ENABLED", "true")
+os.environ.setdefault("TOP_LINKS_CAPACITY", "1000")
+os.environ.setdefault("VISITOR_FLUSH_INTERVAL", "5")
+os.environ.setdefault("METRICS_ENABLED", "true")
+
+from main import app  # noqa: E402
+from utils.storage import URLStorage  # noqa: E402
+from services.url_service import URLService  # noqa: E402
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover
+    fakeredis = None
 
 
 @pytest.fixture
@@ -13,18 +27,56 @@ def client():
     return TestClient(app)
 
 
-@pytest.fixture
-def url_storage():
-    """创建新的存储实例用于测试"""
-    return URLStorage()
+@pytest_asyncio.fixture(params=["memory", "durable", "redis", "shm"])
+async def url_storage(request, tmp_path):
+    """
+    创建新的存储实例用于测试
+    
+    每个存储测试分别在内存、本地持久化、Redis和共享内存后端上运行；设置REDIS_URL时连接本地redis-server，
+    否则使用进程内的fakeredis
+    """
+    if request.param == "memory":
+        yield URLStorage(click_series=True)
+        return
+    
+    if request.param == "durable":
+        from utils.durable_storage import DurableURLStorage
+        storage = DurableURLStorage(data_dir=str(tmp_path), fsync_delay=0, click_series=True)
+        yield storage
+        await storage.close()
+        return
+    
+    if request.param == "shm":
+        from utils.shm_storage import SharedMemoryURLStorage
+        storage = SharedMemoryURLStorage(str(tmp_path / "links.tbl"), capacity=4096, heap_size=1 << 20, click_series=True)
+        yield storage
+        await storage.close()
+        return
+    
+    from utils.redis_storage import RedisURLStorage
+    
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        prefix = f"test:{uuid.uuid4().hex}:"
+        storage = RedisURLStorage(url=redis_url, prefix=prefix, click_series=True, search_index=True)
+        yield storage
+        keys = [key async for key in storage._redis.scan_iter(match=prefix + "*")]
+        if keys:
+            await storage._redis.delete(*keys)
+        await storage.close()
+    elif fakeredis is not None:
+        client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+        storage = RedisURLStorage(client=client, click_series=True, search_index=True)
+        yield storage
+        await storage.close()
+    else:
+        pytest.skip("需要REDIS_URL或fakeredis")
 
 
 @pytest.fixture
 def url_service(url_storage):
     """创建URL服务实例用于测试"""
-    service = URLService()
-    service.storage = url_storage
-    return service
+    return URLService(storage=url_storage)
 
 
 @pytest.fixture
@@ -37,6 +89,21 @@ def sample_url_data():
     }
 
 
+@pytest.fixture
+def make_url_data():
+    """按短ID构造直接写入存储的URL数据，其余字段可用关键字参数覆盖"""
+    def factory(url_id: str, **overrides) -> dict:
+        data = {
+            "id": url_id,
+            "original_url": f"https://www.example.com/{url_id}",
+            "short_url": f"http://localhost:8000/{url_id}",
+            "created_at": datetime.utcnow().isoformat()
+        }
+        data.update(overrides)
+        return data
+    return factory
+
+
 @pytest.fixture
 def sample_url_with_alias():
     """带自定义别名的示例URL数据"""
@@ -1,3 +1,4 @@
+import json
 import pytest
 from datetime import datetime, timedelta
 
@@ -166,6 +167,39 @@ class TestURLAPI:
         data = response.json()
         assert data["id"] == short_id
         assert data["click_count"] == 2
+        
+        assert data["unique_visitors"] == 1
+        
+        client.get(f"/{short_id}", headers={"User-Agent": "another-browser"}, follow_redirects=False)
+        assert client.get(f"/api/urls/{short_id}/stats").json()["unique_visitors"] == 2
+        
+        response = client.get(f"/api/urls/{short_id}/stats", params={"granularity": "minute"})
+        assert response.status_code == 200
+        series = response.json()["series"]
+        assert len(series) == 60
+        assert sum(point["clicks"] for point in series) == 3
+        
+        response = client.get(
+            f"/api/urls/{short_id}/stats",
+            params={"granularity": "day", "start": "2030-01-02T00:00:00", "end": "2030-01-01T00:00:00"}
+        )
+        assert response.status_code == 400
+    
+    def test_get_top_urls(self, client):
+        """测试获取热点短链接，路径不会被当作短链接ID"""
+        create_response = client.post("/shorten", json={"original_url": "https://www.example.com/top"})
+        short_id = create_response.json()["id"]
+        for _ in range(3):
+            client.get(f"/{short_id}", follow_redirects=False)
+        
+        response = client.get("/api/urls/top", params={"k": 100, "minutes": 5})
+        
+        assert response.status_code == 200
+        item = next(item for item in response.json() if item["id"] == short_id)
+        assert item["clicks"] == 3
+        assert item["original_url"] == "https://www.example.com/top"
+        
+        assert client.get("/api/urls/top", params={"k": 0}).status_code == 422
     
     def test_update_url(self, client):
         """测试更新短链接"""
@@ -267,4 +301,119 @@ class TestURLAPI:
             if expected_status == 200:
                 assert response.status_code in [200, 409]  # 可能因重复而冲突
             else:
-                assert response.status_code == expected_status 
\ No newline at end of file
+                assert response.status_code == expected_status
+    
+    def test_create_short_urls_batch(self, client):
+        """测试批量创建短链接"""
+        payload = {
+            "items": [
+                {"original_url": "https://www.example.com/batch"},
+                {"original_url": "https://www.example.com/batch", "custom_alias": "batch-api"},
+                {"original_url": "https://www.example.com/batch", "custom_alias": "batch-api"},
+            ]
+        }
+        
+        response = client.post("/shorten/batch", json=payload)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 3
+        assert data["succeeded"] == 2
+        assert data["failed"] == 1
+        assert [item["status_code"] for item in data["results"]] == [200, 200, 409]
+        assert data["results"][1]["data"]["short_url"].endswith("batch-api")
+    
+    def test_create_short_urls_batch_empty(self, client):
+        """测试空批量请求"""
+        response = client.post("/shorten/batch", json={"items": []})
+        assert response.status_code == 422
+    
+    def test_get_all_urls_pagination(self, client):
+        """测试游标分页和NDJSON流式列表"""
+        for i in range(3):
+            client.post("/shorten", json={"original_url": f"https://www.example.com/page{i}"})
+        
+        first = client.get("/api/urls", params={"limit": 2})
+        assert first.status_code == 200
+        assert len(first.json()) == 2
+        cursor = first.headers["X-Next-Cursor"]
+        
+        second = client.get("/api/urls", params={"limit": 2, "cursor": cursor})
+        assert second.status_code == 200
+        first_ids = {url["id"] for url in first.json()}
+        assert all(url["id"] not in first_ids for url in second.json())
+        
+        stream = client.get("/api/urls", params={"stream": True, "cursor": cursor})
+        assert stream.status_code == 200
+        assert stream.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in stream.text.splitlines()]
+        assert [url["id"] for url in lines[:2]] == [url["id"] for url in second.json()]
+        
+        assert client.get("/api/urls", params={"limit": 0}).status_code == 422
+        assert client.get("/api/urls", params={"cursor": "not-a-cursor"}).status_code == 400
+        assert client.get("/api/urls", params={"cursor": "not-a-cursor", "stream": True}).status_code == 400
+
+
+    def test_domain_endpoints(self, client):
+        """测试按域名列出、汇总、批量停用和删除"""
+        created = [
+            client.post("/shorten", json={"original_url": f"https://abuse.example.net/{i}"}).json()
+            for i in range(3)
+        ]
+        client.get(f"/{created[0]['id']}", follow_redirects=False)
+        
+        first = client.get("/api/domains/ABUSE.example.net/urls", params={"limit": 2})
+        assert [url["id"] for url in first.json()] == [url["id"] for url in created[:2]]
+        second = client.get("/api/domains/abuse.example.net/urls", params={"cursor": first.headers["X-Next-Cursor"]})
+        assert [url["id"] for url in second.json()] == [created[2]["id"]]
+        assert "X-Next-Cursor" not in second.headers
+        
+        stats = client.get("/api/domains/abuse.example.net/stats").json()
+        assert stats["domain"] == "abuse.example.net"
+        assert stats["links"] == 3 and stats["active_links"] == 3
+        
+        response = client.put("/api/domains/abuse.example.net", json={"is_active": False})
+        assert response.json() == {"domain": "abuse.example.net", "affected": 3}
+        assert client.get(f"/{created[0]['id']}", follow_redirects=False).status_code == 410
+        assert client.put("/api/domains/abuse.example.net", json={"is_active": False}).json()["affected"] == 0
+        
+        assert client.delete("/api/domains/abuse.example.net").json()["affected"] == 3
+        assert client.get(f"/api/urls/{created[1]['id']}").status_code == 404
+        assert client.get("/api/domains/abuse.example.net/urls").json() == []
+    
+    def test_search_endpoint(self, client):
+        """测试按原始URL和别名搜索、分页和参数校验"""
+        created = [
+            client.post("/shorten", json={"original_url": f"https://Search.example.net/item{i}"}).json()
+            for i in range(3)
+        ]
+        aliased = client.post("/shorten", json={
+            "original_url": "https://www.example.com/other",
+            "custom_alias": "searchalias"
+        }).json()
+        
+        first = client.get("/api/search", params={"q": "search.EXAMPLE.net/item", "limit": 2})
+        assert [url["id"] for url in first.json()] == [url["id"] for url in created[:2]]
+        second = client.get("/api/search", params={"q": "search.example.net/item", "cursor": first.headers["X-Next-Cursor"]})
+        assert [url["id"] for url in second.json()] == [created[2]["id"]]
+        assert "X-Next-Cursor" not in second.headers
+        
+        assert [url["id"] for url in client.get("/api/search", params={"q": "SearchAl", "mode": "prefix"}).json()] == [aliased["id"]]
+        assert client.get("/api/search", params={"q": "example.net", "mode": "prefix"}).json() == []
+        assert client.get("/api/search", params={"q": ""}).status_code == 422
+        assert client.get("/api/search", params={"q": "x", "mode": "regex"}).status_code == 422
+    
+    def test_metrics_endpoint(self, client):
+        """测试/metrics按路由模板输出请求指标"""
+        created = client.post("/shorten", json={"original_url": "https://www.example.com/metrics"}).json()
+        client.get(f"/{created['id']}", follow_redirects=False)
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert '# TYPE http_request_duration_seconds histogram' in text
+        assert 'http_requests_total{method="GET",route="/{short_id}",status="302"}' in text
+        assert 'http_request_duration_seconds_bucket{method="POST",route="/shorten",le="+Inf"}' in text
+        assert 'storage_operation_duration_seconds_count{operation="create_url"}' in text
+        assert created["id"] not in text
\ No newline at end of file
@@ -0,0 +1,86 @@
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from main import app
+from middleware.redirect import FastRedirectMiddleware
+from services.url_service import URLService
+from utils.bloom_filter import CountingBloomFilter
+from utils.filtered_storage import FilteredStorage
+from utils.storage import URLStorage
+from exceptions.url_exceptions import URLNotFoundError, not_found_body
+
+
+class TestCountingBloomFilter:
+    """计数布隆过滤器测试"""
+    
+    def test_no_false_negatives_and_remove(self):
+        """测试加入的键一定判为存在，删除后判为不存在，误判率接近设计值"""
+        bloom = CountingBloomFilter(10000, error_rate=0.01)
+        keys = [f"key{i}" for i in range(10000)]
+        for key in keys:
+            bloom.add(key)
+        
+        assert all(key in bloom for key in keys)
+        false_positives = sum(f"other{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+        
+        for key in keys[:5000]:
+            bloom.remove(key)
+        assert all(key in bloom for key in keys[5000:])
+        assert sum(key in bloom for key in keys[:5000]) < 300
+
+
+class TestFilteredStorage:
+    """成员过滤器存储包装测试"""
+    
+    @pytest.mark.asyncio
+    async def test_rejects_unknown_ids(self, url_storage, make_url_data):
+        """测试加载后不存在的ID和别名不访问后端，创建和删除同步更新过滤器"""
+        await url_storage.create_url(make_url_data("existing", custom_alias="existalias"))
+        storage = FilteredStorage(url_storage, capacity=1000)
+        
+        # 加载前不拒绝
+        assert await storage.get_url("missing") is None
+        assert storage.rejections == 0
+        
+        assert await storage.warm() == 2
+        assert (await storage.get_url("existalias")).id == "existing"
+        with pytest.raises(URLNotFoundError):
+            await storage.resolve_and_count("missing")
+        assert await storage.get_url("missing") is None
+        assert storage.rejections == 2
+        
+        await storage.create_url(make_url_data("created", custom_alias="newalias"))
+        assert await storage.resolve_url("newalias") == "https://www.example.com/created"
+        assert await storage.aliases_exist(["newalias", "nosuchalias"]) == {"newalias"}
+        
+        assert await storage.delete_url("newalias") is True
+        assert "created" not in storage._filter
+        assert "newalias" not in storage._filter
+        assert await storage.get_url("existing") is not None
+    
+    @pytest.mark.asyncio
+    async def test_prebuilt_not_found(self, make_url_data):
+        """测试过滤器判定不存在时重定向返回预先格式化的404，响应体与异常处理器一致"""
+        backend = URLStorage()
+        await backend.create_url(make_url_data("existing"))
+        storage = FilteredStorage(backend, capacity=1000)
+        await storage.warm()
+        service = URLService(storage=storage)
+        
+        assert service.known_missing("missing") is True
+        assert service.known_missing("existing") is False
+        assert URLService(storage=backend).known_missing("missing") is False
+        for url_id in ["missing", "带\"引号\\的ID"]:
+            exc = URLNotFoundError(url_id)
+            expected = JSONResponse({"error": exc.detail, "status_code": 404}).body
+            assert not_found_body(url_id) == expected
+        
+        client = TestClient(FastRedirectMiddleware(app, service_factory=lambda: service, metrics_enabled=False))
+        rejections = storage.rejections
+        response = client.get("/missing", follow_redirects=False)
+        assert response.status_code == 404
+        assert response.json() == {"error": URLNotFoundError("missing").detail, "status_code": 404}
+        assert storage.rejections == rejections + 1
+        assert client.get("/existing", follow_redirects=False).status_code == 302
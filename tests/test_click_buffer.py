@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+
+from models.url_models import URLCreate
+from utils.click_buffer import ClickBuffer
+
+
+class TestClickBuffer:
+    """点击计数写回缓冲测试"""
+    
+    def test_record_and_pending(self):
+        """测试累加点击增量"""
+        buffer = ClickBuffer()
+        buffer.record("abc", now=100)
+        buffer.record("abc", now=200)
+        
+        assert buffer.pending("abc") == (2, 200)
+        assert buffer.pending("other") == (0, None)
+    
+    def test_discard(self):
+        """测试丢弃待写回增量"""
+        buffer = ClickBuffer()
+        buffer.record("abc")
+        buffer.discard("abc")
+        
+        assert buffer.pending("abc") == (0, None)
+    
+    @pytest.mark.asyncio
+    async def test_flush_to_storage(self, url_service, url_storage):
+        """测试写回后计数进入存储并清空缓冲"""
+        buffer = ClickBuffer()
+        url_service.click_buffer = buffer
+        created_url = await url_service.create_short_url(URLCreate(original_url="https://www.example.com"))
+        
+        await url_service.get_original_url(created_url.id)
+        await url_service.get_original_url(created_url.id)
+        
+        # 写回前存储中计数不变，统计接口合并待写回增量
+        assert (await url_storage.get_url(created_url.id)).click_count == 0
+        stats = await url_service.get_url_stats(created_url.id)
+        assert stats.click_count == 2
+        assert stats.last_accessed is not None
+        
+        assert await buffer.flush(url_storage) == 1
+        assert buffer.pending(created_url.id) == (0, None)
+        assert (await url_storage.get_url(created_url.id)).click_count == 2
+        stats = await url_service.get_url_stats(created_url.id)
+        assert stats.click_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_flush_failure_keeps_deltas(self):
+        """测试写回失败时增量保留在缓冲中"""
+        class BrokenStorage:
+            async def apply_click_deltas(self, deltas):
+                raise RuntimeError("backend down")
+        
+        buffer = ClickBuffer()
+        buffer.record("abc", now=100)
+        with pytest.raises(RuntimeError):
+            await buffer.flush(BrokenStorage())
+        buffer.record("abc", now=200)
+        
+        assert buffer.pending("abc") == (2, 200)
+    
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_flush(self):
+        """测试停止时等待进行中的写回完成，不丢失已取出的增量"""
+        class SlowStorage:
+            def __init__(self):
+                self.applied = {}
+            
+            async def apply_click_deltas(self, deltas):
+                await asyncio.sleep(0.05)
+                for url_id, (count, _) in deltas.items():
+                    self.applied[url_id] = self.applied.get(url_id, 0) + count
+        
+        storage = SlowStorage()
+        buffer = ClickBuffer()
+        buffer.record("abc")
+        buffer.start(storage, interval=0.01)
+        await asyncio.sleep(0.03)  # 写回进行中
+        buffer.record("abc")
+        await buffer.stop()
+        
+        assert storage.applied == {"abc": 2}
+        assert len(buffer) == 0
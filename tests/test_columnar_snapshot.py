@@ -0,0 +1,152 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main import url_shortener_exception_handler
+from routers.admin_router import router as admin_router
+from config import settings
+from utils.storage import URLStorage
+from utils.durable_storage import DurableURLStorage
+from utils.url_record import URLRecord
+from utils.columnar_snapshot import export_snapshot, import_snapshot, read_header, read_snapshot, write_snapshot
+from exceptions.url_exceptions import URLShortenerException, InvalidSnapshotError, SnapshotNotSupportedError
+
+
+async def seed(storage, make_url_data) -> None:
+    await storage.create_url(make_url_data("plain"))
+    await storage.create_url(make_url_data(
+        "aliased",
+        custom_alias="snapalias",
+        original_url="https://例子.com/路径?q=1",
+        expires_at=(datetime.utcnow() + timedelta(days=1)).isoformat(),
+        canonical_key="key1"
+    ))
+    await storage.create_url(make_url_data("other", short_url="https://s.example.com/other", is_active=False))
+    await storage.resolve_and_count("snapalias")
+    await storage.reserve_id_block(100)
+
+
+class TestColumnarSnapshot:
+    """列式快照测试"""
+    
+    @pytest.mark.asyncio
+    async def test_round_trip(self, url_storage, tmp_path, make_url_data):
+        """测试导出后导入新存储，记录、索引、分页顺序和ID计数值一致"""
+        await seed(url_storage, make_url_data)
+        path = str(tmp_path / "links.snap")
+        if not isinstance(url_storage, URLStorage):
+            with pytest.raises(SnapshotNotSupportedError):
+                await export_snapshot(url_storage, path)
+            return
+        
+        assert await export_snapshot(url_storage, path) == 3
+        assert read_header(path) == (3, 100)
+        
+        restored = URLStorage()
+        assert await import_snapshot(restored, path) == 3
+        for url_id in ("plain", "aliased", "other"):
+            assert await restored.get_stats(url_id) == await url_storage.get_stats(url_id)
+        assert await restored.resolve_url("snapalias") == "https://例子.com/路径?q=1"
+        assert (await restored.find_canonical(["key1"]))["key1"].id == "aliased"
+        assert [url.id for url in (await restored.list_urls(10))[0]] == ["plain", "aliased", "other"]
+        assert await restored.reserve_id_block(1) == 100
+    
+    @pytest.mark.asyncio
+    async def test_import_replaces_existing(self, tmp_path, make_url_data):
+        """测试导入时同ID链接被替换，其旧别名不再指向它"""
+        source = URLStorage()
+        await source.create_url(make_url_data("shared", original_url="https://www.new.com"))
+        path = str(tmp_path / "links.snap")
+        await export_snapshot(source, path)
+        
+        target = URLStorage()
+        await target.create_url(make_url_data("shared", custom_alias="oldalias"))
+        await target.create_url(make_url_data("local"))
+        assert await import_snapshot(target, path) == 1
+        
+        assert (await target.get_url("shared")).original_url == "https://www.new.com"
+        assert await target.get_url("oldalias") is None
+        assert len((await target.list_urls(10))[0]) == 2
+    
+    @pytest.mark.asyncio
+    async def test_durable_import_survives_restart(self, tmp_path, make_url_data):
+        """测试导入持久化存储后生成快照，重启后数据仍在"""
+        source = URLStorage()
+        await seed(source, make_url_data)
+        path = str(tmp_path / "links.snap")
+        await export_snapshot(source, path)
+        
+        storage = DurableURLStorage(str(tmp_path / "data"), fsync_delay=0)
+        await import_snapshot(storage, path)
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path / "data"), fsync_delay=0)
+        assert restored.recovery_stats["snapshot_records"] == 3
+        assert (await restored.get_url("snapalias")).id == "aliased"
+        assert await restored.reserve_id_block(1) == 100
+        await restored.close()
+    
+    def test_invalid_files(self, tmp_path):
+        """测试空文件、文件头不符和被截断的文件"""
+        path = tmp_path / "links.snap"
+        path.write_bytes(b"")
+        with pytest.raises(InvalidSnapshotError):
+            read_snapshot(str(path))
+        
+        path.write_bytes(b"NOTASNAPSHOT" * 4)
+        with pytest.raises(InvalidSnapshotError):
+            read_snapshot(str(path))
+        
+        write_snapshot(str(path), [], 7)
+        assert read_snapshot(str(path)) == ([], 7)
+        
+        write_snapshot(str(path), [URLRecord("x", "https://www.example.com", "http://localhost:8000", 1)], 0)
+        path.write_bytes(path.read_bytes()[:-16])
+        with pytest.raises(InvalidSnapshotError):
+            read_snapshot(str(path))
+
+
+class TestSnapshotAPI:
+    """管理接口测试"""
+    
+    @pytest.fixture
+    def admin_client(self, monkeypatch):
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        app = FastAPI()
+        app.include_router(admin_router)
+        app.add_exception_handler(URLShortenerException, url_shortener_exception_handler)
+        return TestClient(app)
+    
+    def test_export_and_import(self, admin_client, client, tmp_path):
+        """测试导出下载和上传导入，令牌错误时拒绝"""
+        created = client.post("/shorten", json={"original_url": "https://www.example.com/snapshot"}).json()
+        
+        assert admin_client.get("/api/admin/snapshot").status_code == 401
+        assert admin_client.get("/api/admin/snapshot", headers={"X-Admin-Token": "wrong"}).status_code == 401
+        
+        response = admin_client.get("/api/admin/snapshot", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        path = tmp_path / "links.snap"
+        path.write_bytes(response.content)
+        records, _ = read_snapshot(str(path))
+        assert created["id"] in {record.id for record in records}
+        
+        response = admin_client.post("/api/admin/snapshot", content=response.content, headers={"X-Admin-Token": "secret"})
+        assert response.json() == {"imported": len(records)}
+        assert client.get(f"/api/urls/{created['id']}").json()["original_url"] == "https://www.example.com/snapshot"
+        
+        response = admin_client.post("/api/admin/snapshot", content=b"garbage", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 400
+    
+    def test_import_size_limit(self, admin_client, monkeypatch):
+        """测试请求体超过上限时返回413，按声明长度和实际接收的字节数检查"""
+        monkeypatch.setattr(settings, "snapshot_upload_max_bytes", 16)
+        headers = {"X-Admin-Token": "secret"}
+        
+        response = admin_client.post("/api/admin/snapshot", content=b"x" * 17, headers=headers)
+        assert response.status_code == 413
+        
+        chunks = iter([b"x" * 10, b"x" * 10])
+        response = admin_client.post("/api/admin/snapshot", content=chunks, headers=headers)
+        assert response.status_code == 413
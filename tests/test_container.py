@@ -0,0 +1,67 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from models.url_models import URLCreate
+from services.container import ServiceContainer, container
+from services.url_service import URLService
+from routers.url_router import get_url_service
+from utils.resolve_cache import ResolveCache
+from utils.top_links import TopLinks
+
+
+def make_container(url_storage, path) -> ServiceContainer:
+    """使用独立存储、解析缓存和热点统计的服务容器"""
+    service_container = ServiceContainer(storage=url_storage, warm_start_path=str(path), warm_start_size=2)
+    service_container._service = URLService(
+        storage=url_storage,
+        resolve_cache=ResolveCache(100),
+        top_links=TopLinks(capacity=100, window_minutes=5)
+    )
+    return service_container
+
+
+class TestServiceContainer:
+    """服务容器测试"""
+    
+    def test_shared_service(self):
+        """测试各请求共享容器中的同一个服务实例"""
+        assert get_url_service() is get_url_service() is container.service
+    
+    @pytest.mark.asyncio
+    async def test_warm_start(self, url_storage, tmp_path):
+        """测试关闭时保存最热的链接，重启后在接受请求前预热解析缓存"""
+        path = tmp_path / "hot.json"
+        before = make_container(url_storage, path)
+        ids = []
+        for clicks in (3, 1, 2):
+            created = await before.service.create_short_url(URLCreate(original_url="https://www.example.com"))
+            for _ in range(clicks):
+                await before.service.get_original_url(created.id)
+            ids.append(created.id)
+        
+        assert before.save_hot_links() == 2
+        assert json.loads(path.read_text())["keys"] == [ids[0], ids[2]]
+        
+        after = make_container(url_storage, path)
+        assert await after.warm_start() == 2
+        assert after.service.resolve_cache.hot_keys(10) == [ids[2], ids[0]]
+        # 预热只读取，不计点击
+        assert (await url_storage.get_url(ids[0])).click_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_warm_start_missing_snapshot(self, url_storage, tmp_path):
+        """测试快照不存在或损坏时跳过预热"""
+        service_container = make_container(url_storage, tmp_path / "hot.json")
+        assert await service_container.warm_start() == 0
+        
+        (tmp_path / "hot.json").write_text("{")
+        assert await service_container.warm_start() == 0
+    
+    def test_lifespan(self):
+        """测试应用生命周期启动和关闭容器"""
+        with TestClient(app) as client:
+            assert client.get("/api/health").status_code == 200
+            assert container.started
+        assert not container.started
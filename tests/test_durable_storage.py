@@ -0,0 +1,194 @@
+import pytest
+from datetime import datetime, timedelta
+
+from utils.durable_storage import DurableURLStorage
+
+
+class TestDurableURLStorage:
+    """本地持久化存储测试"""
+    
+    @pytest.mark.asyncio
+    async def test_recover_from_log(self, tmp_path, make_url_data):
+        """测试重启后通过重放操作日志恢复数据"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        await storage.create_url(make_url_data("keep", expires_at=expires_at, custom_alias="myalias"))
+        await storage.create_url(make_url_data("gone"))
+        await storage.update_url("keep", {"original_url": "https://www.updated.com"})
+        await storage.delete_url("gone")
+        await storage.resolve_and_count("myalias")
+        await storage.resolve_and_count("keep")
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        
+        assert restored.recovery_stats["snapshot_records"] == 0
+        assert await restored.get_url("gone") is None
+        record = await restored.get_url("myalias")
+        assert record.original_url == "https://www.updated.com"
+        assert record.click_count == 2
+        assert record.expires_at == expires_at
+        assert (await restored.get_stats("keep"))["last_accessed"] is not None
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_recover_from_snapshot_and_tail(self, tmp_path, make_url_data):
+        """测试快照加日志尾部恢复"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        for i in range(10):
+            await storage.create_url(make_url_data(f"id{i}"))
+        assert await storage.compact() == 10
+        await storage.create_url(make_url_data("tail"))
+        await storage.delete_url("id0")
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        
+        assert restored.recovery_stats["snapshot_records"] == 10
+        assert restored.recovery_stats["replayed_ops"] == 2
+        assert len(await restored.get_all_urls()) == 10
+        assert await restored.get_url("id0") is None
+        assert await restored.get_url("tail") is not None
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_order_index_survives_restart(self, tmp_path, make_url_data):
+        """测试重启后分页顺序不变（日志重放中的更新原位替换）"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        created_at = datetime.utcnow()
+        for i in reversed(range(6)):
+            await storage.create_url(make_url_data(f"id{i}", created_at=(created_at + timedelta(seconds=i)).isoformat()))
+        await storage.compact()
+        await storage.update_url("id2", {"is_active": False})
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        
+        page, cursor = await restored.list_urls(4)
+        assert [url.id for url in page] == ["id0", "id1", "id2", "id3"]
+        assert page[2].is_active is False
+        page, cursor = await restored.list_urls(4, cursor)
+        assert [url.id for url in page] == ["id4", "id5"]
+        assert cursor is None
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_automatic_snapshot(self, tmp_path, make_url_data):
+        """测试日志达到阈值后自动生成快照"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0, snapshot_ops=5)
+        for i in range(6):
+            await storage.create_url(make_url_data(f"id{i}"))
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert restored.recovery_stats["snapshot_records"] >= 5
+        assert len(await restored.get_all_urls()) == 6
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_torn_log_tail_is_discarded(self, tmp_path, make_url_data):
+        """测试崩溃导致的半行日志被丢弃并截断"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        await storage.create_url(make_url_data("ok"))
+        await storage.close()
+        with open(tmp_path / "oplog.jsonl", "ab") as f:
+            f.write(b'["p",["broken"')
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        await restored.create_url(make_url_data("after"))
+        await restored.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert restored.recovery_stats["replayed_ops"] == 2
+        assert await restored.get_url("ok") is not None
+        assert await restored.get_url("after") is not None
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_id_counter_survives_restart(self, tmp_path):
+        """测试预留的ID计数值在重启和快照后不会重复"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert await storage.reserve_id_block(100) == 0
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert await restored.reserve_id_block(100) == 100
+        await restored.compact()
+        await restored.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert await restored.reserve_id_block(100) == 200
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_id_secret_survives_restart(self, tmp_path):
+        """测试首次保存的短ID置换密钥在日志重放和快照后保持不变"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert await storage.load_id_secret("kept") == "kept"
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert await restored.load_id_secret("other") == "kept"
+        await restored.compact()
+        await restored.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert await restored.load_id_secret("other") == "kept"
+        await restored.close()
+
+
+    @pytest.mark.asyncio
+    async def test_canonical_index_survives_restart(self, tmp_path, make_url_data):
+        """测试去重索引在日志重放和快照恢复后重建"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        await storage.create_url(make_url_data("dedup", canonical_key="canonical-key"))
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert (await restored.find_canonical(["canonical-key"]))["canonical-key"].id == "dedup"
+        await restored.compact()
+        await restored.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert (await restored.find_canonical(["canonical-key"]))["canonical-key"].id == "dedup"
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_click_series_survives_restart(self, tmp_path, make_url_data):
+        """测试点击时间序列在日志重放和快照恢复后保留"""
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0, click_series=True)
+        await storage.create_url(make_url_data("series"))
+        await storage.resolve_and_count("series")
+        await storage.resolve_and_count("series")
+        expected = await storage.get_click_series("series", "minute")
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0, click_series=True)
+        assert await restored.get_click_series("series", "minute") == expected
+        await restored.compact()
+        await restored.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0, click_series=True)
+        assert restored.recovery_stats["snapshot_records"] == 1
+        assert await restored.get_click_series("series", "minute") == expected
+        await restored.close()
+    
+    @pytest.mark.asyncio
+    async def test_visitor_sketch_survives_restart(self, tmp_path, make_url_data):
+        """测试独立访客统计在日志重放和快照恢复后保留"""
+        registers = bytearray(1024)
+        registers[7], registers[300] = 2, 5
+        storage = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        await storage.create_url(make_url_data("visited"))
+        await storage.merge_visitor_sketches({"visited": registers})
+        await storage.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert await restored.get_visitor_sketch("visited") == registers
+        await restored.compact()
+        await restored.close()
+        
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0)
+        assert restored.recovery_stats["replayed_ops"] == 0
+        assert await restored.get_visitor_sketch("visited") == registers
+        await restored.close()
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+from models.url_models import URLCreate
+from services.url_service import URLService
+from utils.expiry_reaper import ExpiryReaper
+from utils.resolve_cache import ResolveCache
+from utils.top_links import TopLinks
+from utils.url_record import now_micros
+from exceptions.url_exceptions import URLExpiredError, URLNotFoundError
+
+
+class TestExpiryReaper:
+    """过期链接清理测试"""
+    
+    @pytest.mark.asyncio
+    async def test_grace_period(self, url_service, url_storage):
+        """测试宽限期内的过期链接保留（访问返回410），超过宽限期后删除"""
+        reaper = ExpiryReaper(grace_period=3600)
+        
+        recent = await url_service.create_short_url(URLCreate(
+            original_url="https://www.example.com/recent",
+            expires_at=datetime.utcnow() - timedelta(minutes=1)
+        ))
+        old = await url_service.create_short_url(URLCreate(
+            original_url="https://www.example.com/old",
+            expires_at=datetime.utcnow() - timedelta(hours=2)
+        ))
+        
+        assert await reaper.reap(url_storage) == 1
+        
+        with pytest.raises(URLExpiredError):
+            await url_service.get_original_url(recent.id)
+        with pytest.raises(URLNotFoundError):
+            await url_service.get_original_url(old.id)
+    
+    @pytest.mark.asyncio
+    async def test_reap_in_batches(self, url_service, url_storage):
+        """测试分批清理全部过期链接"""
+        reaper = ExpiryReaper(batch_size=3)
+        
+        expires_at = datetime.utcnow() - timedelta(minutes=1)
+        await url_service.create_short_urls([
+            URLCreate(original_url=f"https://www.example.com/{i}", expires_at=expires_at)
+            for i in range(7)
+        ])
+        await url_service.create_short_url(URLCreate(original_url="https://www.example.com/live"))
+        
+        assert await reaper.reap(url_storage) == 7
+        assert len(await url_storage.get_all_urls()) == 1
+    
+    @pytest.mark.asyncio
+    async def test_background_task(self, url_service, url_storage):
+        """测试后台任务定期清理"""
+        reaper = ExpiryReaper()
+        await url_service.create_short_url(URLCreate(
+            original_url="https://www.example.com/expired",
+            expires_at=datetime.utcnow() - timedelta(minutes=1)
+        ))
+        
+        reaper.start(url_storage, interval=0.01)
+        await asyncio.sleep(0.05)
+        await reaper.stop()
+        
+        assert await url_storage.get_all_urls() == []
+    
+    @pytest.mark.asyncio
+    async def test_reaped_links_leave_caches(self, url_storage):
+        """测试清理后通过on_reaped丢弃解析缓存和热点统计中的链接，重定向不再命中缓存"""
+        service = URLService(
+            storage=url_storage,
+            resolve_cache=ResolveCache(max_size=100, ttl=3600),
+            top_links=TopLinks(capacity=10, window_minutes=5)
+        )
+        created = await service.create_short_url(URLCreate(
+            original_url="https://www.example.com/cached",
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        assert await service.get_original_url(created.id) == "https://www.example.com/cached"
+        
+        reaper = ExpiryReaper()
+        assert await reaper.reap(url_storage, now=now_micros() + 7_200_000_000, on_reaped=service.discard_links) == 1
+        
+        assert service.top_links.top(10) == []
+        with pytest.raises(URLNotFoundError):
+            await service.get_original_url(created.id)
@@ -0,0 +1,104 @@
+import json
+import pytest
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from models.url_models import URLResponse, URLCreate, URLUpdate
+from services.container import container
+from services.url_service import URLService
+from utils.fragment_cache import FragmentCache
+
+
+def make_url(**overrides) -> URLResponse:
+    data = {
+        "id": "abc123",
+        "original_url": 'https://例子.com/path?q="1"',
+        "short_url": "http://localhost:8000/abc123",
+        "click_count": 7,
+        "created_at": datetime(2024, 1, 2, 3, 4, 5, 678),
+    }
+    data.update(overrides)
+    return URLResponse(**data)
+
+
+def response_model_json(value) -> bytes:
+    """与response_model加JSONResponse的输出相同"""
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class TestFragmentCache:
+    """JSON片段缓存测试"""
+    
+    def test_render_matches_response_model(self):
+        """测试片段与常规序列化结果逐字节相同，点击次数变化时直接拼接"""
+        cache = FragmentCache()
+        url_data = make_url()
+        assert cache.render(url_data) == response_model_json(url_data)
+        
+        clicked = make_url(click_count=12345)
+        assert cache.render(clicked) == response_model_json(clicked)
+        assert (cache.hits, cache.misses) == (1, 1)
+        
+        urls = [make_url(id=f"id{i}", short_url=f"http://localhost:8000/id{i}") for i in range(3)]
+        assert cache.render_list(urls) == response_model_json(urls)
+        assert cache.render_list([]) == b"[]"
+    
+    def test_changed_fields_rerender(self):
+        """测试其他字段与缓存时不同时重新序列化，超出容量时淘汰"""
+        cache = FragmentCache(max_size=2)
+        cache.render(make_url())
+        updated = make_url(is_active=False, expires_at=datetime(2030, 1, 1))
+        assert cache.render(updated) == response_model_json(updated)
+        assert cache.misses == 2
+        
+        cache.render(make_url(id="other"))
+        cache.render(make_url(id="third"))
+        assert len(cache) == 2
+
+
+class TestFragmentCacheService:
+    """服务层片段缓存测试"""
+    
+    @pytest.mark.asyncio
+    async def test_update_and_delete_invalidate(self, url_storage):
+        """测试更新和删除时使缓存失效"""
+        service = URLService(storage=url_storage, fragment_cache=FragmentCache())
+        created = await service.create_short_url(URLCreate(original_url="https://www.example.com/a", custom_alias="fragalias"))
+        
+        assert json.loads(await service.get_url_info_json("fragalias"))["id"] == created.id
+        await service.update_url("fragalias", URLUpdate(original_url="https://www.example.com/b"))
+        assert len(service.fragment_cache) == 0
+        
+        content, next_cursor = await service.list_urls_json(10)
+        assert json.loads(content)[0]["original_url"] == "https://www.example.com/b"
+        assert next_cursor is None
+        
+        await service.delete_url(created.id)
+        assert len(service.fragment_cache) == 0
+
+
+class TestFragmentCacheAPI:
+    """列表和详情接口测试"""
+    
+    def test_same_body_with_and_without_cache(self, client, monkeypatch):
+        """测试启用缓存前后接口返回相同的内容和分页游标"""
+        for i in range(3):
+            client.post("/shorten", json={"original_url": f"https://www.example.com/fragment/{i}"})
+        short_id = client.get("/api/urls", params={"limit": 1}).json()[0]["id"]
+        client.get(f"/{short_id}", follow_redirects=False)
+        
+        def fetch():
+            page = client.get("/api/urls", params={"limit": 2})
+            info = client.get(f"/api/urls/{short_id}")
+            return page.content, page.headers.get("x-next-cursor"), info.content
+        
+        monkeypatch.setattr(container.service, "fragment_cache", FragmentCache())
+        cached = fetch()
+        assert fetch() == cached
+        assert container.service.fragment_cache.hits > 0
+        
+        monkeypatch.setattr(container.service, "fragment_cache", None)
+        assert fetch() == cached
+        assert cached[1] is not None
+        assert client.get("/api/urls/nonexistent").status_code == 404
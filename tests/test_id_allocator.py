@@ -0,0 +1,81 @@
+import pytest
+
+from utils.id_allocator import IDAllocator, IDPermutation, ID_SPACE, encode_base62, decode_base62
+
+
+class TestIDPermutation:
+    """短ID置换测试"""
+    
+    def test_base62_round_trip(self):
+        """测试定长base62编解码"""
+        for value in (0, 1, 61, 62, 123456789, ID_SPACE - 1):
+            encoded = encode_base62(value)
+            assert len(encoded) == 8
+            assert encoded.isalnum()
+            assert decode_base62(encoded) == value
+    
+    def test_permutation_is_reversible(self):
+        """测试置换可逆且结果落在ID空间内"""
+        permutation = IDPermutation("secret")
+        for value in list(range(1000)) + [ID_SPACE - 1]:
+            permuted = permutation.permute(value)
+            assert 0 <= permuted < ID_SPACE
+            assert permutation.inverse(permuted) == value
+    
+    def test_permutation_depends_on_secret(self):
+        """测试不同密钥产生不同的ID序列"""
+        first = [IDPermutation("a").permute(i) for i in range(10)]
+        second = [IDPermutation("b").permute(i) for i in range(10)]
+        assert first != second
+
+
+class TestIDAllocator:
+    """分块ID分配器测试"""
+    
+    @pytest.mark.asyncio
+    async def test_block_reservation(self):
+        """测试按块预留计数值"""
+        reservations = []
+        counter = 0
+        
+        async def reserve_block(size):
+            nonlocal counter
+            reservations.append(size)
+            start, counter = counter, counter + size
+            return start
+        
+        allocator = IDAllocator(reserve_block, block_size=10, secret="secret")
+        ids = [await allocator.next_id() for _ in range(25)]
+        ids += await allocator.next_ids(30)
+        
+        assert len(set(ids)) == 55
+        assert all(len(short_id) == 8 for short_id in ids)
+        assert reservations == [10, 10, 10, 25]
+    
+    @pytest.mark.asyncio
+    async def test_allocators_sharing_storage(self, url_storage):
+        """测试共享同一存储的多个分配器不会分配重复ID"""
+        first = IDAllocator(url_storage.reserve_id_block, block_size=7, secret="secret")
+        second = IDAllocator(url_storage.reserve_id_block, block_size=7, secret="secret")
+        
+        ids = []
+        for _ in range(20):
+            ids.append(await first.next_id())
+            ids.append(await second.next_id())
+        
+        assert len(set(ids)) == 40
+    
+    @pytest.mark.asyncio
+    async def test_generated_secret_shared_through_storage(self, url_storage):
+        """测试未配置密钥时随机生成并保存到存储，之后的分配器沿用同一置换"""
+        first = IDAllocator(url_storage.reserve_id_block, block_size=5, load_secret=url_storage.load_id_secret)
+        first_ids = await first.next_ids(5)
+        secret = await url_storage.load_id_secret("unused")
+        assert secret != "unused"
+        
+        second = IDAllocator(url_storage.reserve_id_block, block_size=5, load_secret=url_storage.load_id_secret)
+        second_ids = await second.next_ids(5)
+        permutation = IDPermutation(secret)
+        assert [decode_base62(short_id) for short_id in first_ids + second_ids] == [
+            permutation.permute(counter) for counter in range(10)
+        ]
@@ -0,0 +1,114 @@
+import pytest
+from datetime import datetime
+
+from models.url_models import URLResponse
+from utils.metrics import MetricsRegistry
+from utils.instrumented_storage import InstrumentedStorage
+from utils.metrics import storage_operation_duration_seconds, storage_operation_errors_total
+from exceptions.url_exceptions import URLNotFoundError
+
+
+class BrokenStorage:
+    """get_url总是抛出连接异常、resolve_url总是返回未找到的存储"""
+    
+    async def get_url(self, url_id):
+        raise ConnectionError("storage unavailable")
+    
+    async def resolve_url(self, url_id):
+        raise URLNotFoundError(url_id)
+    
+    async def close(self):
+        pass
+
+
+class TestMetricsRegistry:
+    """指标注册表测试"""
+    
+    def test_counter_and_gauge(self):
+        """测试计数器和瞬时值输出"""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "请求数", ("route",))
+        requests.labels("/a").inc()
+        requests.labels("/a").inc(2)
+        requests.labels('/"b"').inc()
+        in_flight = registry.gauge("in_flight", "处理中").labels()
+        in_flight.inc()
+        in_flight.inc()
+        in_flight.dec()
+        
+        lines = registry.render().splitlines()
+        assert "# TYPE requests_total counter" in lines
+        assert 'requests_total{route="/a"} 3' in lines
+        assert 'requests_total{route="/\\"b\\""} 1' in lines
+        assert "in_flight 1" in lines
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """测试直方图各桶累计计数、总和与总数"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "延迟", ("route",), buckets=(0.1, 1.0))
+        child = histogram.labels("/a")
+        for value in (0.05, 0.1, 0.5, 3.0):
+            child.observe(value)
+        
+        lines = registry.render().splitlines()
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+        assert 'latency_seconds_sum{route="/a"} 3.65' in lines
+        assert 'latency_seconds_count{route="/a"} 4' in lines
+        assert child.count == 4
+    
+    def test_callback_metric(self):
+        """测试抓取时计算的指标，回调返回None时不输出"""
+        registry = MetricsRegistry()
+        values = {"ratio": 0.5}
+        registry.callback("hit_ratio", "命中率", lambda: values["ratio"])
+        assert "hit_ratio 0.5" in registry.render().splitlines()
+        
+        values["ratio"] = None
+        assert "hit_ratio" not in registry.render()
+    
+    def test_duplicate_name(self):
+        """测试重复注册同名指标"""
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "请求数")
+        with pytest.raises(ValueError):
+            registry.gauge("requests_total", "请求数")
+
+
+class TestInstrumentedStorage:
+    """带指标的存储包装测试"""
+    
+    @pytest.mark.asyncio
+    async def test_records_duration(self, url_storage):
+        """测试委托到实际后端并记录耗时"""
+        storage = InstrumentedStorage(url_storage)
+        durations = storage_operation_duration_seconds.labels("get_url")
+        before = durations.count
+        
+        created = await storage.create_url({
+            "original_url": "https://www.example.com",
+            "short_url": "http://localhost:8000/abc123",
+            "id": "abc123",
+            "created_at": datetime.utcnow(),
+        })
+        assert isinstance(created, URLResponse)
+        assert (await storage.get_url("abc123")).original_url == "https://www.example.com"
+        assert durations.count == before + 1
+        assert [url.id async for url in storage.iter_urls()] == ["abc123"]
+    
+    @pytest.mark.asyncio
+    async def test_errors(self):
+        """测试只把后端异常计为错误，未找到等业务结果不计"""
+        storage = InstrumentedStorage(BrokenStorage())
+        get_errors = storage_operation_errors_total.labels("get_url")
+        resolve_errors = storage_operation_errors_total.labels("resolve_url")
+        before_get, before_resolve = get_errors.value, resolve_errors.value
+        
+        with pytest.raises(ConnectionError):
+            await storage.get_url("abc123")
+        with pytest.raises(URLNotFoundError):
+            await storage.resolve_url("abc123")
+        
+        assert get_errors.value == before_get + 1
+        assert resolve_errors.value == before_resolve
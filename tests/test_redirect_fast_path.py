@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from middleware.redirect import FastRedirectMiddleware
+from utils.metrics import http_requests_total
+
+
+@pytest.fixture
+def fast_client():
+    """重定向走快速路径的测试客户端"""
+    return TestClient(FastRedirectMiddleware(app))
+
+
+class TestFastRedirect:
+    """重定向快速路径测试"""
+    
+    def test_redirect(self, fast_client):
+        """测试302响应、点击计数和指标与经过路由时一致"""
+        created = fast_client.post("/shorten", json={"original_url": "https://www.example.com/页面?q=1"}).json()
+        counter = http_requests_total.labels("GET", "/{short_id}", "302")
+        before = counter.value
+        
+        response = fast_client.get(f"/{created['id']}", follow_redirects=False)
+        assert response.status_code == 302
+        assert response.headers["location"] == "https://www.example.com/%E9%A1%B5%E9%9D%A2?q=1"
+        assert response.content == b""
+        assert counter.value == before + 1
+        
+        routed = TestClient(app).get(f"/{created['id']}", follow_redirects=False)
+        assert routed.headers["location"] == response.headers["location"]
+        assert fast_client.get(f"/api/urls/{created['id']}/stats").json()["click_count"] == 2
+    
+    def test_not_found(self, fast_client):
+        """测试错误响应与全局异常处理器格式相同"""
+        response = fast_client.get("/nonexistent", follow_redirects=False)
+        assert response.status_code == 404
+        assert response.json() == TestClient(app).get("/nonexistent").json()
+    
+    def test_falls_through(self, fast_client):
+        """测试应用自身的路径、跨域请求和非GET请求交给应用处理"""
+        assert fast_client.get("/").status_code == 200
+        assert fast_client.get("/docs").status_code == 200
+        assert fast_client.head("/nonexistent").status_code == 405
+        
+        created = fast_client.post("/shorten", json={"original_url": "https://www.example.com/cors"}).json()
+        response = fast_client.get(
+            f"/{created['id']}",
+            headers={"Origin": "http://localhost:3000"},
+            follow_redirects=False
+        )
+        assert response.status_code == 302
+        assert "access-control-allow-origin" in response.headers
@@ -0,0 +1,145 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+
+from models.url_models import URLCreate, URLResponse, URLUpdate
+from services.url_service import URLService
+from routers.url_router import get_url_service
+from main import app
+from utils.resolve_cache import ResolveCache
+from exceptions.url_exceptions import URLExpiredError, URLInactiveError, URLNotFoundError
+
+
+def make_response(url_id: str) -> URLResponse:
+    return URLResponse(
+        id=url_id,
+        original_url=f"https://www.example.com/{url_id}",
+        short_url=f"http://localhost:8000/{url_id}",
+        created_at=datetime.utcnow()
+    )
+
+
+@pytest.fixture
+def cached_service(url_storage):
+    """启用解析缓存的URL服务"""
+    return URLService(storage=url_storage, resolve_cache=ResolveCache(max_size=100, ttl=60))
+
+
+class TestResolveCache:
+    """热点链接解析缓存测试"""
+    
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = ResolveCache(max_size=2)
+        cache.put("a", make_response("a"))
+        cache.put("b", make_response("b"))
+        assert cache.get("a") is not None
+        cache.put("c", make_response("c"))
+        
+        assert cache.get("b") is None
+        assert cache.get("a").original_url == "https://www.example.com/a"
+        assert cache.stats() == {"size": 2, "max_size": 2, "hits": 2, "misses": 1, "evictions": 1}
+    
+    def test_ttl(self):
+        """测试条目超过TTL后失效"""
+        cache = ResolveCache(ttl=0)
+        cache.put("a", make_response("a"))
+        
+        assert cache.get("a") is None
+        assert len(cache) == 0
+    
+    @pytest.mark.asyncio
+    async def test_hits_and_click_count(self, cached_service):
+        """测试命中后不再读取存储，点击照常计数"""
+        created_url = await cached_service.create_short_url(URLCreate(original_url="https://www.example.com/hot"))
+        
+        for _ in range(3):
+            assert await cached_service.get_original_url(created_url.id) == "https://www.example.com/hot"
+        
+        assert cached_service.resolve_cache.misses == 1
+        assert cached_service.resolve_cache.hits == 2
+        assert (await cached_service.get_url_stats(created_url.id)).click_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_invalidate_on_update_and_delete(self, cached_service):
+        """测试更新和删除使缓存条目失效"""
+        created_url = await cached_service.create_short_url(URLCreate(
+            original_url="https://www.example.com/old",
+            custom_alias="cached"
+        ))
+        await cached_service.get_original_url("cached")
+        
+        await cached_service.update_url("cached", URLUpdate(original_url="https://www.example.com/new"))
+        assert await cached_service.get_original_url("cached") == "https://www.example.com/new"
+        
+        await cached_service.update_url("cached", URLUpdate(is_active=False))
+        with pytest.raises(URLInactiveError):
+            await cached_service.get_original_url("cached")
+        
+        await cached_service.delete_url(created_url.id)
+        with pytest.raises(URLNotFoundError):
+            await cached_service.get_original_url("cached")
+    
+    @pytest.mark.asyncio
+    async def test_refill_during_update_is_invalidated(self, cached_service, monkeypatch):
+        """测试写入期间并发重定向用旧记录填充的缓存条目在写入完成后失效"""
+        await cached_service.create_short_url(URLCreate(
+            original_url="https://www.example.com/before",
+            custom_alias="racing"
+        ))
+        storage_update = cached_service.storage.update_url
+        
+        async def update_with_concurrent_redirect(short_id, update_dict):
+            assert await cached_service.get_original_url("racing") == "https://www.example.com/before"
+            return await storage_update(short_id, update_dict)
+        
+        monkeypatch.setattr(cached_service.storage, "update_url", update_with_concurrent_redirect)
+        await cached_service.update_url("racing", URLUpdate(original_url="https://www.example.com/after"))
+        assert await cached_service.get_original_url("racing") == "https://www.example.com/after"
+    
+    @pytest.mark.asyncio
+    async def test_invalidate_on_domain_operations(self, cached_service):
+        """测试按域名批量停用和删除使以ID和别名为键的缓存条目失效"""
+        created_url = await cached_service.create_short_url(URLCreate(
+            original_url="https://abuse.example.com/x",
+            custom_alias="abusive"
+        ))
+        await cached_service.get_original_url("abusive")
+        await cached_service.get_original_url(created_url.id)
+        
+        assert (await cached_service.set_domain_active("abuse.example.com", False)).affected == 1
+        assert len(cached_service.resolve_cache) == 0
+        with pytest.raises(URLInactiveError):
+            await cached_service.get_original_url("abusive")
+        
+        assert (await cached_service.delete_domain("Abuse.Example.com:443")).affected == 1
+        with pytest.raises(URLNotFoundError):
+            await cached_service.get_original_url("abusive")
+    
+    @pytest.mark.asyncio
+    async def test_expiry_checked_locally(self, cached_service):
+        """测试缓存条目按过期时间在本地校验"""
+        created_url = await cached_service.create_short_url(URLCreate(
+            original_url="https://www.example.com/soon",
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        await cached_service.get_original_url(created_url.id)
+        cached_service.resolve_cache.get(created_url.id).expires_at = 0
+        
+        with pytest.raises(URLExpiredError):
+            await cached_service.get_original_url(created_url.id)
+    
+    @pytest.mark.asyncio
+    async def test_health_reports_service_cache(self, cached_service):
+        """测试健康检查报告注入的服务实例所用的缓存"""
+        created = await cached_service.create_short_url(URLCreate(original_url="https://www.example.com"))
+        await cached_service.get_original_url(created.id)
+        await cached_service.get_original_url(created.id)
+        
+        app.dependency_overrides[get_url_service] = lambda: cached_service
+        try:
+            health = TestClient(app).get("/api/health").json()
+        finally:
+            del app.dependency_overrides[get_url_service]
+        assert health["resolve_cache"] == cached_service.resolve_cache.stats()
+        assert health["resolve_cache"]["hits"] == 1
@@ -0,0 +1,210 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+
+from utils.storage import URLStorage
+from utils.durable_storage import DurableURLStorage
+from utils.url_record import URLRecord
+from utils.search_index import SearchIndex, fold
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover
+    fakeredis = None
+
+
+def make_url_data(url_id: str, original_url: str, offset: int, alias: str = None) -> dict:
+    return {
+        "id": url_id,
+        "original_url": original_url,
+        "short_url": f"http://localhost:8000/{url_id}",
+        "created_at": (datetime(2024, 1, 1) + timedelta(seconds=offset)).isoformat(),
+        "custom_alias": alias
+    }
+
+
+class TestSearchIndex:
+    """原始URL和别名搜索索引测试"""
+    
+    def test_fold_only_ascii(self):
+        """测试大小写折叠只转换ASCII字母"""
+        assert fold("HTTPS://Example.COM") == "https://example.com"
+        assert fold("https://É.com/ÄB") == "https://É.com/Äb"
+    
+    def test_prefix_and_candidates(self):
+        """测试前缀查询、三元组候选和移除"""
+        index = SearchIndex()
+        index.add("a", "https://Docs.example.com/guide", "Manual")
+        index.add("b", "https://shop.example.com/guide")
+        index.add("c", "https://docs.example.org")
+        
+        assert [url_id for _, url_id in index.prefix("https://docs.")] == ["a", "c"]
+        assert list(index.prefix("man")) == [("manual", "a")]
+        assert list(index.prefix("https://", ("https://docs.example.com/guide", "a"))) == [
+            ("https://docs.example.org", "c"),
+            ("https://shop.example.com/guide", "b"),
+        ]
+        assert sorted(index.candidates("guide")) == ["a", "b"]
+        assert index.candidates("gu") is None
+        assert index.candidates("missing") == []
+        
+        index.remove("a", "https://Docs.example.com/guide", "Manual")
+        assert len(index) == 2
+        assert list(index.prefix("man")) == []
+        assert index.candidates("guide") == ["b"]
+        assert index.candidates("manual") == []
+    
+    def test_candidates_intersect_postings(self):
+        """测试候选为各三元组倒排表的交集，而不只是最短的倒排表"""
+        index = SearchIndex()
+        index.add("full", "https://example.com/guide")
+        index.add("split", "https://gui.example.com/ide")
+        for i in range(100):
+            index.add(f"other{i}", f"https://example.com/uid{i}")
+        
+        assert index.candidates("guide") == ["full"]
+        assert len(index.candidates("example.com/")) == 102
+    
+    def test_merge_reserved_index(self):
+        """测试预留文档号另建的索引并入后，与预留之后新加入的文档一起保持倒排表有序"""
+        index = SearchIndex()
+        index.add("a", "https://docs.example.com/guide")
+        other = SearchIndex(index.reserve(2))
+        index.add("b", "https://docs.example.com/guide/late")
+        other.add("c", "https://docs.example.com/guide/imported", "Import")
+        other.add("d", "https://shop.example.net")
+        index.merge(other)
+        
+        assert len(index) == 4
+        assert sorted(index.candidates("guide")) == ["a", "b", "c"]
+        assert all(list(posting) == sorted(posting) for posting in index._postings.values())
+        assert sorted(url_id for _, url_id in index.prefix("https://docs.")) == ["a", "b", "c"]
+        assert list(index.prefix("imp")) == [("import", "c")]
+        index.remove_many([
+            ("c", "https://docs.example.com/guide/imported", "Import"),
+            ("d", "https://shop.example.net", None),
+        ])
+        assert sorted(index.candidates("guide")) == ["a", "b"]
+        assert index.candidates("shop") == []
+        assert list(index.prefix("imp")) == []
+    
+    def test_remove_many_bulk_posting(self):
+        """测试删除项较多的倒排表过滤重建后与逐条移除结果一致"""
+        bulk, single = SearchIndex(), SearchIndex()
+        urls = {f"id{i}": f"https://example.com/{'guide' if i % 2 else 'shop'}/{i}" for i in range(300)}
+        for index in (bulk, single):
+            for url_id, url in urls.items():
+                index.add(url_id, url)
+        removed = [url_id for i, url_id in enumerate(urls) if i % 3 == 0]
+        bulk.remove_many((url_id, urls[url_id], None) for url_id in removed)
+        for url_id in removed:
+            single.remove(url_id, urls[url_id])
+        
+        assert len(bulk) == len(single) == 200
+        assert bulk._postings == single._postings
+        assert list(bulk.prefix("https://")) == list(single.prefix("https://"))
+    
+    @pytest.mark.asyncio
+    async def test_indexed_matches_scan(self):
+        """测试启用索引的存储与逐条扫描在随机增删改后结果一致"""
+        rng = random.Random(7)
+        words = ["alpha", "Beta", "gamma", "delta", "ab", "ga"]
+        indexed, scanned = URLStorage(search_index=True), URLStorage()
+        live = []
+        for i in range(300):
+            action = rng.random()
+            if live and action < 0.15:
+                url_id = live.pop(rng.randrange(len(live)))
+                for storage in (indexed, scanned):
+                    await storage.delete_url(url_id)
+            elif live and action < 0.3:
+                update = {"original_url": f"https://{rng.choice(words)}.example/{rng.choice(words)}"}
+                url_id = rng.choice(live)
+                for storage in (indexed, scanned):
+                    await storage.update_url(url_id, update)
+            else:
+                url_id = f"s{i}"
+                data = make_url_data(
+                    url_id,
+                    f"https://{rng.choice(words)}.example/{rng.choice(words)}{i}",
+                    i,
+                    f"{rng.choice(words)}-{i}" if rng.random() < 0.3 else None,
+                )
+                for storage in (indexed, scanned):
+                    await storage.create_url(dict(data))
+                live.append(url_id)
+        
+        assert (await scanned.search_urls("ga", "substring", 1000))[0]
+        for query in ["https://al", "BETA", "ga", "a", "mma.ex", "delta-", "/ab", "zzz"]:
+            for mode in ("prefix", "substring"):
+                expected = await scanned.search_urls(query, mode, 1000)
+                assert await indexed.search_urls(query, mode, 1000) == expected
+        
+        # 前缀查询从游标位置分页，结果与扫描一致
+        for query in ["https://", "a", "ga"]:
+            pages = {}
+            for storage in (indexed, scanned):
+                found, cursor = [], None
+                while True:
+                    page, cursor = await storage.search_urls(query, "prefix", 7, cursor)
+                    found.extend(url.id for url in page)
+                    if cursor is None:
+                        break
+                pages[storage is indexed] = found
+            assert pages[True] == pages[False]
+            assert len(set(pages[True])) == len(pages[True])
+    
+    @pytest.mark.asyncio
+    async def test_redis_index_opt_in(self):
+        """测试Redis后端未启用索引时不写搜索有序集合，扫描结果与使用索引时一致"""
+        if fakeredis is None:
+            pytest.skip("需要fakeredis")
+        from utils.redis_storage import RedisURLStorage
+        
+        server = fakeredis.FakeServer()
+        backends = {}
+        for enabled in (True, False):
+            client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+            backends[enabled] = RedisURLStorage(client=client, prefix=f"{enabled}:", search_index=enabled)
+        for storage in backends.values():
+            for i in range(20):
+                alias = f"Docs-{i}" if i % 3 == 0 else None
+                await storage.create_url(make_url_data(f"r{i}", f"https://docs.example.com/p{i % 7}", i, alias))
+            await storage.update_url("r1", {"original_url": "https://shop.example.com/docs"})
+            await storage.delete_url("r2")
+        
+        assert await backends[True]._redis.zcard(backends[True]._search_key) > 0
+        assert not await backends[False]._redis.exists(backends[False]._search_key)
+        for query, mode in [("https://docs.", "prefix"), ("docs", "prefix"), ("docs", "substring"), ("p3", "substring")]:
+            pages = {}
+            for enabled, storage in backends.items():
+                found, cursor = [], None
+                while True:
+                    page, cursor = await storage.search_urls(query, mode, 4, cursor)
+                    found.extend(url.id for url in page)
+                    if cursor is None:
+                        break
+                pages[enabled] = found
+            assert pages[True] == pages[False]
+            assert pages[False]
+    
+    @pytest.mark.asyncio
+    async def test_index_rebuilt_after_import_and_recovery(self, tmp_path):
+        """测试批量导入和持久化存储恢复后索引完整"""
+        storage = URLStorage(search_index=True)
+        await storage.create_url(make_url_data("old", "https://replaced.example", 0))
+        await storage.import_records([
+            URLRecord("old", "https://new.example/x", "http://localhost:8000", 1),
+            URLRecord("imp", "https://new.example/y", "http://localhost:8000", 2, custom_alias="Imported"),
+        ])
+        assert (await storage.search_urls("replaced", "substring", 10)) == ([], None)
+        assert [url.id for url in (await storage.search_urls("new.ex", "substring", 10))[0]] == ["old", "imp"]
+        assert [url.id for url in (await storage.search_urls("imp", "prefix", 10))[0]] == ["imp"]
+        
+        durable = DurableURLStorage(str(tmp_path), fsync_delay=0, search_index=True)
+        await durable.create_url(make_url_data("kept", "https://durable.example/page", 0, "keep"))
+        await durable.close()
+        restored = DurableURLStorage(str(tmp_path), fsync_delay=0, search_index=True)
+        assert [url.id for url in (await restored.search_urls("able.exa", "substring", 10))[0]] == ["kept"]
+        assert [url.id for url in (await restored.search_urls("KEEP", "prefix", 10))[0]] == ["kept"]
+        await restored.close()
@@ -1,14 +1,17 @@
+import asyncio
 import pytest
 from datetime import datetime, timedelta
 
 from models.url_models import URLCreate, URLUpdate
 from services.url_service import URLService
+from utils.id_allocator import IDAllocator, IDPermutation, encode_base62
 from exceptions.url_exceptions import (
     URLNotFoundError,
     URLExpiredError,
     InvalidURLError,
     DuplicateAliasError,
-    URLInactiveError
+    URLInactiveError,
+    InvalidTimeRangeError
 )
 
 
@@ -148,6 +151,28 @@ class TestURLService:
         assert stats.id == created_url.id
         assert stats.click_count == 2
         assert stats.last_accessed is not None
+        assert stats.series is None
+    
+    @pytest.mark.asyncio
+    async def test_get_url_stats_series(self, url_service):
+        """测试按粒度返回点击时间序列，默认覆盖该粒度保留的全部时间段"""
+        created_url = await url_service.create_short_url(URLCreate(original_url="https://www.example.com"))
+        await url_service.get_original_url(created_url.id)
+        await url_service.get_original_url(created_url.id)
+        
+        stats = await url_service.get_url_stats(created_url.id, "hour")
+        assert stats.granularity == "hour"
+        assert len(stats.series) == 48
+        assert sum(point.clicks for point in stats.series) == 2
+        assert stats.series[1].timestamp - stats.series[0].timestamp == timedelta(hours=1)
+        
+        end = datetime.utcnow() - timedelta(days=2)
+        stats = await url_service.get_url_stats(created_url.id, "day", end - timedelta(days=3), end)
+        assert len(stats.series) == 4
+        assert sum(point.clicks for point in stats.series) == 0
+        
+        with pytest.raises(InvalidTimeRangeError):
+            await url_service.get_url_stats(created_url.id, "minute", datetime.utcnow(), end)
     
     @pytest.mark.asyncio
     async def test_update_url_success(self, url_service):
@@ -229,4 +254,156 @@ class TestURLService:
         info_after = await url_service.get_url_info(created_url.id)
         
         assert info_after.click_count == initial_count
-        assert info_after.id == created_url.id 
\ No newline at end of file
+        assert info_after.id == created_url.id
+    
+    @pytest.mark.asyncio
+    async def test_create_short_urls_batch(self, url_service):
+        """测试批量创建短链接，部分失败不影响其他项"""
+        await url_service.create_short_url(URLCreate(
+            original_url="https://www.example.com/existing",
+            custom_alias="taken"
+        ))
+        items = [
+            URLCreate(original_url="https://www.example.com/a"),
+            URLCreate(original_url="https://www.example.com/b", custom_alias="batch-b"),
+            URLCreate(original_url="https://www.example.com/c", custom_alias="taken"),
+            URLCreate(original_url="https://www.example.com/d", custom_alias="batch-b"),
+            URLCreate(original_url="https://www.example.com/e", custom_alias="bad alias"),
+            URLCreate(original_url="https://www.example.com/f"),
+        ]
+        
+        result = await url_service.create_short_urls(items)
+        
+        assert result.total == 6
+        assert result.succeeded == 3
+        assert result.failed == 3
+        assert [item.index for item in result.results] == list(range(6))
+        assert [item.status_code for item in result.results] == [200, 200, 409, 409, 400, 200]
+        assert result.results[1].data.id == "batch-b"
+        assert result.results[2].error is not None
+        
+        generated = [result.results[0].data.id, result.results[5].data.id]
+        assert all(len(short_id) == 8 for short_id in generated)
+        assert generated[0] != generated[1]
+        assert await url_service.get_original_url(generated[1]) == "https://www.example.com/f"
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicate_alias(self, url_service):
+        """测试大量并发请求创建同一别名时恰好一个成功，其余报告冲突，链接不被覆盖"""
+        async def attempt(i):
+            try:
+                return await url_service.create_short_url(URLCreate(
+                    original_url=f"https://www.example.com/race/{i}",
+                    custom_alias="race"
+                ))
+            except DuplicateAliasError:
+                return None
+        
+        results = await asyncio.gather(*(attempt(i) for i in range(200)))
+        winners = [result for result in results if result is not None]
+        assert len(winners) == 1
+        assert await url_service.get_original_url("race") == winners[0].original_url
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_batches_with_same_aliases(self, url_service):
+        """测试并发批量创建相同的一组别名时每个别名只成功一次"""
+        batches = [
+            [URLCreate(original_url=f"https://www.example.com/{i}/{j}", custom_alias=f"batch-race-{j}") for j in range(10)]
+            for i in range(20)
+        ]
+        responses = await asyncio.gather(*(url_service.create_short_urls(items) for items in batches))
+        
+        assert sum(response.succeeded for response in responses) == 10
+        for j in range(10):
+            winners = [response.results[j].data for response in responses if response.results[j].success]
+            assert len(winners) == 1
+            assert await url_service.get_original_url(f"batch-race-{j}") == winners[0].original_url
+        assert {result.status_code for response in responses for result in response.results if not result.success} == {409}
+    
+    @pytest.mark.asyncio
+    async def test_generated_id_skips_existing_alias(self, url_storage):
+        """测试生成ID与已有自定义别名相同时换用新ID，别名链接不被覆盖"""
+        service = URLService(
+            storage=url_storage,
+            id_allocator=IDAllocator(url_storage.reserve_id_block, block_size=10, secret="secret")
+        )
+        permutation = IDPermutation("secret")
+        taken = [encode_base62(permutation.permute(counter)) for counter in (0, 3)]
+        for alias in taken:
+            await url_storage.create_url({
+                "id": alias,
+                "original_url": f"https://alias.example/{alias}",
+                "short_url": f"http://localhost:8000/{alias}",
+                "created_at": datetime.utcnow().isoformat(),
+                "custom_alias": alias
+            })
+        
+        single = await service.create_short_url(URLCreate(original_url="https://www.example.com/single"))
+        batch = await service.create_short_urls([
+            URLCreate(original_url=f"https://www.example.com/batch{i}") for i in range(2)
+        ])
+        
+        assert single.id == encode_base62(permutation.permute(1))
+        assert [result.data.id for result in batch.results] == [
+            encode_base62(permutation.permute(counter)) for counter in (2, 4)
+        ]
+        for alias in taken:
+            assert await service.get_original_url(alias) == f"https://alias.example/{alias}"
+        assert len(await url_storage.get_all_urls()) == 5
+
+
+    @pytest.mark.asyncio
+    async def test_create_short_url_dedup(self, url_storage):
+        """测试去重模式：规范化URL相同时返回已有链接"""
+        service = URLService(storage=url_storage, dedup_enabled=True)
+        first = await service.create_short_url(URLCreate(original_url="https://www.example.com/a?x=1&y=2"))
+        
+        same = await service.create_short_url(
+            URLCreate(original_url="https://WWW.EXAMPLE.COM:443/a?y=2&x=1&utm_source=feed")
+        )
+        assert same.id == first.id
+        assert same.original_url == first.original_url
+        
+        # 带别名或过期时间的请求、不同的目标各自创建新链接
+        aliased = await service.create_short_url(
+            URLCreate(original_url="https://www.example.com/a?x=1&y=2", custom_alias="dedup-alias")
+        )
+        expiring = await service.create_short_url(URLCreate(
+            original_url="https://www.example.com/a?x=1&y=2",
+            expires_at=datetime.utcnow() + timedelta(days=1)
+        ))
+        other = await service.create_short_url(URLCreate(original_url="https://www.example.com/a?x=2&y=2"))
+        assert len({first.id, aliased.id, expiring.id, other.id}) == 4
+        
+        # 已有链接停用后不再复用，新链接接管索引
+        await service.update_url(first.id, URLUpdate(is_active=False))
+        replacement = await service.create_short_url(URLCreate(original_url="https://www.example.com/a?x=1&y=2"))
+        assert replacement.id != first.id
+        again = await service.create_short_url(URLCreate(original_url="https://www.example.com/a?y=2&x=1"))
+        assert again.id == replacement.id
+        
+        # 未开启去重时每次都创建新链接
+        plain = await URLService(storage=url_storage, dedup_enabled=False).create_short_url(
+            URLCreate(original_url="https://www.example.com/a?x=1&y=2")
+        )
+        assert plain.id != replacement.id
+    
+    @pytest.mark.asyncio
+    async def test_create_short_urls_batch_dedup(self, url_storage):
+        """测试批量创建的去重：复用已有链接，批内重复项只创建一次"""
+        service = URLService(storage=url_storage, dedup_enabled=True)
+        existing = await service.create_short_url(URLCreate(original_url="https://www.example.com/existing"))
+        items = [
+            URLCreate(original_url="https://www.example.com/existing?utm_medium=email"),
+            URLCreate(original_url="https://www.example.com/new?b=1&a=1"),
+            URLCreate(original_url="https://www.example.com/new?a=1&b=1"),
+            URLCreate(original_url="https://www.example.com/new?a=1&b=1", custom_alias="new-alias"),
+        ]
+        
+        result = await service.create_short_urls(items)
+        
+        assert result.succeeded == 4
+        assert result.results[0].data.id == existing.id
+        assert result.results[1].data.id == result.results[2].data.id
+        assert result.results[3].data.id == "new-alias"
+        assert len(await url_storage.get_all_urls()) == 3
\ No newline at end of file
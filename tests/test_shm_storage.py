@@ -0,0 +1,208 @@
+import os
+import subprocess
+import sys
+import pytest
+
+from utils.shm_storage import SharedMemoryURLStorage, HEADER_SIZE, SLOT_SIZE, STATS_BLOCK_SIZE, _H_HEAP_USED
+from exceptions.url_exceptions import StorageFullError
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程脚本：打开同一张表，创建一条链接并对指定链接计数
+WORKER_SCRIPT = """
+import asyncio, sys
+from utils.shm_storage import SharedMemoryURLStorage
+
+async def main(path, worker, clicks):
+    storage = SharedMemoryURLStorage(path)
+    await storage.create_url({
+        "id": f"worker{worker}",
+        "original_url": f"https://www.example.com/worker{worker}",
+        "base_url": "http://localhost:8000",
+    })
+    for _ in range(clicks):
+        await storage.resolve_and_count("shared")
+    await storage.close()
+
+asyncio.run(main(sys.argv[1], sys.argv[2], int(sys.argv[3])))
+"""
+
+# 子进程脚本：打开同一张表，按条件创建一组所有进程争用的别名，输出成功的个数
+RACE_SCRIPT = """
+import asyncio, sys
+from utils.shm_storage import SharedMemoryURLStorage
+
+async def main(path, worker):
+    storage = SharedMemoryURLStorage(path)
+    won = 0
+    for i in range(200):
+        created = await storage.create_url_if_absent({
+            "id": f"race{i}",
+            "custom_alias": f"race{i}",
+            "original_url": f"https://www.example.com/{worker}/{i}",
+            "base_url": "http://localhost:8000",
+        })
+        won += created is not None
+    await storage.close()
+    print(won)
+
+asyncio.run(main(sys.argv[1], sys.argv[2]))
+"""
+
+
+class TestSharedMemoryURLStorage:
+    """共享内存存储测试"""
+    
+    @pytest.mark.asyncio
+    async def test_shared_between_processes(self, tmp_path, make_url_data):
+        """测试多个进程读写同一张表，点击计数不丢失"""
+        path = str(tmp_path / "links.tbl")
+        storage = SharedMemoryURLStorage(path, capacity=1024, heap_size=1 << 16)
+        await storage.create_url(make_url_data("shared"))
+        
+        workers = [
+            subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, path, str(i), "300"], cwd=PROJECT_ROOT)
+            for i in range(3)
+        ]
+        assert [worker.wait(timeout=60) for worker in workers] == [0, 0, 0]
+        
+        assert (await storage.get_url("shared")).click_count == 900
+        for i in range(3):
+            assert await storage.resolve_url(f"worker{i}") == f"https://www.example.com/worker{i}"
+        await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_create_if_absent_between_processes(self, tmp_path):
+        """测试多个进程并发按条件创建同一组别名，每个别名恰好一个进程成功"""
+        path = str(tmp_path / "links.tbl")
+        storage = SharedMemoryURLStorage(path, capacity=1024, heap_size=1 << 16)
+        
+        workers = [
+            subprocess.Popen(
+                [sys.executable, "-c", RACE_SCRIPT, path, str(i)], cwd=PROJECT_ROOT, stdout=subprocess.PIPE, text=True
+            )
+            for i in range(4)
+        ]
+        won = [int(worker.communicate(timeout=60)[0]) for worker in workers]
+        assert [worker.returncode for worker in workers] == [0, 0, 0, 0]
+        
+        assert sum(won) == 200
+        assert len((await storage.list_urls(1000))[0]) == 200
+        await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_reopen_keeps_layout(self, tmp_path, make_url_data):
+        """测试重新打开时沿用文件头中的大小和已有数据"""
+        path = str(tmp_path / "links.tbl")
+        storage = SharedMemoryURLStorage(path, capacity=1024, heap_size=1 << 16)
+        await storage.create_url(make_url_data("keep", custom_alias="kept"))
+        assert await storage.reserve_id_block(10) == 0
+        await storage.close()
+        
+        reopened = SharedMemoryURLStorage(path, capacity=64)
+        
+        assert os.path.getsize(path) == HEADER_SIZE + 1024 * (SLOT_SIZE + STATS_BLOCK_SIZE) + (1 << 16)
+        assert await reopened.resolve_url("kept") == "https://www.example.com/keep"
+        assert await reopened.reserve_id_block(10) == 10
+        await reopened.close()
+    
+    @pytest.mark.asyncio
+    async def test_table_full(self, tmp_path, make_url_data):
+        """测试超过装载上限后拒绝写入，删除后墓碑槽位可复用"""
+        storage = SharedMemoryURLStorage(str(tmp_path / "links.tbl"), capacity=8, heap_size=1 << 12)
+        for i in range(6):
+            await storage.create_url(make_url_data(f"id{i}"))
+        
+        with pytest.raises(StorageFullError):
+            await storage.create_url(make_url_data("overflow"))
+        
+        await storage.delete_url("id3")
+        await storage.create_url(make_url_data("id3"))
+        assert len(await storage.get_all_urls()) == 6
+        await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_torn_slot_is_repaired(self, tmp_path, make_url_data):
+        """测试写者中途崩溃（序列号停在奇数）后读者仍能读取"""
+        storage = SharedMemoryURLStorage(str(tmp_path / "links.tbl"), capacity=16, heap_size=1 << 12)
+        await storage.create_url(make_url_data("torn"))
+        index, _ = storage._find(b"torn")
+        offset = HEADER_SIZE + index * SLOT_SIZE
+        storage._mm[offset] |= 1
+        
+        assert await storage.resolve_url("torn") == "https://www.example.com/torn"
+        assert storage._mm[offset] & 1 == 0
+        await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_heap_space_reused(self, tmp_path, make_url_data):
+        """测试删除和改写原始URL释放的字符串块被复用，反复增删改不会写满字符串区"""
+        storage = SharedMemoryURLStorage(str(tmp_path / "links.tbl"), capacity=16, heap_size=1 << 12)
+        for i in range(200):
+            await storage.create_url(make_url_data("cycle", original_url=f"https://www.example.com/cycle/{i}"))
+            await storage.update_url("cycle", {"original_url": f"https://www.example.com/updated/{i}"})
+            assert await storage.resolve_url("cycle") == f"https://www.example.com/updated/{i}"
+            await storage.delete_url("cycle")
+        
+        assert await storage.get_url("cycle") is None
+        assert storage._get_header(_H_HEAP_USED) < 1 << 10
+        await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_scan_rereads_torn_slot(self, tmp_path, make_url_data):
+        """测试扫描遇到写入中途的槽位时按seqlock重读，而不是使用不一致的内容"""
+        storage = SharedMemoryURLStorage(str(tmp_path / "links.tbl"), capacity=16, heap_size=1 << 12)
+        await storage.create_url(make_url_data("scan1"))
+        await storage.create_url(make_url_data("scan2"))
+        index, _ = storage._find(b"scan2")
+        storage._mm[HEADER_SIZE + index * SLOT_SIZE] |= 1
+        
+        page, _ = await storage.search_urls("example.com/scan", "substring", 10)
+        assert [url.id for url in page] == ["scan1", "scan2"]
+        await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_clicks_during_update_are_kept(self, tmp_path, make_url_data):
+        """测试只持条带锁的点击在更新读取记录之后计入时不会被更新覆盖"""
+        path = str(tmp_path / "links.tbl")
+        storage = SharedMemoryURLStorage(path, capacity=16, heap_size=1 << 12, click_series=True)
+        other = SharedMemoryURLStorage(path, click_series=True)
+        await storage.create_url(make_url_data("busy"))
+        
+        index, fields = storage._lookup("busy")
+        record = storage._to_record(fields)
+        for _ in range(3):
+            await other.resolve_and_count("busy")
+        record.update({"is_active": False})
+        with storage._locked():
+            storage._write_record(index, record, fields)
+        
+        stats = await storage.get_stats("busy")
+        assert stats["click_count"] == 3 and stats["is_active"] is False
+        assert sum((await storage.get_click_series("busy", "minute"))[1]) == 3
+        await other.close()
+        await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_click_deltas_lock_each_stripe_once(self, tmp_path, make_url_data):
+        """测试批量写回按条带分组加锁，按ID和别名计入，不存在的ID忽略"""
+        storage = SharedMemoryURLStorage(str(tmp_path / "links.tbl"), capacity=16, heap_size=1 << 12)
+        for i in range(4):
+            await storage.create_url(make_url_data(f"id{i}", custom_alias=f"alias{i}" if i == 0 else None))
+        locked = []
+        stripe = storage._stripe
+        
+        def counting_stripe(index):
+            locked.append(index)
+            return stripe(index)
+        
+        storage._stripe = counting_stripe
+        await storage.apply_click_deltas({
+            "id0": (2, 100), "alias0": (3, 300), "id1": (1, 200), "missing": (5, 400),
+        })
+        
+        assert sorted(locked) == sorted({storage._lookup(url_id)[0] for url_id in ("id0", "id1")})
+        assert (await storage.get_stats("id0"))["click_count"] == 5
+        assert (await storage.get_stats("id1"))["click_count"] == 1
+        await storage.close()
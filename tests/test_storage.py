@@ -1,8 +1,10 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from utils.storage import URLStorage
+from utils.url_record import URLRecord, to_micros
 from models.url_models import URLResponse
+from exceptions.url_exceptions import URLNotFoundError, URLExpiredError, URLInactiveError, InvalidCursorError
 
 
 class TestURLStorage:
@@ -213,4 +215,500 @@ class TestURLStorage:
         await url_storage.create_url(url_data)
         
         assert await url_storage.alias_exists("myalias") is True
-        assert await url_storage.alias_exists("nonexistent") is False
\ No newline at end of file
+        assert await url_storage.alias_exists("nonexistent") is False
+    
+    @pytest.mark.asyncio
+    async def test_resolve_and_count(self, url_storage):
+        """测试单次查找解析并计数"""
+        url_data = {
+            "id": "test123",
+            "original_url": "https://www.example.com",
+            "short_url": "http://localhost:8000/test123",
+            "click_count": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            "expires_at": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+            "is_active": True,
+            "last_accessed": None,
+            "custom_alias": "myalias"
+        }
+        
+        await url_storage.create_url(url_data)
+        
+        assert await url_storage.resolve_and_count("test123") == "https://www.example.com"
+        assert await url_storage.resolve_and_count("myalias") == "https://www.example.com"
+        
+        stats = await url_storage.get_stats("test123")
+        assert stats["click_count"] == 2
+        assert stats["last_accessed"] is not None
+    
+    @pytest.mark.asyncio
+    async def test_resolve_and_count_errors(self, url_storage):
+        """测试解析不存在、已过期和已停用的URL"""
+        url_data = {
+            "id": "test123",
+            "original_url": "https://www.example.com",
+            "short_url": "http://localhost:8000/test123",
+            "click_count": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            "expires_at": None,
+            "is_active": True,
+            "last_accessed": None
+        }
+        
+        await url_storage.create_url(url_data)
+        
+        with pytest.raises(URLNotFoundError):
+            await url_storage.resolve_and_count("nonexistent")
+        
+        await url_storage.update_url("test123", {"is_active": False})
+        with pytest.raises(URLInactiveError):
+            await url_storage.resolve_and_count("test123")
+        
+        # 更新过期时间后预解析字段应同步更新
+        expired_at = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+        await url_storage.update_url("test123", {"is_active": True, "expires_at": expired_at})
+        with pytest.raises(URLExpiredError):
+            await url_storage.resolve_and_count("test123")
+        
+        stats = await url_storage.get_stats("test123")
+        assert stats["click_count"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_create_urls_batch(self, url_storage):
+        """测试批量创建和批量别名查询"""
+        url_data_list = [
+            {
+                "id": f"batch{i}",
+                "original_url": f"https://www.example.com/{i}",
+                "short_url": f"http://localhost:8000/batch{i}",
+                "created_at": datetime.utcnow().isoformat(),
+                "custom_alias": "batchalias" if i == 0 else None
+            }
+            for i in range(3)
+        ]
+        
+        results = await url_storage.create_urls(url_data_list)
+        
+        assert [result.id for result in results] == ["batch0", "batch1", "batch2"]
+        assert len(await url_storage.get_all_urls()) == 3
+        assert await url_storage.resolve_url("batchalias") == "https://www.example.com/0"
+        assert await url_storage.aliases_exist(["batchalias", "other"]) == {"batchalias"}
+        assert await url_storage.aliases_exist([]) == set()
+    
+    @pytest.mark.asyncio
+    async def test_list_urls_cursor_pagination(self, url_storage):
+        """测试游标分页：顺序稳定，同一创建时间按ID排序，翻页期间删除不影响后续页"""
+        created_at = datetime.utcnow()
+        url_data_list = [
+            {
+                "id": f"page{i:02d}",
+                "original_url": f"https://www.example.com/{i}",
+                "short_url": f"http://localhost:8000/page{i:02d}",
+                # 前4条共享同一创建时间
+                "created_at": (created_at + timedelta(seconds=max(i - 3, 0))).isoformat()
+            }
+            for i in reversed(range(10))
+        ]
+        await url_storage.create_urls(url_data_list)
+        
+        page, cursor = await url_storage.list_urls(3)
+        assert [url.id for url in page] == ["page00", "page01", "page02"]
+        
+        await url_storage.delete_url("page02")
+        await url_storage.delete_url("page03")
+        
+        seen = [url.id for url in page]
+        while cursor is not None:
+            page, cursor = await url_storage.list_urls(3, cursor)
+            seen.extend(url.id for url in page)
+        
+        assert seen == ["page00", "page01", "page02"] + [f"page{i:02d}" for i in range(4, 10)]
+        assert [url.id async for url in url_storage.iter_urls(batch_size=4)] == [
+            "page00", "page01"
+        ] + [f"page{i:02d}" for i in range(4, 10)]
+    
+    @pytest.mark.asyncio
+    async def test_reap_expired(self, url_storage):
+        """测试按过期索引清理，更新过期时间后索引同步"""
+        now = datetime.utcnow()
+        for url_id, expires_at in [
+            ("past1", now - timedelta(hours=2)),
+            ("past2", now - timedelta(hours=1)),
+            ("future", now + timedelta(hours=1)),
+            ("forever", None),
+        ]:
+            await url_storage.create_url({
+                "id": url_id,
+                "original_url": f"https://www.example.com/{url_id}",
+                "short_url": f"http://localhost:8000/{url_id}",
+                "created_at": now.isoformat(),
+                "expires_at": expires_at.isoformat() if expires_at else None,
+                "custom_alias": f"alias-{url_id}"
+            })
+        
+        # 延长past2，提前future
+        await url_storage.update_url("past2", {"expires_at": (now + timedelta(days=1)).isoformat()})
+        await url_storage.update_url("future", {"expires_at": (now - timedelta(minutes=1)).isoformat()})
+        
+        before = to_micros(now)
+        assert await url_storage.reap_expired(before, 1) == ["past1"]
+        assert await url_storage.reap_expired(before, 10) == ["future"]
+        assert await url_storage.reap_expired(before, 10) == []
+        
+        assert {url.id for url in await url_storage.get_all_urls()} == {"past2", "forever"}
+        assert await url_storage.alias_exists("alias-past1") is False
+        assert await url_storage.get_url("future") is None
+    
+    @pytest.mark.asyncio
+    async def test_list_urls_invalid_cursor(self, url_storage):
+        """测试无效游标"""
+        with pytest.raises(InvalidCursorError):
+            await url_storage.list_urls(10, "not-a-cursor")
+    
+    @pytest.mark.asyncio
+    async def test_find_canonical(self, url_storage):
+        """测试去重索引：同一哈希键指向最新创建的链接，删除后不再返回"""
+        for url_id in ("dedup1", "dedup2"):
+            await url_storage.create_url({
+                "id": url_id,
+                "original_url": "https://www.example.com/page",
+                "short_url": f"http://localhost:8000/{url_id}",
+                "created_at": datetime.utcnow().isoformat(),
+                "canonical_key": "canonical-key"
+            })
+        
+        found = await url_storage.find_canonical(["canonical-key", "missing"])
+        assert list(found) == ["canonical-key"]
+        assert found["canonical-key"].id == "dedup2"
+        assert await url_storage.find_canonical([]) == {}
+        
+        assert await url_storage.delete_url("dedup2") is True
+        assert await url_storage.find_canonical(["canonical-key"]) == {}
+        assert await url_storage.get_url("~canonical-key") is None
+    
+    @pytest.mark.asyncio
+    async def test_click_series(self, url_storage):
+        """测试点击按分钟、小时和天计入计数环，别名计入实际ID，删除后清空"""
+        await url_storage.create_url({
+            "id": "series1",
+            "original_url": "https://www.example.com",
+            "short_url": "http://localhost:8000/series1",
+            "created_at": datetime.utcnow().isoformat(),
+            "custom_alias": "seriesalias"
+        })
+        assert await url_storage.get_click_series("series1", "minute") == (0, [0] * 60)
+        
+        await url_storage.resolve_and_count("series1")
+        await url_storage.resolve_and_count("seriesalias")
+        await url_storage.increment_click_count("series1")
+        now = to_micros(datetime.utcnow())
+        await url_storage.apply_click_deltas({"series1": (2, now)})
+        
+        for granularity, width in (("minute", 60), ("hour", 3600), ("day", 86400)):
+            head, ring = await url_storage.get_click_series("series1", granularity)
+            assert head == now // 1_000_000 // width
+            assert sum(ring) == 5
+        
+        assert await url_storage.delete_url("series1") is True
+        assert await url_storage.get_click_series("series1", "hour") == (0, [0] * 48)
+    
+    @pytest.mark.asyncio
+    async def test_click_series_disabled(self):
+        """测试默认不记录点击时间序列，不为被点击的链接分配计数环"""
+        storage = URLStorage()
+        await storage.create_url({
+            "id": "plain",
+            "original_url": "https://www.example.com",
+            "short_url": "http://localhost:8000/plain",
+            "created_at": datetime.utcnow().isoformat()
+        })
+        await storage.resolve_and_count("plain")
+        await storage.apply_click_deltas({"plain": (2, to_micros(datetime.utcnow()))})
+        
+        assert (await storage.get_stats("plain"))["click_count"] == 3
+        assert await storage.get_click_series("plain", "minute") == (0, [0] * 60)
+        assert storage._series == {}
+    
+    @pytest.mark.asyncio
+    async def test_visitor_sketch(self, url_storage):
+        """测试独立访客寄存器按位取最大值合并，别名合并到实际ID，删除后清空"""
+        await url_storage.create_url({
+            "id": "visit1",
+            "original_url": "https://www.example.com",
+            "short_url": "http://localhost:8000/visit1",
+            "created_at": datetime.utcnow().isoformat(),
+            "custom_alias": "visitalias"
+        })
+        assert await url_storage.get_visitor_sketch("visit1") == bytes(1024)
+        
+        first = bytearray(1024)
+        first[0], first[5] = 3, 1
+        second = bytearray(1024)
+        second[5], second[1023] = 4, 2
+        await url_storage.merge_visitor_sketches({"visit1": first, "missing": first})
+        await url_storage.merge_visitor_sketches({"visitalias": second})
+        
+        expected = bytearray(1024)
+        expected[0], expected[5], expected[1023] = 3, 4, 2
+        assert await url_storage.get_visitor_sketch("visitalias") == expected
+        assert await url_storage.get_visitor_sketch("missing") == bytes(1024)
+        
+        assert await url_storage.delete_url("visit1") is True
+        assert await url_storage.get_visitor_sketch("visit1") == bytes(1024)
+    
+    @pytest.mark.asyncio
+    async def test_domain_index(self, url_storage):
+        """测试域名索引：按主机名分页和汇总，更新原始URL后移到新域名，删除后移出"""
+        created_at = datetime.utcnow()
+        await url_storage.create_urls([
+            {
+                "id": f"dom{i}",
+                "original_url": f"https://{host}/page{i}",
+                "short_url": f"http://localhost:8000/dom{i}",
+                "created_at": (created_at + timedelta(seconds=i)).isoformat(),
+                "custom_alias": f"domalias{i}" if i == 0 else None
+            }
+            for i, host in enumerate(["Spam.example:8443", "user@spam.example", "spam.example", "other.example"])
+        ])
+        await url_storage.resolve_and_count("domalias0")
+        
+        page, cursor = await url_storage.list_domain_urls("spam.example", 2)
+        assert [url.id for url in page] == ["dom0", "dom1"]
+        page, cursor = await url_storage.list_domain_urls("spam.example", 2, cursor)
+        assert [url.id for url in page] == ["dom2"] and cursor is None
+        assert await url_storage.list_domain_urls("missing.example", 10) == ([], None)
+        assert await url_storage.get_domain_stats("spam.example") == {"links": 3, "active_links": 3, "clicks": 1}
+        
+        await url_storage.update_url("dom2", {"original_url": "https://other.example/moved"})
+        await url_storage.delete_url("dom1")
+        assert [url.id for url in (await url_storage.list_domain_urls("spam.example", 10))[0]] == ["dom0"]
+        assert [url.id for url in (await url_storage.list_domain_urls("other.example", 10))[0]] == ["dom2", "dom3"]
+    
+    @pytest.mark.asyncio
+    async def test_domain_bulk_operations(self, url_storage):
+        """测试按域名批量停用和删除，别名和其他域名的链接不受影响"""
+        for i, host in enumerate(["spam.example", "spam.example", "good.example"]):
+            await url_storage.create_url({
+                "id": f"bulk{i}",
+                "original_url": f"https://{host}/{i}",
+                "short_url": f"http://localhost:8000/bulk{i}",
+                "created_at": datetime.utcnow().isoformat(),
+                "custom_alias": f"bulkalias{i}"
+            })
+        await url_storage.update_url("bulk1", {"is_active": False})
+        
+        assert await url_storage.set_domain_active("spam.example", False) == ["bulk0"]
+        with pytest.raises(URLInactiveError):
+            await url_storage.resolve_url("bulkalias0")
+        assert await url_storage.get_domain_stats("spam.example") == {"links": 2, "active_links": 0, "clicks": 0}
+        
+        assert sorted(await url_storage.delete_domain_urls("spam.example")) == ["bulk0", "bulk1"]
+        assert await url_storage.delete_domain_urls("spam.example") == []
+        assert await url_storage.get_url("bulk0") is None
+        assert await url_storage.alias_exists("bulkalias1") is False
+        assert [url.id for url in await url_storage.get_all_urls()] == ["bulk2"]
+        assert await url_storage.get_domain_stats("spam.example") == {"links": 0, "active_links": 0, "clicks": 0}
+    
+    @pytest.mark.asyncio
+    async def test_create_url_if_absent(self, url_storage):
+        """测试条件创建：ID或别名已作为ID或别名存在时不写入，成功时与create_url一样建立全部索引"""
+        def data(url_id, **overrides):
+            url_data = {
+                "id": url_id,
+                "original_url": f"https://cond.example/{url_id}",
+                "short_url": f"http://localhost:8000/{url_id}",
+                "created_at": datetime.utcnow().isoformat()
+            }
+            url_data.update(overrides)
+            return url_data
+        
+        expires_at = datetime.utcnow() - timedelta(days=1)
+        created = await url_storage.create_url_if_absent(
+            data("condalias", custom_alias="condalias", canonical_key="condkey", expires_at=expires_at.isoformat())
+        )
+        assert created.id == "condalias"
+        assert await url_storage.create_url_if_absent(data("condalias", custom_alias="condalias")) is None
+        assert await url_storage.get_url("condalias") == created
+        assert (await url_storage.find_canonical(["condkey"]))["condkey"] == created
+        assert [url.id for url in (await url_storage.list_domain_urls("cond.example", 10))[0]] == ["condalias"]
+        assert [url.id for url in (await url_storage.search_urls("cond.ex", "substring", 10))[0]] == ["condalias"]
+        
+        await url_storage.create_url(data("gen12345"))
+        await url_storage.create_url(data("other123", custom_alias="otheralias"))
+        assert await url_storage.create_url_if_absent(data("gen12345", custom_alias="gen12345")) is None
+        assert await url_storage.create_url_if_absent(data("otheralias", custom_alias="otheralias")) is None
+        assert await url_storage.create_url_if_absent(data("fresh123", custom_alias="otheralias")) is None
+        assert await url_storage.get_url("fresh123") is None
+        
+        results = await url_storage.create_urls_if_absent([
+            data("batch1", custom_alias="batch1"),
+            data("condalias", custom_alias="condalias"),
+            data("batch1", custom_alias="batch1", original_url="https://cond.example/second"),
+            data("batch2"),
+        ])
+        assert [url.id if url else None for url in results] == ["batch1", None, None, "batch2"]
+        assert (await url_storage.get_url("batch1")).original_url == "https://cond.example/batch1"
+        assert await url_storage.create_urls_if_absent([]) == []
+        
+        assert await url_storage.reap_expired(to_micros(datetime.utcnow()), 10) == ["condalias"]
+        assert await url_storage.alias_exists("condalias") is False
+        assert (await url_storage.create_url_if_absent(data("condalias", custom_alias="condalias"))).id == "condalias"
+    
+    @pytest.mark.asyncio
+    async def test_search_urls(self, url_storage):
+        """测试按原始URL和别名的前缀、子串搜索，更新、删除和过期清理后索引随之变化"""
+        created_at = datetime.utcnow()
+        await url_storage.create_urls([
+            {
+                "id": f"find{i}",
+                "original_url": url,
+                "short_url": f"http://localhost:8000/find{i}",
+                "created_at": (created_at + timedelta(seconds=i)).isoformat(),
+                "custom_alias": alias
+            }
+            for i, (url, alias) in enumerate([
+                ("https://Docs.Example.com/Guide?q=a*b", None),
+                ("https://docs.example.com/api", "GuideLink"),
+                ("https://shop.example.com/guide/路径", None),
+                ("https://blog.example.org/post", "post[1]"),
+            ])
+        ])
+        
+        async def ids(query, mode, limit=10, cursor=None):
+            page, _ = await url_storage.search_urls(query, mode, limit, cursor)
+            return [url.id for url in page]
+        
+        assert await ids("HTTPS://DOCS.", "prefix") == ["find1", "find0"]
+        assert await ids("guide", "prefix") == ["find1"]
+        assert await ids("guide", "substring") == ["find0", "find1", "find2"]
+        assert await ids("/路径", "substring") == ["find2"]
+        assert await ids("a*b", "substring") == ["find0"]
+        assert await ids("t[1", "substring") == ["find3"]
+        assert await ids("e", "substring", limit=100) == ["find0", "find1", "find2", "find3"]
+        assert await ids("nothing", "substring") == []
+        
+        page, cursor = await url_storage.search_urls("example", "substring", 2)
+        assert [url.id for url in page] == ["find0", "find1"]
+        page, cursor = await url_storage.search_urls("example", "substring", 2, cursor)
+        assert [url.id for url in page] == ["find2", "find3"] and cursor is None
+        
+        await url_storage.update_url("find1", {"original_url": "https://moved.example.net/"})
+        assert await ids("https://docs.", "prefix") == ["find0"]
+        assert await ids("moved", "substring") == ["find1"]
+        assert await ids("guidelink", "prefix") == ["find1"]
+        
+        await url_storage.delete_url("find3")
+        assert await ids("post", "substring") == []
+        await url_storage.delete_domain_urls("shop.example.com")
+        assert await ids("guide", "substring") == ["find0", "find1"]
+        await url_storage.update_url("find0", {"expires_at": (created_at - timedelta(days=1)).isoformat()})
+        assert await url_storage.reap_expired(to_micros(datetime.utcnow()), 10) == ["find0"]
+        assert await ids("https://", "prefix") == ["find1"]
+    
+    @pytest.mark.asyncio
+    async def test_search_prefix_pages(self, url_storage):
+        """测试前缀查询按匹配文本分页，原始URL和别名都匹配的链接只出现一次"""
+        created_at = datetime.utcnow()
+        await url_storage.create_urls([
+            {
+                "id": url_id,
+                "original_url": url,
+                "short_url": f"http://localhost:8000/{url_id}",
+                "created_at": (created_at + timedelta(seconds=i)).isoformat(),
+                "custom_alias": alias
+            }
+            for i, (url_id, url, alias) in enumerate([
+                ("pre1", "https://x.example/b", None),
+                ("pre0", "https://x.example/a", "https-alias"),
+                ("pre2", "https://a.example", "prefix-alias"),
+                ("pre3", "ftp://y.example", "HTTPS-upper"),
+            ])
+        ])
+        
+        found, cursor = [], None
+        while True:
+            page, cursor = await url_storage.search_urls("HTTPS", "prefix", 1, cursor)
+            found.extend(url.id for url in page)
+            if cursor is None:
+                break
+        assert found == ["pre0", "pre3", "pre2", "pre1"]
+        
+        page, cursor = await url_storage.search_urls("https", "prefix", 3)
+        assert [url.id for url in page] == ["pre0", "pre3", "pre2"]
+        assert [url.id for url in (await url_storage.search_urls("https", "prefix", 3, cursor))[0]] == ["pre1"]
+        
+        _, list_cursor = await url_storage.list_urls(1)
+        with pytest.raises(InvalidCursorError):
+            await url_storage.search_urls("https", "prefix", 3, list_cursor)
+    
+    @pytest.mark.asyncio
+    async def test_load_id_secret(self, url_storage):
+        """测试短ID置换密钥只保存首次提供的值"""
+        assert await url_storage.load_id_secret("first") == "first"
+        assert await url_storage.load_id_secret("second") == "first"
+    
+    @pytest.mark.asyncio
+    async def test_insert_existing_id_replaces_indexes(self):
+        """测试以已存在的ID插入记录时旧记录连同排序、域名和搜索索引一并移除"""
+        storage = URLStorage(search_index=True)
+        await storage.create_url({
+            "id": "dup12345",
+            "original_url": "https://old.example/page",
+            "short_url": "http://localhost:8000/dup12345",
+            "created_at": datetime.utcnow().isoformat(),
+            "custom_alias": "dup12345"
+        })
+        await storage.create_url({
+            "id": "dup12345",
+            "original_url": "https://new.example/page",
+            "short_url": "http://localhost:8000/dup12345",
+            "created_at": datetime.utcnow().isoformat()
+        })
+        
+        assert [url.id for url in await storage.get_all_urls()] == ["dup12345"]
+        assert await storage.list_domain_urls("old.example", 10) == ([], None)
+        assert await storage.search_urls("old.ex", "substring", 10) == ([], None)
+        assert (await storage.get_url("dup12345")).original_url == "https://new.example/page"
+
+
+
+class TestURLRecord:
+    """紧凑存储记录测试"""
+    
+    def test_round_trip(self):
+        """测试字典与记录互相转换"""
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        record = URLRecord.from_dict({
+            "id": "test123",
+            "original_url": "https://www.example.com",
+            "short_url": "http://localhost:8000/test123",
+            "created_at": datetime.utcnow().isoformat(),
+            "expires_at": expires_at,
+            "custom_alias": "myalias"
+        })
+        
+        assert isinstance(record.created_at, int)
+        assert record.base_url == "http://localhost:8000"
+        assert record.short_url == "http://localhost:8000/test123"
+        assert record.to_response().expires_at == expires_at
+        
+        data = record.to_dict()
+        assert data["expires_at"] == expires_at.isoformat()
+        assert data["custom_alias"] == "myalias"
+        assert data["last_accessed"] is None
+    
+    def test_slots(self):
+        """测试记录没有实例字典"""
+        record = URLRecord("test123", "https://www.example.com", "http://localhost:8000", created_at=0)
+        assert not hasattr(record, "__dict__")
+    
+    def test_update_converts_timestamps(self):
+        """测试更新时转换时间字段并忽略未知字段"""
+        record = URLRecord("test123", "https://www.example.com", "http://localhost:8000", created_at=0)
+        expires_at = datetime(2030, 1, 1)
+        
+        record.update({"expires_at": expires_at.isoformat(), "is_active": False, "unknown": 1})
+        
+        assert record.expires_at == to_micros(expires_at)
+        assert record.is_active is False
+        assert record.is_expired(to_micros(expires_at) + 1)
@@ -0,0 +1,98 @@
+import pytest
+
+from config import settings
+from models.url_models import URLCreate
+from services.url_service import URLService
+from utils.top_links import SpaceSaving, TopLinks
+
+
+MINUTE = 60_000_000
+
+
+@pytest.fixture
+def top_service(url_storage):
+    """启用热点统计的URL服务"""
+    return URLService(storage=url_storage, top_links=TopLinks(capacity=10, window_minutes=5))
+
+
+class TestSpaceSaving:
+    """Space-Saving热点统计测试"""
+    
+    def test_counts_within_capacity(self):
+        """测试未满时计数精确"""
+        sketch = SpaceSaving(3)
+        for key in "aababc":
+            sketch.offer(key)
+        
+        assert sketch.items() == {"a": [3, 0], "b": [2, 0], "c": [1, 0]}
+        assert sketch.min_count() == 1
+    
+    def test_eviction_keeps_heavy_hitters(self):
+        """测试超出容量时替换最小计数，热点键始终保留且误差有界"""
+        sketch = SpaceSaving(4)
+        for i in range(1000):
+            sketch.offer("hot")
+            sketch.offer(f"cold{i}")
+        
+        assert len(sketch) == 4
+        count, error = sketch.items()["hot"]
+        assert count - error <= 1000 <= count
+        assert len(sketch._heap) <= 4 * 4 + 1
+
+
+class TestTopLinks:
+    """热点短链接统计测试"""
+    
+    def test_window(self):
+        """测试按分钟窗口统计，窗口外的分钟被覆盖"""
+        top = TopLinks(capacity=10, window_minutes=3)
+        now = 1000 * MINUTE
+        for _ in range(5):
+            top.record("old", now - 3 * MINUTE)
+        top.record("recent", now - MINUTE)
+        top.record("recent", now)
+        top.record("new", now)
+        
+        assert top.top(10, now=now) == [("old", 5, 0), ("recent", 2, 0), ("new", 1, 0)]
+        assert top.top(10, minutes=3, now=now) == [("recent", 2, 0), ("new", 1, 0)]
+        assert sorted(top.top(10, minutes=1, now=now)) == [("new", 1, 0), ("recent", 1, 0)]
+        assert top.top(1, minutes=60, now=now) == [("recent", 2, 0)]
+    
+    def test_discard(self):
+        """测试删除后不再出现在统计中"""
+        top = TopLinks(capacity=10, window_minutes=3)
+        top.record("a")
+        top.record("b")
+        top.discard("a")
+        
+        assert [key for key, _, _ in top.top(10)] == ["b"]
+        assert [key for key, _, _ in top.top(10, minutes=1)] == ["b"]
+    
+    @pytest.mark.asyncio
+    async def test_top_urls(self, top_service):
+        """测试按重定向次数排序，别名与ID合并，已删除的链接不返回"""
+        hot = await top_service.create_short_url(URLCreate(original_url="https://www.example.com/hot", custom_alias="hotlink"))
+        warm = await top_service.create_short_url(URLCreate(original_url="https://www.example.com/warm"))
+        gone = await top_service.create_short_url(URLCreate(original_url="https://www.example.com/gone"))
+        
+        for short_id in [hot.id, "hotlink", "hotlink", warm.id, warm.id, gone.id]:
+            await top_service.get_original_url(short_id)
+        await top_service.delete_url(gone.id)
+        
+        top = await top_service.get_top_urls(k=5)
+        assert [(item.id, item.clicks) for item in top] == [(hot.id, 3), (warm.id, 2)]
+        assert top[0].original_url == "https://www.example.com/hot"
+        
+        top = await top_service.get_top_urls(k=1, minutes=5)
+        assert [(item.id, item.clicks) for item in top] == [(hot.id, 3)]
+    
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self, url_storage, monkeypatch):
+        """测试TOP_LINKS_CAPACITY为0时不统计，接口返回空列表"""
+        monkeypatch.setattr(settings, "top_links_capacity", 0)
+        service = URLService(storage=url_storage)
+        created = await service.create_short_url(URLCreate(original_url="https://www.example.com/plain"))
+        await service.get_original_url(created.id)
+        
+        assert service.top_links is None
+        assert await service.get_top_urls(k=5) == []
@@ -0,0 +1,106 @@
+import pytest
+
+from config import settings
+from models.url_models import URLCreate
+from services.url_service import URLService
+from utils.hyperloglog import (
+    EMPTY_SKETCH,
+    new_sketch,
+    add_register,
+    estimate,
+    merge_sketches,
+    merge_sparse,
+    sparse_registers,
+    visitor_register
+)
+from utils.visitor_buffer import VisitorBuffer
+
+
+def make_sketch(visitors) -> bytearray:
+    registers = new_sketch()
+    for visitor in visitors:
+        add_register(registers, *visitor_register(visitor))
+    return registers
+
+
+@pytest.fixture
+def visitor_service(url_storage):
+    """启用独立访客统计的URL服务"""
+    return URLService(storage=url_storage, visitor_buffer=VisitorBuffer())
+
+
+class TestHyperLogLog:
+    """HyperLogLog独立访客估计测试"""
+    
+    def test_estimate(self):
+        """测试小基数精确、大基数误差在标准误差的数倍以内，重复访客不重复计数"""
+        assert estimate(EMPTY_SKETCH) == 0
+        assert estimate(make_sketch(["a", "b", "c", "a", "b"])) == 3
+        
+        estimated = estimate(make_sketch(f"192.0.2.{i % 250}|agent{i}" for i in range(50000)))
+        assert abs(estimated - 50000) / 50000 < 0.1
+    
+    def test_merge_equals_union(self):
+        """测试合并结果与对访客并集直接统计相同"""
+        left = make_sketch(f"visitor{i}" for i in range(3000))
+        right = make_sketch(f"visitor{i}" for i in range(2000, 6000))
+        union = make_sketch(f"visitor{i}" for i in range(6000))
+        
+        assert merge_sketches([left, right]) == union
+        
+        restored = new_sketch()
+        merge_sparse(restored, sparse_registers(union))
+        assert restored == union
+
+
+class TestVisitorBuffer:
+    """独立访客统计缓冲测试"""
+    
+    @pytest.mark.asyncio
+    async def test_flush_merges_into_storage(self, visitor_service, url_storage):
+        """测试缓冲与存储中的统计合并，多个缓冲（worker）的统计可以合并"""
+        created_url = await visitor_service.create_short_url(
+            URLCreate(original_url="https://www.example.com", custom_alias="visited")
+        )
+        for visitor in ("ip1|ua", "ip2|ua", "ip1|ua"):
+            await visitor_service.get_original_url(created_url.id, visitor)
+        await visitor_service.get_original_url("visited", "ip3|ua")
+        
+        assert (await visitor_service.get_url_stats(created_url.id)).unique_visitors == 3
+        await visitor_service.visitor_buffer.flush(url_storage)
+        assert len(visitor_service.visitor_buffer) == 0
+        
+        other_worker = VisitorBuffer()
+        other_worker.record(created_url.id, "ip1|ua")
+        other_worker.record(created_url.id, "ip4|ua")
+        await other_worker.flush(url_storage)
+        
+        assert estimate(await url_storage.get_visitor_sketch("visited")) == 4
+        assert (await visitor_service.get_url_stats(created_url.id)).unique_visitors == 4
+    
+    @pytest.mark.asyncio
+    async def test_flush_failure_keeps_sketches(self):
+        """测试合并失败时寄存器放回缓冲，与之后的访问合并"""
+        class BrokenStorage:
+            async def merge_visitor_sketches(self, sketches):
+                raise RuntimeError("backend down")
+        
+        buffer = VisitorBuffer()
+        buffer.record("abc", "ip1|ua")
+        with pytest.raises(RuntimeError):
+            await buffer.flush(BrokenStorage())
+        buffer.record("abc", "ip2|ua")
+        
+        assert len(buffer) == 1
+        assert estimate(buffer.pending("abc")) == 2
+    
+    @pytest.mark.asyncio
+    async def test_disabled(self, url_storage, monkeypatch):
+        """测试VISITOR_FLUSH_INTERVAL为0时不统计，不返回独立访客数"""
+        monkeypatch.setattr(settings, "visitor_flush_interval", 0)
+        service = URLService(storage=url_storage)
+        assert service.visitor_buffer is None
+        created_url = await service.create_short_url(URLCreate(original_url="https://www.example.com"))
+        await service.get_original_url(created_url.id, "ip1|ua")
+        
+        assert (await service.get_url_stats(created_url.id)).unique_visitors is None
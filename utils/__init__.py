@@ -1,4 +1,6 @@
 from .url_utils import generate_short_id, validate_url, is_url_expired, is_valid_alias, sanitize_url, get_domain_from_url
-from .storage import URLStorage
+from .base_storage import BaseURLStorage
+from .storage import URLStorage, create_storage
+from .url_record import URLRecord
 
-__all__ = ["generate_short_id", "validate_url", "is_url_expired", "is_valid_alias", "sanitize_url", "get_domain_from_url", "URLStorage"] 
\ No newline at end of file
+__all__ = ["generate_short_id", "validate_url", "is_url_expired", "is_valid_alias", "sanitize_url", "get_domain_from_url", "BaseURLStorage", "URLStorage", "create_storage", "URLRecord"] 
\ No newline at end of file
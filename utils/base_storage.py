@@ -0,0 +1,181 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from models.url_models import URLResponse
+from utils.url_record import URLRecord
+from exceptions.url_exceptions import SnapshotNotSupportedError
+
+
+class BaseURLStorage(ABC):
+    """
+    异步存储后端接口
+    
+    所有方法均接受短链接ID或自定义别名；查找失败时返回None/False，
+    重定向相关方法（resolve_*）直接抛出对应的短链接异常
+    """
+    
+    @abstractmethod
+    async def create_url(self, url_data: dict) -> URLResponse:
+        """创建短链接"""
+    
+    @abstractmethod
+    async def create_url_if_absent(self, url_data: dict) -> Optional[URLResponse]:
+        """
+        ID和自定义别名都未被占用（作为ID或别名）时创建短链接，否则不写入并返回None
+        
+        检查和写入在一次调用内原子完成，并发创建同一别名时只有一个成功
+        """
+    
+    @abstractmethod
+    async def get_url(self, url_id: str) -> Optional[URLResponse]:
+        """根据ID获取短链接"""
+    
+    @abstractmethod
+    async def update_url(self, url_id: str, update_data: dict) -> Optional[URLResponse]:
+        """更新短链接"""
+    
+    @abstractmethod
+    async def delete_url(self, url_id: str) -> bool:
+        """删除短链接"""
+    
+    @abstractmethod
+    async def increment_click_count(self, url_id: str) -> Optional[int]:
+        """增加点击次数"""
+    
+    @abstractmethod
+    async def resolve_and_count(self, url_id: str) -> str:
+        """解析短链接并计数，只返回目标URL"""
+    
+    @abstractmethod
+    async def resolve_url(self, url_id: str) -> str:
+        """解析短链接但不计数"""
+    
+    @abstractmethod
+    async def apply_click_deltas(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        """批量合并点击增量：ID -> (点击增量, 最后访问时间微秒)"""
+    
+    @abstractmethod
+    async def get_all_urls(self) -> List[URLResponse]:
+        """获取所有短链接"""
+    
+    @abstractmethod
+    async def list_urls(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        按（创建时间, ID）顺序分页获取短链接
+        
+        返回本页结果和下一页游标，没有更多结果时游标为None
+        """
+    
+    @abstractmethod
+    async def alias_exists(self, alias: str) -> bool:
+        """检查别名是否存在"""
+    
+    @abstractmethod
+    async def get_stats(self, url_id: str) -> Optional[dict]:
+        """获取统计信息"""
+    
+    @abstractmethod
+    async def reap_expired(self, before: int, limit: int) -> List[str]:
+        """删除过期时间早于before（微秒）的链接，最多limit条，返回被删除的ID"""
+    
+    @abstractmethod
+    async def find_canonical(self, keys: List[str]) -> Dict[str, URLResponse]:
+        """
+        按规范化URL哈希键查找去重索引中的链接，返回键 -> 链接
+        
+        索引不随链接更新而维护，调用方需自行确认返回的链接仍然可复用
+        """
+    
+    @abstractmethod
+    async def list_domain_urls(self, domain: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        按（创建时间, ID）顺序分页获取原始URL主机名为domain的短链接（主机名见get_domain_from_url）
+        
+        游标格式与list_urls相同
+        """
+    
+    @abstractmethod
+    async def get_domain_stats(self, domain: str) -> dict:
+        """汇总某主机名下的链接：links（链接数）、active_links（激活的链接数）、clicks（点击次数合计）"""
+    
+    @abstractmethod
+    async def set_domain_active(self, domain: str, is_active: bool) -> List[str]:
+        """批量设置某主机名下全部链接的激活状态，返回状态发生变化的ID"""
+    
+    @abstractmethod
+    async def delete_domain_urls(self, domain: str) -> List[str]:
+        """删除某主机名下的全部链接及其别名和索引，返回被删除的ID"""
+    
+    @abstractmethod
+    async def search_urls(self, query: str, mode: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        分页获取原始URL或自定义别名匹配query的短链接
+        
+        mode为prefix（以query开头）或substring（包含query），ASCII字母不区分大小写（见utils/search_index.py）。
+        子串查询按（创建时间, ID）排序，游标格式与list_urls相同；前缀查询按（排序文本, ID）排序，
+        排序文本见utils/search_index.py的prefix_key，游标由encode_search_cursor编码
+        """
+    
+    @abstractmethod
+    async def get_click_series(self, url_id: str, granularity: str) -> Tuple[int, List[int]]:
+        """
+        获取某粒度的点击计数环：最新桶号和按槽位顺序排列的计数（布局见utils/click_series.py）
+        
+        链接不存在或尚无点击时返回全零
+        """
+    
+    @abstractmethod
+    async def merge_visitor_sketches(self, sketches: Dict[str, bytes]) -> None:
+        """按位取最大值合并独立访客HyperLogLog寄存器：ID或别名 -> 寄存器（布局见utils/hyperloglog.py）"""
+    
+    @abstractmethod
+    async def get_visitor_sketch(self, url_id: str) -> bytes:
+        """获取独立访客寄存器，链接不存在或尚无访客时返回全零"""
+    
+    @abstractmethod
+    def iter_keys(self) -> AsyncIterator[str]:
+        """逐个产出全部短链接ID和别名（无序），用于构建成员过滤器"""
+    
+    @abstractmethod
+    async def reserve_id_block(self, size: int) -> int:
+        """预留size个连续的ID计数值，返回起始值"""
+    
+    @abstractmethod
+    async def load_id_secret(self, candidate: str) -> str:
+        """
+        获取与ID计数值一起保存的短ID置换密钥；尚未保存时原子地保存candidate并返回
+        
+        共享同一存储的实例以及重启后的进程由此使用同一密钥，ID计数值与置换始终对应
+        """
+    
+    async def create_urls(self, url_data_list: List[dict]) -> List[URLResponse]:
+        """批量创建短链接，后端可覆盖为单次提交"""
+        return [await self.create_url(url_data) for url_data in url_data_list]
+    
+    async def create_urls_if_absent(self, url_data_list: List[dict]) -> List[Optional[URLResponse]]:
+        """批量条件创建，结果与逐条调用create_url_if_absent相同（批内后出现的重复项返回None），后端可覆盖为单次提交"""
+        return [await self.create_url_if_absent(url_data) for url_data in url_data_list]
+    
+    async def aliases_exist(self, aliases: List[str]) -> Set[str]:
+        """返回给定别名中已存在的部分，后端可覆盖为一次多键查询"""
+        return {alias for alias in aliases if await self.alias_exists(alias)}
+    
+    async def iter_urls(self, cursor: Optional[str] = None, batch_size: int = 500) -> AsyncIterator[URLResponse]:
+        """从游标之后按分页顺序逐条产出短链接，内存中最多只保留一页"""
+        while True:
+            page, cursor = await self.list_urls(batch_size, cursor)
+            for url in page:
+                yield url
+            if cursor is None:
+                return
+    
+    async def export_records(self) -> Tuple[List[URLRecord], int]:
+        """导出全部记录和ID计数值上界（列式快照），不支持的后端抛出SnapshotNotSupportedError"""
+        raise SnapshotNotSupportedError(type(self).__name__)
+    
+    async def import_records(self, records: List[URLRecord], id_counter: int = 0) -> int:
+        """批量导入记录（同ID的已有链接被替换），返回导入的记录数；不支持的后端抛出SnapshotNotSupportedError"""
+        raise SnapshotNotSupportedError(type(self).__name__)
+    
+    async def close(self) -> None:
+        """释放后端资源（连接池等）"""
@@ -0,0 +1,49 @@
+import hashlib
+import math
+
+
+class CountingBloomFilter:
+    """
+    计数布隆过滤器
+    
+    每个位置是一个8位计数器，加入时各位置加一、删除时减一，因此支持删除。
+    判断为不存在的键一定不存在；判断为存在的键有约error_rate的概率实际不存在。
+    计数器达到255后不再增减，避免溢出导致误删
+    """
+    
+    __slots__ = ("size", "hash_count", "_counters")
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        # 按期望元素数和误判率计算计数器个数和哈希函数个数
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self._counters = bytearray(self.size)
+    
+    def add(self, key: str) -> None:
+        counters = self._counters
+        for position in self._positions(key):
+            if counters[position] < 255:
+                counters[position] += 1
+    
+    def remove(self, key: str) -> None:
+        """删除之前加入过的键；删除未加入的键会破坏其他键的计数"""
+        counters = self._counters
+        for position in self._positions(key):
+            if 0 < counters[position] < 255:
+                counters[position] -= 1
+    
+    def __contains__(self, key: str) -> bool:
+        counters = self._counters
+        for position in self._positions(key):
+            if not counters[position]:
+                return False
+        return True
+    
+    def _positions(self, key: str):
+        """双重哈希：一次128位哈希拆成两个64位值，第i个位置为 h1 + i * h2"""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % size
@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional, Tuple
+
+from utils.url_record import now_micros
+from utils.metrics import registry
+from utils.write_behind import WriteBehindBuffer
+
+
+class ClickBuffer(WriteBehindBuffer):
+    """
+    点击计数写回缓冲
+    
+    重定向时只在进程内累加每条链接的点击增量和最后访问时间，
+    由后台任务定期批量合并到存储，避免每次重定向都写存储
+    """
+    
+    failure_message = "点击计数写回失败"
+    
+    def __init__(self):
+        super().__init__()
+        self._pending: Dict[str, List[int]] = {}  # ID -> [点击增量, 最后访问时间(微秒)]
+    
+    def record(self, url_id: str, now: Optional[int] = None) -> None:
+        """记录一次点击"""
+        if now is None:
+            now = now_micros()
+        entry = self._pending.get(url_id)
+        if entry is None:
+            self._pending[url_id] = [1, now]
+        else:
+            entry[0] += 1
+            entry[1] = now
+    
+    def pending(self, url_id: str) -> Tuple[int, Optional[int]]:
+        """获取尚未写回的点击增量和最后访问时间"""
+        entry = self._pending.get(url_id)
+        if entry is None:
+            return 0, None
+        return entry[0], entry[1]
+    
+    async def _write(self, storage, deltas: Dict[str, List[int]]) -> None:
+        await storage.apply_click_deltas(deltas)
+    
+    def _merge_back(self, deltas: Dict[str, List[int]]) -> None:
+        for url_id, (count, last_accessed) in deltas.items():
+            entry = self._pending.get(url_id)
+            if entry is None:
+                self._pending[url_id] = [count, last_accessed]
+            else:
+                entry[0] += count
+                entry[1] = max(entry[1], last_accessed)
+
+
+# 全局点击缓冲实例
+click_buffer = ClickBuffer()
+registry.callback("click_buffer_pending_links", "有待写回点击增量的链接数", lambda: len(click_buffer))
@@ -0,0 +1,79 @@
+from array import array
+from typing import List, Tuple
+
+
+# 各粒度的桶宽（秒）和环形缓冲桶数：最近60分钟、48小时、90天
+GRANULARITIES = {
+    "minute": (60, 60),
+    "hour": (3600, 48),
+    "day": (86400, 90),
+}
+
+
+def _layout() -> Tuple[tuple, int]:
+    levels = []
+    offset = len(GRANULARITIES)
+    for head_index, (width, size) in enumerate(GRANULARITIES.values()):
+        levels.append((head_index, width, size, offset))
+        offset += size
+    return tuple(levels), offset
+
+
+# 每条链接的序列保存为一个定长uint32数组：先是各粒度最新桶号，再依次是各粒度的计数环。
+# 内存、Redis（BITFIELD）和共享内存后端使用同一布局
+LEVELS, SERIES_LENGTH = _layout()  # LEVELS: (最新桶号下标, 桶宽, 桶数, 计数环起始下标)
+SERIES_BYTES = SERIES_LENGTH * 4
+LEVEL_BY_NAME = dict(zip(GRANULARITIES, LEVELS))
+
+
+def new_series() -> array:
+    """分配一条全零的点击序列"""
+    return array("I", bytes(SERIES_BYTES))
+
+
+def record_clicks(data, timestamp: int, count: int = 1) -> None:
+    """
+    在各粒度的计数环中累加点击
+    
+    data为new_series()数组或同布局的memoryview，timestamp为秒级时间戳。
+    时间前进到新桶时先清零跳过的桶；早于计数环覆盖范围的点击只计入更粗的粒度
+    """
+    for head_index, width, size, offset in LEVELS:
+        bucket = timestamp // width
+        head = data[head_index]
+        if bucket > head:
+            first = max(head + 1, bucket - size + 1)
+            for skipped in range(first, bucket + 1):
+                data[offset + skipped % size] = 0
+            data[head_index] = head = bucket
+        if bucket > head - size:
+            data[offset + bucket % size] += count
+
+
+def read_ring(data, granularity: str) -> Tuple[int, List[int]]:
+    """取出某粒度的最新桶号和按槽位顺序排列的计数环"""
+    head_index, _, size, offset = LEVEL_BY_NAME[granularity]
+    return data[head_index], list(data[offset:offset + size])
+
+
+def series_points(
+    head: int,
+    ring: List[int],
+    granularity: str,
+    start: int,
+    end: int,
+    now: int
+) -> List[Tuple[int, int]]:
+    """
+    按时间范围从计数环中取出序列点：(桶起始秒级时间戳, 点击数)
+    
+    范围会被截断到计数环仍保留的最近桶数之内；最新桶之后没有点击的桶计为0
+    """
+    width, size = GRANULARITIES[granularity]
+    now_bucket = now // width
+    first = max(start // width, now_bucket - size + 1)
+    last = min(end // width, now_bucket)
+    return [
+        (bucket * width, ring[bucket % size] if head - size < bucket <= head else 0)
+        for bucket in range(first, last + 1)
+    ]
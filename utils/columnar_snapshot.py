@@ -0,0 +1,283 @@
+"""
+列式二进制链接快照
+
+用于在实例之间整体迁移链接数据（例如为新节点灌入数据），不经过创建接口逐条重放。
+文件布局（小端序，各段按8字节对齐）:
+    
+    magic       8字节  b"URLCOL" + 2字节版本号
+    header      <QQ    记录数, ID计数值上界
+    整数列      <q x N  created_at, expires_at, last_accessed, click_count（时间为UTC微秒，-1表示空）
+    is_active   <B x N
+    base_index  <I x N  基础URL在字典中的序号
+    字符串块    id, original_url, custom_alias, canonical_key（空串表示空）, 基础URL字典
+
+字符串块为 <QQ（条数, 数据字节数）+ <I x 条数（各条UTF-8字节长度）+ 拼接后的数据。
+导入时在线程中整体读入文件，整数列按内存视图一次转换为列表，字符串块整体解码后按偏移切分，
+直接构造URLRecord并由存储批量合并索引，不经过Pydantic模型。
+点击时间序列和独立访客统计不在快照中。
+
+命令行:
+    python -m utils.columnar_snapshot export links.snap               # 从本地存储（STORAGE_BACKEND/DATA_DIR）导出
+    python -m utils.columnar_snapshot import links.snap               # 导入本地存储，服务须已停止
+    python -m utils.columnar_snapshot export links.snap --url http://host:8000 --token TOKEN
+    python -m utils.columnar_snapshot import links.snap --url http://host:8000 --token TOKEN
+    python -m utils.columnar_snapshot info links.snap
+"""
+import argparse
+import asyncio
+import gc
+import struct
+import sys
+import time
+from array import array
+from itertools import accumulate
+from typing import List, Optional, Tuple
+
+from utils.url_record import URLRecord
+from exceptions.url_exceptions import InvalidSnapshotError
+
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MAGIC = b"URLCOL" + struct.pack("<H", SNAPSHOT_VERSION)
+SNAPSHOT_MEDIA_TYPE = "application/vnd.url-shortener.snapshot"
+
+_HEADER = struct.Struct("<QQ")
+_BLOCK_HEADER = struct.Struct("<QQ")
+_NULL = -1
+_ADMIN_PATH = "/api/admin/snapshot"
+
+
+def _padding(size: int) -> bytes:
+    return b"\x00" * (-size % 8)
+
+
+def _column(typecode: str, values) -> bytes:
+    column = array(typecode, values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    data = column.tobytes()
+    return data + _padding(len(data))
+
+
+def _string_block(values: List[str]) -> bytes:
+    encoded = [value.encode() for value in values]
+    data = b"".join(encoded)
+    lengths = _column("I", map(len, encoded))
+    return _BLOCK_HEADER.pack(len(encoded), len(data)) + lengths + data + _padding(len(data))
+
+
+def encode_snapshot(records: List[URLRecord], id_counter: int) -> List[bytes]:
+    """把记录编码为快照文件的各段（依次写出即为完整文件）"""
+    bases = {}
+    base_index = [bases.setdefault(record.base_url, len(bases)) for record in records]
+    return [
+        SNAPSHOT_MAGIC,
+        _HEADER.pack(len(records), id_counter),
+        _column("q", [record.created_at for record in records]),
+        _column("q", [_NULL if record.expires_at is None else record.expires_at for record in records]),
+        _column("q", [_NULL if record.last_accessed is None else record.last_accessed for record in records]),
+        _column("q", [record.click_count for record in records]),
+        _column("B", [record.is_active for record in records]),
+        _column("I", base_index),
+        _string_block([record.id for record in records]),
+        _string_block([record.original_url for record in records]),
+        _string_block([record.custom_alias or "" for record in records]),
+        _string_block([record.canonical_key or "" for record in records]),
+        _string_block(list(bases)),
+    ]
+
+
+def write_snapshot(path: str, records: List[URLRecord], id_counter: int) -> int:
+    """写出快照文件，返回文件字节数"""
+    size = 0
+    with open(path, "wb") as f:
+        for part in encode_snapshot(records, id_counter):
+            f.write(part)
+            size += len(part)
+    return size
+
+
+class _Reader:
+    """
+    按顺序读取快照各段（每段之后按8字节对齐），越界时抛出InvalidSnapshotError
+    """
+    
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._offset = 0
+    
+    def take(self, size: int) -> memoryview:
+        end = self._offset + size
+        if end > len(self._view):
+            raise InvalidSnapshotError("文件被截断")
+        chunk = self._view[self._offset:end]
+        self._offset = end + (-size % 8)
+        return chunk
+    
+    def read(self, size: int) -> bytes:
+        with self.take(size) as chunk:
+            return bytes(chunk)
+    
+    def column(self, typecode: str, count: int) -> list:
+        with self.take(count * array(typecode).itemsize) as chunk:
+            if sys.byteorder == "little":
+                with chunk.cast(typecode) as typed:
+                    return typed.tolist()
+            column = array(typecode, chunk.tobytes())
+        column.byteswap()
+        return column.tolist()
+    
+    def strings(self, expected: Optional[int] = None) -> List[str]:
+        count, size = _BLOCK_HEADER.unpack(self.read(_BLOCK_HEADER.size))
+        if expected is not None and count != expected:
+            raise InvalidSnapshotError("字符串块条数与记录数不一致")
+        if size == 0:
+            # 多数链接没有别名和去重键，整块为空
+            self.take(count * 4).release()
+            return [""] * count
+        lengths = self.column("I", count)
+        raw = self.read(size)
+        ends = list(accumulate(lengths))
+        if (ends[-1] if ends else 0) != size:
+            raise InvalidSnapshotError("字符串块长度不一致")
+        starts = [0] + ends[:-1]
+        try:
+            if raw.isascii():
+                # ASCII时字节偏移即字符偏移，整块解码一次后切片
+                text = raw.decode("ascii")
+                return [text[start:end] for start, end in zip(starts, ends)]
+            return [raw[start:end].decode() for start, end in zip(starts, ends)]
+        except UnicodeDecodeError:
+            raise InvalidSnapshotError("字符串不是有效的UTF-8")
+
+
+def read_header(path: str) -> Tuple[int, int]:
+    """读取快照的记录数和ID计数值上界"""
+    with open(path, "rb") as f:
+        data = f.read(len(SNAPSHOT_MAGIC) + _HEADER.size)
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or len(data) < len(SNAPSHOT_MAGIC) + _HEADER.size:
+        raise InvalidSnapshotError("无法识别的文件头或版本")
+    return _HEADER.unpack(data[len(SNAPSHOT_MAGIC):])
+
+
+def read_snapshot(path: str) -> Tuple[List[URLRecord], int]:
+    """读入快照文件并构造记录，返回（记录列表, ID计数值上界）"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data:
+        raise InvalidSnapshotError("文件为空")
+    view = memoryview(data)
+    try:
+        reader = _Reader(view)
+        if reader.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise InvalidSnapshotError("无法识别的文件头或版本")
+        count, id_counter = _HEADER.unpack(reader.read(_HEADER.size))
+        
+        created_at = reader.column("q", count)
+        expires_at = [None if value == _NULL else value for value in reader.column("q", count)]
+        last_accessed = [None if value == _NULL else value for value in reader.column("q", count)]
+        click_count = reader.column("q", count)
+        is_active = list(map(bool, reader.column("B", count)))
+        base_index = reader.column("I", count)
+        ids = reader.strings(count)
+        original_urls = reader.strings(count)
+        aliases = [alias or None for alias in reader.strings(count)]
+        canonical_keys = [key or None for key in reader.strings(count)]
+        bases = reader.strings()
+        try:
+            base_urls = [bases[index] for index in base_index]
+        except IndexError:
+            raise InvalidSnapshotError("基础URL序号越界")
+    finally:
+        view.release()
+    
+    records = list(map(
+        URLRecord,
+        ids, original_urls, base_urls, created_at, expires_at,
+        last_accessed, click_count, is_active, aliases, canonical_keys,
+    ))
+    return records, id_counter
+
+
+async def export_snapshot(storage, path: str) -> int:
+    """把存储中的全部链接导出为快照文件，返回记录数（编码在线程中进行）"""
+    records, id_counter = await storage.export_records()
+    await asyncio.to_thread(write_snapshot, path, records, id_counter)
+    return len(records)
+
+
+async def import_snapshot(storage, path: str) -> int:
+    """
+    把快照文件导入存储（同ID的已有链接被替换），返回导入的记录数
+    
+    读取和解码在线程中进行，存储只在事件循环上做最后的批量合并；
+    期间暂停分代GC（百万级新对象会反复触发全量回收），结束后恢复，不冻结对象
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        records, id_counter = await asyncio.to_thread(read_snapshot, path)
+        return await storage.import_records(records, id_counter)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+async def _run_local(args) -> int:
+    from config import settings
+    from utils.storage import create_storage
+    
+    storage = create_storage(settings)
+    try:
+        if args.command == "export":
+            return await export_snapshot(storage, args.path)
+        return await import_snapshot(storage, args.path)
+    finally:
+        await storage.close()
+
+
+def _run_remote(args) -> int:
+    import httpx
+    
+    headers = {"X-Admin-Token": args.token or ""}
+    url = args.url.rstrip("/") + _ADMIN_PATH
+    with httpx.Client(timeout=None) as client:
+        if args.command == "export":
+            with client.stream("GET", url, headers=headers) as response:
+                response.raise_for_status()
+                with open(args.path, "wb") as f:
+                    for chunk in response.iter_bytes(1 << 20):
+                        f.write(chunk)
+            return read_header(args.path)[0]
+        
+        def chunks():
+            with open(args.path, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    yield chunk
+        
+        headers["Content-Type"] = SNAPSHOT_MEDIA_TYPE
+        response = client.post(url, content=chunks(), headers=headers)
+        response.raise_for_status()
+        return response.json()["imported"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列式二进制链接快照导出和导入")
+    parser.add_argument("command", choices=("export", "import", "info"))
+    parser.add_argument("path", help="快照文件路径")
+    parser.add_argument("--url", help="经运行中服务的管理接口导出或导入，不指定则直接操作本地存储")
+    parser.add_argument("--token", help="管理接口令牌（ADMIN_TOKEN）")
+    args = parser.parse_args()
+    
+    if args.command == "info":
+        count, id_counter = read_header(args.path)
+        print(f"version={SNAPSHOT_VERSION} records={count} id_counter={id_counter}")
+        return
+    
+    started = time.perf_counter()
+    count = _run_remote(args) if args.url else asyncio.run(_run_local(args))
+    print(f"{args.command}: {count} 条链接, {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
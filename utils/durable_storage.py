@@ -0,0 +1,293 @@
+import asyncio
+import gc
+import json
+import logging
+import marshal
+import os
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from utils.storage import URLStorage
+from utils.url_record import URLRecord
+from utils.hyperloglog import new_sketch, merge_sparse, sparse_registers
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"URLSNAP\x01"
+
+
+class DurableURLStorage(URLStorage):
+    """
+    本地持久化存储后端
+    
+    数据仍全部保存在内存中，所有变更追加写入操作日志（JSON Lines），
+    并发写入合并为一次fsync（组提交）后才返回。点击计数不逐次写日志，
+    而是随下一批fsync以绝对值写入。日志累计到一定条数后生成紧凑快照并截断日志，
+    重启时加载快照再重放日志尾部即可恢复。ID计数值和短ID置换密钥随快照保存，点击时间序列随快照保存，
+    快照之后的部分由重放时相邻两次点击计数之差按最后访问时间重新累计；
+    独立访客统计随快照保存，每次合并以非零寄存器写入日志
+    """
+    
+    def __init__(
+        self,
+        data_dir: str,
+        fsync_delay: float = 0.002,
+        snapshot_ops: int = 1_000_000,
+        search_index: bool = False,
+        click_series: bool = False,
+    ):
+        super().__init__(search_index=search_index, click_series=click_series)
+        os.makedirs(data_dir, exist_ok=True)
+        self._snapshot_path = os.path.join(data_dir, "snapshot.dat")
+        self._log_path = os.path.join(data_dir, "oplog.jsonl")
+        self._prev_log_path = os.path.join(data_dir, "oplog.prev.jsonl")
+        self._fsync_delay = fsync_delay
+        self._snapshot_ops = snapshot_ops
+        
+        self._dirty_clicks: Dict[str, URLRecord] = {}  # 待写入日志的点击计数
+        self._log_ops = 0  # 当前日志中的操作条数
+        self._sync_future: Optional[asyncio.Future] = None
+        self._io_lock: Optional[asyncio.Lock] = None
+        self._compact_task: Optional[asyncio.Task] = None
+        
+        self.recovery_stats = self._recover()
+        self._log = open(self._log_path, "ab", buffering=1 << 20)
+    
+    async def flush(self) -> None:
+        """立即把已记录的变更（含点击计数）写入日志并fsync"""
+        await self._commit()
+    
+    async def compact(self) -> int:
+        """生成新快照并截断操作日志，返回快照中的记录数"""
+        async with self._get_io_lock():
+            self._write_dirty_clicks()
+            # 按排序索引顺序写出，恢复时可直接追加而无需插入排序
+            rows = [record.astuple() for record in self._order]
+            series = [(url_id, data.tobytes()) for url_id, data in self._series.items()]
+            visitors = [(url_id, bytes(registers)) for url_id, registers in self._visitors.items()]
+            id_counter = self._id_counter
+            id_secret = self._id_secret
+            
+            # 轮换日志：此后的变更写入新日志，旧日志在快照落盘后删除
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            os.replace(self._log_path, self._prev_log_path)
+            self._log = open(self._log_path, "ab", buffering=1 << 20)
+            self._log_ops = 0
+        
+        await asyncio.to_thread(self._write_snapshot, rows, series, visitors, id_counter, id_secret)
+        os.remove(self._prev_log_path)
+        return len(rows)
+    
+    async def import_records(self, records: List[URLRecord], id_counter: int = 0) -> int:
+        """批量导入后直接生成新快照，而不是为每条记录写一条日志"""
+        for record in records:
+            self._dirty_clicks.pop(record.id, None)
+        imported = await super().import_records(records, id_counter)
+        await self.compact()
+        return imported
+    
+    async def close(self) -> None:
+        """等待进行中的快照，写入剩余变更并关闭日志"""
+        if self._sync_future is not None:
+            await asyncio.shield(self._sync_future)
+        if self._compact_task is not None:
+            await self._compact_task
+        async with self._get_io_lock():
+            self._write_dirty_clicks()
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+    
+    # 持久化钩子
+    
+    def _log_put(self, record: URLRecord) -> None:
+        self._dirty_clicks.pop(record.id, None)
+        self._append(["p", record.astuple()])
+    
+    def _log_delete(self, url_id: str) -> None:
+        self._dirty_clicks.pop(url_id, None)
+        self._append(["d", url_id])
+    
+    def _log_clicks(self, record: URLRecord) -> None:
+        self._dirty_clicks[record.id] = record
+        self._schedule_sync()
+    
+    def _log_id_counter(self, value: int) -> None:
+        self._append(["n", value])
+    
+    def _log_visitors(self, url_id: str, registers: bytes) -> None:
+        self._append(["v", url_id, sparse_registers(registers)])
+    
+    def _log_id_secret(self, secret: str) -> None:
+        self._append(["s", secret])
+    
+    async def _commit(self) -> None:
+        await asyncio.shield(self._schedule_sync())
+    
+    # 日志写入与组提交
+    
+    def _append(self, op: list) -> None:
+        self._log.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")).encode() + b"\n")
+        self._log_ops += 1
+    
+    def _write_dirty_clicks(self) -> None:
+        if not self._dirty_clicks:
+            return
+        clicks = [
+            (record.id, record.click_count, record.last_accessed)
+            for record in self._dirty_clicks.values()
+        ]
+        self._dirty_clicks = {}
+        self._append(["k", clicks])
+    
+    def _get_io_lock(self) -> asyncio.Lock:
+        if self._io_lock is None:
+            self._io_lock = asyncio.Lock()
+        return self._io_lock
+    
+    def _schedule_sync(self) -> asyncio.Future:
+        """加入下一批fsync；等待窗口内的所有写入共用一次fsync"""
+        if self._sync_future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            # 无人等待（只有点击计数）时避免未取回异常的警告
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._sync_future = future
+            loop.call_later(self._fsync_delay, lambda: asyncio.ensure_future(self._sync(future)))
+        return self._sync_future
+    
+    async def _sync(self, future: asyncio.Future) -> None:
+        async with self._get_io_lock():
+            # 从此刻起的新写入进入下一批
+            if self._sync_future is future:
+                self._sync_future = None
+            try:
+                self._write_dirty_clicks()
+                self._log.flush()
+                await asyncio.to_thread(os.fsync, self._log.fileno())
+            except Exception as exc:
+                logger.exception("操作日志fsync失败")
+                future.set_exception(exc)
+                return
+        future.set_result(None)
+        
+        if self._log_ops >= self._snapshot_ops and (self._compact_task is None or self._compact_task.done()):
+            self._compact_task = asyncio.ensure_future(self.compact())
+    
+    # 快照与恢复
+    
+    def _write_snapshot(self, rows: list, series: list, visitors: list, id_counter: int, id_secret: Optional[str]) -> None:
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(marshal.dumps((id_counter, id_secret, rows, series, visitors)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        dir_fd = os.open(os.path.dirname(self._snapshot_path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    
+    def _recover(self) -> dict:
+        """加载快照并按顺序重放旧日志和当前日志（日志操作均为幂等的全量写入）"""
+        started = time.perf_counter()
+        snapshot_records = 0
+        replayed = 0
+        
+        # 恢复期间会创建数百万个对象，暂停分代GC可避免反复扫描
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if os.path.exists(self._snapshot_path):
+                with open(self._snapshot_path, "rb") as f:
+                    if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                        raise ValueError(f"无法识别的快照文件: {self._snapshot_path}")
+                    self._id_counter, self._id_secret, rows, series, visitors = marshal.loads(f.read())
+                for row in rows:
+                    self._insert_record(URLRecord(*row))
+                for url_id, data in series:
+                    if url_id in self._storage:
+                        self._series[url_id] = array("I", data)
+                for url_id, registers in visitors:
+                    if url_id in self._storage:
+                        self._visitors[url_id] = bytearray(registers)
+                snapshot_records = len(rows)
+                del rows, series, visitors
+            
+            for path in (self._prev_log_path, self._log_path):
+                if os.path.exists(path):
+                    replayed += self._replay(path, truncate_torn=(path == self._log_path))
+            self._log_ops = replayed
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        
+        return {
+            "snapshot_records": snapshot_records,
+            "replayed_ops": replayed,
+            "seconds": time.perf_counter() - started,
+        }
+    
+    def _replay(self, path: str, truncate_torn: bool) -> int:
+        replayed = 0
+        valid_size = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    op = json.loads(line)
+                except ValueError:
+                    # 崩溃时最后一行可能只写了一半，丢弃并截断
+                    logger.warning("操作日志%s在偏移%d处损坏，忽略其后内容", path, valid_size)
+                    break
+                self._apply_op(op)
+                valid_size += len(line)
+                replayed += 1
+        if truncate_torn and valid_size != os.path.getsize(path):
+            os.truncate(path, valid_size)
+        return replayed
+    
+    def _apply_op(self, op: list) -> None:
+        kind = op[0]
+        if kind == "p":
+            record = URLRecord(*op[1])
+            existing = self._storage.get(record.id)
+            if existing is not None:
+                self._replay_clicks(existing, record.click_count, record.last_accessed)
+                self._replace_record(existing, record)
+            else:
+                self._insert_record(record)
+        elif kind == "d":
+            existing = self._storage.get(op[1])
+            if existing is not None:
+                self._remove_record(existing)
+        elif kind == "n":
+            self._id_counter = max(self._id_counter, op[1])
+        elif kind == "s":
+            if self._id_secret is None:
+                self._id_secret = op[1]
+        elif kind == "k":
+            for url_id, click_count, last_accessed in op[1]:
+                record = self._storage.get(url_id)
+                if record is not None:
+                    self._replay_clicks(record, click_count, last_accessed)
+                    record.click_count = click_count
+                    record.last_accessed = last_accessed
+        elif kind == "v":
+            if op[1] in self._storage:
+                registers = self._visitors.get(op[1])
+                if registers is None:
+                    registers = self._visitors[op[1]] = new_sketch()
+                merge_sparse(registers, op[2])
+    
+    def _replay_clicks(self, record: URLRecord, click_count: int, last_accessed: Optional[int]) -> None:
+        """把日志中点击计数的增量按最后访问时间计入时间序列（一批fsync内的点击相隔不超过fsync等待窗口）"""
+        if click_count > record.click_count and last_accessed is not None:
+            self._record_series(record.id, last_accessed, click_count - record.click_count)
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from config import settings
+from utils.url_record import now_micros
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryReaper:
+    """
+    过期链接清理任务
+    
+    定期从存储的过期索引中删除过期超过宽限期的链接。每批最多删除batch_size条，
+    批次之间让出事件循环，避免大量链接同时过期时长时间阻塞请求处理。
+    on_reaped在每批删除后收到被删除的链接ID，用于丢弃进程内的缓存和待合并统计
+    """
+    
+    def __init__(self, grace_period: float = 0, batch_size: int = 1000):
+        self._grace_period = grace_period
+        self._batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._storage = None
+        self._on_reaped: Optional[Callable[[List[str]], None]] = None
+    
+    async def reap(
+        self,
+        storage=None,
+        now: Optional[int] = None,
+        on_reaped: Optional[Callable[[List[str]], None]] = None
+    ) -> int:
+        """清理全部过期超过宽限期的链接，返回删除数"""
+        storage = storage or self._storage
+        on_reaped = on_reaped or self._on_reaped
+        if now is None:
+            now = now_micros()
+        before = now - int(self._grace_period * 1_000_000)
+        
+        total = 0
+        while True:
+            reaped = await storage.reap_expired(before, self._batch_size)
+            if reaped and on_reaped is not None:
+                on_reaped(reaped)
+            total += len(reaped)
+            if len(reaped) < self._batch_size:
+                return total
+            await asyncio.sleep(0)
+    
+    def start(self, storage, interval: float, on_reaped: Optional[Callable[[List[str]], None]] = None) -> None:
+        """启动后台定期清理任务"""
+        self._storage = storage
+        self._on_reaped = on_reaped
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(interval))
+    
+    async def stop(self) -> None:
+        """停止后台任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                reaped = await self.reap()
+            except Exception:
+                logger.exception("过期链接清理失败")
+                continue
+            if reaped:
+                logger.info("已清理%d条过期链接", reaped)
+
+
+# 全局过期清理实例
+expiry_reaper = ExpiryReaper(
+    grace_period=settings.expiry_grace_period,
+    batch_size=settings.expiry_reap_batch_size
+)
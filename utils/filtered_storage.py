@@ -0,0 +1,218 @@
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from models.url_models import URLResponse
+from utils.url_record import URLRecord
+from utils.base_storage import BaseURLStorage
+from utils.bloom_filter import CountingBloomFilter
+from exceptions.url_exceptions import URLNotFoundError
+
+
+class FilteredStorage(BaseURLStorage):
+    """
+    带成员过滤器的存储包装
+    
+    在进程内维护全部ID和别名的计数布隆过滤器，按ID或别名查找时先查过滤器，
+    确定不存在的键直接返回未找到，不访问后端。过滤器随本实例的创建和删除更新，
+    启动时由warm()从后端加载；加载完成前不拒绝任何请求。
+    
+    只有本进程能看到全部写入时才可以启用：多个实例或worker写同一个Redis或共享内存表时，
+    其他实例新建的链接不在本进程的过滤器中，会被误判为不存在
+    """
+    
+    def __init__(self, storage: BaseURLStorage, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self._storage = storage
+        self._filter = CountingBloomFilter(capacity, error_rate)
+        self._ready = False
+        self.rejections = 0
+    
+    def __getattr__(self, name):
+        # 后端特有的属性和方法直接透传
+        if name == "_storage":
+            raise AttributeError(name)
+        return getattr(self._storage, name)
+    
+    @property
+    def ready(self) -> bool:
+        return self._ready
+    
+    async def warm(self) -> int:
+        """从后端加载全部ID和别名，返回加载的键数"""
+        loaded = 0
+        async for key in self._storage.iter_keys():
+            self._filter.add(key)
+            loaded += 1
+        self._ready = True
+        return loaded
+    
+    def might_exist(self, url_id: str) -> bool:
+        """过滤器判断键可能存在；加载完成前总是返回True"""
+        if not self._ready or url_id in self._filter:
+            return True
+        self.rejections += 1
+        return False
+    
+    # 写操作：后端成功后更新过滤器
+    
+    async def create_url(self, url_data: dict) -> URLResponse:
+        url = await self._storage.create_url(url_data)
+        self._add(url.id, url_data.get("custom_alias"))
+        return url
+    
+    async def create_urls(self, url_data_list: List[dict]) -> List[URLResponse]:
+        urls = await self._storage.create_urls(url_data_list)
+        for url, url_data in zip(urls, url_data_list):
+            self._add(url.id, url_data.get("custom_alias"))
+        return urls
+    
+    async def create_url_if_absent(self, url_data: dict) -> Optional[URLResponse]:
+        url = await self._storage.create_url_if_absent(url_data)
+        if url is not None:
+            self._add(url.id, url_data.get("custom_alias"))
+        return url
+    
+    async def create_urls_if_absent(self, url_data_list: List[dict]) -> List[Optional[URLResponse]]:
+        urls = await self._storage.create_urls_if_absent(url_data_list)
+        for url, url_data in zip(urls, url_data_list):
+            if url is not None:
+                self._add(url.id, url_data.get("custom_alias"))
+        return urls
+    
+    async def update_url(self, url_id: str, update_data: dict) -> Optional[URLResponse]:
+        if not self.might_exist(url_id):
+            return None
+        url = await self._storage.update_url(url_id, update_data)
+        if url is not None and update_data.get("custom_alias"):
+            # 旧别名的计数保留，只会多一个误判，不会漏判
+            self._filter.add(update_data["custom_alias"])
+        return url
+    
+    async def delete_url(self, url_id: str) -> bool:
+        """删除前读取记录以取得别名，删除成功后从过滤器中移除ID和别名"""
+        if not self.might_exist(url_id):
+            return False
+        data = await self._storage.get_stats(url_id)
+        deleted = await self._storage.delete_url(url_id)
+        if deleted and data is not None and self._ready:
+            self._filter.remove(data["id"])
+            if data.get("custom_alias"):
+                self._filter.remove(data["custom_alias"])
+        return deleted
+    
+    async def reap_expired(self, before: int, limit: int) -> List[str]:
+        """清理结果只有ID，被清理链接的别名计数保留（只会多误判，不会漏判）"""
+        ids = await self._storage.reap_expired(before, limit)
+        if self._ready:
+            for url_id in ids:
+                self._filter.remove(url_id)
+        return ids
+    
+    async def delete_domain_urls(self, domain: str) -> List[str]:
+        """与清理过期链接相同，只从过滤器中移除被删除的ID"""
+        ids = await self._storage.delete_domain_urls(domain)
+        if self._ready:
+            for url_id in ids:
+                self._filter.remove(url_id)
+        return ids
+    
+    # 按ID或别名的查找：过滤器判断不存在时直接返回
+    
+    async def get_url(self, url_id: str) -> Optional[URLResponse]:
+        if not self.might_exist(url_id):
+            return None
+        return await self._storage.get_url(url_id)
+    
+    async def increment_click_count(self, url_id: str) -> Optional[int]:
+        if not self.might_exist(url_id):
+            return None
+        return await self._storage.increment_click_count(url_id)
+    
+    async def resolve_and_count(self, url_id: str) -> str:
+        if not self.might_exist(url_id):
+            raise URLNotFoundError(url_id)
+        return await self._storage.resolve_and_count(url_id)
+    
+    async def resolve_url(self, url_id: str) -> str:
+        if not self.might_exist(url_id):
+            raise URLNotFoundError(url_id)
+        return await self._storage.resolve_url(url_id)
+    
+    async def alias_exists(self, alias: str) -> bool:
+        if not self.might_exist(alias):
+            return False
+        return await self._storage.alias_exists(alias)
+    
+    async def aliases_exist(self, aliases: List[str]) -> Set[str]:
+        candidates = [alias for alias in aliases if self.might_exist(alias)]
+        if not candidates:
+            return set()
+        return await self._storage.aliases_exist(candidates)
+    
+    async def get_stats(self, url_id: str) -> Optional[dict]:
+        if not self.might_exist(url_id):
+            return None
+        return await self._storage.get_stats(url_id)
+    
+    # 其余操作直接委托
+    
+    async def apply_click_deltas(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        await self._storage.apply_click_deltas(deltas)
+    
+    async def get_all_urls(self) -> List[URLResponse]:
+        return await self._storage.get_all_urls()
+    
+    async def list_urls(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        return await self._storage.list_urls(limit, cursor)
+    
+    async def find_canonical(self, keys: List[str]) -> Dict[str, URLResponse]:
+        return await self._storage.find_canonical(keys)
+    
+    async def list_domain_urls(self, domain: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        return await self._storage.list_domain_urls(domain, limit, cursor)
+    
+    async def get_domain_stats(self, domain: str) -> dict:
+        return await self._storage.get_domain_stats(domain)
+    
+    async def set_domain_active(self, domain: str, is_active: bool) -> List[str]:
+        return await self._storage.set_domain_active(domain, is_active)
+    
+    async def search_urls(self, query: str, mode: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        return await self._storage.search_urls(query, mode, limit, cursor)
+    
+    async def get_click_series(self, url_id: str, granularity: str) -> Tuple[int, List[int]]:
+        return await self._storage.get_click_series(url_id, granularity)
+    
+    async def merge_visitor_sketches(self, sketches: Dict[str, bytes]) -> None:
+        await self._storage.merge_visitor_sketches(sketches)
+    
+    async def get_visitor_sketch(self, url_id: str) -> bytes:
+        return await self._storage.get_visitor_sketch(url_id)
+    
+    async def reserve_id_block(self, size: int) -> int:
+        return await self._storage.reserve_id_block(size)
+    
+    async def load_id_secret(self, candidate: str) -> str:
+        return await self._storage.load_id_secret(candidate)
+    
+    async def export_records(self) -> Tuple[List[URLRecord], int]:
+        return await self._storage.export_records()
+    
+    async def import_records(self, records: List[URLRecord], id_counter: int = 0) -> int:
+        imported = await self._storage.import_records(records, id_counter)
+        for record in records:
+            self._add(record.id, record.custom_alias)
+        return imported
+    
+    def iter_urls(self, cursor: Optional[str] = None, batch_size: int = 500) -> AsyncIterator[URLResponse]:
+        return self._storage.iter_urls(cursor, batch_size)
+    
+    def iter_keys(self) -> AsyncIterator[str]:
+        return self._storage.iter_keys()
+    
+    async def close(self) -> None:
+        await self._storage.close()
+    
+    def _add(self, url_id: str, alias: Optional[str]) -> None:
+        self._filter.add(url_id)
+        if alias:
+            self._filter.add(alias)
+
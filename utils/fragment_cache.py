@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import List
+
+from config import settings
+from utils.metrics import registry
+from models.url_models import URLResponse
+
+
+_CLICK_FIELD = ',"click_count":'
+
+
+class JSONFragment:
+    """一条链接的JSON序列化结果，以click_count的值为界分成前后两段"""
+    
+    __slots__ = ("prefix", "suffix", "version")
+    
+    def __init__(self, prefix: bytes, suffix: bytes, version: tuple):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.version = version  # 生成片段时的可变字段，与读取结果不一致时重新序列化
+
+
+def _version(url_data: URLResponse) -> tuple:
+    return (url_data.original_url, url_data.expires_at, url_data.is_active)
+
+
+class FragmentCache:
+    """
+    链接JSON片段缓存
+    
+    按链接ID缓存URLResponse序列化后的字节（与response_model输出相同），列表和详情响应
+    直接拼接片段，省去模型校验和逐字段序列化。点击次数变化频繁，不进入缓存，拼接时填入；
+    其余可变字段与缓存时不同（例如被其他实例修改）时重新序列化，更新和删除时主动失效
+    """
+    
+    def __init__(self, max_size: int = 50000):
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, JSONFragment]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def render(self, url_data: URLResponse) -> bytes:
+        """序列化一条链接，命中缓存时只拼接点击次数"""
+        fragment = self._entries.get(url_data.id)
+        if fragment is not None and fragment.version == _version(url_data):
+            self._entries.move_to_end(url_data.id)
+            self.hits += 1
+        else:
+            self.misses += 1
+            fragment = self._put(url_data)
+        return b"%s%d%s" % (fragment.prefix, url_data.click_count, fragment.suffix)
+    
+    def render_list(self, urls: List[URLResponse]) -> bytes:
+        """序列化链接列表为JSON数组"""
+        return b"[" + b",".join([self.render(url_data) for url_data in urls]) + b"]"
+    
+    def invalidate(self, *url_ids: str) -> None:
+        for url_id in url_ids:
+            self._entries.pop(url_id, None)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def _put(self, url_data: URLResponse) -> JSONFragment:
+        head, tail = url_data.model_dump_json().split(_CLICK_FIELD, 1)
+        fragment = JSONFragment(
+            (head + _CLICK_FIELD).encode(),
+            tail[len(str(url_data.click_count)):].encode(),
+            _version(url_data),
+        )
+        self._entries[url_data.id] = fragment
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return fragment
+
+
+# 全局JSON片段缓存实例，FRAGMENT_CACHE_SIZE为0时不启用
+fragment_cache = FragmentCache(settings.fragment_cache_size) if settings.fragment_cache_size > 0 else None
+
+if fragment_cache is not None:
+    registry.callback("fragment_cache_hits_total", "JSON片段缓存命中数", lambda: fragment_cache.hits, kind="counter")
+    registry.callback("fragment_cache_misses_total", "JSON片段缓存未命中数", lambda: fragment_cache.misses, kind="counter")
+    registry.callback("fragment_cache_entries", "JSON片段缓存当前条目数", lambda: len(fragment_cache))
@@ -0,0 +1,76 @@
+import hashlib
+import math
+from typing import Iterable, List, Tuple
+
+
+# 2^10个6位以内的寄存器，每个占一个字节，标准误差约1.04/sqrt(1024) ≈ 3.3%
+PRECISION = 10
+REGISTERS = 1 << PRECISION
+_VALUE_BITS = 64 - PRECISION
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+_POWERS = [2.0 ** -rank for rank in range(_VALUE_BITS + 2)]
+
+# 全零寄存器，链接尚无访客记录时返回
+EMPTY_SKETCH = bytes(REGISTERS)
+
+
+def visitor_register(visitor: str) -> Tuple[int, int]:
+    """
+    计算访客对应的寄存器：(寄存器下标, 取值)
+    
+    64位哈希的高PRECISION位选择寄存器，其余位中最高位1的位置（从1计）为取值
+    """
+    value = int.from_bytes(hashlib.blake2b(visitor.encode(), digest_size=8).digest(), "big")
+    return value >> _VALUE_BITS, _VALUE_BITS - (value & _VALUE_MASK).bit_length() + 1
+
+
+def new_sketch() -> bytearray:
+    """分配一个全零的HyperLogLog寄存器数组"""
+    return bytearray(REGISTERS)
+
+
+def add_register(registers: bytearray, index: int, rank: int) -> None:
+    """按(下标, 取值)更新寄存器"""
+    if registers[index] < rank:
+        registers[index] = rank
+
+
+def merge_sketch(registers: bytearray, other: bytes) -> None:
+    """把另一个寄存器数组按位取最大值合并进来，合并结果等同于对两组访客的并集计数"""
+    registers[:] = bytes(map(max, registers, other))
+
+
+def sparse_registers(registers: bytes) -> List[Tuple[int, int]]:
+    """非零寄存器的(下标, 取值)列表，用于日志和网络传输"""
+    return [(index, rank) for index, rank in enumerate(registers) if rank]
+
+
+def merge_sparse(registers: bytearray, pairs: Iterable[Tuple[int, int]]) -> None:
+    """合并sparse_registers()格式的寄存器"""
+    for index, rank in pairs:
+        if registers[index] < rank:
+            registers[index] = rank
+
+
+def estimate(registers: bytes) -> int:
+    """估计不同访客数；基数较小时使用线性计数修正"""
+    total = 0.0
+    zeros = 0
+    for rank in registers:
+        total += _POWERS[rank]
+        if not rank:
+            zeros += 1
+    raw = _ALPHA * REGISTERS * REGISTERS / total
+    if raw <= 2.5 * REGISTERS and zeros:
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
+
+
+def merge_sketches(sketches: Iterable[bytes]) -> bytearray:
+    """合并多个寄存器数组（如各worker或各节点的统计）"""
+    merged = new_sketch()
+    for sketch in sketches:
+        merge_sketch(merged, sketch)
+    return merged
+
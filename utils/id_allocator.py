@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import secrets
+import string
+from typing import Awaitable, Callable, List, Optional
+
+from config import settings
+from utils.storage import url_storage
+
+
+ALPHABET = string.ascii_letters + string.digits
+ID_LENGTH = 8
+ID_SPACE = len(ALPHABET) ** ID_LENGTH  # 62^8 ≈ 2.18e14
+
+_HALF_BITS = 24  # 2^48 > 62^8，在48位上做Feistel置换再循环行走回落到ID空间
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUNDS = 4
+
+
+def encode_base62(value: int, length: int = ID_LENGTH) -> str:
+    """定长base62编码"""
+    chars = []
+    for _ in range(length):
+        value, rem = divmod(value, 62)
+        chars.append(ALPHABET[rem])
+    return "".join(reversed(chars))
+
+
+def decode_base62(text: str) -> int:
+    """base62解码"""
+    value = 0
+    for char in text:
+        value = value * 62 + ALPHABET.index(char)
+    return value
+
+
+class IDPermutation:
+    """
+    ID空间上的可逆置换
+    
+    4轮Feistel网络（轮函数为带密钥的BLAKE2b）作用在48位整数上，
+    结果超出62^8时继续置换（循环行走），保证输入输出一一对应
+    """
+    
+    def __init__(self, secret: str):
+        self._key = hashlib.blake2b(secret.encode(), digest_size=32).digest()
+    
+    def _round(self, round_index: int, half: int) -> int:
+        digest = hashlib.blake2b(
+            half.to_bytes(3, "big") + bytes((round_index,)),
+            key=self._key,
+            digest_size=3,
+        ).digest()
+        return int.from_bytes(digest, "big")
+    
+    def _feistel(self, value: int) -> int:
+        left, right = value >> _HALF_BITS, value & _HALF_MASK
+        for i in range(_ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << _HALF_BITS) | right
+    
+    def _feistel_inverse(self, value: int) -> int:
+        left, right = value >> _HALF_BITS, value & _HALF_MASK
+        for i in reversed(range(_ROUNDS)):
+            left, right = right ^ self._round(i, left), left
+        return (left << _HALF_BITS) | right
+    
+    def permute(self, value: int) -> int:
+        value = self._feistel(value)
+        while value >= ID_SPACE:
+            value = self._feistel(value)
+        return value
+    
+    def inverse(self, value: int) -> int:
+        value = self._feistel_inverse(value)
+        while value >= ID_SPACE:
+            value = self._feistel_inverse(value)
+        return value
+
+
+class IDAllocator:
+    """
+    分块预留的短ID分配器
+    
+    从存储后端一次预留一整块连续计数值（共享后端上只需偶尔一次往返），
+    块内计数值经密钥置换后编码为8位base62 ID。计数值不重复，ID即不重复，
+    因此生成ID时无需再查询存储确认是否已存在
+    
+    未配置密钥时，首次补充计数值前经load_secret从存储读取置换密钥，
+    存储中尚无密钥则保存一个随机生成的密钥，保证重启和多实例使用同一置换；
+    没有load_secret时使用仅在本进程内有效的随机密钥
+    """
+    
+    def __init__(
+        self,
+        reserve_block: Callable[[int], Awaitable[int]],
+        block_size: int = 1000,
+        secret: str = "",
+        load_secret: Optional[Callable[[str], Awaitable[str]]] = None,
+    ):
+        self._reserve_block = reserve_block
+        self._block_size = block_size
+        self._load_secret = load_secret
+        self._permutation = IDPermutation(secret) if secret else None
+        if self._permutation is None and load_secret is None:
+            self._permutation = IDPermutation(secrets.token_urlsafe(24))
+        self._next = 0
+        self._end = 0
+        self._lock = None
+    
+    async def next_id(self) -> str:
+        """分配一个短ID"""
+        return (await self.next_ids(1))[0]
+    
+    async def next_ids(self, count: int) -> List[str]:
+        """批量分配短ID"""
+        counters = []
+        while len(counters) < count:
+            if self._next >= self._end:
+                await self._refill(count - len(counters))
+                continue
+            take = min(count - len(counters), self._end - self._next)
+            counters.extend(range(self._next, self._next + take))
+            self._next += take
+        return [encode_base62(self._permutation.permute(counter)) for counter in counters]
+    
+    async def _refill(self, needed: int) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # 等锁期间其他协程可能已经补充了新块
+            if self._next < self._end:
+                return
+            if self._permutation is None:
+                self._permutation = IDPermutation(await self._load_secret(secrets.token_urlsafe(24)))
+            size = max(self._block_size, needed)
+            start = await self._reserve_block(size)
+            self._next, self._end = start, start + size
+
+
+# 全局ID分配器，从全局存储后端预留计数值
+id_allocator = IDAllocator(
+    url_storage.reserve_id_block,
+    block_size=settings.id_block_size,
+    secret=settings.id_secret,
+    load_secret=url_storage.load_id_secret,
+)
@@ -0,0 +1,87 @@
+import time
+from typing import AsyncIterator, Optional
+
+from models.url_models import URLResponse
+from utils.base_storage import BaseURLStorage
+from utils.metrics import storage_operation_duration_seconds, storage_operation_errors_total
+from exceptions.url_exceptions import URLShortenerException
+
+
+def _timed(operation: str):
+    """生成带计时的委托方法；直方图和计数器在定义时预先分配"""
+    duration = storage_operation_duration_seconds.labels(operation)
+    errors = storage_operation_errors_total.labels(operation)
+    
+    async def method(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await getattr(self._storage, operation)(*args, **kwargs)
+        except URLShortenerException:
+            # 未找到、已过期、别名冲突等是正常的业务结果，不计为存储异常
+            raise
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+    
+    method.__name__ = operation
+    return method
+
+
+class InstrumentedStorage(BaseURLStorage):
+    """
+    带指标的存储包装
+    
+    把每个存储操作委托给实际后端，并按操作记录耗时和异常数
+    """
+    
+    create_url = _timed("create_url")
+    create_urls = _timed("create_urls")
+    create_url_if_absent = _timed("create_url_if_absent")
+    create_urls_if_absent = _timed("create_urls_if_absent")
+    get_url = _timed("get_url")
+    update_url = _timed("update_url")
+    delete_url = _timed("delete_url")
+    increment_click_count = _timed("increment_click_count")
+    resolve_and_count = _timed("resolve_and_count")
+    resolve_url = _timed("resolve_url")
+    apply_click_deltas = _timed("apply_click_deltas")
+    get_all_urls = _timed("get_all_urls")
+    list_urls = _timed("list_urls")
+    alias_exists = _timed("alias_exists")
+    aliases_exist = _timed("aliases_exist")
+    get_stats = _timed("get_stats")
+    reap_expired = _timed("reap_expired")
+    find_canonical = _timed("find_canonical")
+    list_domain_urls = _timed("list_domain_urls")
+    get_domain_stats = _timed("get_domain_stats")
+    set_domain_active = _timed("set_domain_active")
+    delete_domain_urls = _timed("delete_domain_urls")
+    search_urls = _timed("search_urls")
+    get_click_series = _timed("get_click_series")
+    merge_visitor_sketches = _timed("merge_visitor_sketches")
+    get_visitor_sketch = _timed("get_visitor_sketch")
+    reserve_id_block = _timed("reserve_id_block")
+    load_id_secret = _timed("load_id_secret")
+    export_records = _timed("export_records")
+    import_records = _timed("import_records")
+    
+    def __init__(self, storage: BaseURLStorage):
+        self._storage = storage
+    
+    def __getattr__(self, name):
+        # 后端特有的属性和方法直接透传
+        if name == "_storage":
+            raise AttributeError(name)
+        return getattr(self._storage, name)
+    
+    def iter_urls(self, cursor: Optional[str] = None, batch_size: int = 500) -> AsyncIterator[URLResponse]:
+        """逐页遍历由后端完成，各页的读取不单独计时"""
+        return self._storage.iter_urls(cursor, batch_size)
+    
+    def iter_keys(self) -> AsyncIterator[str]:
+        return self._storage.iter_keys()
+    
+    async def close(self) -> None:
+        await self._storage.close()
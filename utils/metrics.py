@@ -0,0 +1,199 @@
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# 默认延迟分桶（秒），覆盖进程内重定向的亚毫秒级到慢请求的数秒级
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class CounterValue:
+    """单个标签组合的计数器"""
+    
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0
+    
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class GaugeValue(CounterValue):
+    """单个标签组合的瞬时值"""
+    
+    __slots__ = ()
+    
+    def dec(self, amount: int = 1) -> None:
+        self.value -= amount
+    
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramValue:
+    """单个标签组合的直方图，各桶计数预先分配，观测只需一次二分查找和两次加法"""
+    
+    __slots__ = ("buckets", "counts", "sum")
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个桶为+Inf
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+    
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Metric:
+    """
+    一个指标族
+    
+    按标签值缓存各自的计数对象；热路径上应在初始化时调用labels()取得对象并保存，
+    此后每次记录都不再有字典查找或对象分配
+    """
+    
+    def __init__(self, name: str, documentation: str, kind: str, label_names: Tuple[str, ...] = (), factory=None):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.label_names = label_names
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+    
+    def labels(self, *values: str):
+        """取得某个标签组合的计数对象，不存在时创建"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._factory()
+        return child
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            if self.kind == "histogram":
+                lines.extend(self._render_histogram(values, child))
+            else:
+                lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}")
+        return lines
+    
+    def _render_histogram(self, values: Tuple[str, ...], child: HistogramValue) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(child.buckets + (math.inf,), child.counts):
+            cumulative += count
+            labels = _format_labels(self.label_names, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """抓取时才计算取值的指标（缓存命中率、缓冲区大小等），回调返回None时不输出"""
+    
+    def __init__(self, name: str, documentation: str, kind: str, callback: Callable[[], Optional[float]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self._callback = callback
+    
+    def render(self) -> List[str]:
+        value = self._callback()
+        if value is None:
+            return []
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            f"{self.name} {_format_value(value)}",
+        ]
+
+
+class MetricsRegistry:
+    """指标注册表，按Prometheus文本格式输出"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+    
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Metric:
+        return self._register(Metric(name, documentation, "counter", label_names, CounterValue))
+    
+    def gauge(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Metric:
+        return self._register(Metric(name, documentation, "gauge", label_names, GaugeValue))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Metric:
+        return self._register(Metric(name, documentation, "histogram", label_names, lambda: HistogramValue(buckets)))
+    
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Optional[float]],
+        kind: str = "gauge"
+    ) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, kind, callback))
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已注册: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+# 全局指标注册表与服务指标
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP请求数", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP请求处理耗时（秒）", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "正在处理的HTTP请求数"
+).labels()
+storage_operation_duration_seconds = registry.histogram(
+    "storage_operation_duration_seconds", "存储操作耗时（秒）", ("operation",)
+)
+storage_operation_errors_total = registry.counter(
+    "storage_operation_errors_total", "存储操作异常数（不含未找到、已过期等业务结果）", ("operation",)
+)
+url_dedup_hits_total = registry.counter(
+    "url_dedup_hits_total", "去重模式下返回已有链接的创建请求数"
+).labels()
@@ -0,0 +1,814 @@
+import heapq
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import redis.asyncio as redis
+
+from models.url_models import URLResponse
+from utils.base_storage import BaseURLStorage
+from utils.url_record import (
+    URLRecord,
+    now_micros,
+    encode_cursor,
+    decode_cursor,
+    encode_search_cursor,
+    decode_search_cursor
+)
+from utils.click_series import LEVELS, LEVEL_BY_NAME
+from utils.hyperloglog import REGISTERS, sparse_registers
+from utils.url_utils import get_domain_from_url
+from utils.search_index import fold, matches, prefix_key
+from exceptions.url_exceptions import URLNotFoundError, URLExpiredError, URLInactiveError
+
+
+# 以下Lua脚本先通过别名键解析实际ID（KEYS[1]别名键，KEYS[2]按原ID拼出的记录键），
+# 别名命中时按前缀拼出记录键，因此只适用于单实例Redis，不适用于集群模式
+
+# 点击时间序列：每条链接一个定长字符串，按utils/click_series.py的布局以BITFIELD读写uint32，
+# 与record_clicks逻辑相同
+_RECORD_SERIES_LUA = """
+local series_levels = {%s}
+local function record_series(key, now, count)
+    for _, level in ipairs(series_levels) do
+        local bucket = math.floor(now / level[2])
+        local head = redis.call('BITFIELD', key, 'GET', 'u32', '#' .. level[1])[1]
+        if bucket > head then
+            local args = {'SET', 'u32', '#' .. level[1], bucket}
+            for skipped = math.max(head + 1, bucket - level[3] + 1), bucket do
+                args[#args + 1] = 'SET'
+                args[#args + 1] = 'u32'
+                args[#args + 1] = '#' .. (level[4] + skipped %% level[3])
+                args[#args + 1] = 0
+            end
+            redis.call('BITFIELD', key, unpack(args))
+            head = bucket
+        end
+        if bucket > head - level[3] then
+            redis.call('BITFIELD', key, 'INCRBY', 'u32', '#' .. (level[4] + bucket %% level[3]), count)
+        end
+    end
+end
+""" % ", ".join("{%d, %d, %d, %d}" % level for level in LEVELS)
+
+# ARGV[4]为序列键前缀（为空表示不记录点击时间序列），ARGV[5]为请求中的ID
+_RESOLVE_SCRIPT = _RECORD_SERIES_LUA + """
+local key = KEYS[2]
+local url_id = ARGV[5]
+local id = redis.call('GET', KEYS[1])
+if id then
+    key = ARGV[1] .. id
+    url_id = id
+end
+local fields = redis.call('HMGET', key, 'original_url', 'expires_at', 'is_active')
+if not fields[1] then return {1} end
+if fields[2] and fields[2] ~= '' and tonumber(ARGV[2]) > tonumber(fields[2]) then return {2} end
+if fields[3] ~= '1' then return {3} end
+if ARGV[3] == '1' then
+    redis.call('HINCRBY', key, 'click_count', 1)
+    redis.call('HSET', key, 'last_accessed', ARGV[2])
+    if ARGV[4] ~= '' then
+        record_series(ARGV[4] .. url_id, math.floor(tonumber(ARGV[2]) / 1000000), 1)
+    end
+end
+return {0, fields[1]}
+"""
+
+# ARGV[4]为序列键前缀（为空表示不记录点击时间序列），ARGV[5]为请求中的ID
+_ADD_CLICKS_SCRIPT = _RECORD_SERIES_LUA + """
+local key = KEYS[2]
+local url_id = ARGV[5]
+local id = redis.call('GET', KEYS[1])
+if id then
+    key = ARGV[1] .. id
+    url_id = id
+end
+if redis.call('EXISTS', key) == 0 then return false end
+local count = redis.call('HINCRBY', key, 'click_count', ARGV[2])
+local last = redis.call('HGET', key, 'last_accessed')
+if not last or last == '' or tonumber(ARGV[3]) > tonumber(last) then
+    redis.call('HSET', key, 'last_accessed', ARGV[3])
+end
+if ARGV[4] ~= '' then
+    record_series(ARGV[4] .. url_id, math.floor(tonumber(ARGV[3]) / 1000000), tonumber(ARGV[2]))
+end
+return count
+"""
+
+# 独立访客寄存器：每条链接一个字符串，每个寄存器一个字节，只用SETRANGE写入变大的寄存器，
+# 超出当前长度时Redis自动以零字节补齐。ARGV[2]为寄存器键前缀，ARGV[4]起为(下标, 取值)对
+_MERGE_VISITORS_SCRIPT = """
+local url_id = ARGV[3]
+local id = redis.call('GET', KEYS[1])
+if id then url_id = id end
+if redis.call('EXISTS', ARGV[1] .. url_id) == 0 then return 0 end
+local key = ARGV[2] .. url_id
+for i = 4, #ARGV, 2 do
+    local offset = tonumber(ARGV[i])
+    local rank = tonumber(ARGV[i + 1])
+    local current = string.byte(redis.call('GETRANGE', key, offset, offset)) or 0
+    if rank > current then
+        redis.call('SETRANGE', key, offset, string.char(rank))
+    end
+end
+return 1
+"""
+
+# 搜索索引：一个分数全为0的有序集合，成员为折叠后的原始URL或别名 + "\0" + ID，前缀查询按字典序范围读取。
+# string.lower只转换ASCII字母，与utils/search_index.py的fold结果一致。
+# 写入脚本调用以下函数维护索引，注册时按是否启用搜索索引拼接在脚本之前
+_SEARCH_LUA = """
+local function search_members(url, alias, id)
+    local members = {string.lower(url) .. string.char(0) .. id}
+    if alias and alias ~= '' then members[2] = string.lower(alias) .. string.char(0) .. id end
+    return members
+end
+local function unindex_search(key, url, alias, id)
+    if url then redis.call('ZREM', key, unpack(search_members(url, alias, id))) end
+end
+local function index_search(key, url, alias, id)
+    local args = {}
+    for _, member in ipairs(search_members(url, alias, id)) do
+        args[#args + 1] = 0
+        args[#args + 1] = member
+    end
+    redis.call('ZADD', key, unpack(args))
+end
+"""
+
+# 未启用搜索索引时脚本中的索引维护为空操作
+_NO_SEARCH_LUA = """
+local function unindex_search(key, url, alias, id) end
+local function index_search(key, url, alias, id) end
+"""
+
+# 条件创建：ID和别名都未作为记录键或别名键存在时写入记录及全部索引，否则返回0。
+# KEYS为记录键、ID有序集合、过期有序集合、域名集合和搜索索引；
+# ARGV为记录键前缀、别名键前缀、去重键前缀、ID、别名、去重键、创建时间、过期时间（可选值为空串）和哈希字段
+_CREATE_SCRIPT = """
+local id, alias, canonical = ARGV[4], ARGV[5], ARGV[6]
+if redis.call('EXISTS', KEYS[1], ARGV[2] .. id) > 0 then return 0 end
+if alias ~= '' and alias ~= id and redis.call('EXISTS', ARGV[1] .. alias, ARGV[2] .. alias) > 0 then return 0 end
+redis.call('HSET', KEYS[1], unpack(ARGV, 9))
+if alias ~= '' then redis.call('SET', ARGV[2] .. alias, id) end
+if canonical ~= '' then redis.call('SET', ARGV[3] .. canonical, id) end
+redis.call('ZADD', KEYS[2], ARGV[7], id)
+if ARGV[8] ~= '' then redis.call('ZADD', KEYS[3], ARGV[8], id) end
+redis.call('SADD', KEYS[4], id)
+index_search(KEYS[5], redis.call('HGET', KEYS[1], 'original_url'), alias, id)
+return 1
+"""
+
+# ARGV[2]为域名集合键前缀，原始URL变化时调用方一并传入新的domain字段，脚本据此移动域名索引；
+# KEYS[4]为搜索索引，原始URL或别名变化时替换其成员
+_UPDATE_SCRIPT = """
+local key = KEYS[2]
+local id = redis.call('GET', KEYS[1])
+if id then key = ARGV[1] .. id end
+if redis.call('EXISTS', key) == 0 then return false end
+local before = redis.call('HMGET', key, 'domain', 'original_url', 'custom_alias')
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', key, ARGV[i], ARGV[i + 1])
+end
+local fields = redis.call('HMGET', key, 'id', 'expires_at', 'domain', 'original_url', 'custom_alias')
+if fields[2] and fields[2] ~= '' then
+    redis.call('ZADD', KEYS[3], fields[2], fields[1])
+else
+    redis.call('ZREM', KEYS[3], fields[1])
+end
+if fields[3] and fields[3] ~= before[1] then
+    if before[1] then redis.call('SREM', ARGV[2] .. before[1], fields[1]) end
+    redis.call('SADD', ARGV[2] .. fields[3], fields[1])
+end
+if fields[4] ~= before[2] or fields[5] ~= before[3] then
+    unindex_search(KEYS[4], before[2], before[3], fields[1])
+    index_search(KEYS[4], fields[4], fields[5], fields[1])
+end
+return redis.call('HGETALL', key)
+"""
+
+_DELETE_SCRIPT = """
+local key = KEYS[2]
+local url_id = ARGV[3]
+local id = redis.call('GET', KEYS[1])
+if id then
+    key = ARGV[1] .. id
+    url_id = id
+end
+if redis.call('EXISTS', key) == 0 then return 0 end
+local fields = redis.call('HMGET', key, 'custom_alias', 'canonical_key', 'domain', 'original_url')
+if fields[1] and fields[1] ~= '' then redis.call('DEL', ARGV[2] .. fields[1]) end
+if fields[2] and fields[2] ~= '' and redis.call('GET', ARGV[4] .. fields[2]) == url_id then
+    redis.call('DEL', ARGV[4] .. fields[2])
+end
+if fields[3] then redis.call('SREM', ARGV[7] .. fields[3], url_id) end
+unindex_search(KEYS[5], fields[4], fields[1], url_id)
+redis.call('DEL', key, ARGV[5] .. url_id, ARGV[6] .. url_id)
+redis.call('ZREM', KEYS[3], url_id)
+redis.call('ZREM', KEYS[4], url_id)
+return 1
+"""
+
+_REAP_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(ids) do
+    local key = ARGV[3] .. id
+    local fields = redis.call('HMGET', key, 'custom_alias', 'canonical_key', 'domain', 'original_url')
+    if fields[1] and fields[1] ~= '' then redis.call('DEL', ARGV[4] .. fields[1]) end
+    if fields[2] and fields[2] ~= '' and redis.call('GET', ARGV[5] .. fields[2]) == id then
+        redis.call('DEL', ARGV[5] .. fields[2])
+    end
+    if fields[3] then redis.call('SREM', ARGV[8] .. fields[3], id) end
+    unindex_search(KEYS[3], fields[4], fields[1], id)
+    redis.call('DEL', key, ARGV[6] .. id, ARGV[7] .. id)
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZREM', KEYS[1], id)
+end
+return ids
+"""
+
+# KEYS[1]为域名集合键，逐个设置集合中链接的激活状态，返回状态发生变化的ID
+_SET_DOMAIN_ACTIVE_SCRIPT = """
+local changed = {}
+for _, id in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    local key = ARGV[1] .. id
+    local current = redis.call('HGET', key, 'is_active')
+    if current and current ~= ARGV[2] then
+        redis.call('HSET', key, 'is_active', ARGV[2])
+        changed[#changed + 1] = id
+    end
+end
+return changed
+"""
+
+# KEYS[1]为域名集合键，删除集合中的全部链接（与删除脚本相同地清理别名、去重键和统计）及集合本身
+_DELETE_DOMAIN_SCRIPT = """
+local ids = redis.call('SMEMBERS', KEYS[1])
+for _, id in ipairs(ids) do
+    local key = ARGV[1] .. id
+    local fields = redis.call('HMGET', key, 'custom_alias', 'canonical_key', 'original_url')
+    if fields[1] and fields[1] ~= '' then redis.call('DEL', ARGV[2] .. fields[1]) end
+    if fields[2] and fields[2] ~= '' and redis.call('GET', ARGV[3] .. fields[2]) == id then
+        redis.call('DEL', ARGV[3] .. fields[2])
+    end
+    unindex_search(KEYS[4], fields[3], fields[1], id)
+    redis.call('DEL', key, ARGV[4] .. id, ARGV[5] .. id)
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZREM', KEYS[3], id)
+end
+redis.call('DEL', KEYS[1])
+return ids
+"""
+
+# 解析脚本返回的状态码
+_RESOLVE_OK = 0
+_RESOLVE_NOT_FOUND = 1
+_RESOLVE_EXPIRED = 2
+_RESOLVE_INACTIVE = 3
+
+
+def _encode(value) -> str:
+    """将记录字段编码为Redis哈希值，None编码为空字符串"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    return int(value)
+
+
+class RedisURLStorage(BaseURLStorage):
+    """
+    Redis存储后端
+    
+    每条链接保存为一个哈希，别名和去重模式的规范化URL哈希键单独保存为字符串键，
+    原始URL的主机名另存于哈希的domain字段，并按主机名把ID保存在集合中，
+    search_index为True时折叠大小写后的原始URL和别名加上ID保存在一个分数全为0的有序集合中供搜索，
+    点击时间序列（click_series为True时记录）保存为按BITFIELD读写的定长字符串，独立访客统计保存为每个寄存器一字节的字符串，全部ID保存在按创建时间排序的有序集合中，
+    设置了过期时间的ID另存一个按过期时间排序的有序集合供清理任务使用。
+    重定向和点击计数使用服务端Lua脚本原子完成，批量操作使用pipeline减少往返
+    """
+    
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "shortener:",
+        max_connections: int = 50,
+        client: Optional[redis.Redis] = None,
+        click_series: bool = False,
+        search_index: bool = False,
+    ):
+        if client is None:
+            pool = redis.ConnectionPool.from_url(url, max_connections=max_connections, decode_responses=True)
+            client = redis.Redis(connection_pool=pool)
+        self._redis = client
+        self._link_prefix = f"{prefix}link:"
+        self._alias_prefix = f"{prefix}alias:"
+        self._canonical_prefix = f"{prefix}canonical:"
+        self._domain_prefix = f"{prefix}domain:"
+        self._series_prefix = f"{prefix}series:"
+        self._record_series_prefix = self._series_prefix if click_series else ""  # 计数脚本的ARGV[4]
+        self._visitors_prefix = f"{prefix}visitors:"
+        self._search_key = f"{prefix}search"
+        self._search_index = search_index
+        self._ids_key = f"{prefix}ids"
+        self._expiry_key = f"{prefix}expiry"
+        self._id_counter_key = f"{prefix}id_counter"
+        self._id_secret_key = f"{prefix}id_secret"
+        self._resolve = client.register_script(_RESOLVE_SCRIPT)
+        self._add_clicks = client.register_script(_ADD_CLICKS_SCRIPT)
+        search_lua = _SEARCH_LUA if search_index else _NO_SEARCH_LUA
+        self._create = client.register_script(search_lua + _CREATE_SCRIPT)
+        self._update = client.register_script(search_lua + _UPDATE_SCRIPT)
+        self._delete = client.register_script(search_lua + _DELETE_SCRIPT)
+        self._reap = client.register_script(search_lua + _REAP_SCRIPT)
+        self._merge_visitors = client.register_script(_MERGE_VISITORS_SCRIPT)
+        self._set_domain_active = client.register_script(_SET_DOMAIN_ACTIVE_SCRIPT)
+        self._delete_domain = client.register_script(search_lua + _DELETE_DOMAIN_SCRIPT)
+    
+    async def create_url(self, url_data: dict) -> URLResponse:
+        """创建短链接（单次事务提交记录、别名和ID索引）"""
+        return (await self.create_urls([url_data]))[0]
+    
+    async def create_urls(self, url_data_list: List[dict]) -> List[URLResponse]:
+        """批量创建短链接，全部记录在一个事务pipeline中提交"""
+        records = [URLRecord.from_dict(url_data) for url_data in url_data_list]
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for record in records:
+                pipe.hset(self._link_prefix + record.id, mapping=self._to_mapping(record))
+                if record.custom_alias:
+                    pipe.set(self._alias_prefix + record.custom_alias, record.id)
+                if record.canonical_key:
+                    pipe.set(self._canonical_prefix + record.canonical_key, record.id)
+                pipe.sadd(self._domain_prefix + get_domain_from_url(record.original_url), record.id)
+                if self._search_index:
+                    pipe.zadd(self._search_key, dict.fromkeys(self._search_members(record), 0))
+            pipe.zadd(self._ids_key, {record.id: record.created_at for record in records})
+            expiring = {record.id: record.expires_at for record in records if record.expires_at is not None}
+            if expiring:
+                pipe.zadd(self._expiry_key, expiring)
+            await pipe.execute()
+        return [record.to_response() for record in records]
+    
+    async def create_url_if_absent(self, url_data: dict) -> Optional[URLResponse]:
+        """检查和写入在一个服务端脚本内原子完成，一次往返"""
+        return (await self.create_urls_if_absent([url_data]))[0]
+    
+    async def create_urls_if_absent(self, url_data_list: List[dict]) -> List[Optional[URLResponse]]:
+        """每条记录一次脚本调用，一次pipeline提交，脚本按顺序执行，批内重复项也只有第一项成功"""
+        records = [URLRecord.from_dict(url_data) for url_data in url_data_list]
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for record in records:
+                args = [
+                    self._link_prefix,
+                    self._alias_prefix,
+                    self._canonical_prefix,
+                    record.id,
+                    _encode(record.custom_alias),
+                    _encode(record.canonical_key),
+                    record.created_at,
+                    _encode(record.expires_at),
+                ]
+                for pair in self._to_mapping(record).items():
+                    args.extend(pair)
+                keys = [
+                    self._link_prefix + record.id,
+                    self._ids_key,
+                    self._expiry_key,
+                    self._domain_prefix + get_domain_from_url(record.original_url),
+                    self._search_key,
+                ]
+                await self._create(keys=keys, args=args, client=pipe)
+            created = await pipe.execute()
+        return [record.to_response() if ok else None for record, ok in zip(records, created)]
+    
+    async def get_url(self, url_id: str) -> Optional[URLResponse]:
+        """根据ID获取短链接"""
+        record = await self._get_record(url_id)
+        if record is None:
+            return None
+        return record.to_response()
+    
+    async def update_url(self, url_id: str, update_data: dict) -> Optional[URLResponse]:
+        """更新短链接"""
+        # 借助URLRecord统一字段转换，只写回被更新的字段
+        converted = URLRecord("", "", "", created_at=0)
+        converted.update(update_data)
+        args = [self._link_prefix, self._domain_prefix]
+        for key in update_data:
+            if key == "short_url":
+                key = "base_url"
+            if key in URLRecord.__slots__ and key != "id":
+                args.extend((key, _encode(getattr(converted, key))))
+        if "original_url" in update_data:
+            args.extend(("domain", get_domain_from_url(converted.original_url)))
+        
+        result = await self._update(keys=self._keys(url_id) + [self._expiry_key, self._search_key], args=args)
+        if not result:
+            return None
+        return self._from_hash(dict(zip(result[::2], result[1::2]))).to_response()
+    
+    async def delete_url(self, url_id: str) -> bool:
+        """删除短链接及其别名和索引"""
+        deleted = await self._delete(
+            keys=self._keys(url_id) + [self._ids_key, self._expiry_key, self._search_key],
+            args=[
+                self._link_prefix,
+                self._alias_prefix,
+                url_id,
+                self._canonical_prefix,
+                self._series_prefix,
+                self._visitors_prefix,
+                self._domain_prefix,
+            ],
+        )
+        return bool(deleted)
+    
+    async def increment_click_count(self, url_id: str) -> Optional[int]:
+        """增加点击次数（服务端原子自增）"""
+        count = await self._add_clicks(
+            keys=self._keys(url_id),
+            args=[self._link_prefix, 1, now_micros(), self._record_series_prefix, url_id],
+        )
+        return None if count is None else int(count)
+    
+    async def resolve_and_count(self, url_id: str) -> str:
+        """解析短链接并计数，一次往返完成"""
+        return await self._resolve_url(url_id, count=True)
+    
+    async def resolve_url(self, url_id: str) -> str:
+        """解析短链接但不计数"""
+        return await self._resolve_url(url_id, count=False)
+    
+    async def apply_click_deltas(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        """批量合并点击增量，一次pipeline提交"""
+        if not deltas:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for url_id, (count, last_accessed) in deltas.items():
+                await self._add_clicks(
+                    keys=self._keys(url_id),
+                    args=[self._link_prefix, count, last_accessed, self._record_series_prefix, url_id],
+                    client=pipe,
+                )
+            await pipe.execute()
+    
+    async def get_all_urls(self) -> List[URLResponse]:
+        """获取所有短链接（按创建时间排序，分批pipeline读取）"""
+        ids = await self._redis.zrange(self._ids_key, 0, -1)
+        return [record.to_response() for record in await self._get_records(ids)]
+    
+    async def list_urls(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        按（创建时间, ID）顺序分页获取短链接
+        
+        有序集合按（分数, 成员）排序，与排序键一致；从游标的创建时间开始按分数范围读取，
+        只需跳过同一时间戳下不大于游标ID的成员
+        """
+        if cursor is None:
+            entries = await self._redis.zrange(self._ids_key, 0, limit, withscores=True)
+            entries = [(int(score), url_id) for url_id, score in entries]
+        else:
+            position = decode_cursor(cursor)
+            entries = []
+            offset = 0
+            while len(entries) <= limit:
+                chunk = await self._redis.zrangebyscore(
+                    self._ids_key, position[0], "+inf", start=offset, num=limit + 1, withscores=True
+                )
+                if not chunk:
+                    break
+                offset += len(chunk)
+                entries.extend(
+                    (int(score), url_id) for url_id, score in chunk if (int(score), url_id) > position
+                )
+        
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(*entries[-1])
+        records = await self._get_records([url_id for _, url_id in entries])
+        return [record.to_response() for record in records], next_cursor
+    
+    async def alias_exists(self, alias: str) -> bool:
+        """检查别名是否存在"""
+        return bool(await self._redis.exists(self._alias_prefix + alias))
+    
+    async def aliases_exist(self, aliases: List[str]) -> Set[str]:
+        """一次MGET查询多个别名"""
+        if not aliases:
+            return set()
+        values = await self._redis.mget([self._alias_prefix + alias for alias in aliases])
+        return {alias for alias, value in zip(aliases, values) if value is not None}
+    
+    async def get_stats(self, url_id: str) -> Optional[dict]:
+        """获取统计信息"""
+        record = await self._get_record(url_id)
+        if record is None:
+            return None
+        return record.to_dict()
+    
+    async def reap_expired(self, before: int, limit: int) -> List[str]:
+        """按过期时间有序集合删除过期链接，单个脚本内原子完成"""
+        return await self._reap(
+            keys=[self._expiry_key, self._ids_key, self._search_key],
+            args=[
+                before,
+                limit,
+                self._link_prefix,
+                self._alias_prefix,
+                self._canonical_prefix,
+                self._series_prefix,
+                self._visitors_prefix,
+                self._domain_prefix,
+            ],
+        )
+    
+    async def find_canonical(self, keys: List[str]) -> Dict[str, URLResponse]:
+        """一次MGET查出去重索引中的ID，再批量读取记录"""
+        if not keys:
+            return {}
+        ids = await self._redis.mget([self._canonical_prefix + key for key in keys])
+        records = {record.id: record for record in await self._get_records([url_id for url_id in ids if url_id])}
+        return {
+            key: records[url_id].to_response()
+            for key, url_id in zip(keys, ids)
+            if url_id in records
+        }
+    
+    async def list_domain_urls(self, domain: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """读出域名集合的成员后按创建时间分页"""
+        ids = await self._redis.smembers(self._domain_prefix + domain)
+        return await self._page_ids(ids, limit, cursor)
+    
+    async def search_urls(self, query: str, mode: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        在搜索有序集合中查找，未启用搜索索引时分批读取全部记录逐条匹配（_search_scan）
+        
+        成员分数全为0，前缀查询用ZRANGEBYLEX从游标对应的成员之后按字典序分页读取（_search_prefix）；
+        子串查询用ZSCAN按MATCH模式在服务端过滤，需遍历整个集合，再按创建时间分页。
+        模式中的通配符会匹配到成员中的ID部分，因此按拆出的文本复核
+        """
+        query = fold(query)
+        if not self._search_index:
+            return await self._search_scan(query, mode, limit, cursor)
+        if mode == "prefix":
+            return await self._search_prefix(query, limit, cursor)
+        ids = set()
+        pattern = "*" + "".join("\\" + char if char in "*?[]\\" else char for char in query) + "*"
+        async for member, _ in self._redis.zscan_iter(self._search_key, match=pattern, count=1000):
+            text, _, url_id = member.rpartition("\x00")
+            if query in text:
+                ids.add(url_id)
+        return await self._page_ids(ids, limit, cursor)
+    
+    async def get_domain_stats(self, domain: str) -> dict:
+        """读出域名集合的成员，分批pipeline读取激活状态和点击次数后汇总"""
+        ids = list(await self._redis.smembers(self._domain_prefix + domain))
+        links = active_links = clicks = 0
+        for start in range(0, len(ids), 500):
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for url_id in ids[start:start + 500]:
+                    pipe.hmget(self._link_prefix + url_id, "is_active", "click_count")
+                rows = await pipe.execute()
+            for is_active, click_count in rows:
+                if click_count is None:
+                    continue
+                links += 1
+                active_links += is_active == "1"
+                clicks += int(click_count)
+        return {"links": links, "active_links": active_links, "clicks": clicks}
+    
+    async def set_domain_active(self, domain: str, is_active: bool) -> List[str]:
+        """在单个脚本内原子地设置激活状态"""
+        return await self._set_domain_active(
+            keys=[self._domain_prefix + domain],
+            args=[self._link_prefix, _encode(is_active)],
+        )
+    
+    async def delete_domain_urls(self, domain: str) -> List[str]:
+        """在单个脚本内原子地删除全部链接及其别名、索引和统计"""
+        return await self._delete_domain(
+            keys=[self._domain_prefix + domain, self._ids_key, self._expiry_key, self._search_key],
+            args=[
+                self._link_prefix,
+                self._alias_prefix,
+                self._canonical_prefix,
+                self._series_prefix,
+                self._visitors_prefix,
+            ],
+        )
+    
+    async def get_click_series(self, url_id: str, granularity: str) -> Tuple[int, List[int]]:
+        """用一条BITFIELD命令读出某粒度的最新桶号和计数环"""
+        head_index, _, size, offset = LEVEL_BY_NAME[granularity]
+        args = ["GET", "u32", f"#{head_index}"]
+        for index in range(offset, offset + size):
+            args.extend(("GET", "u32", f"#{index}"))
+        
+        actual_id = await self._redis.get(self._alias_prefix + url_id)
+        values = await self._redis.execute_command("BITFIELD", self._series_prefix + (actual_id or url_id), *args)
+        return values[0], values[1:]
+    
+    async def merge_visitor_sketches(self, sketches: Dict[str, bytes]) -> None:
+        """只发送非零寄存器，由服务端脚本逐个取最大值，一次pipeline提交"""
+        if not sketches:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for url_id, registers in sketches.items():
+                args = [self._link_prefix, self._visitors_prefix, url_id]
+                for pair in sparse_registers(registers):
+                    args.extend(pair)
+                await self._merge_visitors(keys=[self._alias_prefix + url_id], args=args, client=pipe)
+            await pipe.execute()
+    
+    async def get_visitor_sketch(self, url_id: str) -> bytes:
+        """读取寄存器字符串，按寄存器个数补齐末尾的零字节"""
+        actual_id = await self._redis.get(self._alias_prefix + url_id)
+        value = await self._redis.get(self._visitors_prefix + (actual_id or url_id))
+        registers = (value or "").encode("latin-1")
+        return registers + bytes(REGISTERS - len(registers))
+    
+    async def iter_keys(self) -> AsyncIterator[str]:
+        """按前缀SCAN记录键和别名键"""
+        for prefix in (self._link_prefix, self._alias_prefix):
+            async for key in self._redis.scan_iter(match=prefix + "*", count=1000):
+                yield key[len(prefix):]
+    
+    async def reserve_id_block(self, size: int) -> int:
+        """通过服务端原子自增预留一块ID计数值，多个实例之间不会重叠"""
+        end = await self._redis.incrby(self._id_counter_key, size)
+        return end - size
+    
+    async def load_id_secret(self, candidate: str) -> str:
+        """SET NX后读回，一次事务往返；并发调用时以先写入者为准"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._id_secret_key, candidate, nx=True)
+            pipe.get(self._id_secret_key)
+            _, secret = await pipe.execute()
+        return secret
+    
+    async def close(self) -> None:
+        """关闭连接池"""
+        await self._redis.aclose()
+    
+    def _keys(self, url_id: str) -> List[str]:
+        return [self._alias_prefix + url_id, self._link_prefix + url_id]
+    
+    async def _resolve_url(self, url_id: str, count: bool) -> str:
+        result = await self._resolve(
+            keys=self._keys(url_id),
+            args=[self._link_prefix, now_micros(), "1" if count else "0", self._record_series_prefix, url_id],
+        )
+        status = int(result[0])
+        if status == _RESOLVE_NOT_FOUND:
+            raise URLNotFoundError(url_id)
+        if status == _RESOLVE_EXPIRED:
+            raise URLExpiredError(url_id)
+        if status == _RESOLVE_INACTIVE:
+            raise URLInactiveError(url_id)
+        return result[1]
+    
+    async def _get_record(self, url_id: str) -> Optional[URLRecord]:
+        """按ID或别名查找记录，别名与ID相同时只需一次往返"""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.get(self._alias_prefix + url_id)
+            pipe.hgetall(self._link_prefix + url_id)
+            actual_id, data = await pipe.execute()
+        if actual_id is not None and actual_id != url_id:
+            data = await self._redis.hgetall(self._link_prefix + actual_id)
+        if not data:
+            return None
+        return self._from_hash(data)
+    
+    async def _search_scan(self, query: str, mode: str, limit: int, cursor: Optional[str]) -> Tuple[List[URLResponse], Optional[str]]:
+        """按创建时间分批读取全部记录，顺序和游标与使用索引时相同"""
+        ids = await self._redis.zrange(self._ids_key, 0, -1)
+        records = await self._get_records(ids)
+        if mode != "prefix":
+            return await self._page_ids(
+                {record.id for record in records if matches(query, mode, record.original_url, record.custom_alias)},
+                limit,
+                cursor,
+            )
+        
+        position = decode_search_cursor(cursor) if cursor is not None else None
+        entries = []
+        for record in records:
+            text = prefix_key(query, record.original_url, record.custom_alias)
+            if text is not None and (position is None or (text, record.id) > position):
+                entries.append(((text, record.id), record))
+        entries = heapq.nsmallest(limit + 1, entries, key=lambda entry: entry[0])
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_search_cursor(*entries[-1][0])
+        return [record.to_response() for _, record in entries], next_cursor
+    
+    async def _search_prefix(self, query: str, limit: int, cursor: Optional[str]) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        每轮用ZRANGEBYLEX ... LIMIT读取limit + 1个成员并用pipeline读取对应记录，凑满一页或读完范围为止
+        
+        原始URL和别名都匹配的链接有两个成员，只保留排序文本较小的一个（prefix_key），与其他后端顺序一致
+        """
+        low = "[" + query
+        if cursor is not None:
+            member = "\x00".join(decode_search_cursor(cursor))
+            if member >= query:
+                low = "(" + member
+        high = "(" + query + "\U0010ffff"
+        entries = []
+        while len(entries) <= limit:
+            members = await self._redis.zrangebylex(self._search_key, low, high, start=0, num=limit + 1)
+            if not members:
+                break
+            low = "(" + members[-1]
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for member in members:
+                    pipe.hgetall(self._link_prefix + member.rpartition("\x00")[2])
+                rows = await pipe.execute()
+            for member, data in zip(members, rows):
+                if not data:
+                    continue
+                text, _, url_id = member.rpartition("\x00")
+                record = self._from_hash(data)
+                if prefix_key(query, record.original_url, record.custom_alias) == text:
+                    entries.append(((text, url_id), record))
+            if len(members) <= limit:
+                break
+        
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_search_cursor(*entries[-1][0])
+        return [record.to_response() for _, record in entries], next_cursor
+    
+    async def _page_ids(self, ids: Set[str], limit: int, cursor: Optional[str]) -> Tuple[List[URLResponse], Optional[str]]:
+        """用一次ZMSCORE从ID有序集合取得一组ID的创建时间，按（创建时间, ID）排序后只读取本页的记录"""
+        if not ids:
+            return [], None
+        ids = list(ids)
+        scores = await self._redis.zmscore(self._ids_key, ids)
+        entries = [(int(score), url_id) for url_id, score in zip(ids, scores) if score is not None]
+        if cursor is not None:
+            position = decode_cursor(cursor)
+            entries = [entry for entry in entries if entry > position]
+        entries = heapq.nsmallest(limit + 1, entries)
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(*entries[-1])
+        records = await self._get_records([url_id for _, url_id in entries])
+        return [record.to_response() for record in records], next_cursor
+    
+    async def _get_records(self, ids: List[str], batch_size: int = 500) -> List[URLRecord]:
+        records = []
+        for start in range(0, len(ids), batch_size):
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for url_id in ids[start:start + batch_size]:
+                    pipe.hgetall(self._link_prefix + url_id)
+                rows = await pipe.execute()
+            records.extend(self._from_hash(data) for data in rows if data)
+        return records
+    
+    @staticmethod
+    def _to_mapping(record: URLRecord) -> dict:
+        return {
+            "id": record.id,
+            "original_url": record.original_url,
+            "base_url": record.base_url,
+            "custom_alias": _encode(record.custom_alias),
+            "created_at": record.created_at,
+            "expires_at": _encode(record.expires_at),
+            "last_accessed": _encode(record.last_accessed),
+            "click_count": record.click_count,
+            "is_active": _encode(record.is_active),
+            "canonical_key": _encode(record.canonical_key),
+            "domain": get_domain_from_url(record.original_url),
+        }
+    
+    @staticmethod
+    def _search_members(record: URLRecord) -> List[str]:
+        """搜索有序集合中的成员，与Lua脚本中的search_members一致"""
+        members = [fold(record.original_url) + "\x00" + record.id]
+        if record.custom_alias:
+            members.append(fold(record.custom_alias) + "\x00" + record.id)
+        return members
+    
+    @staticmethod
+    def _from_hash(data: dict) -> URLRecord:
+        return URLRecord(
+            id=data["id"],
+            original_url=data["original_url"],
+            base_url=data["base_url"],
+            created_at=int(data["created_at"]),
+            expires_at=_optional_int(data.get("expires_at")),
+            last_accessed=_optional_int(data.get("last_accessed")),
+            click_count=int(data.get("click_count", 0)),
+            is_active=data.get("is_active") == "1",
+            custom_alias=data.get("custom_alias") or None,
+            canonical_key=data.get("canonical_key") or None,
+        )
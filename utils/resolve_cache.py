@@ -0,0 +1,128 @@
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import List, Optional, Set
+
+from config import settings
+from utils.metrics import registry
+from models.url_models import URLResponse
+from utils.url_record import to_micros
+from exceptions.url_exceptions import URLExpiredError, URLInactiveError
+
+
+class CachedLink:
+    """解析缓存条目：重定向所需的最少字段"""
+    
+    __slots__ = ("url_id", "original_url", "expires_at", "is_active", "cached_until")
+    
+    def __init__(self, url_id: str, original_url: str, expires_at: Optional[int], is_active: bool, cached_until: float):
+        self.url_id = url_id
+        self.original_url = original_url
+        self.expires_at = expires_at
+        self.is_active = is_active
+        self.cached_until = cached_until
+    
+    def resolve(self, short_id: str, now: int) -> str:
+        """按缓存的过期时间和状态校验，返回目标URL"""
+        if self.expires_at is not None and now > self.expires_at:
+            raise URLExpiredError(short_id)
+        if not self.is_active:
+            raise URLInactiveError(short_id)
+        return self.original_url
+
+
+class ResolveCache:
+    """
+    热点短链接解析缓存
+    
+    进程内LRU缓存，短链接ID或别名 -> 目标URL、过期时间和激活状态。
+    过期时间在本地校验，条目超过TTL后重新从存储读取，
+    以限制其他实例修改链接后本实例读到旧数据的时间
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl: float = 30.0):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: "OrderedDict[str, CachedLink]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> Optional[CachedLink]:
+        """查找缓存条目，未命中或已超过TTL时返回None"""
+        link = self._entries.get(key)
+        if link is None:
+            self.misses += 1
+            return None
+        if link.cached_until < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return link
+    
+    def put(self, key: str, url_data: URLResponse) -> CachedLink:
+        """缓存从存储读取的链接，超出容量时淘汰最久未使用的条目"""
+        link = CachedLink(
+            url_id=url_data.id,
+            original_url=url_data.original_url,
+            expires_at=to_micros(url_data.expires_at),
+            is_active=url_data.is_active,
+            cached_until=time.monotonic() + self._ttl,
+        )
+        self._entries[key] = link
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return link
+    
+    def invalidate(self, *keys: str) -> None:
+        """使给定ID或别名的缓存条目失效"""
+        for key in keys:
+            self._entries.pop(key, None)
+    
+    def invalidate_links(self, url_ids: Set[str]) -> int:
+        """使指向给定ID的全部条目（含以别名为键的条目）失效，返回失效的条目数；需要遍历整个缓存"""
+        keys = [key for key, link in self._entries.items() if link.url_id in url_ids]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+    
+    def hot_keys(self, limit: int) -> List[str]:
+        """最近使用的键，最近的在前"""
+        return list(islice(reversed(self._entries), limit))
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+    
+    def hit_ratio(self) -> float:
+        """命中率，尚无查找时为0"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self) -> dict:
+        """命中、未命中和淘汰计数"""
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# 全局解析缓存实例，RESOLVE_CACHE_SIZE为0时不启用
+resolve_cache = ResolveCache(settings.resolve_cache_size, settings.resolve_cache_ttl) if settings.resolve_cache_size > 0 else None
+
+if resolve_cache is not None:
+    registry.callback("resolve_cache_hits_total", "解析缓存命中数", lambda: resolve_cache.hits, kind="counter")
+    registry.callback("resolve_cache_misses_total", "解析缓存未命中数", lambda: resolve_cache.misses, kind="counter")
+    registry.callback("resolve_cache_evictions_total", "解析缓存淘汰数", lambda: resolve_cache.evictions, kind="counter")
+    registry.callback("resolve_cache_entries", "解析缓存当前条目数", lambda: len(resolve_cache))
+    registry.callback("resolve_cache_hit_ratio", "解析缓存命中率", resolve_cache.hit_ratio)
@@ -0,0 +1,287 @@
+import string
+from array import array
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+NGRAM = 3
+_BLOCK_SIZE = 512
+_BULK_REMOVE = 64  # 同一倒排表删除至少这么多项时过滤重建，而不是逐项搬移
+_PROBE_RATIO = 32  # 倒排表长度超过候选数这么多倍时求交改为逐个二分查找
+SEARCH_MODES = ("prefix", "substring")
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fold(text: str) -> str:
+    """
+    搜索用的大小写折叠：只转换ASCII字母
+    
+    与Redis后端Lua脚本中的string.lower逐字节转换结果一致；URL中的非ASCII字符一般已被编码，不受影响
+    """
+    if text.isascii():
+        return text.lower()
+    return text.translate(_ASCII_LOWER)
+
+
+def ngrams(text: str) -> Set[str]:
+    """文本中全部不重复的NGRAM字符片段，短于NGRAM时为空"""
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def prefix_key(query: str, original_url: str, alias: Optional[str]) -> Optional[str]:
+    """
+    前缀查询中链接的排序文本：原始URL和别名折叠后以已折叠的query开头的较小者，都不匹配时为None
+    
+    前缀查询按（排序文本, ID）分页，原始URL和别名都匹配的链接只按较小的文本出现一次
+    """
+    text = fold(original_url)
+    if not text.startswith(query):
+        text = None
+    if alias:
+        alias = fold(alias)
+        if alias.startswith(query) and (text is None or alias < text):
+            return alias
+    return text
+
+
+def matches(query: str, mode: str, original_url: str, alias: Optional[str]) -> bool:
+    """原始URL或别名是否匹配已折叠的查询，mode为prefix或substring"""
+    if mode == "prefix":
+        return fold(original_url).startswith(query) or (alias is not None and fold(alias).startswith(query))
+    return query in fold(original_url) or (alias is not None and query in fold(alias))
+
+
+def _contains(posting: array, doc: int) -> bool:
+    position = bisect_left(posting, doc)
+    return position < len(posting) and posting[position] == doc
+
+
+class _SortedEntries:
+    """
+    分块有序列表：条目按块保存，每块超过2*_BLOCK_SIZE条时对半拆分
+    
+    插入和删除先按各块的最大条目二分定位到块，只移动块内的元素；
+    单个大列表在百万条时每次insort需移动数MB指针
+    """
+    
+    def __init__(self):
+        self._blocks: List[List[Tuple[str, str]]] = []
+        self._maxes: List[Tuple[str, str]] = []
+    
+    def add(self, entry: Tuple[str, str]) -> None:
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            return
+        position = bisect_left(self._maxes, entry)
+        if position == len(self._maxes):
+            position -= 1
+            self._blocks[position].append(entry)
+            self._maxes[position] = entry
+        else:
+            insort(self._blocks[position], entry)
+        block = self._blocks[position]
+        if len(block) > 2 * _BLOCK_SIZE:
+            self._blocks[position:position + 1] = [block[:_BLOCK_SIZE], block[_BLOCK_SIZE:]]
+            self._maxes[position:position + 1] = [block[_BLOCK_SIZE - 1], block[-1]]
+    
+    def discard(self, entry: Tuple[str, str]) -> None:
+        position = bisect_left(self._maxes, entry)
+        if position == len(self._maxes):
+            return
+        block = self._blocks[position]
+        offset = bisect_left(block, entry)
+        if block[offset] != entry:
+            return
+        del block[offset]
+        if not block:
+            del self._blocks[position]
+            del self._maxes[position]
+        elif offset == len(block):
+            self._maxes[position] = block[-1]
+    
+    def iter_from(self, key: tuple) -> Iterator[Tuple[str, str]]:
+        """从第一个不小于key的条目开始按序产出"""
+        position = bisect_left(self._maxes, key)
+        if position == len(self._maxes):
+            return
+        block = self._blocks[position]
+        yield from islice(block, bisect_left(block, key), None)
+        for block in islice(self._blocks, position + 1, None):
+            yield from block
+    
+    def merge(self, other: "_SortedEntries") -> None:
+        """并入另一组条目后按_BLOCK_SIZE重新分块；两组各自有序，排序只需一次归并"""
+        if not self._blocks:
+            self._blocks, self._maxes = other._blocks, other._maxes
+            return
+        entries = [entry for block in self._blocks for entry in block]
+        entries.extend(entry for block in other._blocks for entry in block)
+        entries.sort()
+        self._blocks = [entries[i:i + _BLOCK_SIZE] for i in range(0, len(entries), _BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+
+
+class SearchIndex:
+    """
+    原始URL和自定义别名的内存搜索索引（文本均经fold折叠）
+    
+    前缀查询使用按（文本, ID）排序的分块列表，二分定位后顺序读到不再匹配为止。
+    子串查询使用三元组倒排索引：每条链接加入索引时分配一个递增的文档号，原始URL和别名合为一个文档，
+    每个三元组对应一个按文档号递增的array('I')，比保存ID集合约省九成内存。
+    查询对各三元组的倒排表求交集作为候选，由调用方按原文复核（三元组都出现不代表子串出现）
+    """
+    
+    def __init__(self, first_doc: int = 0):
+        self._sorted = _SortedEntries()
+        self._postings: Dict[str, array] = {}
+        self._doc_ids: Dict[str, int] = {}  # ID -> 文档号
+        self._docs: Dict[int, str] = {}  # 文档号 -> ID
+        self._next_doc = first_doc
+    
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+    
+    def add(self, url_id: str, original_url: str, alias: Optional[str] = None) -> None:
+        texts = self._texts(original_url, alias)
+        for text in texts:
+            self._sorted.add((text, url_id))
+        
+        doc = self._next_doc
+        self._next_doc += 1
+        self._doc_ids[url_id] = doc
+        self._docs[doc] = url_id
+        postings = self._postings
+        for gram in set().union(*map(ngrams, texts)):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(doc)
+    
+    def remove(self, url_id: str, original_url: str, alias: Optional[str] = None) -> None:
+        """移除加入时使用的同一组文本；倒排表有序，按文档号二分定位后删除"""
+        texts = self._texts(original_url, alias)
+        for text in texts:
+            self._sorted.discard((text, url_id))
+        
+        doc = self._doc_ids.pop(url_id, None)
+        if doc is None:
+            return
+        del self._docs[doc]
+        for gram in set().union(*map(ngrams, texts)):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            position = bisect_left(posting, doc)
+            if position < len(posting) and posting[position] == doc:
+                del posting[position]
+                if not posting:
+                    del self._postings[gram]
+    
+    def reserve(self, count: int) -> int:
+        """预留count个连续文档号并返回第一个，供在别处用SearchIndex(first_doc)建立索引后merge"""
+        first = self._next_doc
+        self._next_doc += count
+        return first
+    
+    def merge(self, other: "SearchIndex") -> None:
+        """
+        并入由reserve预留的文档号建立的索引，其中的ID须已从本索引移除
+        
+        预留之后本索引没有再加入文档的三元组直接拼接倒排表，否则合并后重新排序
+        """
+        self._sorted.merge(other._sorted)
+        self._doc_ids.update(other._doc_ids)
+        self._docs.update(other._docs)
+        postings = self._postings
+        for gram, posting in other._postings.items():
+            current = postings.get(gram)
+            if current is None:
+                postings[gram] = posting
+            elif current[-1] < posting[0]:
+                current.extend(posting)
+            else:
+                postings[gram] = array("I", sorted(current + posting))
+    
+    def remove_many(self, entries: Iterable[Tuple[str, str, Optional[str]]]) -> None:
+        """
+        批量移除（ID, 原始URL, 别名），每个倒排表只处理一次
+        
+        常见三元组的倒排表有上百万项，逐条remove每次都要搬移整段数组；
+        删除项较多的倒排表改为过滤后重建
+        """
+        removed: Dict[str, Set[int]] = {}
+        for url_id, original_url, alias in entries:
+            texts = self._texts(original_url, alias)
+            for text in texts:
+                self._sorted.discard((text, url_id))
+            doc = self._doc_ids.pop(url_id, None)
+            if doc is None:
+                continue
+            del self._docs[doc]
+            for gram in set().union(*map(ngrams, texts)):
+                removed.setdefault(gram, set()).add(doc)
+        
+        for gram, docs in removed.items():
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            if len(docs) < _BULK_REMOVE:
+                for doc in docs:
+                    position = bisect_left(posting, doc)
+                    if position < len(posting) and posting[position] == doc:
+                        del posting[position]
+            else:
+                posting = self._postings[gram] = array("I", [doc for doc in posting if doc not in docs])
+            if not posting:
+                del self._postings[gram]
+    
+    def prefix(self, query: str, after: Optional[Tuple[str, str]] = None) -> Iterator[Tuple[str, str]]:
+        """
+        按（文本, ID）顺序产出文本以已折叠的query开头的条目，after为上一页最后的条目时从其后开始
+        
+        原始URL和别名都匹配时同一ID产出两次，调用方按prefix_key只保留一次
+        """
+        start = (query,) if after is None or after < (query,) else after
+        for entry in self._sorted.iter_from(start):
+            if not entry[0].startswith(query):
+                return
+            if entry != after:
+                yield entry
+    
+    def candidates(self, query: str) -> Optional[List[str]]:
+        """
+        可能包含已折叠的query的ID，需按原文复核
+        
+        query短于NGRAM时没有可用的三元组，返回None表示只能扫描全部链接。
+        各三元组的倒排表从短到长求交集：候选远少于下一个倒排表时逐个二分查找，否则按集合求交
+        """
+        grams = ngrams(query)
+        if not grams:
+            return None
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        
+        found = postings[0]
+        for posting in postings[1:]:
+            if not found:
+                break
+            if len(found) * _PROBE_RATIO < len(posting):
+                found = [doc for doc in found if _contains(posting, doc)]
+            else:
+                found = set(found).intersection(posting)
+        docs = self._docs
+        return [docs[doc] for doc in found]
+    
+    @staticmethod
+    def _texts(original_url: str, alias: Optional[str]) -> List[str]:
+        if alias:
+            return [fold(original_url), fold(alias)]
+        return [fold(original_url)]
@@ -0,0 +1,979 @@
+import fcntl
+import heapq
+import mmap
+import os
+import struct
+import sys
+import zlib
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from models.url_models import URLResponse
+from utils.base_storage import BaseURLStorage
+from utils.url_record import (
+    URLRecord,
+    now_micros,
+    encode_cursor,
+    decode_cursor,
+    encode_search_cursor,
+    decode_search_cursor
+)
+from utils.click_series import GRANULARITIES, SERIES_BYTES, record_clicks, read_ring
+from utils.hyperloglog import EMPTY_SKETCH, REGISTERS, merge_sketch
+from utils.url_utils import get_domain_from_url
+from utils.search_index import fold, matches, prefix_key
+from exceptions.url_exceptions import (
+    URLNotFoundError,
+    URLExpiredError,
+    URLInactiveError,
+    DuplicateAliasError,
+    StorageFullError
+)
+
+
+MAGIC = b"URLSHM\x00\x01"
+HEADER_SIZE = 4096
+MAX_KEY_BYTES = 32
+MAX_LOAD_FACTOR = 0.75
+
+# 文件头：魔数、槽位数、字符串区大小、字符串区已用字节、存活记录数、非空槽位数、ID计数值
+_HEADER = struct.Struct("<8sQQQQQQ")
+_H_HEAP_USED = 24
+_H_LIVE = 32
+_H_USED = 40
+_H_ID_COUNTER = 48
+# 文件头之后保存短ID置换密钥：1字节长度加至多63字节，长度为0表示尚未保存（旧表该区域全为0）
+_H_ID_SECRET = _HEADER.size
+_ID_SECRET_MAX = 63
+_U64 = struct.Struct("<Q")
+
+# 字符串区按16字节分块分配。释放的块按块大小挂入文件头中的空闲链表（链表指针写在空闲块的前8字节，
+# 保存块偏移加1，0表示链表为空），分配时优先复用同样大小的空闲块；超过最大级别的块释放后不再复用。
+# 块总是在所属槽位改写之后才释放，无锁读者读取字符串后复核槽位序列号，不会用到被复用的内容
+_HEAP_ALIGN = 16
+_FREE_CLASSES = 256
+_H_FREE_LISTS = 128
+
+# 点击和独立访客合并只持记录槽位所在条带的字节范围锁，不同链接的重定向互不阻塞
+_STRIPES = 4096
+
+# 槽位（128字节）：序列号、状态、键长、别名长、是否激活、键、别名、
+# 原始URL偏移、基础URL偏移、原始URL长度、基础URL长度、创建时间、过期时间、最后访问时间、点击次数。
+# 别名槽位和去重槽位的原始URL偏移字段保存目标记录的槽位号
+_SLOT = struct.Struct("<IBBBB32s32sQQIIqqqq")
+SLOT_SIZE = _SLOT.size
+_SEQ = struct.Struct("<I")
+_CLICKS = struct.Struct("<qq")  # 最后访问时间、点击次数
+_CLICKS_OFFSET = SLOT_SIZE - _CLICKS.size
+
+_EMPTY = 0
+_RECORD = 1
+_ALIAS = 2
+_TOMBSTONE = 3
+_CANONICAL = 4
+
+# 去重槽位的键前缀；别名只允许字母、数字、连字符和下划线，不会与之冲突
+_CANONICAL_PREFIX = b"~"
+
+# 统计区：每个槽位对应一个定长块，块首为所属记录的创建时间，其后是utils/click_series.py布局的点击序列
+# 和utils/hyperloglog.py的独立访客寄存器。槽位被新记录复用时创建时间不同，首次写入时清零；
+# 只有被写入过的块才会占用实际内存页
+_STATS_OWNER = struct.Struct("<q")
+_SERIES_START = _STATS_OWNER.size
+_VISITORS_START = _SERIES_START + SERIES_BYTES
+STATS_BLOCK_SIZE = (_VISITORS_START + REGISTERS + 15) // 16 * 16
+
+_NULL = -(1 << 63)  # 可选时间字段为None时的取值
+_SPIN_LIMIT = 1000
+
+# _SLOT字段下标
+_F_SEQ, _F_STATE, _F_KEY_LEN, _F_ALIAS_LEN, _F_ACTIVE, _F_KEY, _F_ALIAS = range(7)
+_F_URL_OFF, _F_BASE_OFF, _F_URL_LEN, _F_BASE_LEN = range(7, 11)
+_F_CREATED, _F_EXPIRES, _F_LAST, _F_CLICKS = range(11, 15)
+
+
+def _slot_key(fields: tuple) -> bytes:
+    return fields[_F_KEY][:fields[_F_KEY_LEN]]
+
+
+def _slot_alias(fields: tuple) -> bytes:
+    return fields[_F_ALIAS][:fields[_F_ALIAS_LEN]]
+
+
+def _encode_key(value: str) -> bytes:
+    key = value.encode()
+    if len(key) > MAX_KEY_BYTES:
+        raise ValueError(f"短链接ID或别名超过{MAX_KEY_BYTES}字节: {value}")
+    return key
+
+
+def _optional(value: int) -> Optional[int]:
+    return None if value == _NULL else value
+
+
+def _same_record(current: tuple, fields: tuple) -> bool:
+    """槽位是否仍保存fields所属的记录（槽位可能已被删除或复用）"""
+    return (
+        current[_F_STATE] == _RECORD
+        and current[_F_CREATED] == fields[_F_CREATED]
+        and _slot_key(current) == _slot_key(fields)
+    )
+
+
+def _block_size(length: int) -> int:
+    return max(_HEAP_ALIGN, (length + _HEAP_ALIGN - 1) // _HEAP_ALIGN * _HEAP_ALIGN)
+
+
+class SharedMemoryURLStorage(BaseURLStorage):
+    """
+    共享内存存储后端
+    
+    同一主机上的所有worker进程映射同一个文件（默认位于/dev/shm），文件内是定长槽位的
+    开放寻址哈希表，字符串写入表后的字符串区。读操作不加锁：每个槽位带序列号（seqlock），
+    写入前后各自增一次，读者发现序列号为奇数或前后不一致时重读，读取原始URL后同样复核序列号。
+    每次写槽位都持有槽位所在条带的字节范围锁（fcntl记录锁）；点击计数和独立访客合并只持该条带锁，
+    创建、更新、删除等改变表结构的写操作另外通过文件锁（flock）串行化，临界区内均不含await。
+    记录锁属于进程，同一进程内靠临界区不含await互斥。
+    每次计数的条带锁需要加锁和解锁两次lockf系统调用：单进程实测无锁解析约5微秒，解析并计数约15微秒，
+    其中两次lockf约1.5–1.9微秒，其余为持锁复核槽位和序列号写入。开启点击写回缓冲（CLICK_FLUSH_INTERVAL）时
+    重定向只做无锁解析，批量写回按条带分组，每个条带每批只加锁一次。点击时间序列和独立访客统计保存在字符串区之后的统计区，
+    与槽位一一对应，写入时同样使槽位序列号为奇数，因此统计也可以无锁读取。
+    统计区在创建表文件时按槽位数整体分配，click_series为False时只是不写入点击时间序列。
+    
+    哈希表不支持扩容，删除留下墓碑，新写入会复用墓碑槽位；删除或改写原始URL后其字符串块进入空闲链表供复用；列表、分页、过期清理和按域名的查询与批量操作
+    （没有域名二级索引）需要扫描整张表。
+    去重模式的规范化URL哈希键也保存为指向记录槽位的槽位，记录中不保存该键，
+    因此删除链接时不清理，由下一次同一URL的创建覆盖
+    """
+    
+    def __init__(self, path: str, capacity: int = 1 << 20, heap_size: int = 256 << 20, click_series: bool = False):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError("槽位数必须是2的幂")
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        # 第一个打开文件的进程负责初始化；已存在的表沿用文件头中的大小
+        with self._locked():
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, HEADER_SIZE + capacity * (SLOT_SIZE + STATS_BLOCK_SIZE) + heap_size)
+                os.pwrite(self._fd, _HEADER.pack(MAGIC, capacity, heap_size, 0, 0, 0, 0), 0)
+            magic, capacity, heap_size = _HEADER.unpack(os.pread(self._fd, _HEADER.size, 0))[:3]
+        if magic != MAGIC:
+            os.close(self._fd)
+            raise ValueError(f"无法识别的共享内存表文件: {path}")
+        
+        self._click_series = click_series
+        self._capacity = capacity
+        self._mask = capacity - 1
+        self._max_used = int(capacity * MAX_LOAD_FACTOR)
+        self._heap_start = HEADER_SIZE + capacity * SLOT_SIZE
+        self._heap_size = heap_size
+        self._stats_start = self._heap_start + heap_size
+        self._mm = mmap.mmap(self._fd, self._stats_start + capacity * STATS_BLOCK_SIZE)
+        # 基础URL的字符串从不释放，其偏移和解码结果可以在进程内缓存
+        self._base_offsets: Dict[str, Tuple[int, int]] = {}
+        self._base_strings: Dict[int, str] = {}
+    
+    async def create_url(self, url_data: dict) -> URLResponse:
+        """创建短链接"""
+        record = URLRecord.from_dict(url_data)
+        with self._locked():
+            self._put_record(record)
+        return record.to_response()
+    
+    async def create_urls(self, url_data_list: List[dict]) -> List[URLResponse]:
+        """批量创建短链接，只加一次锁"""
+        records = [URLRecord.from_dict(url_data) for url_data in url_data_list]
+        with self._locked():
+            for record in records:
+                self._put_record(record)
+        return [record.to_response() for record in records]
+    
+    async def create_url_if_absent(self, url_data: dict) -> Optional[URLResponse]:
+        """持锁检查ID和别名后写入，跨进程原子"""
+        record = URLRecord.from_dict(url_data)
+        with self._locked():
+            if self._key_taken(record):
+                return None
+            self._put_record(record)
+        return record.to_response()
+    
+    async def create_urls_if_absent(self, url_data_list: List[dict]) -> List[Optional[URLResponse]]:
+        """批量条件创建，只加一次锁"""
+        records = [URLRecord.from_dict(url_data) for url_data in url_data_list]
+        created = []
+        with self._locked():
+            for record in records:
+                taken = self._key_taken(record)
+                if not taken:
+                    self._put_record(record)
+                created.append(not taken)
+        return [record.to_response() if ok else None for record, ok in zip(records, created)]
+    
+    async def get_url(self, url_id: str) -> Optional[URLResponse]:
+        """根据ID获取短链接（无锁读取）"""
+        _, fields, url = self._lookup_url(url_id)
+        if fields is None:
+            return None
+        return self._to_record(fields, url).to_response()
+    
+    async def update_url(self, url_id: str, update_data: dict) -> Optional[URLResponse]:
+        """更新短链接"""
+        with self._locked():
+            index, fields = self._lookup(url_id)
+            if fields is None:
+                return None
+            record = self._to_record(fields)
+            old_alias = record.custom_alias
+            record.update(update_data)
+            self._write_record(index, record, fields)
+            if record.custom_alias != old_alias:
+                if old_alias and old_alias != record.id:
+                    self._remove_key(_encode_key(old_alias))
+                self._put_alias(record, index)
+        return record.to_response()
+    
+    async def delete_url(self, url_id: str) -> bool:
+        """删除短链接及其别名"""
+        with self._locked():
+            index, fields = self._lookup(url_id)
+            if fields is None:
+                return False
+            self._delete_record(index, fields)
+        return True
+    
+    async def increment_click_count(self, url_id: str) -> Optional[int]:
+        """增加点击次数（只持记录槽位的条带锁）"""
+        return self._count(url_id, 1, now_micros())
+    
+    async def resolve_and_count(self, url_id: str) -> str:
+        """无锁解析，再只持记录槽位的条带锁计数；计数前记录被并发改写时重新解析"""
+        now = now_micros()
+        while True:
+            index, fields, url = self._resolve_fields(url_id, now)
+            if self._add_clicks(index, fields, 1, now) is not None:
+                return url
+    
+    async def resolve_url(self, url_id: str) -> str:
+        """解析短链接但不计数（无锁读取）"""
+        return self._resolve_url(url_id, now_micros())
+    
+    async def apply_click_deltas(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        """
+        批量合并点击增量：先无锁查找全部记录并按条带分组，每个条带只加锁一次计入组内全部增量；
+        查找之后槽位被并发改写的记录在释放条带锁后逐条重新查找计入
+        """
+        stripes: Dict[int, list] = {}
+        for url_id, (count, last_accessed) in deltas.items():
+            index, fields = self._lookup(url_id)
+            if fields is not None:
+                stripes.setdefault(index & (_STRIPES - 1), []).append((url_id, index, fields, count, last_accessed))
+        retry = []
+        for stripe, entries in stripes.items():
+            with self._stripe(stripe):
+                for entry in entries:
+                    if self._add_clicks_held(*entry[1:]) is None:
+                        retry.append(entry)
+        for url_id, _, _, count, last_accessed in retry:
+            self._count(url_id, count, last_accessed)
+    
+    async def get_all_urls(self) -> List[URLResponse]:
+        """获取所有短链接（扫描全表后按创建时间排序）"""
+        return [record.to_response() for record in self._records_for(sorted(self._scan_keys()))]
+    
+    async def list_urls(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """按（创建时间, ID）顺序分页获取短链接，每页扫描一次全表"""
+        keys = self._scan_keys()
+        if cursor is not None:
+            position = decode_cursor(cursor)
+            keys = [key for key in keys if key > position]
+        keys = heapq.nsmallest(limit + 1, keys)
+        next_cursor = None
+        if len(keys) > limit:
+            keys = keys[:limit]
+            next_cursor = encode_cursor(*keys[-1])
+        return [record.to_response() for record in self._records_for(keys)], next_cursor
+    
+    async def iter_urls(self, cursor: Optional[str] = None, batch_size: int = 500) -> AsyncIterator[URLResponse]:
+        """扫描一次全表得到排序键，再逐页读取记录"""
+        keys = sorted(self._scan_keys())
+        if cursor is not None:
+            position = decode_cursor(cursor)
+            keys = [key for key in keys if key > position]
+        for start in range(0, len(keys), batch_size):
+            for record in self._records_for(keys[start:start + batch_size]):
+                yield record.to_response()
+    
+    async def iter_keys(self) -> AsyncIterator[str]:
+        """扫描一次全表，产出记录槽位中的ID和别名"""
+        for key, alias in self._scan(lambda fields: (_slot_key(fields), _slot_alias(fields))):
+            yield key.decode()
+            if alias:
+                yield alias.decode()
+    
+    async def alias_exists(self, alias: str) -> bool:
+        """检查别名是否存在"""
+        key = _encode_key(alias)
+        _, fields = self._find(key)
+        if fields is None:
+            return False
+        return fields[_F_STATE] == _ALIAS or _slot_alias(fields) == key
+    
+    async def get_stats(self, url_id: str) -> Optional[dict]:
+        """获取统计信息"""
+        _, fields, url = self._lookup_url(url_id)
+        if fields is None:
+            return None
+        return self._to_record(fields, url).to_dict()
+    
+    async def reap_expired(self, before: int, limit: int) -> List[str]:
+        """无锁扫描找出过期记录，再加锁逐条确认后删除"""
+        candidates = heapq.nsmallest(limit, self._scan_expired(before))
+        reaped = []
+        if not candidates:
+            return reaped
+        with self._locked():
+            for _, url_id in candidates:
+                index, fields = self._lookup(url_id)
+                if fields is None or fields[_F_EXPIRES] == _NULL or fields[_F_EXPIRES] >= before:
+                    continue
+                self._delete_record(index, fields)
+                reaped.append(url_id)
+        return reaped
+    
+    async def find_canonical(self, keys: List[str]) -> Dict[str, URLResponse]:
+        """按规范化URL哈希键查找去重槽位指向的记录（无锁读取）"""
+        found = {}
+        for key in keys:
+            _, fields = self._find(_CANONICAL_PREFIX + key.encode())
+            if fields is None or fields[_F_STATE] != _CANONICAL:
+                continue
+            fields, url = self._read_record_slot(fields[_F_URL_OFF])
+            if url is not None:
+                found[key] = self._to_record(fields, url).to_response()
+        return found
+    
+    async def list_domain_urls(self, domain: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """扫描全表找出该域名的排序键，再按list_urls的方式分页"""
+        keys = self._scan_domain(domain, lambda fields: (fields[_F_CREATED], _slot_key(fields).decode()))
+        return self._page_keys(keys, limit, cursor)
+    
+    async def search_urls(self, query: str, mode: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        无锁扫描全表（没有搜索索引），按原始URL和别名复核后分页
+        
+        前缀查询按（排序文本, ID）分页（见prefix_key），与其他后端顺序一致；子串查询按创建时间分页
+        """
+        query = fold(query)
+        
+        if mode == "prefix":
+            def build_prefix(fields, url):
+                alias = _slot_alias(fields)
+                text = prefix_key(query, url, alias.decode() if alias else None)
+                return None if text is None else (text, _slot_key(fields).decode())
+            
+            keys = self._scan(build_prefix, with_url=True)
+            return self._page_keys(keys, limit, cursor, decode_search_cursor, encode_search_cursor)
+        
+        def build(fields, url):
+            alias = _slot_alias(fields)
+            if matches(query, mode, url, alias.decode() if alias else None):
+                return fields[_F_CREATED], _slot_key(fields).decode()
+            return None
+        
+        return self._page_keys(self._scan(build, with_url=True), limit, cursor)
+    
+    async def get_domain_stats(self, domain: str) -> dict:
+        """无锁扫描全表汇总"""
+        rows = self._scan_domain(domain, lambda fields: (fields[_F_ACTIVE], fields[_F_CLICKS]))
+        return {
+            "links": len(rows),
+            "active_links": sum(1 for is_active, _ in rows if is_active),
+            "clicks": sum(clicks for _, clicks in rows),
+        }
+    
+    async def set_domain_active(self, domain: str, is_active: bool) -> List[str]:
+        """无锁扫描找出该域名的记录，再加锁逐条确认后改写激活状态"""
+        candidates = self._scan_domain(domain, lambda fields: _slot_key(fields).decode())
+        changed = []
+        with self._locked():
+            for url_id in candidates:
+                index, fields = self._lookup_domain_record(url_id, domain)
+                if fields is None or bool(fields[_F_ACTIVE]) == is_active:
+                    continue
+                record = self._to_record(fields)
+                record.is_active = is_active
+                self._write_record(index, record, fields)
+                changed.append(url_id)
+        return changed
+    
+    async def delete_domain_urls(self, domain: str) -> List[str]:
+        """无锁扫描找出该域名的记录，再加锁逐条确认后删除"""
+        candidates = self._scan_domain(domain, lambda fields: _slot_key(fields).decode())
+        deleted = []
+        with self._locked():
+            for url_id in candidates:
+                index, fields = self._lookup_domain_record(url_id, domain)
+                if fields is None:
+                    continue
+                self._delete_record(index, fields)
+                deleted.append(url_id)
+        return deleted
+    
+    async def get_click_series(self, url_id: str, granularity: str) -> Tuple[int, List[int]]:
+        """无锁读取记录槽位对应的统计块，块不属于该记录时视为尚无点击"""
+        data = self._read_stats(url_id, _SERIES_START, _VISITORS_START)
+        if data is None:
+            return 0, [0] * GRANULARITIES[granularity][1]
+        with memoryview(data).cast("I") as ring:
+            return read_ring(ring, granularity)
+    
+    async def merge_visitor_sketches(self, sketches: Dict[str, bytes]) -> None:
+        """合并独立访客寄存器，逐条只持记录槽位的条带锁"""
+        for url_id, registers in sketches.items():
+            while True:
+                index, fields = self._lookup(url_id)
+                if fields is None or self._merge_visitors(index, fields, registers):
+                    break
+    
+    async def get_visitor_sketch(self, url_id: str) -> bytes:
+        """无锁读取记录槽位对应的独立访客寄存器"""
+        data = self._read_stats(url_id, _VISITORS_START, _VISITORS_START + REGISTERS)
+        return EMPTY_SKETCH if data is None else data
+    
+    async def reserve_id_block(self, size: int) -> int:
+        """在文件头中预留一块ID计数值，同一主机的所有worker共享"""
+        with self._locked():
+            start = self._get_header(_H_ID_COUNTER)
+            self._set_header(_H_ID_COUNTER, start + size)
+        return start
+    
+    async def load_id_secret(self, candidate: str) -> str:
+        """加锁读取文件头中的密钥，尚未保存时写入candidate"""
+        encoded = candidate.encode()
+        if not 0 < len(encoded) <= _ID_SECRET_MAX:
+            raise ValueError(f"短ID置换密钥须为1到{_ID_SECRET_MAX}字节")
+        with self._locked():
+            length = self._mm[_H_ID_SECRET]
+            if length == 0:
+                self._mm[_H_ID_SECRET + 1:_H_ID_SECRET + 1 + len(encoded)] = encoded
+                self._mm[_H_ID_SECRET] = len(encoded)
+                return candidate
+            return self._mm[_H_ID_SECRET + 1:_H_ID_SECRET + 1 + length].decode()
+    
+    async def close(self) -> None:
+        """解除映射并关闭文件"""
+        self._mm.close()
+        os.close(self._fd)
+    
+    # 锁与文件头
+    
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _stripe(self, index: int):
+        """槽位所在条带的字节范围锁（fcntl记录锁，与全局flock互不影响；不可嵌套获取）"""
+        start = index & (_STRIPES - 1)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, start)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, start)
+    
+    def _get_header(self, offset: int) -> int:
+        return _U64.unpack_from(self._mm, offset)[0]
+    
+    def _set_header(self, offset: int, value: int) -> None:
+        _U64.pack_into(self._mm, offset, value)
+    
+    def _add_header(self, offset: int, delta: int) -> None:
+        self._set_header(offset, self._get_header(offset) + delta)
+    
+    # 槽位读写
+    
+    def _slot_offset(self, index: int) -> int:
+        return HEADER_SIZE + index * SLOT_SIZE
+    
+    def _read_slot(self, index: int) -> tuple:
+        """按seqlock协议无锁读取槽位"""
+        offset = self._slot_offset(index)
+        mm = self._mm
+        for _ in range(_SPIN_LIMIT):
+            seq = _SEQ.unpack_from(mm, offset)[0]
+            if seq & 1:
+                continue
+            fields = _SLOT.unpack_from(mm, offset)
+            if _SEQ.unpack_from(mm, offset)[0] == seq:
+                return fields
+        # 长时间读不到一致的槽位：取得条带锁后读取（写者若已崩溃，锁已随进程释放）
+        with self._stripe(index):
+            return self._read_slot_held(index)
+    
+    def _read_slot_held(self, index: int) -> tuple:
+        """持条带锁读取槽位；序列号仍为奇数说明写者中途崩溃，直接修复"""
+        offset = self._slot_offset(index)
+        seq = _SEQ.unpack_from(self._mm, offset)[0]
+        if seq & 1:
+            _SEQ.pack_into(self._mm, offset, (seq + 1) & 0xFFFFFFFF)
+        return _SLOT.unpack_from(self._mm, offset)
+    
+    @contextmanager
+    def _seq_writing(self, offset: int):
+        """持条带锁写入槽位或其统计块：期间序列号为奇数，无锁读者会重读；写入中途异常时停在奇数，由持锁读者修复"""
+        seq = _SEQ.unpack_from(self._mm, offset)[0] | 1
+        _SEQ.pack_into(self._mm, offset, seq)
+        yield seq
+        _SEQ.pack_into(self._mm, offset, (seq + 1) & 0xFFFFFFFF)
+    
+    def _write_slot(self, index: int, *values) -> None:
+        offset = self._slot_offset(index)
+        with self._stripe(index), self._seq_writing(offset) as seq:
+            _SLOT.pack_into(self._mm, offset, seq, *values)
+    
+    def _write_tombstone(self, index: int) -> None:
+        self._write_slot(index, _TOMBSTONE, 0, 0, 0, b"", b"", 0, 0, 0, 0, 0, _NULL, _NULL, 0)
+    
+    def _count(self, url_id: str, count: int, last_accessed: int) -> Optional[int]:
+        """按ID或别名把点击计入记录；计入前槽位被并发改写时重新查找"""
+        while True:
+            index, fields = self._lookup(url_id)
+            if fields is None:
+                return None
+            clicks = self._add_clicks(index, fields, count, last_accessed)
+            if clicks is not None:
+                return clicks
+    
+    def _add_clicks(self, index: int, fields: tuple, count: int, last_accessed: int) -> Optional[int]:
+        """持条带锁把点击计入记录槽位及其统计块；槽位已不再保存fields所属的记录时返回None"""
+        with self._stripe(index):
+            return self._add_clicks_held(index, fields, count, last_accessed)
+    
+    def _add_clicks_held(self, index: int, fields: tuple, count: int, last_accessed: int) -> Optional[int]:
+        """调用方已持有槽位所在条带的锁"""
+        offset = self._slot_offset(index)
+        current = self._read_slot_held(index)
+        if not _same_record(current, fields):
+            return None
+        clicks = current[_F_CLICKS] + count
+        latest = last_accessed
+        if current[_F_LAST] != _NULL and current[_F_LAST] > latest:
+            latest = current[_F_LAST]
+        with self._seq_writing(offset):
+            self._record_series(index, current[_F_CREATED], last_accessed, count)
+            _CLICKS.pack_into(self._mm, offset + _CLICKS_OFFSET, latest, clicks)
+        return clicks
+    
+    def _merge_visitors(self, index: int, fields: tuple, registers: bytes) -> bool:
+        """持条带锁把独立访客寄存器合并到记录的统计块；槽位已不再保存fields所属的记录时返回False"""
+        with self._stripe(index):
+            if not _same_record(self._read_slot_held(index), fields):
+                return False
+            with self._seq_writing(self._slot_offset(index)):
+                with self._stats_block(index, fields[_F_CREATED]) as block:
+                    with block[_VISITORS_START:_VISITORS_START + REGISTERS] as current:
+                        merge_sketch(current, registers)
+        return True
+    
+    def _stats_offset(self, index: int) -> int:
+        return self._stats_start + index * STATS_BLOCK_SIZE
+    
+    def _read_stats(self, url_id: str, start: int, end: int) -> Optional[bytes]:
+        """
+        无锁读取记录统计块的[start, end)部分，链接不存在或块不属于该记录（尚未写入过）时返回None
+        
+        统计块与槽位共用序列号，复制后序列号未变化说明期间没有写入
+        """
+        for _ in range(_SPIN_LIMIT):
+            index, fields = self._lookup(url_id)
+            if fields is None:
+                return None
+            offset = self._stats_offset(index)
+            owner = _STATS_OWNER.unpack_from(self._mm, offset)[0]
+            data = self._mm[offset + start:offset + end]
+            if _SEQ.unpack_from(self._mm, self._slot_offset(index))[0] == fields[_F_SEQ]:
+                return data if owner == fields[_F_CREATED] else None
+        index, fields = self._lookup(url_id)
+        if fields is None:
+            return None
+        offset = self._stats_offset(index)
+        with self._stripe(index):
+            if _STATS_OWNER.unpack_from(self._mm, offset)[0] != fields[_F_CREATED]:
+                return None
+            return self._mm[offset + start:offset + end]
+    
+    @contextmanager
+    def _stats_block(self, index: int, created_at: int):
+        """持条带锁取得槽位的统计块以便写入，块属于之前的记录时先清零"""
+        offset = self._stats_offset(index)
+        with memoryview(self._mm)[offset:offset + STATS_BLOCK_SIZE] as block:
+            if _STATS_OWNER.unpack_from(block)[0] != created_at:
+                block[:] = bytes(STATS_BLOCK_SIZE)
+                _STATS_OWNER.pack_into(block, 0, created_at)
+            yield block
+    
+    def _record_series(self, index: int, created_at: int, timestamp: int, count: int) -> None:
+        """把点击计入槽位的统计块（timestamp为微秒）"""
+        if not self._click_series:
+            return
+        with self._stats_block(index, created_at) as block:
+            with block[_SERIES_START:_VISITORS_START].cast("I") as data:
+                record_clicks(data, timestamp // 1_000_000, count)
+    
+    # 哈希表
+    
+    def _find(self, key: bytes) -> Tuple[int, Optional[tuple]]:
+        """线性探测查找键所在的记录或别名槽位"""
+        index = zlib.crc32(key) & self._mask
+        for _ in range(self._capacity):
+            fields = self._read_slot(index)
+            state = fields[_F_STATE]
+            if state == _EMPTY:
+                break
+            if state != _TOMBSTONE and _slot_key(fields) == key:
+                return index, fields
+            index = (index + 1) & self._mask
+        return -1, None
+    
+    def _lookup(self, url_id: str) -> Tuple[int, Optional[tuple]]:
+        """按ID或别名查找记录槽位"""
+        key = url_id.encode()
+        if len(key) > MAX_KEY_BYTES:
+            return -1, None
+        index, fields = self._find(key)
+        if fields is None or fields[_F_STATE] == _RECORD:
+            return index, fields
+        if fields[_F_STATE] != _ALIAS:
+            return -1, None
+        # 别名槽位指向记录槽位；槽位可能已被复用，需确认记录的别名仍是该键
+        index = fields[_F_URL_OFF]
+        fields = self._read_slot(index)
+        if fields[_F_STATE] != _RECORD or _slot_alias(fields) != key:
+            return -1, None
+        return index, fields
+    
+    def _claim_slot(self, key: bytes) -> int:
+        """为键找到可写入的槽位：已存在的同键槽位，否则探测路径上的第一个墓碑或空槽位"""
+        index = zlib.crc32(key) & self._mask
+        free = -1
+        for _ in range(self._capacity):
+            fields = self._read_slot(index)
+            state = fields[_F_STATE]
+            if state == _EMPTY:
+                break
+            if state == _TOMBSTONE:
+                if free < 0:
+                    free = index
+            elif _slot_key(fields) == key:
+                return index
+            index = (index + 1) & self._mask
+        else:
+            if free < 0:
+                raise StorageFullError("共享内存哈希表已满")
+        if free >= 0:
+            return free
+        if self._get_header(_H_USED) >= self._max_used:
+            raise StorageFullError("共享内存哈希表已满")
+        self._add_header(_H_USED, 1)
+        return index
+    
+    def _lookup_url(self, url_id: str) -> Tuple[int, Optional[tuple], Optional[str]]:
+        """无锁按ID或别名查找记录槽位并读取原始URL；读取期间槽位被改写时重新查找"""
+        for _ in range(_SPIN_LIMIT):
+            index, fields = self._lookup(url_id)
+            if fields is None:
+                return index, None, None
+            url = self._url_if_unchanged(index, fields)
+            if url is not None:
+                return index, fields, url
+        # 持锁时字符串不会被释放
+        with self._locked():
+            index, fields = self._lookup(url_id)
+            if fields is None:
+                return index, None, None
+            return index, fields, self._read_string(fields[_F_URL_OFF], fields[_F_URL_LEN])
+    
+    def _read_record_slot(self, index: int) -> Tuple[tuple, Optional[str]]:
+        """无锁读取槽位，是记录时连同原始URL一起读取（否则URL为None）；读取期间槽位被改写时重读"""
+        for _ in range(_SPIN_LIMIT):
+            fields = self._read_slot(index)
+            if fields[_F_STATE] != _RECORD:
+                return fields, None
+            url = self._url_if_unchanged(index, fields)
+            if url is not None:
+                return fields, url
+        with self._locked():
+            fields = self._read_slot(index)
+            if fields[_F_STATE] != _RECORD:
+                return fields, None
+            return fields, self._read_string(fields[_F_URL_OFF], fields[_F_URL_LEN])
+    
+    def _url_if_unchanged(self, index: int, fields: tuple) -> Optional[str]:
+        """无锁读取记录槽位的原始URL；读取后槽位序列号已变化（字符串块可能已被释放复用）时返回None"""
+        start = self._heap_start + fields[_F_URL_OFF]
+        data = self._mm[start:start + fields[_F_URL_LEN]]
+        if _SEQ.unpack_from(self._mm, self._slot_offset(index))[0] != fields[_F_SEQ]:
+            return None
+        return data.decode()
+    
+    def _remove_key(self, key: bytes) -> None:
+        index, fields = self._find(key)
+        if fields is not None:
+            self._write_tombstone(index)
+    
+    def _key_taken(self, record: URLRecord) -> bool:
+        """持锁检查记录的ID或别名是否已占用记录或别名槽位"""
+        keys = (record.id, record.custom_alias) if record.custom_alias else (record.id,)
+        return any(self._find(_encode_key(key))[1] is not None for key in keys)
+    
+    def _delete_record(self, index: int, fields: tuple) -> None:
+        """持锁删除记录槽位及其别名，槽位改写后释放原始URL字符串"""
+        alias = _slot_alias(fields)
+        if alias and alias != _slot_key(fields):
+            self._remove_key(alias)
+        self._write_tombstone(index)
+        self._add_header(_H_LIVE, -1)
+        self._free_string(fields[_F_URL_OFF], fields[_F_URL_LEN])
+    
+    def _put_record(self, record: URLRecord) -> None:
+        key = _encode_key(record.id)
+        index = self._claim_slot(key)
+        fields = self._read_slot(index)
+        if fields[_F_STATE] == _ALIAS and _slot_key(fields) == key:
+            raise DuplicateAliasError(record.id)
+        if fields[_F_STATE] == _RECORD:
+            # 覆盖已有记录：先移除旧别名
+            alias = _slot_alias(fields)
+            if alias and alias != key:
+                self._remove_key(alias)
+        else:
+            self._add_header(_H_LIVE, 1)
+            fields = None
+        self._write_record(index, record, fields)
+        self._put_alias(record, index)
+        if record.canonical_key:
+            key = _CANONICAL_PREFIX + record.canonical_key.encode()
+            self._write_pointer(self._claim_slot(key), _CANONICAL, key, index)
+    
+    def _put_alias(self, record: URLRecord, index: int) -> None:
+        """别名与ID不同时写入指向记录槽位的别名槽位"""
+        if not record.custom_alias or record.custom_alias == record.id:
+            return
+        key = _encode_key(record.custom_alias)
+        alias_index = self._claim_slot(key)
+        # 别名与其他链接的ID相同时不能覆盖该记录
+        if self._read_slot(alias_index)[_F_STATE] == _RECORD:
+            raise DuplicateAliasError(record.custom_alias)
+        self._write_pointer(alias_index, _ALIAS, key, index)
+    
+    def _write_pointer(self, slot: int, state: int, key: bytes, index: int) -> None:
+        """写入指向记录槽位的别名或去重槽位"""
+        self._write_slot(slot, state, len(key), 0, 0, key, b"", index, 0, 0, 0, 0, _NULL, _NULL, 0)
+    
+    def _write_record(self, index: int, record: URLRecord, previous: Optional[tuple]) -> None:
+        key = _encode_key(record.id)
+        alias = _encode_key(record.custom_alias) if record.custom_alias else b""
+        # 原始URL未变化时沿用旧字符串，避免字符串区无谓增长
+        if previous is not None and self._read_string(previous[_F_URL_OFF], previous[_F_URL_LEN]) == record.original_url:
+            url_off, url_len = previous[_F_URL_OFF], previous[_F_URL_LEN]
+        else:
+            url_off, url_len = self._alloc_string(record.original_url)
+        base_off, base_len = self._base_offset(record.base_url)
+        click_count = record.click_count
+        last_accessed = _NULL if record.last_accessed is None else record.last_accessed
+        offset = self._slot_offset(index)
+        with self._stripe(index):
+            if previous is not None:
+                # 点击只持条带锁，读取previous之后计入的点击不能被覆盖
+                current_last, current_clicks = _CLICKS.unpack_from(self._mm, offset + _CLICKS_OFFSET)
+                if current_clicks != previous[_F_CLICKS]:
+                    click_count += current_clicks - previous[_F_CLICKS]
+                    last_accessed = current_last
+            with self._seq_writing(offset) as seq:
+                _SLOT.pack_into(
+                    self._mm,
+                    offset,
+                    seq,
+                    _RECORD,
+                    len(key),
+                    len(alias),
+                    1 if record.is_active else 0,
+                    key,
+                    alias,
+                    url_off,
+                    base_off,
+                    url_len,
+                    base_len,
+                    record.created_at,
+                    _NULL if record.expires_at is None else record.expires_at,
+                    last_accessed,
+                    click_count,
+                )
+        if previous is not None and url_off != previous[_F_URL_OFF]:
+            self._free_string(previous[_F_URL_OFF], previous[_F_URL_LEN])
+    
+    # 字符串区
+    
+    def _alloc_string(self, value: str) -> Tuple[int, int]:
+        """持锁写入字符串，优先复用同样大小的空闲块，返回偏移和字节长度"""
+        data = value.encode()
+        size = _block_size(len(data))
+        head = _H_FREE_LISTS + (size // _HEAP_ALIGN - 1) * 8
+        if size // _HEAP_ALIGN <= _FREE_CLASSES and self._get_header(head):
+            offset = self._get_header(head) - 1
+            start = self._heap_start + offset
+            self._set_header(head, _U64.unpack_from(self._mm, start)[0])
+        else:
+            offset = self._get_header(_H_HEAP_USED)
+            if offset + size > self._heap_size:
+                raise StorageFullError("共享内存字符串区已满")
+            start = self._heap_start + offset
+            self._set_header(_H_HEAP_USED, offset + size)
+        self._mm[start:start + len(data)] = data
+        return offset, len(data)
+    
+    def _free_string(self, offset: int, length: int) -> None:
+        """持锁把不再被任何槽位引用的字符串块挂入空闲链表"""
+        size = _block_size(length)
+        if size // _HEAP_ALIGN > _FREE_CLASSES:
+            return
+        head = _H_FREE_LISTS + (size // _HEAP_ALIGN - 1) * 8
+        _U64.pack_into(self._mm, self._heap_start + offset, self._get_header(head))
+        self._set_header(head, offset + 1)
+    
+    def _base_offset(self, base_url: str) -> Tuple[int, int]:
+        location = self._base_offsets.get(base_url)
+        if location is None:
+            location = self._base_offsets[base_url] = self._alloc_string(base_url)
+        return location
+    
+    def _read_string(self, offset: int, length: int) -> str:
+        start = self._heap_start + offset
+        return self._mm[start:start + length].decode()
+    
+    def _read_base(self, offset: int, length: int) -> str:
+        value = self._base_strings.get(offset)
+        if value is None:
+            value = self._base_strings[offset] = sys.intern(self._read_string(offset, length))
+        return value
+    
+    # 记录转换与扫描
+    
+    def _to_record(self, fields: tuple, original_url: Optional[str] = None) -> URLRecord:
+        """槽位转换为记录；无锁读者须传入经_url_if_unchanged复核的原始URL，持锁时可直接读取"""
+        alias = _slot_alias(fields)
+        if original_url is None:
+            original_url = self._read_string(fields[_F_URL_OFF], fields[_F_URL_LEN])
+        return URLRecord(
+            id=_slot_key(fields).decode(),
+            original_url=original_url,
+            base_url=self._read_base(fields[_F_BASE_OFF], fields[_F_BASE_LEN]),
+            created_at=fields[_F_CREATED],
+            expires_at=_optional(fields[_F_EXPIRES]),
+            last_accessed=_optional(fields[_F_LAST]),
+            click_count=fields[_F_CLICKS],
+            is_active=bool(fields[_F_ACTIVE]),
+            custom_alias=alias.decode() if alias else None,
+        )
+    
+    def _resolve_fields(self, url_id: str, now: int) -> Tuple[int, tuple, str]:
+        index, fields, url = self._lookup_url(url_id)
+        if fields is None:
+            raise URLNotFoundError(url_id)
+        if fields[_F_EXPIRES] != _NULL and now > fields[_F_EXPIRES]:
+            raise URLExpiredError(url_id)
+        if not fields[_F_ACTIVE]:
+            raise URLInactiveError(url_id)
+        return index, fields, url
+    
+    def _resolve_url(self, url_id: str, now: int) -> str:
+        return self._resolve_fields(url_id, now)[2]
+    
+    def _scan(self, build, with_url: bool = False) -> list:
+        """
+        无锁遍历全部记录槽位，收集build的非None返回值；with_url时build另外接收原始URL
+        
+        序列号为奇数或读后已变化的槽位（写入中途）按seqlock重读。结果只反映扫描时刻，
+        调用方需按结果重新查找复核
+        """
+        results = []
+        mm = self._mm
+        with memoryview(mm)[HEADER_SIZE:self._heap_start] as view:
+            for index, fields in enumerate(_SLOT.iter_unpack(view)):
+                if fields[_F_STATE] != _RECORD:
+                    continue
+                url = None
+                if fields[_F_SEQ] & 1 or _SEQ.unpack_from(mm, self._slot_offset(index))[0] != fields[_F_SEQ]:
+                    fields = None
+                elif with_url:
+                    url = self._url_if_unchanged(index, fields)
+                    if url is None:
+                        fields = None
+                if fields is None:
+                    fields, url = self._read_record_slot(index)
+                    if url is None:
+                        continue
+                value = build(fields, url) if with_url else build(fields)
+                if value is not None:
+                    results.append(value)
+        return results
+    
+    def _scan_keys(self) -> List[Tuple[int, str]]:
+        return self._scan(lambda fields: (fields[_F_CREATED], _slot_key(fields).decode()))
+    
+    def _scan_expired(self, before: int) -> List[Tuple[int, str]]:
+        def build(fields):
+            if fields[_F_EXPIRES] != _NULL and fields[_F_EXPIRES] < before:
+                return fields[_F_EXPIRES], _slot_key(fields).decode()
+            return None
+        return self._scan(build)
+    
+    def _scan_domain(self, domain: str, build) -> list:
+        """无锁扫描原始URL主机名为domain的记录槽位，收集build的返回值"""
+        def matches(fields, url):
+            return build(fields) if get_domain_from_url(url) == domain else None
+        return self._scan(matches, with_url=True)
+    
+    def _lookup_domain_record(self, url_id: str, domain: str) -> Tuple[int, Optional[tuple]]:
+        """持锁按ID复核扫描结果：记录仍存在且主机名仍为domain时返回槽位"""
+        index, fields = self._lookup(url_id)
+        if fields is None or _slot_key(fields) != url_id.encode():
+            return -1, None
+        if get_domain_from_url(self._read_string(fields[_F_URL_OFF], fields[_F_URL_LEN])) != domain:
+            return -1, None
+        return index, fields
+    
+    def _page_keys(
+        self,
+        keys: List[tuple],
+        limit: int,
+        cursor: Optional[str],
+        decode=decode_cursor,
+        encode=encode_cursor
+    ) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        从任意顺序的排序键中选出游标之后的一页，按list_urls的方式读取记录
+        
+        排序键默认为（创建时间, ID），前缀搜索传入（排序文本, ID）及其游标编解码
+        """
+        if cursor is not None:
+            position = decode(cursor)
+            keys = [key for key in keys if key > position]
+        keys = heapq.nsmallest(limit + 1, keys)
+        next_cursor = None
+        if len(keys) > limit:
+            keys = keys[:limit]
+            next_cursor = encode(*keys[-1])
+        return [record.to_response() for record in self._records_for(keys)], next_cursor
+    
+    def _records_for(self, keys: List[tuple]) -> List[URLRecord]:
+        """按排序键逐条读取记录，跳过扫描后已删除的链接"""
+        records = []
+        for _, url_id in keys:
+            _, fields, url = self._lookup_url(url_id)
+            if fields is not None and _slot_key(fields) == url_id.encode():
+                records.append(self._to_record(fields, url))
+        return records
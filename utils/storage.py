@@ -1,91 +1,719 @@
-import json
-from datetime import datetime
-from typing import Dict, Optional, List
+import asyncio
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from heapq import heapify, heappop, heappush, nsmallest
+from operator import attrgetter, itemgetter
+from typing import AsyncIterator, Dict, Optional, List, Set, Tuple
 from models.url_models import URLResponse
+from utils.base_storage import BaseURLStorage
+from utils.url_record import (
+    URLRecord,
+    now_micros,
+    encode_cursor,
+    decode_cursor,
+    encode_search_cursor,
+    decode_search_cursor
+)
+from utils.click_series import GRANULARITIES, new_series, record_clicks, read_ring
+from utils.hyperloglog import EMPTY_SKETCH, new_sketch, merge_sketch
+from utils.url_utils import get_domain_from_url
+from utils.search_index import SearchIndex, fold, matches, prefix_key
+from config import settings
+from exceptions.url_exceptions import URLNotFoundError, URLExpiredError, URLInactiveError
 
 
-class URLStorage:
-    """URL存储管理器 - 使用内存存储，实际项目中可替换为数据库"""
+# 分页排序键：（创建时间, ID）
+_order_key = attrgetter("created_at", "id")
+
+
+def _prepare_import(records: List[URLRecord], first_doc: Optional[int]) -> tuple:
+    """
+    批量导入中只依赖导入记录本身的计算，在线程中执行
+    
+    按ID去重（后出现的为准）、按排序键排序、按域名分组，收集别名、去重映射和过期堆条目；
+    first_doc不为None时用预留的文档号为导入记录单独建立搜索索引
+    """
+    by_id = {record.id: record for record in records}
+    ordered = sorted(by_id.values(), key=_order_key)
+    aliases = {record.custom_alias: record.id for record in ordered if record.custom_alias}
+    canonical = {record.canonical_key: record.id for record in ordered if record.canonical_key}
+    expiry = [(record.expires_at, record.id) for record in ordered if record.expires_at is not None]
+    domains: Dict[str, List[str]] = {}
+    for record in ordered:
+        domains.setdefault(get_domain_from_url(record.original_url), []).append(record.id)
+    index = None
+    if first_doc is not None:
+        index = SearchIndex(first_doc)
+        for record in ordered:
+            index.add(record.id, record.original_url, record.custom_alias)
+    return by_id, ordered, aliases, canonical, expiry, domains, index
+
+
+def _page(records, limit: int, cursor: Optional[str]) -> Tuple[List[URLResponse], Optional[str]]:
+    """从任意顺序的记录中选出游标之后按排序键最小的一页，不对全部记录排序"""
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        records = [record for record in records if _order_key(record) > position]
+    records = nsmallest(limit + 1, records, key=_order_key)
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(*_order_key(records[-1]))
+    return [record.to_response() for record in records], next_cursor
+
+
+def _prefix_page(entries, limit: int, position: Optional[Tuple[str, str]]) -> Tuple[List[URLResponse], Optional[str]]:
+    """前缀搜索的一页：entries为任意顺序的（排序键, 记录），排序键为（排序文本, ID）"""
+    if position is not None:
+        entries = [entry for entry in entries if entry[0] > position]
+    entries = nsmallest(limit + 1, entries, key=itemgetter(0))
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_search_cursor(*entries[-1][0])
+    return [record.to_response() for _, record in entries], next_cursor
+
+
+class URLStorage(BaseURLStorage):
+    """
+    URL存储管理器 - 使用内存存储，实际项目中可替换为数据库
     
-    def __init__(self):
-        self._storage: Dict[str, dict] = {}
+    search_index为True时维护原始URL和别名的搜索索引（utils/search_index.py），
+    否则搜索逐条扫描全部记录；click_series为True时为被点击的链接记录点击时间序列
+    """
+    
+    def __init__(self, search_index: bool = False, click_series: bool = False):
+        self._storage: Dict[str, URLRecord] = {}
         self._alias_index: Dict[str, str] = {}  # 别名到ID的映射
+        self._canonical_index: Dict[str, str] = {}  # 规范化URL哈希键到ID的映射（去重模式）
+        self._domain_index: Dict[str, Set[str]] = {}  # 原始URL主机名到ID集合的映射
+        self._order: List[URLRecord] = []  # 按（创建时间, ID）排序的记录，用于游标分页
+        self._expiry_heap: List[Tuple[int, str]] = []  # (过期时间, ID)最小堆，条目惰性失效
+        self._series: Dict[str, array] = {}  # ID -> 点击时间序列，首次点击时分配
+        self._visitors: Dict[str, bytearray] = {}  # ID -> 独立访客HyperLogLog寄存器
+        self._id_counter = 0  # 已预留的ID计数值上界
+        self._id_secret: Optional[str] = None  # 短ID置换密钥（未配置ID_SECRET时由首个分配器生成）
+        self._search_index: Optional[SearchIndex] = SearchIndex() if search_index else None
+        self._click_series = click_series
     
     async def create_url(self, url_data: dict) -> URLResponse:
         """创建短链接"""
-        url_id = url_data["id"]
-        self._storage[url_id] = url_data
-        
-        # 如果有自定义别名，建立映射
-        if "custom_alias" in url_data and url_data["custom_alias"]:
-            self._alias_index[url_data["custom_alias"]] = url_id
-        
-        return URLResponse(**url_data)
+        record = URLRecord.from_dict(url_data)
+        self._insert_record(record)
+        self._log_put(record)
+        await self._commit()
+        return record.to_response()
+    
+    async def create_urls(self, url_data_list: List[dict]) -> List[URLResponse]:
+        """批量创建短链接，全部写入后统一提交一次"""
+        records = [URLRecord.from_dict(url_data) for url_data in url_data_list]
+        for record in records:
+            self._insert_record(record)
+            self._log_put(record)
+        await self._commit()
+        return [record.to_response() for record in records]
+    
+    async def create_url_if_absent(self, url_data: dict) -> Optional[URLResponse]:
+        """检查和写入之间没有await，不会与其他协程交错"""
+        record = URLRecord.from_dict(url_data)
+        if self._key_taken(record):
+            return None
+        self._insert_record(record)
+        self._log_put(record)
+        await self._commit()
+        return record.to_response()
+    
+    async def create_urls_if_absent(self, url_data_list: List[dict]) -> List[Optional[URLResponse]]:
+        """逐条检查并写入后统一提交一次"""
+        results = []
+        for url_data in url_data_list:
+            record = URLRecord.from_dict(url_data)
+            if self._key_taken(record):
+                results.append(None)
+                continue
+            self._insert_record(record)
+            self._log_put(record)
+            results.append(record)
+        await self._commit()
+        return [record.to_response() if record is not None else None for record in results]
     
     async def get_url(self, url_id: str) -> Optional[URLResponse]:
         """根据ID获取短链接"""
         # 首先检查是否是别名
-        actual_id = self._alias_index.get(url_id, url_id)
-        
-        if actual_id in self._storage:
-            return URLResponse(**self._storage[actual_id])
-        return None
+        record = self._get_record(url_id)
+        if record is None:
+            return None
+        return record.to_response()
     
     async def update_url(self, url_id: str, update_data: dict) -> Optional[URLResponse]:
         """更新短链接"""
-        actual_id = self._alias_index.get(url_id, url_id)
-        
-        if actual_id not in self._storage:
+        record = self._get_record(url_id)
+        if record is None:
             return None
         
-        # 更新数据
-        self._storage[actual_id].update(update_data)
-        return URLResponse(**self._storage[actual_id])
+        # 更新数据；涉及索引键时先移出索引再重新插入
+        if "created_at" in update_data or "custom_alias" in update_data:
+            stats = self._detach_stats(record.id)
+            self._remove_record(record)
+            record.update(update_data)
+            self._insert_record(record)
+            self._attach_stats(record.id, stats)
+        else:
+            if "original_url" in update_data:
+                self._unindex_domain(record)
+                self._unindex_search(record)
+            record.update(update_data)
+            if "original_url" in update_data:
+                self._index_domain(record)
+                self._index_search(record)
+            if "expires_at" in update_data:
+                self._index_expiry(record)
+        self._log_put(record)
+        await self._commit()
+        return record.to_response()
     
     async def delete_url(self, url_id: str) -> bool:
         """删除短链接"""
-        actual_id = self._alias_index.get(url_id, url_id)
-        
-        if actual_id not in self._storage:
+        record = self._get_record(url_id)
+        if record is None:
             return False
         
-        # 删除别名映射
-        url_data = self._storage[actual_id]
-        if "custom_alias" in url_data and url_data["custom_alias"]:
-            self._alias_index.pop(url_data["custom_alias"], None)
-        
-        # 删除URL数据
-        del self._storage[actual_id]
+        self._remove_record(record)
+        self._log_delete(record.id)
+        await self._commit()
         return True
     
     async def increment_click_count(self, url_id: str) -> Optional[int]:
         """增加点击次数"""
-        actual_id = self._alias_index.get(url_id, url_id)
-        
-        if actual_id not in self._storage:
+        record = self._get_record(url_id)
+        if record is None:
             return None
         
-        self._storage[actual_id]["click_count"] += 1
-        self._storage[actual_id]["last_accessed"] = datetime.utcnow().isoformat()
-        return self._storage[actual_id]["click_count"]
+        record.click_count += 1
+        record.last_accessed = now_micros()
+        self._record_series(record.id, record.last_accessed, 1)
+        self._log_clicks(record)
+        return record.click_count
+    
+    async def resolve_and_count(self, url_id: str) -> str:
+        """
+        解析短链接并计数：一次查找完成过期/停用检查和点击计数，只返回目标URL
+        
+        重定向热路径专用，不构建Pydantic模型
+        """
+        now = now_micros()
+        record = self._resolve_record(url_id, now)
+        record.click_count += 1
+        record.last_accessed = now
+        self._record_series(record.id, now, 1)
+        self._log_clicks(record)
+        return record.original_url
+    
+    async def resolve_url(self, url_id: str) -> str:
+        """解析短链接但不计数（点击由写回缓冲另行累计）"""
+        return self._resolve_record(url_id, now_micros()).original_url
+    
+    async def apply_click_deltas(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        """批量合并点击增量：ID -> (点击增量, 最后访问时间微秒)"""
+        for url_id, (count, last_accessed) in deltas.items():
+            record = self._get_record(url_id)
+            if record is None:
+                continue
+            record.click_count += count
+            if record.last_accessed is None or last_accessed > record.last_accessed:
+                record.last_accessed = last_accessed
+            self._record_series(record.id, last_accessed, count)
+            self._log_clicks(record)
     
     async def get_all_urls(self) -> List[URLResponse]:
         """获取所有短链接"""
-        return [URLResponse(**data) for data in self._storage.values()]
+        return [record.to_response() for record in self._order]
+    
+    async def list_urls(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """按（创建时间, ID）顺序分页获取短链接，游标定位为一次二分查找"""
+        start = 0
+        if cursor is not None:
+            start = bisect_right(self._order, decode_cursor(cursor), key=_order_key)
+        records = self._order[start:start + limit + 1]
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = encode_cursor(*_order_key(records[-1]))
+        return [record.to_response() for record in records], next_cursor
     
     async def alias_exists(self, alias: str) -> bool:
         """检查别名是否存在"""
         return alias in self._alias_index
     
+    async def aliases_exist(self, aliases: List[str]) -> Set[str]:
+        """返回给定别名中已存在的部分"""
+        return {alias for alias in aliases if alias in self._alias_index}
+    
     async def get_stats(self, url_id: str) -> Optional[dict]:
         """获取统计信息"""
-        actual_id = self._alias_index.get(url_id, url_id)
-        
-        if actual_id not in self._storage:
+        record = self._get_record(url_id)
+        if record is None:
             return None
         
-        return self._storage[actual_id].copy()
+        return record.to_dict()
+    
+    async def reap_expired(self, before: int, limit: int) -> List[str]:
+        """从过期堆顶依次删除过期链接，跳过已删除或过期时间已变更的失效条目"""
+        heap = self._expiry_heap
+        reaped = []
+        while heap and heap[0][0] < before and len(reaped) < limit:
+            expires_at, url_id = heappop(heap)
+            record = self._storage.get(url_id)
+            if record is None or record.expires_at != expires_at:
+                continue
+            self._remove_record(record)
+            self._log_delete(url_id)
+            reaped.append(url_id)
+        
+        # 失效条目过多时重建堆，使其大小跟随存活链接数
+        if len(heap) > 2 * len(self._storage) + 1024:
+            self._rebuild_expiry_heap()
+        if reaped:
+            await self._commit()
+        return reaped
+    
+    async def find_canonical(self, keys: List[str]) -> Dict[str, URLResponse]:
+        """按规范化URL哈希键查找去重索引中的链接"""
+        found = {}
+        for key in keys:
+            record = self._storage.get(self._canonical_index.get(key))
+            if record is not None:
+                found[key] = record.to_response()
+        return found
+    
+    async def list_domain_urls(self, domain: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """按ID集合取出该域名的记录后分页"""
+        return _page(self._domain_records(domain), limit, cursor)
+    
+    async def get_domain_stats(self, domain: str) -> dict:
+        """汇总某主机名下的链接数、激活链接数和点击次数"""
+        records = self._domain_records(domain)
+        return {
+            "links": len(records),
+            "active_links": sum(1 for record in records if record.is_active),
+            "clicks": sum(record.click_count for record in records),
+        }
+    
+    async def set_domain_active(self, domain: str, is_active: bool) -> List[str]:
+        """批量设置激活状态，只为状态变化的记录写日志，最后统一提交一次"""
+        changed = []
+        for record in self._domain_records(domain):
+            if record.is_active != is_active:
+                record.is_active = is_active
+                self._log_put(record)
+                changed.append(record.id)
+        if changed:
+            await self._commit()
+        return changed
+    
+    async def delete_domain_urls(self, domain: str) -> List[str]:
+        """批量删除某主机名下的全部链接，最后统一提交一次"""
+        deleted = []
+        for record in self._domain_records(domain):
+            self._remove_record(record)
+            self._log_delete(record.id)
+            deleted.append(record.id)
+        if deleted:
+            await self._commit()
+        return deleted
+    
+    async def search_urls(self, query: str, mode: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[URLResponse], Optional[str]]:
+        """
+        按原始URL或别名搜索
+        
+        有搜索索引时前缀查询从游标位置顺序读取有序列表，读够一页即停止；子串查询复核三元组索引给出的候选。
+        没有索引或子串短于三个字符时扫描全部记录
+        """
+        query = fold(query)
+        index = self._search_index
+        if mode == "prefix":
+            position = decode_search_cursor(cursor) if cursor is not None else None
+            if index is not None:
+                return self._indexed_prefix_page(index, query, limit, position)
+            entries = []
+            for record in self._order:
+                text = prefix_key(query, record.original_url, record.custom_alias)
+                if text is not None:
+                    entries.append(((text, record.id), record))
+            return _prefix_page(entries, limit, position)
+        
+        candidates = index.candidates(query) if index is not None else None
+        if candidates is None:
+            records = self._order
+        else:
+            records = [self._storage[url_id] for url_id in set(candidates) if url_id in self._storage]
+        return _page(
+            [record for record in records if matches(query, mode, record.original_url, record.custom_alias)],
+            limit,
+            cursor,
+        )
+    
+    def _indexed_prefix_page(
+        self,
+        index: SearchIndex,
+        query: str,
+        limit: int,
+        position: Optional[Tuple[str, str]]
+    ) -> Tuple[List[URLResponse], Optional[str]]:
+        """从索引中position之后读取limit + 1条，原始URL和别名都匹配的链接只保留排序文本较小的条目"""
+        entries = []
+        for text, url_id in index.prefix(query, position):
+            record = self._storage[url_id]
+            if prefix_key(query, record.original_url, record.custom_alias) != text:
+                continue
+            if entries and entries[-1][0] == (text, url_id):
+                continue
+            entries.append(((text, url_id), record))
+            if len(entries) > limit:
+                break
+        return _prefix_page(entries, limit, None)
+    
+    async def get_click_series(self, url_id: str, granularity: str) -> Tuple[int, List[int]]:
+        """获取某粒度的点击计数环"""
+        record = self._get_record(url_id)
+        series = self._series.get(record.id) if record is not None else None
+        if series is None:
+            return 0, [0] * GRANULARITIES[granularity][1]
+        return read_ring(series, granularity)
+    
+    async def merge_visitor_sketches(self, sketches: Dict[str, bytes]) -> None:
+        """合并独立访客寄存器"""
+        for url_id, registers in sketches.items():
+            record = self._get_record(url_id)
+            if record is None:
+                continue
+            self._merge_visitors(record.id, registers)
+            self._log_visitors(record.id, registers)
+        await self._commit()
+    
+    async def get_visitor_sketch(self, url_id: str) -> bytes:
+        """获取独立访客寄存器"""
+        record = self._get_record(url_id)
+        registers = self._visitors.get(record.id) if record is not None else None
+        return EMPTY_SKETCH if registers is None else bytes(registers)
+    
+    async def iter_keys(self) -> AsyncIterator[str]:
+        """产出全部ID和别名（先复制键列表，遍历期间的修改不影响迭代）"""
+        for key in list(self._storage):
+            yield key
+        for alias in list(self._alias_index):
+            yield alias
+    
+    async def reserve_id_block(self, size: int) -> int:
+        """预留size个连续的ID计数值，返回起始值"""
+        start = self._id_counter
+        self._id_counter += size
+        self._log_id_counter(self._id_counter)
+        await self._commit()
+        return start
+    
+    async def load_id_secret(self, candidate: str) -> str:
+        """获取保存的短ID置换密钥，尚未保存时保存candidate"""
+        if self._id_secret is None:
+            self._id_secret = candidate
+            self._log_id_secret(candidate)
+            await self._commit()
+        return self._id_secret
+    
+    async def export_records(self) -> Tuple[List[URLRecord], int]:
+        """按分页顺序导出全部记录（复制列表，导出过程中的增删不影响结果）"""
+        return list(self._order), self._id_counter
+    
+    async def import_records(self, records: List[URLRecord], id_counter: int = 0) -> int:
+        """
+        批量导入记录，同ID的已有链接被替换（保留其点击序列和独立访客统计）
+        
+        解析域名、排序和为导入记录建立搜索索引在线程中完成（_prepare_import），
+        之后在事件循环上一次并入各索引，其间没有await，并发请求看不到导入一半的状态；
+        不逐条记录变更日志，ID计数值取两者较大值，导入后新分配的ID不会与导入的链接冲突
+        """
+        search_index = self._search_index
+        first_doc = search_index.reserve(len(records)) if search_index is not None else None
+        prepared = await asyncio.to_thread(_prepare_import, records, first_doc)
+        self._merge_import(*prepared, search_index)
+        self._id_counter = max(self._id_counter, id_counter)
+        return len(records)
+    
+    def _merge_import(self, by_id, ordered, aliases, canonical, expiry, domains, index, search_index) -> None:
+        """把_prepare_import的结果并入各索引：先移除被替换的旧记录，再整体更新"""
+        storage = self._storage
+        replaced = [storage[url_id] for url_id in by_id.keys() & storage.keys()]
+        for existing in replaced:
+            if existing.custom_alias:
+                self._alias_index.pop(existing.custom_alias, None)
+            self._unindex_canonical(existing)
+            self._unindex_domain(existing)
+        if search_index is not None and replaced:
+            search_index.remove_many(
+                (existing.id, existing.original_url, existing.custom_alias) for existing in replaced
+            )
+        storage.update(by_id)
+        self._alias_index.update(aliases)
+        self._canonical_index.update(canonical)
+        for domain, ids in domains.items():
+            current = self._domain_index.get(domain)
+            if current is None:
+                self._domain_index[domain] = set(ids)
+            else:
+                current.update(ids)
+        
+        # 导入的记录都比已有记录新时（如导入空存储）直接追加，否则拼接后排序，timsort只需归并两段有序序列
+        order = self._order
+        if replaced:
+            order = [record for record in order if storage[record.id] is record]
+        if not order or (ordered and _order_key(order[-1]) < _order_key(ordered[0])):
+            order.extend(ordered)
+        else:
+            order += ordered
+            order.sort(key=_order_key)
+        self._order = order
+        
+        if expiry:
+            self._expiry_heap.extend(expiry)
+            heapify(self._expiry_heap)
+        if index is not None:
+            search_index.merge(index)
+    
+    def _insert_record(self, record: URLRecord) -> None:
+        """
+        写入记录并建立别名映射、去重映射、域名索引和排序索引
+        
+        同ID的旧记录先连同全部索引和统计一并移除，否则排序列表、域名索引和搜索索引中会残留旧记录
+        """
+        existing = self._storage.get(record.id)
+        if existing is not None:
+            self._remove_record(existing)
+        self._storage[record.id] = record
+        
+        # 如果有自定义别名，建立映射
+        if record.custom_alias:
+            self._alias_index[record.custom_alias] = record.id
+        # 同一规范化URL以最新创建的链接为准
+        if record.canonical_key:
+            self._canonical_index[record.canonical_key] = record.id
+        self._index_domain(record)
+        self._index_search(record)
+        
+        # 新记录通常是最新的，直接追加到末尾
+        if not self._order or _order_key(self._order[-1]) < _order_key(record):
+            self._order.append(record)
+        else:
+            insort(self._order, record, key=_order_key)
+        self._index_expiry(record)
+    
+    def _remove_record(self, record: URLRecord) -> None:
+        """删除记录及其别名映射、去重映射、域名索引和排序索引"""
+        if record.custom_alias:
+            self._alias_index.pop(record.custom_alias, None)
+        self._unindex_canonical(record)
+        self._unindex_domain(record)
+        self._unindex_search(record)
+        self._series.pop(record.id, None)
+        self._visitors.pop(record.id, None)
+        del self._storage[record.id]
+        del self._order[self._order_position(record)]
+    
+    def _replace_record(self, existing: URLRecord, record: URLRecord) -> None:
+        """用同ID的新记录替换旧记录，排序键不变时原位替换"""
+        if _order_key(existing) != _order_key(record):
+            stats = self._detach_stats(existing.id)
+            self._remove_record(existing)
+            self._insert_record(record)
+            self._attach_stats(record.id, stats)
+            return
+        if existing.custom_alias:
+            self._alias_index.pop(existing.custom_alias, None)
+        if record.custom_alias:
+            self._alias_index[record.custom_alias] = record.id
+        self._unindex_canonical(existing)
+        if record.canonical_key:
+            self._canonical_index[record.canonical_key] = record.id
+        self._unindex_domain(existing)
+        self._index_domain(record)
+        self._unindex_search(existing)
+        self._index_search(record)
+        self._storage[record.id] = record
+        self._order[self._order_position(existing)] = record
+        if record.expires_at != existing.expires_at:
+            self._index_expiry(record)
+    
+    def _unindex_canonical(self, record: URLRecord) -> None:
+        """去重映射仍指向该记录时删除映射"""
+        if record.canonical_key and self._canonical_index.get(record.canonical_key) == record.id:
+            del self._canonical_index[record.canonical_key]
+    
+    def _index_domain(self, record: URLRecord) -> None:
+        domain = get_domain_from_url(record.original_url)
+        ids = self._domain_index.get(domain)
+        if ids is None:
+            ids = self._domain_index[domain] = set()
+        ids.add(record.id)
+    
+    def _unindex_domain(self, record: URLRecord) -> None:
+        """从域名索引中移除记录，集合为空时删除该域名"""
+        domain = get_domain_from_url(record.original_url)
+        ids = self._domain_index.get(domain)
+        if ids is not None:
+            ids.discard(record.id)
+            if not ids:
+                del self._domain_index[domain]
+    
+    def _index_search(self, record: URLRecord) -> None:
+        if self._search_index is not None:
+            self._search_index.add(record.id, record.original_url, record.custom_alias)
+    
+    def _unindex_search(self, record: URLRecord) -> None:
+        if self._search_index is not None:
+            self._search_index.remove(record.id, record.original_url, record.custom_alias)
+    
+    def _domain_records(self, domain: str) -> List[URLRecord]:
+        """某主机名下的全部记录，返回新列表，调用方可在遍历时增删记录"""
+        return [self._storage[url_id] for url_id in self._domain_index.get(domain, ())]
+    
+    def _order_position(self, record: URLRecord) -> int:
+        return bisect_left(self._order, _order_key(record), key=_order_key)
+    
+    def _record_series(self, url_id: str, timestamp: int, count: int) -> None:
+        """把点击计入时间序列（timestamp为微秒）"""
+        if not self._click_series:
+            return
+        series = self._series.get(url_id)
+        if series is None:
+            series = self._series[url_id] = new_series()
+        record_clicks(series, timestamp // 1_000_000, count)
+    
+    def _merge_visitors(self, url_id: str, registers: bytes) -> None:
+        current = self._visitors.get(url_id)
+        if current is None:
+            current = self._visitors[url_id] = new_sketch()
+        merge_sketch(current, registers)
+    
+    def _detach_stats(self, url_id: str) -> tuple:
+        """重新插入记录前取出点击序列和独立访客统计，_remove_record会一并删除它们"""
+        return self._series.get(url_id), self._visitors.get(url_id)
+    
+    def _attach_stats(self, url_id: str, stats: tuple) -> None:
+        series, visitors = stats
+        if series is not None:
+            self._series[url_id] = series
+        if visitors is not None:
+            self._visitors[url_id] = visitors
+    
+    def _index_expiry(self, record: URLRecord) -> None:
+        """为记录的当前过期时间加入堆条目；旧条目不删除，出堆时比对过期时间即可识别"""
+        if record.expires_at is not None:
+            heappush(self._expiry_heap, (record.expires_at, record.id))
+    
+    def _rebuild_expiry_heap(self) -> None:
+        self._expiry_heap = [
+            (record.expires_at, record.id)
+            for record in self._storage.values()
+            if record.expires_at is not None
+        ]
+        heapify(self._expiry_heap)
+    
+    # 以下钩子供持久化子类记录变更，内存存储不做任何事
+    
+    def _log_put(self, record: URLRecord) -> None:
+        """记录新建或更新后的完整记录"""
+    
+    def _log_delete(self, url_id: str) -> None:
+        """记录删除操作"""
+    
+    def _log_clicks(self, record: URLRecord) -> None:
+        """记录点击计数变化"""
+    
+    def _log_id_counter(self, value: int) -> None:
+        """记录新的ID计数值上界"""
+    
+    def _log_visitors(self, url_id: str, registers: bytes) -> None:
+        """记录合并进来的独立访客寄存器"""
+    
+    def _log_id_secret(self, secret: str) -> None:
+        """记录首次保存的短ID置换密钥"""
+    
+    async def _commit(self) -> None:
+        """等待已记录的变更落盘"""
+    
+    def _key_taken(self, record: URLRecord) -> bool:
+        """记录的ID或别名是否已被占用（作为ID或别名）"""
+        keys = (record.id, record.custom_alias) if record.custom_alias else (record.id,)
+        return any(key in self._storage or key in self._alias_index for key in keys)
+    
+    def _get_record(self, url_id: str) -> Optional[URLRecord]:
+        """按ID或别名查找原始记录"""
+        return self._storage.get(self._alias_index.get(url_id, url_id))
+    
+    def _resolve_record(self, url_id: str, now: int) -> URLRecord:
+        """查找可重定向的记录，不存在、已过期或已停用时抛出对应异常"""
+        record = self._storage.get(self._alias_index.get(url_id, url_id))
+        if record is None:
+            raise URLNotFoundError(url_id)
+        
+        if record.expires_at is not None and now > record.expires_at:
+            raise URLExpiredError(url_id)
+        
+        if not record.is_active:
+            raise URLInactiveError(url_id)
+        
+        return record
+
+
+def create_storage(settings) -> BaseURLStorage:
+    """根据配置创建存储后端"""
+    if settings.storage_backend == "memory":
+        return URLStorage(search_index=settings.search_index_enabled, click_series=settings.click_series_enabled)
+    
+    if settings.storage_backend == "durable":
+        from utils.durable_storage import DurableURLStorage
+        return DurableURLStorage(
+            data_dir=settings.data_dir,
+            fsync_delay=settings.fsync_delay,
+            snapshot_ops=settings.snapshot_ops,
+            search_index=settings.search_index_enabled,
+            click_series=settings.click_series_enabled,
+        )
+    
+    if settings.storage_backend == "redis":
+        from utils.redis_storage import RedisURLStorage
+        return RedisURLStorage(
+            url=settings.redis_url,
+            prefix=settings.redis_prefix,
+            max_connections=settings.redis_max_connections,
+            click_series=settings.click_series_enabled,
+            search_index=settings.search_index_enabled,
+        )
+    
+    if settings.storage_backend == "shm":
+        from utils.shm_storage import SharedMemoryURLStorage
+        return SharedMemoryURLStorage(
+            path=settings.shm_path,
+            capacity=settings.shm_capacity,
+            heap_size=settings.shm_heap_size,
+            click_series=settings.click_series_enabled,
+        )
+    
+    raise ValueError(f"不支持的存储后端: {settings.storage_backend}")
 
 
-# 全局存储实例
-url_storage = URLStorage() 
\ No newline at end of file
+# 全局存储实例，启用指标时包装一层以记录各操作的耗时，
+# 启用成员过滤器时在最外层先拒绝不存在的ID，被拒绝的查找不计入存储操作指标
+url_storage = create_storage(settings)
+if settings.metrics_enabled:
+    from utils.instrumented_storage import InstrumentedStorage
+    url_storage = InstrumentedStorage(url_storage)
+if settings.notfound_filter_enabled:
+    from utils.filtered_storage import FilteredStorage
+    from utils.metrics import registry
+    url_storage = FilteredStorage(url_storage, settings.notfound_filter_capacity, settings.notfound_filter_error_rate)
+    registry.callback(
+        "notfound_filter_rejections_total",
+        "成员过滤器判断不存在、未访问存储即返回的查找数",
+        lambda: url_storage.rejections,
+        kind="counter"
+    )
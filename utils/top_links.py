@@ -0,0 +1,169 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from utils.url_record import now_micros
+from utils.metrics import registry
+
+
+class SpaceSaving:
+    """
+    Space-Saving热点统计
+    
+    最多跟踪capacity个键；新键在已满时替换计数最小的键并继承其计数作为误差上界。
+    报告的计数是真实值的上界，计数减误差是下界。每次更新的开销只与capacity有关，与键的总数无关
+    """
+    
+    __slots__ = ("capacity", "_counts", "_heap")
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: Dict[str, List[int]] = {}  # 键 -> [计数, 误差]
+        self._heap: List[Tuple[int, str]] = []  # (计数, 键)，惰性删除过时的条目
+    
+    def __len__(self) -> int:
+        return len(self._counts)
+    
+    def offer(self, key: str, count: int = 1) -> None:
+        """计入一次或多次出现"""
+        entry = self._counts.get(key)
+        if entry is None:
+            error = 0
+            if len(self._counts) >= self.capacity:
+                error, evicted = self._pop_min()
+                del self._counts[evicted]
+            entry = self._counts[key] = [error, error]
+        entry[0] += count
+        heapq.heappush(self._heap, (entry[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(counts[0], k) for k, counts in self._counts.items()]
+            heapq.heapify(self._heap)
+    
+    def min_count(self) -> int:
+        """未满时为0，已满时为被跟踪键的最小计数（任何未跟踪键的真实计数都不超过该值）"""
+        if len(self._counts) < self.capacity:
+            return 0
+        count, key = self._peek_min()
+        return count
+    
+    def items(self) -> Dict[str, List[int]]:
+        """被跟踪的键 -> [计数, 误差]"""
+        return self._counts
+    
+    def clear(self) -> None:
+        self._counts.clear()
+        self._heap.clear()
+    
+    def _peek_min(self) -> Tuple[int, str]:
+        heap = self._heap
+        while True:
+            count, key = heap[0]
+            entry = self._counts.get(key)
+            if entry is not None and entry[0] == count:
+                return count, key
+            heapq.heappop(heap)
+    
+    def _pop_min(self) -> Tuple[int, str]:
+        count, key = self._peek_min()
+        heapq.heappop(self._heap)
+        return count, key
+
+
+class TopLinks:
+    """
+    最热短链接统计
+    
+    一个全时段Space-Saving加上按分钟划分的环形窗口（每分钟一个Space-Saving），
+    重定向时同时计入全时段和当前分钟；查询最近N分钟时合并对应的分钟统计。
+    内存上限为 (窗口分钟数 + 1) * capacity 个条目，与链接总数无关。
+    统计只在本进程内进行，多worker部署时各worker分别统计
+    """
+    
+    def __init__(self, capacity: int = 1000, window_minutes: int = 60):
+        self.capacity = capacity
+        self.window_minutes = window_minutes
+        self._all_time = SpaceSaving(capacity)
+        self._minutes = [SpaceSaving(capacity) for _ in range(window_minutes)]
+        self._minute_keys = [-1] * window_minutes  # 各槽位当前对应的分钟号
+    
+    def __len__(self) -> int:
+        return len(self._all_time)
+    
+    def record(self, key: str, now: Optional[int] = None) -> None:
+        """记录一次重定向，now为微秒时间戳"""
+        if now is None:
+            now = now_micros()
+        self._all_time.offer(key)
+        self._minute_sketch(now // 60_000_000).offer(key)
+    
+    def top(self, k: int, minutes: Optional[int] = None, now: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        返回计数最高的k个键：(键, 估计计数, 误差上界)
+        
+        minutes为None时统计全时段，否则统计最近minutes分钟（最多为窗口分钟数）
+        """
+        if minutes is None:
+            merged = {key: (count, error) for key, (count, error) in self._all_time.items().items()}
+        else:
+            if now is None:
+                now = now_micros()
+            current = now // 60_000_000
+            sketches = [
+                self._minutes[minute % self.window_minutes]
+                for minute in range(current - min(minutes, self.window_minutes) + 1, current + 1)
+                if self._minute_keys[minute % self.window_minutes] == minute
+            ]
+            merged = self._merge(sketches)
+        return heapq.nlargest(k, ((key, count, error) for key, (count, error) in merged.items()), key=lambda item: item[1])
+    
+    def discard(self, *keys: str) -> None:
+        """链接删除后不再出现在统计中"""
+        for sketch in (self._all_time, *self._minutes):
+            for key in keys:
+                sketch.items().pop(key, None)
+    
+    def clear(self) -> None:
+        self._all_time.clear()
+        for sketch in self._minutes:
+            sketch.clear()
+        self._minute_keys = [-1] * self.window_minutes
+    
+    def _minute_sketch(self, minute: int) -> SpaceSaving:
+        slot = minute % self.window_minutes
+        if self._minute_keys[slot] != minute:
+            self._minutes[slot].clear()
+            self._minute_keys[slot] = minute
+        return self._minutes[slot]
+    
+    @staticmethod
+    def _merge(sketches: List[SpaceSaving]) -> Dict[str, Tuple[int, int]]:
+        """
+        合并多个分钟统计
+        
+        某个键不在一个已满的统计中时，它在该分钟的真实计数不超过该统计的最小计数，
+        计入计数上界和误差，保持“计数为上界、计数减误差为下界”
+        """
+        keys = set()
+        for sketch in sketches:
+            keys.update(sketch.items())
+        mins = [sketch.min_count() for sketch in sketches]
+        merged = {}
+        for key in keys:
+            count = error = 0
+            for sketch, floor in zip(sketches, mins):
+                entry = sketch.items().get(key)
+                if entry is None:
+                    count += floor
+                    error += floor
+                else:
+                    count += entry[0]
+                    error += entry[1]
+            merged[key] = (count, error)
+        return merged
+
+
+# 全局热点统计实例，TOP_LINKS_CAPACITY为0时不启用
+top_links = TopLinks(settings.top_links_capacity, settings.top_links_window) if settings.top_links_capacity > 0 else None
+
+if top_links is not None:
+    registry.callback("top_links_tracked", "全时段热点统计跟踪的链接数", lambda: len(top_links))
@@ -0,0 +1,212 @@
+import base64
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from models.url_models import URLResponse
+from exceptions.url_exceptions import InvalidCursorError
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def now_micros() -> int:
+    """当前UTC时间（微秒时间戳）"""
+    return time.time_ns() // 1000
+
+
+def to_micros(value) -> Optional[int]:
+    """将ISO字符串、datetime或时间戳转换为UTC微秒时间戳，无时区信息时按UTC处理"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_micros(value: Optional[int]) -> Optional[datetime]:
+    """将UTC微秒时间戳转换为无时区datetime"""
+    if value is None:
+        return None
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def split_short_url(short_url: str, url_id: str) -> str:
+    """从完整短链接中拆出基础URL"""
+    suffix = "/" + url_id
+    if short_url.endswith(suffix):
+        return short_url[:-len(suffix)]
+    return short_url.rstrip("/")
+
+
+def encode_cursor(created_at: int, url_id: str) -> str:
+    """将排序键（创建时间, ID）编码为不透明的分页游标"""
+    return base64.urlsafe_b64encode(f"{created_at}:{url_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """解码分页游标，返回排序键（创建时间, ID）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, url_id = raw.split(":", 1)
+        return int(created_at), url_id
+    except ValueError:
+        raise InvalidCursorError(cursor)
+
+
+def encode_search_cursor(text: str, url_id: str) -> str:
+    """将前缀搜索的排序键（折叠后的文本, ID）编码为分页游标，内容与Redis搜索有序集合的成员相同"""
+    return base64.urlsafe_b64encode(f"{text}\x00{url_id}".encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[str, str]:
+    """解码前缀搜索的分页游标，返回排序键（折叠后的文本, ID）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except ValueError:
+        raise InvalidCursorError(cursor)
+    text, separator, url_id = raw.rpartition("\x00")
+    if not separator:
+        raise InvalidCursorError(cursor)
+    return text, url_id
+
+
+class URLRecord:
+    """
+    紧凑的短链接存储记录
+    
+    使用__slots__避免每条记录的字典开销，时间字段保存为UTC微秒整数，
+    short_url只保存驻留后的基础URL，序列化时再拼接
+    """
+    
+    __slots__ = (
+        "id",
+        "original_url",
+        "base_url",
+        "custom_alias",
+        "created_at",
+        "expires_at",
+        "last_accessed",
+        "click_count",
+        "is_active",
+        "canonical_key",
+    )
+    
+    def __init__(
+        self,
+        id: str,
+        original_url: str,
+        base_url: str,
+        created_at: int,
+        expires_at: Optional[int] = None,
+        last_accessed: Optional[int] = None,
+        click_count: int = 0,
+        is_active: bool = True,
+        custom_alias: Optional[str] = None,
+        canonical_key: Optional[str] = None,
+    ):
+        self.id = id
+        self.original_url = original_url
+        self.base_url = sys.intern(base_url)
+        self.custom_alias = custom_alias
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.last_accessed = last_accessed
+        self.click_count = click_count
+        self.is_active = is_active
+        self.canonical_key = canonical_key  # 去重模式下规范化URL的哈希键
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "URLRecord":
+        """从服务层传入的字典构建记录"""
+        url_id = data["id"]
+        base_url = data.get("base_url")
+        if base_url is None:
+            base_url = split_short_url(data["short_url"], url_id)
+        created_at = to_micros(data.get("created_at"))
+        return cls(
+            id=url_id,
+            original_url=data["original_url"],
+            base_url=base_url,
+            created_at=created_at if created_at is not None else now_micros(),
+            expires_at=to_micros(data.get("expires_at")),
+            last_accessed=to_micros(data.get("last_accessed")),
+            click_count=data.get("click_count", 0),
+            is_active=data.get("is_active", True),
+            custom_alias=data.get("custom_alias") or None,
+            canonical_key=data.get("canonical_key"),
+        )
+    
+    def astuple(self) -> tuple:
+        """按构造参数顺序导出字段，URLRecord(*record.astuple())可还原记录"""
+        return (
+            self.id,
+            self.original_url,
+            self.base_url,
+            self.created_at,
+            self.expires_at,
+            self.last_accessed,
+            self.click_count,
+            self.is_active,
+            self.custom_alias,
+            self.canonical_key,
+        )
+    
+    @property
+    def short_url(self) -> str:
+        return f"{self.base_url}/{self.id}"
+    
+    def update(self, update_data: dict) -> None:
+        """按字段更新记录，时间字段自动转换"""
+        for key, value in update_data.items():
+            if key in ("created_at", "expires_at", "last_accessed"):
+                value = to_micros(value)
+            elif key == "short_url":
+                key, value = "base_url", sys.intern(split_short_url(value, self.id))
+            elif key not in self.__slots__ or key == "id":
+                continue
+            setattr(self, key, value)
+    
+    def is_expired(self, now: int) -> bool:
+        """检查记录在给定微秒时间戳时是否已过期"""
+        return self.expires_at is not None and now > self.expires_at
+    
+    def to_response(self) -> URLResponse:
+        """序列化为响应模型"""
+        return URLResponse(
+            id=self.id,
+            original_url=self.original_url,
+            short_url=self.short_url,
+            click_count=self.click_count,
+            created_at=from_micros(self.created_at),
+            expires_at=from_micros(self.expires_at),
+            is_active=self.is_active,
+        )
+    
+    def to_dict(self) -> dict:
+        """导出为与旧存储格式兼容的字典（时间字段为ISO字符串）"""
+        data = {
+            "id": self.id,
+            "original_url": self.original_url,
+            "short_url": self.short_url,
+            "click_count": self.click_count,
+            "created_at": from_micros(self.created_at).isoformat(),
+            "expires_at": _isoformat(self.expires_at),
+            "is_active": self.is_active,
+            "last_accessed": _isoformat(self.last_accessed),
+        }
+        if self.custom_alias:
+            data["custom_alias"] = self.custom_alias
+        return data
+
+
+def _isoformat(value: Optional[int]) -> Optional[str]:
+    if value is None:
+        return None
+    return from_micros(value).isoformat()
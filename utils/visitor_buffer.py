@@ -0,0 +1,48 @@
+from typing import Dict, Optional
+
+from utils.hyperloglog import new_sketch, add_register, merge_sketch, visitor_register
+from utils.metrics import registry
+from utils.write_behind import WriteBehindBuffer
+
+
+class VisitorBuffer(WriteBehindBuffer):
+    """
+    独立访客统计写回缓冲
+    
+    重定向时只更新进程内每条链接的HyperLogLog寄存器，由后台任务定期与存储中的统计合并。
+    寄存器按位取最大值即可合并，各worker、各节点分别缓冲再合并到同一份统计，
+    结果与所有访问都计入同一个统计相同
+    """
+    
+    failure_message = "独立访客统计合并失败"
+    
+    def __init__(self):
+        super().__init__()
+        self._pending: Dict[str, bytearray] = {}  # ID -> 尚未合并到存储的寄存器
+    
+    def record(self, url_id: str, visitor: str) -> None:
+        """记录一次访问，visitor为访客标识（客户端IP和User-Agent）"""
+        registers = self._pending.get(url_id)
+        if registers is None:
+            registers = self._pending[url_id] = new_sketch()
+        add_register(registers, *visitor_register(visitor))
+    
+    def pending(self, url_id: str) -> Optional[bytearray]:
+        """获取尚未合并到存储的寄存器"""
+        return self._pending.get(url_id)
+    
+    async def _write(self, storage, sketches: Dict[str, bytearray]) -> None:
+        await storage.merge_visitor_sketches(sketches)
+    
+    def _merge_back(self, sketches: Dict[str, bytearray]) -> None:
+        for url_id, registers in sketches.items():
+            current = self._pending.get(url_id)
+            if current is None:
+                self._pending[url_id] = registers
+            else:
+                merge_sketch(current, registers)
+
+
+# 全局独立访客缓冲实例
+visitor_buffer = VisitorBuffer()
+registry.callback("visitor_buffer_pending_links", "有待合并独立访客统计的链接数", lambda: len(visitor_buffer))
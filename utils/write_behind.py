@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    进程内写回缓冲基类
+    
+    按链接ID累积待写回的数据，由后台任务定期取出全部数据批量写入存储；
+    写入失败时把取出的数据合并回缓冲，等待下次重试。
+    子类实现记录方式、批量写入（_write）和合并回缓冲（_merge_back）
+    """
+    
+    # 后台写回失败时的日志消息
+    failure_message = "写回存储失败"
+    
+    def __init__(self):
+        self._pending: Dict[str, object] = {}  # ID -> 尚未写回存储的数据
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._storage = None
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+    
+    def discard(self, url_id: str) -> None:
+        """丢弃某条链接的待写回数据（链接删除时调用）"""
+        self._pending.pop(url_id, None)
+    
+    def drain(self) -> dict:
+        """取出全部待写回数据并清空缓冲"""
+        pending, self._pending = self._pending, {}
+        return pending
+    
+    async def flush(self, storage=None) -> int:
+        """将待写回数据写入存储，返回写回的链接数"""
+        storage = storage or self._storage
+        batch = self.drain()
+        if not batch:
+            return 0
+        try:
+            await self._write(storage, batch)
+        except Exception:
+            # 写回失败时把数据放回缓冲，等待下次重试
+            self._merge_back(batch)
+            raise
+        return len(batch)
+    
+    def start(self, storage, interval: float) -> None:
+        """启动后台定期写回任务"""
+        self._storage = storage
+        if self._task is None or self._task.done():
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run(interval))
+    
+    async def stop(self) -> None:
+        """停止后台任务（等待进行中的一轮完成，避免取消时丢失已取出的数据）并写回剩余数据"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        if self._storage is not None:
+            await self.flush()
+    
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception(self.failure_message)
+    
+    async def _write(self, storage, batch: dict) -> None:
+        raise NotImplementedError
+    
+    def _merge_back(self, batch: dict) -> None:
+        raise NotImplementedError